@@ -0,0 +1,166 @@
+"""
+Vectorized Black-Scholes Pricing
+
+Prices, greeks and implied volatility for whole option chains at once.
+All functions take NumPy arrays (or scalars) and broadcast.
+
+Conventions (match TradeStation's quoted greeks):
+- sigma is a decimal (0.25 = 25%)
+- t is in years
+- theta is per calendar day
+- vega is per 1 volatility point (0.01)
+
+The implied volatility solver runs Newton steps on every contract
+simultaneously, safeguarded by a per-contract bisection bracket; any
+contract that still has not converged falls back to SciPy's Brent solver.
+"""
+
+import os
+from typing import Dict, Optional
+
+import numpy as np
+from scipy.optimize import brentq
+from scipy.special import ndtr
+
+IV_LOWER = 1e-4
+IV_UPPER = 5.0
+IV_TOLERANCE = 1e-6
+IV_MAX_ITERATIONS = 50
+
+_SQRT_2PI = np.sqrt(2 * np.pi)
+
+
+def get_risk_free_rate() -> float:
+    """Annual risk-free rate from RISK_FREE_RATE (decimal, default 4.5%)."""
+    try:
+        return float(os.environ.get("RISK_FREE_RATE", "0.045"))
+    except ValueError:
+        return 0.045
+
+
+def _pdf(x):
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def _d1_d2(s, k, t, r, sigma, q):
+    vol_sqrt_t = sigma * np.sqrt(t)
+    d1 = (np.log(s / k) + (r - q + 0.5 * sigma * sigma) * t) / vol_sqrt_t
+    return d1, d1 - vol_sqrt_t
+
+
+def bs_price(s, k, t, r, sigma, is_call, q=0.0) -> np.ndarray:
+    """Black-Scholes price of European calls (is_call=True) and puts."""
+    s, k, t, sigma = (np.asarray(a, dtype=float) for a in (s, k, t, sigma))
+    is_call = np.asarray(is_call, dtype=bool)
+    d1, d2 = _d1_d2(s, k, t, r, sigma, q)
+    df_s = s * np.exp(-q * t)
+    df_k = k * np.exp(-r * t)
+    call = df_s * ndtr(d1) - df_k * ndtr(d2)
+    put = df_k * ndtr(-d2) - df_s * ndtr(-d1)
+    return np.where(is_call, call, put)
+
+
+def bs_vega(s, k, t, r, sigma, q=0.0) -> np.ndarray:
+    """Raw vega (price change per 1.00 of sigma); same for calls and puts."""
+    s, k, t, sigma = (np.asarray(a, dtype=float) for a in (s, k, t, sigma))
+    d1, _ = _d1_d2(s, k, t, r, sigma, q)
+    return s * np.exp(-q * t) * _pdf(d1) * np.sqrt(t)
+
+
+def bs_greeks(s, k, t, r, sigma, is_call, q=0.0) -> Dict[str, np.ndarray]:
+    """Delta, gamma, theta (per day) and vega (per vol point)."""
+    s, k, t, sigma = (np.asarray(a, dtype=float) for a in (s, k, t, sigma))
+    is_call = np.asarray(is_call, dtype=bool)
+    d1, d2 = _d1_d2(s, k, t, r, sigma, q)
+    sqrt_t = np.sqrt(t)
+    disc_q = np.exp(-q * t)
+    disc_r = np.exp(-r * t)
+    pdf_d1 = _pdf(d1)
+
+    delta = np.where(is_call, disc_q * ndtr(d1), disc_q * (ndtr(d1) - 1))
+    gamma = disc_q * pdf_d1 / (s * sigma * sqrt_t)
+    decay = -s * disc_q * pdf_d1 * sigma / (2 * sqrt_t)
+    theta_call = decay - r * k * disc_r * ndtr(d2) + q * s * disc_q * ndtr(d1)
+    theta_put = decay + r * k * disc_r * ndtr(-d2) - q * s * disc_q * ndtr(-d1)
+    theta = np.where(is_call, theta_call, theta_put) / 365
+    vega = s * disc_q * pdf_d1 * sqrt_t / 100
+
+    return {'delta': delta, 'gamma': gamma, 'theta': theta, 'vega': vega}
+
+
+def implied_volatility(price, s, k, t, r, is_call, q=0.0,
+                       tol: float = IV_TOLERANCE, max_iter: int = IV_MAX_ITERATIONS,
+                       initial: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Solve for implied volatility across a whole chain.
+
+    Returns NaN where the price is outside the no-arbitrage bounds or any
+    input is missing.
+    """
+    price, s, k, t = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (price, s, k, t)))
+    is_call = np.broadcast_to(np.asarray(is_call, dtype=bool), price.shape)
+    shape = price.shape
+    price, s, k, t = (a.astype(float).ravel() for a in (price, s, k, t))
+    is_call = is_call.ravel()
+    n = price.size
+
+    iv = np.full(n, np.nan)
+    with np.errstate(invalid='ignore'):
+        lower_bound = np.where(
+            is_call,
+            np.maximum(s * np.exp(-q * t) - k * np.exp(-r * t), 0),
+            np.maximum(k * np.exp(-r * t) - s * np.exp(-q * t), 0),
+        )
+        upper_bound = np.where(is_call, s * np.exp(-q * t), k * np.exp(-r * t))
+        solvable = (
+            np.isfinite(price) & np.isfinite(s) & np.isfinite(k) & np.isfinite(t)
+            & (s > 0) & (k > 0) & (t > 0)
+            & (price > lower_bound) & (price < upper_bound)
+        )
+    idx = np.flatnonzero(solvable)
+    if idx.size == 0:
+        return iv.reshape(shape)
+
+    p, ss, kk, tt, cc = price[idx], s[idx], k[idx], t[idx], is_call[idx]
+    lo = np.full(idx.size, IV_LOWER)
+    hi = np.full(idx.size, IV_UPPER)
+    if initial is not None:
+        sigma = np.clip(np.broadcast_to(np.asarray(initial, dtype=float), shape).ravel()[idx], IV_LOWER, IV_UPPER)
+        sigma = np.where(np.isfinite(sigma), sigma, 0.3)
+    else:
+        # Brenner-Subrahmanyam style starting point
+        sigma = np.clip(np.sqrt(2 * np.pi / tt) * p / ss, 0.05, 2.0)
+
+    active = np.ones(idx.size, dtype=bool)
+    for _ in range(max_iter):
+        a = np.flatnonzero(active)
+        if a.size == 0:
+            break
+        diff = bs_price(ss[a], kk[a], tt[a], r, sigma[a], cc[a], q) - p[a]
+        done = np.abs(diff) < tol
+        active[a[done]] = False
+
+        # Price is increasing in sigma, so the sign of diff tightens the bracket
+        too_high = diff > 0
+        hi[a] = np.where(too_high, sigma[a], hi[a])
+        lo[a] = np.where(too_high, lo[a], sigma[a])
+
+        vega = bs_vega(ss[a], kk[a], tt[a], r, sigma[a], q)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            step = sigma[a] - diff / vega
+        # Fall back to bisection when Newton leaves the bracket or vega vanishes
+        outside = ~np.isfinite(step) | (step <= lo[a]) | (step >= hi[a])
+        step = np.where(outside, 0.5 * (lo[a] + hi[a]), step)
+        sigma[a] = np.where(done, sigma[a], step)
+
+    # Brent fallback for anything the batched solver could not pin down
+    for j in np.flatnonzero(active):
+        objective = lambda v, j=j: float(bs_price(ss[j], kk[j], tt[j], r, v, cc[j], q)) - p[j]
+        try:
+            sigma[j] = brentq(objective, IV_LOWER, IV_UPPER, xtol=tol)
+            active[j] = False
+        except ValueError:
+            sigma[j] = np.nan
+
+    iv[idx] = sigma
+    return iv.reshape(shape)
@@ -0,0 +1,187 @@
+"""
+Chain Data Quality
+
+Vectorized validation run right after a chain is loaded, before any
+pairing or scoring. Every rule is one boolean mask over the whole chain
+(True = reject), so bad contracts are dropped in bulk instead of being
+caught row by row inside the strategy loops, and the O(n^2) spread search
+only sees clean, liquid contracts.
+
+Rules:
+- crossed: bid > ask
+- no_bid: bid missing or <= 0
+- low_open_interest / low_volume: below CHAIN_MIN_OPEN_INTEREST / CHAIN_MIN_VOLUME
+  (unknown values pass)
+- stale_quote: quote_date older than CHAIN_MAX_QUOTE_AGE_DAYS
+- strike_outlier: strike missing, <= 0, or outside spot x (1 +- CHAIN_STRIKE_RANGE)
+- premium_outlier: bid above CHAIN_MAX_PREMIUM_PCT of the strike (puts) or
+  spot (calls), i.e. an absurd return
+
+Per-rule rejection counts are reported (a contract failing several rules
+counts once per rule).
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from data_collection.option_chain import rows_to_chain
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+@dataclass
+class QualityThresholds:
+    min_open_interest: float = 0
+    min_volume: float = 0
+    max_quote_age_days: int = 5
+    strike_range: float = 0.5
+    max_premium_pct: float = 50.0
+
+    @classmethod
+    def from_env(cls) -> 'QualityThresholds':
+        return cls(
+            min_open_interest=_env_float("CHAIN_MIN_OPEN_INTEREST", 0),
+            min_volume=_env_float("CHAIN_MIN_VOLUME", 0),
+            max_quote_age_days=int(_env_float("CHAIN_MAX_QUOTE_AGE_DAYS", 5)),
+            strike_range=_env_float("CHAIN_STRIKE_RANGE", 0.5),
+            max_premium_pct=_env_float("CHAIN_MAX_PREMIUM_PCT", 50.0),
+        )
+
+
+# Rule name -> mask(chain, spot, thresholds, today); True rejects the contract
+RuleFn = Callable[[np.ndarray, np.ndarray, QualityThresholds, date], np.ndarray]
+RULES: Dict[str, RuleFn] = {}
+
+
+def quality_rule(name: str):
+    def decorator(fn: RuleFn) -> RuleFn:
+        RULES[name] = fn
+        return fn
+    return decorator
+
+
+@quality_rule('crossed')
+def _crossed(chain, spot, thresholds, today):
+    bid, ask = chain['bid'], chain['ask']
+    return np.isfinite(bid) & np.isfinite(ask) & (ask > 0) & (bid > ask)
+
+
+@quality_rule('no_bid')
+def _no_bid(chain, spot, thresholds, today):
+    return ~(chain['bid'] > 0)
+
+
+@quality_rule('low_open_interest')
+def _low_open_interest(chain, spot, thresholds, today):
+    return chain['open_interest'] < thresholds.min_open_interest
+
+
+@quality_rule('low_volume')
+def _low_volume(chain, spot, thresholds, today):
+    return chain['volume'] < thresholds.min_volume
+
+
+@quality_rule('stale_quote')
+def _stale_quote(chain, spot, thresholds, today):
+    quoted = chain['quote_date'].astype('datetime64[D]')
+    oldest = np.datetime64(today, 'D') - np.timedelta64(thresholds.max_quote_age_days, 'D')
+    # NaT (unknown date) compares False and passes
+    return quoted < oldest
+
+
+@quality_rule('strike_outlier')
+def _strike_outlier(chain, spot, thresholds, today):
+    strike = chain['strike']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        moneyness = np.abs(strike / spot - 1)
+    return ~(strike > 0) | (np.isfinite(moneyness) & (moneyness > thresholds.strike_range))
+
+
+@quality_rule('premium_outlier')
+def _premium_outlier(chain, spot, thresholds, today):
+    # A put is worth at most its strike, a call at most the stock
+    reference = np.where(chain['type'] == 'call', spot, chain['strike'])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        premium_pct = chain['bid'] / reference * 100
+    return np.isfinite(premium_pct) & (premium_pct > thresholds.max_premium_pct)
+
+
+@dataclass
+class QualityReport:
+    total: int = 0
+    kept: int = 0
+    rejected: Dict[str, int] = field(default_factory=lambda: {name: 0 for name in RULES})
+
+    def add(self, masks: Mapping[str, np.ndarray], keep: np.ndarray):
+        self.total += len(keep)
+        self.kept += int(keep.sum())
+        for name, mask in masks.items():
+            self.rejected[name] = self.rejected.get(name, 0) + int(mask.sum())
+
+    def summary(self) -> str:
+        counts = ', '.join(f"{name}={count}" for name, count in self.rejected.items() if count)
+        return (f"Chain quality: kept {self.kept}/{self.total} contracts"
+                + (f" (rejected: {counts})" if counts else ""))
+
+
+def spot_column(chain: np.ndarray, prices: Union[Mapping[str, float], float, None]) -> np.ndarray:
+    """Underlying price per contract from one price or a {symbol: price} map (unknown = NaN)."""
+    if prices is None:
+        return np.full(len(chain), np.nan)
+    if not isinstance(prices, Mapping):
+        return np.full(len(chain), float(prices) if prices else np.nan)
+    # One dict lookup per symbol, not per contract
+    symbols, inverse = np.unique(chain['symbol'], return_inverse=True)
+    values = np.array([float(prices.get(s) or np.nan) for s in symbols], dtype=float)
+    return values[inverse] if len(chain) else np.array([], dtype=float)
+
+
+def rule_masks(chain: np.ndarray, spot: np.ndarray, thresholds: Optional[QualityThresholds] = None,
+               today: Optional[date] = None) -> Dict[str, np.ndarray]:
+    """{rule: reject mask} for every rule; use to flag instead of drop."""
+    thresholds = thresholds or QualityThresholds.from_env()
+    today = today or date.today()
+    with np.errstate(invalid='ignore'):
+        return {name: rule(chain, spot, thresholds, today) for name, rule in RULES.items()}
+
+
+def _validate(chain: np.ndarray, prices, thresholds, today, report) -> Tuple[np.ndarray, QualityReport]:
+    report = report if report is not None else QualityReport()
+    masks = rule_masks(chain, spot_column(chain, prices), thresholds, today)
+    keep = np.ones(len(chain), dtype=bool)
+    for mask in masks.values():
+        keep &= ~mask
+    report.add(masks, keep)
+    return keep, report
+
+
+def validate_chain(chain: np.ndarray, prices: Union[Mapping[str, float], float, None] = None,
+                   thresholds: Optional[QualityThresholds] = None, today: Optional[date] = None,
+                   report: Optional[QualityReport] = None) -> Tuple[np.ndarray, QualityReport]:
+    """
+    Drop every contract failing a rule. `prices` is the underlying price
+    (one number for a single-symbol chain, or {symbol: price}). Counts are
+    accumulated into `report` when given, so one report can cover many chains.
+    """
+    keep, report = _validate(chain, prices, thresholds, today, report)
+    return chain[keep], report
+
+
+def validate_rows(rows: List[Dict], prices: Union[Mapping[str, float], float, None] = None,
+                  thresholds: Optional[QualityThresholds] = None, today: Optional[date] = None,
+                  report: Optional[QualityReport] = None) -> Tuple[List[Dict], QualityReport]:
+    """validate_chain for callers that work on options_quotes row dicts."""
+    keep, report = _validate(rows_to_chain(rows, today), prices, thresholds, today, report)
+    return [row for row, ok in zip(rows, keep) if ok], report
@@ -0,0 +1,348 @@
+"""
+Single-Pass Multi-Strategy Chain Scanner
+
+Walks each (symbol, expiration) chain once in columnar form and lets every
+registered strategy emit candidates from the same shared intermediates:
+strike-sorted put/call columns, mids, deltas and the vertical spread pair
+tables (computed lazily, at most once per chain, and reused by VPC, call
+credit spreads and iron condors).
+
+Registered strategies:
+- CSP: Cash-Secured Put
+- VPC: Vertical Put Credit Spread
+- CCS: Call Credit Spread
+- IC:  Iron Condor (best put spreads x best call spreads)
+- CC:  Covered Call
+
+Adding a strategy:
+
+    @register_strategy('XYZ', sides=('put',))
+    def scan_xyz(chain: ChainSlice) -> List[Dict]:
+        ...
+
+Strategies are selected with SCANNER_STRATEGIES (default "CSP,VPC").
+"""
+
+import os
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data_collection.option_chain import group_slices
+from data_collection.ranking import TopKRanker, get_rank_key, ranks_on_simulation
+from data_collection.monte_carlo import apply_monte_carlo
+from data_collection.scoring import get_scoring_engine
+
+# Candidates kept per strategy per ticker
+TOP_PER_STRATEGY = 5
+
+# Filters shared by the strategies (same as the original CSP/VPC logic)
+MAX_SHORT_DELTA = 0.30
+MIN_SPREAD_WIDTH = 2.5
+MAX_SPREAD_WIDTH = 20.0
+# Spreads per side combined into iron condors
+CONDOR_LEGS_PER_SIDE = 3
+
+DEFAULT_STRATEGIES = ('CSP', 'VPC')
+
+
+@dataclass(frozen=True)
+class Strategy:
+    name: str
+    sides: Tuple[str, ...]
+    scan: Callable[['ChainSlice'], List[Dict]]
+
+
+STRATEGIES: Dict[str, Strategy] = {}
+
+
+def register_strategy(name: str, sides: Tuple[str, ...] = ('put',)):
+    """Register a strategy that scans a ChainSlice and returns opportunity dicts."""
+    def decorator(func):
+        STRATEGIES[name] = Strategy(name=name, sides=sides, scan=func)
+        return func
+    return decorator
+
+
+def get_enabled_strategies() -> List[str]:
+    """Strategy names from SCANNER_STRATEGIES, ignoring unknown names."""
+    raw = os.environ.get("SCANNER_STRATEGIES", ",".join(DEFAULT_STRATEGIES))
+    names = [name.strip().upper() for name in raw.split(',') if name.strip()]
+    return [name for name in names if name in STRATEGIES] or list(DEFAULT_STRATEGIES)
+
+
+def required_sides(strategies: Sequence[str]) -> Tuple[str, ...]:
+    """Option types ('put', 'call') the given strategies need loaded."""
+    sides = set()
+    for name in strategies:
+        sides.update(STRATEGIES[name].sides)
+    return tuple(sorted(sides))
+
+
+def _none_if_nan(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+class SideColumns:
+    """Strike-sorted columns for one side (puts or calls) of one expiration."""
+
+    def __init__(self, rows: np.ndarray):
+        self.rows = rows
+        self.strike = rows['strike']
+        # Missing bid/ask count as zero, as in the original generators
+        self.bid = np.nan_to_num(rows['bid'], nan=0.0)
+        self.ask = np.nan_to_num(rows['ask'], nan=0.0)
+        self.mid = np.where((self.bid > 0) & (self.ask > 0), (self.bid + self.ask) / 2, np.nan)
+        self.delta = rows['delta']
+        self.abs_delta = np.abs(rows['delta'])
+        self.theta = rows['theta']
+        self.iv = rows['implied_volatility']
+        self.contractid = rows['contractid']
+
+    def __len__(self):
+        return len(self.rows)
+
+
+@dataclass
+class VerticalPairs:
+    """All valid (short, long) credit spread pairs on one side of a chain."""
+    short_idx: np.ndarray
+    long_idx: np.ndarray
+    width: np.ndarray
+    net_credit: np.ndarray
+
+    @property
+    def return_pct(self) -> np.ndarray:
+        return self.net_credit / (self.width - self.net_credit) * 100
+
+    def __len__(self):
+        return len(self.short_idx)
+
+
+def _vertical_pairs(side: SideColumns, short_ok: np.ndarray, long_below: bool) -> VerticalPairs:
+    """
+    Vectorized credit-spread pairing. Row i is the short leg, column j the
+    long leg; for puts the long leg sits at a lower strike, for calls higher.
+    """
+    n = len(side)
+    if n < 2:
+        empty = np.array([], dtype=int)
+        return VerticalPairs(empty, empty, np.array([]), np.array([]))
+
+    strikes = side.strike
+    width = np.abs(strikes[:, None] - strikes[None, :])
+    net = side.bid[:, None] - side.ask[None, :]
+
+    rows, cols = np.indices((n, n))
+    direction = cols < rows if long_below else cols > rows
+
+    valid = (
+        direction
+        & short_ok[:, None]
+        & (width >= MIN_SPREAD_WIDTH) & (width <= MAX_SPREAD_WIDTH)
+        & (side.ask[None, :] < side.bid[:, None])
+        & (width - net > 0)
+    )
+    short_idx, long_idx = np.nonzero(valid)
+    return VerticalPairs(short_idx, long_idx, width[short_idx, long_idx], net[short_idx, long_idx])
+
+
+class ChainSlice:
+    """One (symbol, expiration) chain plus lazily computed shared intermediates."""
+
+    def __init__(self, ticker_data: Dict, expiration: str, rows: np.ndarray):
+        self.ticker_data = ticker_data
+        self.price = float(ticker_data['price'])
+        self.expiration = expiration
+        self.days_to_exp = int(rows['days_to_exp'][0]) if len(rows) else 0
+        # Rows are sorted by type within an expiration: each side is a
+        # contiguous view (no copy of a shared-memory chain)
+        sides = group_slices(rows['type'])
+        self.puts = SideColumns(rows[slice(*sides.get('put', (0, 0)))])
+        self.calls = SideColumns(rows[slice(*sides.get('call', (0, 0)))])
+
+    @cached_property
+    def put_spreads(self) -> VerticalPairs:
+        short_ok = (self.puts.strike < self.price) & (self.puts.bid > 0)
+        return _vertical_pairs(self.puts, short_ok, long_below=True)
+
+    @cached_property
+    def call_spreads(self) -> VerticalPairs:
+        short_ok = (self.calls.strike > self.price) & (self.calls.bid > 0)
+        return _vertical_pairs(self.calls, short_ok, long_below=False)
+
+    def annualize(self, return_pct: float) -> float:
+        return return_pct * (365 / self.days_to_exp) if self.days_to_exp > 0 else 0
+
+    def record(self, strategy: str, strike: float, width: Optional[float], net_credit: float,
+               collateral: float, return_pct: float, side: SideColumns, idx: int, contractid: str,
+               short_contractid: Optional[str] = None, long_contractid: Optional[str] = None) -> Dict:
+        return {
+            'ticker': self.ticker_data['ticker'],
+            'strategy_type': strategy,
+            'expiration_date': self.expiration,
+            'strike_price': float(strike),
+            'width': float(width) if width is not None else None,
+            'net_credit': round(float(net_credit), 2) if width is not None else float(net_credit),
+            'collateral': round(float(collateral), 2),
+            'return_pct': round(float(return_pct), 2),
+            'annualized_return': round(self.annualize(float(return_pct)), 2),
+            'rsi_14': self.ticker_data.get('rsi'),
+            'iv_percentile': None,
+            'price_vs_bb_lower': None,
+            'above_sma_200': self.ticker_data.get('above_sma200'),
+            'delta': _none_if_nan(side.delta[idx]),
+            'theta': _none_if_nan(side.theta[idx]),
+            'days_to_exp': self.days_to_exp,
+            'implied_volatility': _none_if_nan(side.iv[idx]),
+            'contractid': contractid,
+            # Leg ids for trade proposals (two-leg structures only)
+            'short_contractid': short_contractid,
+            'long_contractid': long_contractid,
+        }
+
+
+# ========================
+# STRATEGIES
+# ========================
+
+@register_strategy('CSP', sides=('put',))
+def scan_csp(chain: ChainSlice) -> List[Dict]:
+    puts = chain.puts
+    # Put delta is negative; unknown delta passes, as before
+    ok = (puts.bid > 0) & (puts.strike < chain.price) & ~(puts.abs_delta >= MAX_SHORT_DELTA)
+    return [
+        chain.record('CSP', puts.strike[i], None, puts.bid[i], puts.strike[i] * 100,
+                     puts.bid[i] / puts.strike[i] * 100, puts, i, str(puts.contractid[i]),
+                     short_contractid=str(puts.contractid[i]))
+        for i in np.flatnonzero(ok)
+    ]
+
+
+def _spread_records(chain: ChainSlice, strategy: str, side: SideColumns, pairs: VerticalPairs) -> List[Dict]:
+    returns = pairs.return_pct
+    return [
+        chain.record(strategy, side.strike[s], pairs.width[k], pairs.net_credit[k],
+                     (pairs.width[k] - pairs.net_credit[k]) * 100, returns[k], side, s,
+                     f"{side.contractid[s]}/{side.contractid[l]}",
+                     short_contractid=str(side.contractid[s]), long_contractid=str(side.contractid[l]))
+        for k, (s, l) in enumerate(zip(pairs.short_idx, pairs.long_idx))
+    ]
+
+
+@register_strategy('VPC', sides=('put',))
+def scan_vpc(chain: ChainSlice) -> List[Dict]:
+    return _spread_records(chain, 'VPC', chain.puts, chain.put_spreads)
+
+
+@register_strategy('CCS', sides=('call',))
+def scan_ccs(chain: ChainSlice) -> List[Dict]:
+    return _spread_records(chain, 'CCS', chain.calls, chain.call_spreads)
+
+
+@register_strategy('IC', sides=('put', 'call'))
+def scan_iron_condor(chain: ChainSlice) -> List[Dict]:
+    puts, calls = chain.puts, chain.calls
+    put_pairs, call_pairs = chain.put_spreads, chain.call_spreads
+    if not len(put_pairs) or not len(call_pairs):
+        return []
+
+    best_puts = np.argsort(-put_pairs.return_pct, kind='stable')[:CONDOR_LEGS_PER_SIDE]
+    best_calls = np.argsort(-call_pairs.return_pct, kind='stable')[:CONDOR_LEGS_PER_SIDE]
+
+    records = []
+    for p in best_puts:
+        for c in best_calls:
+            credit = put_pairs.net_credit[p] + call_pairs.net_credit[c]
+            # Only one side can finish in the money, so risk is the wider wing
+            width = max(put_pairs.width[p], call_pairs.width[c])
+            if width - credit <= 0:
+                continue
+            ps, pl = put_pairs.short_idx[p], put_pairs.long_idx[p]
+            cs, cl = call_pairs.short_idx[c], call_pairs.long_idx[c]
+            records.append(chain.record(
+                'IC', puts.strike[ps], width, credit, (width - credit) * 100,
+                credit / (width - credit) * 100, puts, ps,
+                f"{puts.contractid[ps]}/{puts.contractid[pl]}/{calls.contractid[cs]}/{calls.contractid[cl]}"
+            ))
+    return records
+
+
+@register_strategy('CC', sides=('call',))
+def scan_covered_call(chain: ChainSlice) -> List[Dict]:
+    calls = chain.calls
+    ok = (calls.bid > 0) & (calls.strike > chain.price) & ~(calls.abs_delta >= MAX_SHORT_DELTA)
+    # Collateral is the 100 shares held against the call
+    return [
+        chain.record('CC', calls.strike[i], None, calls.bid[i], chain.price * 100,
+                     calls.bid[i] / chain.price * 100, calls, i, str(calls.contractid[i]),
+                     short_contractid=str(calls.contractid[i]))
+        for i in np.flatnonzero(ok)
+    ]
+
+
+# ========================
+# SCANNER
+# ========================
+
+def simulate_opportunities(opportunities: List[Dict], prices: Dict[str, float]) -> None:
+    """
+    Monte Carlo pass (probability of profit / expected value) over scanner
+    output from any number of tickers in one batch. Credits are per share
+    here; IV is the short leg's.
+    """
+    apply_monte_carlo(opportunities, spot=[prices.get(o['ticker']) for o in opportunities],
+                      credit=[o['net_credit'] for o in opportunities],
+                      iv=[o['implied_volatility'] for o in opportunities])
+
+
+def scan_chain(ticker_data: Dict, chain: np.ndarray,
+               strategies: Optional[Sequence[str]] = None,
+               rank_key: Optional[Callable[[Dict], Tuple]] = None,
+               monte_carlo: bool = True) -> List[Dict]:
+    """
+    Scan one symbol's chain (sorted with option_chain.sort_chain) once and
+    return the top candidates of every requested strategy, ranked by
+    `rank_key` (default: OPPORTUNITY_RANK_KEY, see ranking.py).
+
+    Only the survivors are simulated, in one batch; with
+    monte_carlo=False the caller simulates them instead (e.g. every
+    ticker's survivors at once, see simulate_opportunities). When the
+    ranking itself needs Monte Carlo results (expected_value), all of the
+    ticker's candidates are simulated in one batch before ranking.
+    """
+    strategies = list(strategies or get_enabled_strategies())
+    if len(chain) == 0:
+        return []
+
+    # Bounded heap per strategy: each expiration's candidates are scored in
+    # one batch (every scoring config) and ranked as they are produced
+    ranker = TopKRanker(per_group=TOP_PER_STRATEGY, key=rank_key or get_rank_key(),
+                        group_by='strategy_type')
+    engine = get_scoring_engine()
+    prices = {ticker_data['ticker']: float(ticker_data['price'])}
+    presimulate = ranks_on_simulation()
+    pending: List[Dict] = []
+    for expiration, (start, stop) in group_slices(chain['expiration']).items():
+        chain_slice = ChainSlice(ticker_data, expiration, chain[start:stop])
+        batch = []
+        for name in strategies:
+            batch.extend(STRATEGIES[name].scan(chain_slice))
+        engine.apply(batch)
+        if presimulate:
+            pending.extend(batch)
+        else:
+            ranker.extend(batch)
+    if presimulate:
+        simulate_opportunities(pending, prices)
+        ranker.extend(pending)
+
+    results = []
+    for name in strategies:
+        results.extend(ranker.group(name))
+    if monte_carlo and not presimulate:
+        simulate_opportunities(results, prices)
+    return results
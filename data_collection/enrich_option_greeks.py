@@ -0,0 +1,287 @@
+"""
+Enrich Option Greeks
+
+Pipeline stage between TradeStation collection and opportunity generation.
+TradeStation omits Delta/ImpliedVolatility/Theta for some contracts, which
+parse_option_contract stores as None. This stage loads the latest chain,
+solves implied volatility from the quoted mid for every contract missing
+it (whole chain at once, see black_scholes.py), derives the missing greeks
+and writes back only the rows it filled.
+
+It also logs throughput (contracts/sec) and accuracy against the greeks
+TradeStation did provide, so drift in the model is visible in the logs.
+
+Finally it appends the day's at-the-money IV per symbol to iv_history,
+which backs the IV rank/percentile index (see iv_rank.py), and fits one
+volatility smile per (symbol, expiration) into vol_surfaces (see
+vol_surface.py).
+
+Usage:
+    poetry run python data_collection/enrich_option_greeks.py
+
+    # Synthetic throughput/accuracy benchmark (no database needed)
+    poetry run python data_collection/enrich_option_greeks.py --benchmark 100000
+"""
+
+import os
+import sys
+import time
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Allow `python data_collection/<script>.py` to import project packages
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_collection.black_scholes import bs_greeks, bs_price, get_risk_free_rate, implied_volatility
+from data_collection.iv_rank import atm_iv, record_daily_iv
+from data_collection.option_chain import rows_to_chain, sort_chain, symbol_slices
+from data_collection.vol_surface import fit_surfaces, store_surfaces
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_URL = os.environ.get("SUPABASE_URL", "")
+SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "")
+
+OPTIONS_TABLE = 'options_quotes'
+PAGE_SIZE = 1000
+UPSERT_BATCH = 500
+
+# Greeks this stage fills when TradeStation left them empty
+GREEK_FIELDS = ('implied_volatility', 'delta', 'gamma', 'theta', 'vega')
+
+
+def get_supabase_client():
+    """Get Supabase client."""
+    from supabase import create_client
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+
+def _fetch_all(query_factory) -> List[Dict]:
+    rows = []
+    offset = 0
+    while True:
+        data = query_factory().range(offset, offset + PAGE_SIZE - 1).execute().data or []
+        rows.extend(data)
+        if len(data) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def load_latest_options(supabase) -> List[Dict]:
+    """All contracts from the latest quote_date."""
+    response = supabase.table(OPTIONS_TABLE).select('quote_date').order('quote_date', desc=True).limit(1).execute()
+    if not response.data:
+        return []
+    latest_date = response.data[0]['quote_date']
+    return _fetch_all(
+        lambda: supabase.table(OPTIONS_TABLE).select('*').eq('quote_date', latest_date).order('contractid')
+    )
+
+
+def load_underlying_prices(supabase) -> Dict[str, float]:
+    """Latest stock price per ticker."""
+    response = supabase.table('stock_quotes').select('quote_date').order('quote_date', desc=True).limit(1).execute()
+    if not response.data:
+        return {}
+    latest_date = response.data[0]['quote_date']
+    rows = _fetch_all(
+        lambda: supabase.table('stock_quotes').select('ticker, price').eq('quote_date', latest_date).order('ticker')
+    )
+    prices = {}
+    for row in rows:
+        try:
+            prices[row['ticker']] = float(row['price'])
+        except (TypeError, ValueError, KeyError):
+            continue
+    return prices
+
+
+def option_mid(chain: np.ndarray) -> np.ndarray:
+    """Quoted mid, falling back to mark and then last trade."""
+    bid, ask = chain['bid'], chain['ask']
+    mid = np.where((bid > 0) & (ask > 0) & (ask >= bid), (bid + ask) / 2, np.nan)
+    mid = np.where(np.isnan(mid), chain['mark'], mid)
+    mid = np.where(np.isnan(mid) | (mid <= 0), chain['last'], mid)
+    return np.where(mid > 0, mid, np.nan)
+
+
+def compute_greeks(chain: np.ndarray, spot: np.ndarray, rate: float) -> Dict[str, np.ndarray]:
+    """
+    Model IV and greeks for every contract in the chain. Where TradeStation
+    provided an IV it is used for the greeks; otherwise IV is solved from
+    the mid price.
+    """
+    is_call = chain['type'] == 'call'
+    # Same-day expirations still carry a few hours of time value
+    t = np.maximum(chain['days_to_exp'], 1) / 365
+    solved_iv = implied_volatility(option_mid(chain), spot, chain['strike'], t, rate, is_call)
+
+    quoted_iv = chain['implied_volatility']
+    iv = np.where(np.isfinite(quoted_iv) & (quoted_iv > 0), quoted_iv, solved_iv)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        greeks = bs_greeks(spot, chain['strike'], t, rate, iv, is_call)
+    greeks['implied_volatility'] = iv
+    greeks['solved_iv'] = solved_iv
+    return greeks
+
+
+def accuracy_report(chain: np.ndarray, greeks: Dict[str, np.ndarray]) -> Dict[str, Optional[float]]:
+    """Median absolute error of the model against TradeStation-provided values."""
+    report = {}
+    pairs = {
+        'implied_volatility': (chain['implied_volatility'], greeks['solved_iv']),
+        'delta': (chain['delta'], greeks['delta']),
+        'theta': (chain['theta'], greeks['theta']),
+    }
+    for name, (quoted, model) in pairs.items():
+        both = np.isfinite(quoted) & np.isfinite(model)
+        report[name] = float(np.median(np.abs(quoted[both] - model[both]))) if both.any() else None
+        report[f'{name}_n'] = int(both.sum())
+    return report
+
+
+def fill_missing(rows: List[Dict], chain: np.ndarray, greeks: Dict[str, np.ndarray]) -> List[Dict]:
+    """Rows with at least one greek filled in (quoted values are never overwritten)."""
+    updated = []
+    for i, row in enumerate(rows):
+        changes = {}
+        for field in GREEK_FIELDS:
+            value = greeks[field][i]
+            if row.get(field) is None and np.isfinite(value):
+                changes[field] = round(float(value), 6)
+        if changes:
+            updated.append({**row, **changes})
+    return updated
+
+
+def enrich(supabase, rate: Optional[float] = None) -> int:
+    """Fill missing greeks for the latest chain. Returns rows updated."""
+    rate = get_risk_free_rate() if rate is None else rate
+
+    rows = load_latest_options(supabase)
+    if not rows:
+        logger.warning("No options found")
+        return 0
+    prices = load_underlying_prices(supabase)
+
+    # Only contracts with a known underlying price can be modelled
+    rows = [row for row in rows if row.get('symbol') in prices]
+    if not rows:
+        logger.warning("No options with a known underlying price")
+        return 0
+    chain = rows_to_chain(rows, today=date.today())
+    spot = np.array([prices[row['symbol']] for row in rows], dtype=float)
+
+    missing = np.zeros(len(chain), dtype=bool)
+    for field in GREEK_FIELDS:
+        missing |= np.isnan(chain[field])
+    logger.info(f"Loaded {len(chain)} contracts, {int(missing.sum())} missing greeks")
+
+    started = time.perf_counter()
+    greeks = compute_greeks(chain, spot, rate)
+    elapsed = time.perf_counter() - started
+    logger.info(f"Modelled {len(chain)} contracts in {elapsed:.3f}s "
+                f"({len(chain) / elapsed if elapsed > 0 else 0:,.0f} contracts/sec)")
+
+    report = accuracy_report(chain, greeks)
+    logger.info(
+        "Model vs TradeStation median abs error: "
+        + ", ".join(f"{name}={report[name]:.4f} (n={report[f'{name}_n']})"
+                    for name in ('implied_volatility', 'delta', 'theta') if report[name] is not None)
+    )
+
+    updated = fill_missing(rows, chain, greeks)
+    for i in range(0, len(updated), UPSERT_BATCH):
+        supabase.table(OPTIONS_TABLE).upsert(
+            updated[i:i + UPSERT_BATCH],
+            on_conflict='contractid,quote_date'
+        ).execute()
+    logger.info(f"Filled greeks for {len(updated)} contracts")
+
+    quote_date = rows[0]['quote_date']
+    filled = filled_chain(chain, greeks)
+    record_daily_iv(supabase, quote_date, daily_atm_ivs(filled, prices))
+
+    # Smiles are fitted once per run and cached for the generators / exits
+    started = time.perf_counter()
+    fits = fit_surfaces(filled, prices, rate, quote_date)
+    logger.info(f"Fitted {len(fits)} volatility smiles in {time.perf_counter() - started:.3f}s")
+    store_surfaces(supabase, fits)
+    return len(updated)
+
+
+def filled_chain(chain: np.ndarray, greeks: Dict[str, np.ndarray]) -> np.ndarray:
+    """Chain sorted by symbol/expiration with quoted IV where present and solved IV otherwise."""
+    filled = chain.copy()
+    filled['implied_volatility'] = greeks['implied_volatility']
+    return sort_chain(filled)
+
+
+def daily_atm_ivs(filled: np.ndarray, prices: Dict[str, float]) -> Dict[str, float]:
+    """ATM IV per symbol from a filled_chain."""
+    ivs = {}
+    for symbol, (start, stop) in symbol_slices(filled).items():
+        value = atm_iv(filled[start:stop], prices.get(symbol))
+        if value is not None:
+            ivs[symbol] = value
+    return ivs
+
+
+def benchmark(n: int = 100_000, rate: float = 0.045, seed: int = 0) -> Dict[str, float]:
+    """Solve IV and greeks for a synthetic chain priced from known volatilities."""
+    rng = np.random.default_rng(seed)
+    spot = rng.uniform(20, 500, n)
+    strike = np.round(spot * rng.uniform(0.7, 1.3, n))
+    days = rng.integers(7, 120, n)
+    sigma = rng.uniform(0.1, 1.0, n)
+    is_call = rng.random(n) < 0.5
+    price = bs_price(spot, strike, days / 365, rate, sigma, is_call)
+
+    started = time.perf_counter()
+    iv = implied_volatility(price, spot, strike, days / 365, rate, is_call)
+    bs_greeks(spot, strike, days / 365, rate, iv, is_call)
+    elapsed = time.perf_counter() - started
+
+    solved = np.isfinite(iv)
+    return {
+        'contracts': n,
+        'seconds': elapsed,
+        'contracts_per_sec': n / elapsed if elapsed > 0 else float('inf'),
+        'solved_pct': float(solved.mean() * 100),
+        'median_iv_error': float(np.median(np.abs(iv[solved] - sigma[solved]))),
+    }
+
+
+def main():
+    logger.info("Starting option greeks enrichment")
+    supabase = get_supabase_client()
+    enrich(supabase)
+    logger.info("Option greeks enrichment complete")
+
+
+if __name__ == "__main__":
+    os.makedirs("logs", exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("logs/enrich_option_greeks.log"),
+            logging.StreamHandler()
+        ]
+    )
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        result = benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 100_000)
+        logger.info(f"Benchmark: {result['contracts']} contracts in {result['seconds']:.3f}s "
+                    f"({result['contracts_per_sec']:,.0f} contracts/sec), "
+                    f"{result['solved_pct']:.2f}% solved, median IV error {result['median_iv_error']:.2e}")
+    else:
+        main()
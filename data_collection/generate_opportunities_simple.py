@@ -12,8 +12,12 @@ import os
 import sys
 import logging
 from datetime import datetime
+from pathlib import Path
 from dotenv import load_dotenv
 
+# Allow `python data_collection/<script>.py` to import project packages
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
 # Load environment variables
 load_dotenv()
 
@@ -34,6 +38,16 @@ SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "")
 
 from supabase import create_client
 
+from data_collection.chain_quality import validate_rows
+from data_collection.iv_rank import apply_iv_rank, load_iv_index
+from data_collection.monte_carlo import apply_monte_carlo
+from data_collection.opportunity_publisher import OpportunityPublisher
+from data_collection.ranking import TopKRanker, get_global_limit, ranks_on_simulation
+from data_collection.scoring import get_scoring_engine
+
+# Opportunities kept per ticker
+TOP_PER_TICKER = 3
+
 
 def calculate_trade_score(return_pct, rsi, days_to_exp, annualized_return):
     """
@@ -51,82 +65,19 @@ def calculate_trade_score(return_pct, rsi, days_to_exp, annualized_return):
     C+: 65-69, C: 60-64, C-: 55-59
     D+: 50-54, D: 45-49, D-: 40-44
     F: < 40
+
+    The buckets live in config/scoring_configs.json ("default" config) and
+    are evaluated by scoring.ScoringEngine; generation scores whole batches
+    with the engine directly.
     """
-    score = 0
-    
-    # Return % score (0-50 points)
-    # 0-2%: 0-20pts, 2-5%: 20-35pts, 5-10%: 35-45pts, >10%: 45-50pts
-    if return_pct >= 10:
-        score += 50
-    elif return_pct >= 5:
-        score += 35 + ((return_pct - 5) / 5) * 15
-    elif return_pct >= 2:
-        score += 20 + ((return_pct - 2) / 3) * 15
-    else:
-        score += (return_pct / 2) * 20
-    
-    # RSI score (0-25 points)
-    # Ideal range: 30-70 (neutral to slightly oversold)
-    if rsi:
-        if 30 <= rsi <= 70:
-            score += 25
-        elif 20 <= rsi < 30 or 70 < rsi <= 80:
-            score += 15
-        else:
-            score += 5
-    else:
-        score += 10  # Neutral if no RSI
-    
-    # Days to expiration score (0-15 points)
-    # Ideal: 14-45 days (sweet spot for theta decay)
-    if days_to_exp:
-        if 14 <= days_to_exp <= 45:
-            score += 15
-        elif 7 <= days_to_exp < 14 or 45 < days_to_exp <= 60:
-            score += 10
-        else:
-            score += 5
-    else:
-        score += 7  # Neutral if unknown
-    
-    # Annualized return bonus (0-10 points)
-    if annualized_return:
-        if annualized_return >= 100:
-            score += 10
-        elif annualized_return >= 50:
-            score += 7
-        elif annualized_return >= 25:
-            score += 5
-        else:
-            score += 2
-    
-    # Convert score to letter grade
-    if score >= 95:
-        return 'A+'
-    elif score >= 90:
-        return 'A'
-    elif score >= 85:
-        return 'A-'
-    elif score >= 80:
-        return 'B+'
-    elif score >= 75:
-        return 'B'
-    elif score >= 70:
-        return 'B-'
-    elif score >= 65:
-        return 'C+'
-    elif score >= 60:
-        return 'C'
-    elif score >= 55:
-        return 'C-'
-    elif score >= 50:
-        return 'D+'
-    elif score >= 45:
-        return 'D'
-    elif score >= 40:
-        return 'D-'
-    else:
-        return 'F'
+    results = get_scoring_engine().score_columns({
+        'return_pct': [return_pct],
+        'rsi_14': [rsi],
+        'days_to_exp': [days_to_exp],
+        'annualized_return': [annualized_return],
+    })
+    _, grades = results['default'] if 'default' in results else next(iter(results.values()))
+    return str(grades[0])
 
 
 def get_supabase_client():
@@ -144,16 +95,12 @@ def generate_simple_opportunities():
     - Join options_quotes with stock_quotes
     - Filter for puts
     - Calculate returns
-    - Insert top opportunities
+    - Publish top opportunities as a new generation
     """
     supabase = get_supabase_client()
     
     logger.info("Starting simple opportunities generation")
     
-    # Clear existing opportunities
-    supabase.table('options_opportunities').delete().neq('opportunity_id', 0).execute()
-    logger.info("Cleared options_opportunities table")
-    
     # Get latest dates
     opt_date_result = supabase.table('options_quotes').select('quote_date').order('quote_date', desc=True).limit(1).execute()
     stock_date_result = supabase.table('stock_quotes').select('quote_date').order('quote_date', desc=True).limit(1).execute()
@@ -170,7 +117,7 @@ def generate_simple_opportunities():
     # Get all put options for latest date
     logger.info("Fetching put options...")
     options_result = supabase.table('options_quotes').select(
-        'contractid, symbol, expiration, strike, bid, ask, delta, theta, '
+        'contractid, symbol, type, quote_date, expiration, strike, bid, ask, delta, theta, '
         'implied_volatility, open_interest, volume'
     ).eq('quote_date', latest_opt_date).eq('type', 'put').execute()
     
@@ -186,256 +133,269 @@ def generate_simple_opportunities():
     stocks = {s['ticker']: s for s in stocks_result.data}
     logger.info(f"Found {len(stocks)} stocks")
     
-    # Group options by symbol and expiration for VPC generation
+    # Drop crossed, bid-less, illiquid, stale and outlier contracts in bulk
+    # before any pairing work (see chain_quality.py)
+    options, quality = validate_rows(options_result.data, {t: s.get('price') for t, s in stocks.items()})
+    logger.info(quality.summary())
+    
+    # Group options by symbol (and by expiration for VPC generation)
+    options_by_symbol = {}
     options_by_symbol_exp = {}
-    for opt in options_result.data:
+    for opt in options:
         symbol = opt.get('symbol')
         exp = opt.get('expiration')
+        options_by_symbol.setdefault(symbol, []).append(opt)
         if symbol not in options_by_symbol_exp:
             options_by_symbol_exp[symbol] = {}
         if exp not in options_by_symbol_exp[symbol]:
             options_by_symbol_exp[symbol][exp] = []
         options_by_symbol_exp[symbol][exp].append(opt)
     
-    # Generate opportunities (both CSP and VPC)
-    opportunities = []
+    # Generate opportunities (both CSP and VPC), one symbol at a time.
+    # Each symbol's candidates are scored in one vectorized batch (every
+    # scoring config at once), then ranked: a bounded heap per ticker keeps
+    # the best TOP_PER_TICKER, so the full candidate list is never built
+    ranker = TopKRanker(per_group=TOP_PER_TICKER, global_limit=get_global_limit())
+    engine = get_scoring_engine()
+    # Monte Carlo runs once, on the final survivors, unless the ranking needs
+    # it (OPPORTUNITY_RANK_KEY=expected_value); survivors' inputs by id()
+    presimulate = ranks_on_simulation()
+    survivor_mc_inputs = {}
+    csp_count = 0
+    vpc_count = 0
     
-    # Generate CSPs (Cash Secured Puts)
-    logger.info("Generating CSP opportunities...")
-    for opt in options_result.data:
-        symbol = opt.get('symbol')
+    logger.info("Generating CSP and VPC opportunities...")
+    for symbol, symbol_options in options_by_symbol.items():
         stock = stocks.get(symbol)
-        
         if not stock:
             continue
         
-        try:
-            strike = float(opt.get('strike', 0))
-            bid = float(opt.get('bid', 0))
-            ask = float(opt.get('ask', 0))
-            price = float(stock.get('price', 0))
-            
-            if strike <= 0 or bid <= 0 or price <= 0:
-                continue
-            
-            # Calculate metrics (Cash Secured Put style)
-            collateral = strike * 100  # Per contract
-            income = bid * 100  # Premium collected (per contract)
-            return_pct = (bid / strike) * 100  # Return on collateral
-            
-            # Calculate days to expiration
-            exp_date_str = opt.get('expiration')
-            if exp_date_str:
-                try:
-                    exp_date = datetime.strptime(exp_date_str, '%Y-%m-%d').date()
-                    days_to_exp = (exp_date - datetime.now().date()).days
-                except:
+        batch = []
+        score_inputs = []
+        # Per-share credit and IV for the Monte Carlo pass
+        mc_inputs = []
+        
+        # Generate CSPs (Cash Secured Puts)
+        for opt in symbol_options:
+            try:
+                strike = float(opt.get('strike', 0))
+                bid = float(opt.get('bid', 0))
+                ask = float(opt.get('ask', 0))
+                price = float(stock.get('price', 0))
+                
+                if strike <= 0 or bid <= 0 or price <= 0:
+                    continue
+                
+                # Calculate metrics (Cash Secured Put style)
+                collateral = strike * 100  # Per contract
+                income = bid * 100  # Premium collected (per contract)
+                return_pct = (bid / strike) * 100  # Return on collateral
+                
+                # Calculate days to expiration
+                exp_date_str = opt.get('expiration')
+                if exp_date_str:
+                    try:
+                        exp_date = datetime.strptime(exp_date_str, '%Y-%m-%d').date()
+                        days_to_exp = (exp_date - datetime.now().date()).days
+                    except:
+                        days_to_exp = None
+                else:
                     days_to_exp = None
-            else:
-                days_to_exp = None
-            
-            # Calculate annualized return
-            if days_to_exp and days_to_exp > 0:
-                annualized_return = return_pct * (365 / days_to_exp)
-            else:
-                annualized_return = None
-            
-            # Basic filters (very permissive)
-            if return_pct < 0.5:  # At least 0.5% return
-                continue
-            
-            if days_to_exp and days_to_exp > 90:  # Max 90 days out
+                
+                # Calculate annualized return
+                if days_to_exp and days_to_exp > 0:
+                    annualized_return = return_pct * (365 / days_to_exp)
+                else:
+                    annualized_return = None
+                
+                # Basic filters (very permissive)
+                if return_pct < 0.5:  # At least 0.5% return
+                    continue
+                
+                if days_to_exp and days_to_exp > 90:  # Max 90 days out
+                    continue
+                
+                # Create opportunity record
+                opportunity = {
+                    'ticker': symbol,
+                    'stock_price': price,  # Current stock price
+                    'strategy_type': 'CSP',  # Cash Secured Put
+                    'expiration_date': exp_date_str,
+                    'strike_price': strike,
+                    'width': None,  # N/A for CSP
+                    'net_credit': bid * 100,  # Income per contract (×100)
+                    'collateral': collateral,
+                    'return_pct': round(return_pct, 2),
+                    'annualized_return': round(annualized_return, 2) if annualized_return else None,
+                    'rsi_14': stock.get('rsi'),
+                    'iv_percentile': None,
+                    'price_vs_bb_lower': None,
+                    'above_sma_200': stock.get('sma200') is not None and price > stock.get('sma200') if stock.get('sma200') else None,
+                    'delta': float(opt.get('delta')) if opt.get('delta') else None,
+                    'theta': float(opt.get('theta')) if opt.get('theta') else None,
+                    'short_contractid': opt.get('contractid'),
+                    'long_contractid': None,
+                    'last_updated': datetime.now().isoformat()
+                }
+                
+                batch.append(opportunity)
+                # Scored on unrounded values, as calculate_trade_score always was
+                score_inputs.append((return_pct, stock.get('rsi'), days_to_exp, annualized_return))
+                mc_inputs.append((bid, opt.get('implied_volatility')))
+                
+            except (ValueError, TypeError) as e:
+                logger.debug(f"Error processing option {opt.get('contractid')}: {e}")
                 continue
-            
-            # Calculate trade score
-            trade_score = calculate_trade_score(
-                return_pct=return_pct,
-                rsi=stock.get('rsi'),
-                days_to_exp=days_to_exp,
-                annualized_return=annualized_return
-            )
-            
-            # Create opportunity record
-            opportunity = {
-                'ticker': symbol,
-                'stock_price': price,  # Current stock price
-                'strategy_type': 'CSP',  # Cash Secured Put
-                'expiration_date': exp_date_str,
-                'strike_price': strike,
-                'width': None,  # N/A for CSP
-                'net_credit': bid * 100,  # Income per contract (×100)
-                'collateral': collateral,
-                'return_pct': round(return_pct, 2),
-                'annualized_return': round(annualized_return, 2) if annualized_return else None,
-                'trade_score': trade_score,  # Letter grade (A+ to F)
-                'rsi_14': stock.get('rsi'),
-                'iv_percentile': None,
-                'price_vs_bb_lower': None,
-                'above_sma_200': stock.get('sma200') is not None and price > stock.get('sma200') if stock.get('sma200') else None,
-                'delta': float(opt.get('delta')) if opt.get('delta') else None,
-                'theta': float(opt.get('theta')) if opt.get('theta') else None,
-                'last_updated': datetime.now().isoformat()
-            }
-            
-            opportunities.append(opportunity)
-            
-        except (ValueError, TypeError) as e:
-            logger.debug(f"Error processing option {opt.get('contractid')}: {e}")
-            continue
-    
-    csp_count = len(opportunities)
-    logger.info(f"Generated {csp_count} CSP opportunities")
-    
-    # Generate VPCs (Vertical Put Credit Spreads)
-    logger.info("Generating VPC opportunities...")
-    
-    for symbol, expirations in options_by_symbol_exp.items():
-        stock = stocks.get(symbol)
-        if not stock:
-            continue
         
-        price = float(stock.get('price', 0))
-        if price <= 0:
-            continue
+        symbol_csp_count = len(batch)
         
-        for exp_date_str, exp_options in expirations.items():
-            # Sort by strike descending
-            exp_options_sorted = sorted(exp_options, key=lambda x: float(x.get('strike', 0)), reverse=True)
-            
-            # Try to create VPCs with $5 or $10 width
-            for i, short_leg in enumerate(exp_options_sorted):
-                try:
-                    short_strike = float(short_leg.get('strike', 0))
-                    short_bid = float(short_leg.get('bid', 0))
-                    
-                    if short_strike <= 0 or short_bid <= 0:
-                        continue
-                    
-                    # Filter out ITM (In-The-Money) VPCs
-                    # For puts: ITM when price >= strike
-                    if price >= short_strike:
-                        continue
-                    
-                    # Look for long leg at lower strikes
-                    for long_leg in exp_options_sorted[i+1:]:
-                        long_strike = float(long_leg.get('strike', 0))
-                        long_ask = float(long_leg.get('ask', 0))
-                        
-                        if long_strike <= 0 or long_ask <= 0:
-                            continue
-                        
-                        width = short_strike - long_strike
-                        
-                        # Only reasonable widths ($2.50 to $20)
-                        if width < 2.5 or width > 20:
-                            continue
-                        
-                        # Calculate net credit
-                        net_credit = short_bid - long_ask
-                        
-                        # Must have positive credit
-                        if net_credit <= 0:
-                            continue
-                        
-                        # Calculate metrics
-                        collateral = width * 100  # Max risk
-                        return_pct = (net_credit / width) * 100
-                        
-                        # Calculate days to expiration
-                        try:
-                            exp_date = datetime.strptime(exp_date_str, '%Y-%m-%d').date()
-                            days_to_exp = (exp_date - datetime.now().date()).days
-                        except:
-                            days_to_exp = None
-                        
-                        # Calculate annualized return
-                        if days_to_exp and days_to_exp > 0:
-                            annualized_return = return_pct * (365 / days_to_exp)
-                        else:
-                            annualized_return = None
+        # Generate VPCs (Vertical Put Credit Spreads)
+        price = float(stock.get('price', 0))
+        if price > 0:
+            for exp_date_str, exp_options in options_by_symbol_exp[symbol].items():
+                # Sort by strike descending
+                exp_options_sorted = sorted(exp_options, key=lambda x: float(x.get('strike', 0)), reverse=True)
+                
+                # Try to create VPCs with $5 or $10 width
+                for i, short_leg in enumerate(exp_options_sorted):
+                    try:
+                        short_strike = float(short_leg.get('strike', 0))
+                        short_bid = float(short_leg.get('bid', 0))
                         
-                        # Filters
-                        if return_pct < 0.5:  # At least 0.5% return
+                        if short_strike <= 0 or short_bid <= 0:
                             continue
                         
-                        if days_to_exp and days_to_exp > 90:  # Max 90 days out
+                        # Filter out ITM (In-The-Money) VPCs
+                        # For puts: ITM when price >= strike
+                        if price >= short_strike:
                             continue
                         
-                        # Calculate trade score
-                        trade_score = calculate_trade_score(
-                            return_pct=return_pct,
-                            rsi=stock.get('rsi'),
-                            days_to_exp=days_to_exp,
-                            annualized_return=annualized_return
-                        )
-                        
-                        # Create VPC opportunity
-                        vpc_opp = {
-                            'ticker': symbol,
-                            'stock_price': price,  # Current stock price
-                            'strategy_type': 'VPC',  # Vertical Put Credit Spread
-                            'expiration_date': exp_date_str,
-                            'strike_price': short_strike,  # Short leg strike
-                            'width': width,  # Spread width
-                            'net_credit': net_credit * 100,  # Income per contract (×100)
-                            'collateral': collateral,
-                            'return_pct': round(return_pct, 2),
-                            'annualized_return': round(annualized_return, 2) if annualized_return else None,
-                            'trade_score': trade_score,  # Letter grade (A+ to F)
-                            'rsi_14': stock.get('rsi'),
-                            'iv_percentile': None,
-                            'price_vs_bb_lower': None,
-                            'above_sma_200': stock.get('sma200') is not None and price > stock.get('sma200') if stock.get('sma200') else None,
-                            'delta': float(short_leg.get('delta')) if short_leg.get('delta') else None,
-                            'theta': float(short_leg.get('theta')) if short_leg.get('theta') else None,
-                            'last_updated': datetime.now().isoformat()
-                        }
-                        
-                        opportunities.append(vpc_opp)
-                        
-                        # Only keep best 3 VPCs per expiration per symbol
-                        break
-                        
-                except (ValueError, TypeError) as e:
-                    continue
+                        # Look for long leg at lower strikes
+                        for long_leg in exp_options_sorted[i+1:]:
+                            long_strike = float(long_leg.get('strike', 0))
+                            long_ask = float(long_leg.get('ask', 0))
+                            
+                            if long_strike <= 0 or long_ask <= 0:
+                                continue
+                            
+                            width = short_strike - long_strike
+                            
+                            # Only reasonable widths ($2.50 to $20)
+                            if width < 2.5 or width > 20:
+                                continue
+                            
+                            # Calculate net credit
+                            net_credit = short_bid - long_ask
+                            
+                            # Must have positive credit
+                            if net_credit <= 0:
+                                continue
+                            
+                            # Calculate metrics
+                            collateral = width * 100  # Max risk
+                            return_pct = (net_credit / width) * 100
+                            
+                            # Calculate days to expiration
+                            try:
+                                exp_date = datetime.strptime(exp_date_str, '%Y-%m-%d').date()
+                                days_to_exp = (exp_date - datetime.now().date()).days
+                            except:
+                                days_to_exp = None
+                            
+                            # Calculate annualized return
+                            if days_to_exp and days_to_exp > 0:
+                                annualized_return = return_pct * (365 / days_to_exp)
+                            else:
+                                annualized_return = None
+                            
+                            # Filters
+                            if return_pct < 0.5:  # At least 0.5% return
+                                continue
+                            
+                            if days_to_exp and days_to_exp > 90:  # Max 90 days out
+                                continue
+                            
+                            # Create VPC opportunity
+                            vpc_opp = {
+                                'ticker': symbol,
+                                'stock_price': price,  # Current stock price
+                                'strategy_type': 'VPC',  # Vertical Put Credit Spread
+                                'expiration_date': exp_date_str,
+                                'strike_price': short_strike,  # Short leg strike
+                                'width': width,  # Spread width
+                                'net_credit': net_credit * 100,  # Income per contract (×100)
+                                'collateral': collateral,
+                                'return_pct': round(return_pct, 2),
+                                'annualized_return': round(annualized_return, 2) if annualized_return else None,
+                                'rsi_14': stock.get('rsi'),
+                                'iv_percentile': None,
+                                'price_vs_bb_lower': None,
+                                'above_sma_200': stock.get('sma200') is not None and price > stock.get('sma200') if stock.get('sma200') else None,
+                                'delta': float(short_leg.get('delta')) if short_leg.get('delta') else None,
+                                'theta': float(short_leg.get('theta')) if short_leg.get('theta') else None,
+                                'short_contractid': short_leg.get('contractid'),
+                                'long_contractid': long_leg.get('contractid'),
+                                'last_updated': datetime.now().isoformat()
+                            }
+                            
+                            batch.append(vpc_opp)
+                            score_inputs.append((return_pct, stock.get('rsi'), days_to_exp, annualized_return))
+                            mc_inputs.append((net_credit, short_leg.get('implied_volatility')))
+                            
+                            # Only keep best 3 VPCs per expiration per symbol
+                            break
+                            
+                    except (ValueError, TypeError) as e:
+                        continue
+        
+        csp_count += symbol_csp_count
+        vpc_count += len(batch) - symbol_csp_count
+        
+        # Score this symbol's candidates in one pass, then rank them
+        if batch:
+            return_pcts, rsis, dtes, annualized = zip(*score_inputs)
+            engine.apply(batch, columns={
+                'return_pct': return_pcts,
+                'rsi_14': rsis,
+                'days_to_exp': dtes,
+                'annualized_return': annualized,
+            })
+            credits, ivs = zip(*mc_inputs)
+            if presimulate:
+                apply_monte_carlo(batch, spot=[price] * len(batch), credit=credits, iv=ivs, days=dtes)
+            ranker.extend(batch)
+            if not presimulate:
+                inputs = {id(opp): (price, credit, iv, dte)
+                          for opp, credit, iv, dte in zip(batch, credits, ivs, dtes)}
+                # Each symbol is ranked once, so its survivors are final here
+                for opp in ranker.group(symbol):
+                    survivor_mc_inputs[id(opp)] = inputs[id(opp)]
     
-    vpc_count = len(opportunities) - csp_count
+    logger.info(f"Generated {csp_count} CSP opportunities")
     logger.info(f"Generated {vpc_count} VPC opportunities")
-    logger.info(f"Total opportunities: {len(opportunities)} ({csp_count} CSP + {vpc_count} VPC)")
+    logger.info(f"Total opportunities: {ranker.seen} ({csp_count} CSP + {vpc_count} VPC)")
     
-    # Group opportunities by ticker and take top 3 per ticker
-    # Sort by return_pct descending first
-    opportunities.sort(key=lambda x: x['return_pct'], reverse=True)
+    # Best first; top 3 per ticker (and the global cap, if configured)
+    top_opportunities = ranker.results()
+    if top_opportunities and not presimulate:
+        # One simulation batch for every survivor of the run
+        spots, credits, ivs, dtes = zip(*(survivor_mc_inputs[id(opp)] for opp in top_opportunities))
+        apply_monte_carlo(top_opportunities, spot=spots, credit=credits, iv=ivs, days=dtes)
+    tickers = sorted({opp['ticker'] for opp in top_opportunities})
     
-    ticker_opps = {}
-    for opp in opportunities:
-        ticker = opp['ticker']
-        if ticker not in ticker_opps:
-            ticker_opps[ticker] = []
-        
-        # Only keep top 3 per ticker
-        if len(ticker_opps[ticker]) < 3:
-            ticker_opps[ticker].append(opp)
+    logger.info(f"Keeping top {TOP_PER_TICKER} per ticker: {len(top_opportunities)} opportunities ({len(tickers)} tickers)")
     
-    # Flatten back to list
-    top_opportunities = []
-    for ticker_list in ticker_opps.values():
-        top_opportunities.extend(ticker_list)
-    
-    logger.info(f"Keeping top 3 per ticker: {len(top_opportunities)} opportunities ({len(ticker_opps)} tickers)")
+    # IV rank/percentile from the rolling ATM IV index (one lookup per ticker)
+    if top_opportunities:
+        iv_index = load_iv_index(supabase, tickers)
+        apply_iv_rank(top_opportunities, iv_index)
     
-    # Insert in batches of 100
+    # Publish as a new generation (readers keep seeing the previous one until the flip)
     if top_opportunities:
-        batch_size = 100
-        total_inserted = 0
-        
-        for i in range(0, len(top_opportunities), batch_size):
-            batch = top_opportunities[i:i+batch_size]
-            result = supabase.table('options_opportunities').insert(batch).execute()
-            total_inserted += len(batch)
-            logger.info(f"Inserted batch {i//batch_size + 1}: {len(batch)} opportunities")
+        publisher = OpportunityPublisher(supabase, source='generate_opportunities_simple')
+        total_inserted = publisher.publish(top_opportunities)
         
-        logger.info(f"✅ Total opportunities inserted: {total_inserted}")
+        logger.info(f"✅ Total opportunities published: {total_inserted}")
         return total_inserted
     else:
         logger.warning("No opportunities generated")
@@ -3,6 +3,8 @@ Generate Options Opportunities
 
 Filters stocks based on "Long-Only" technical criteria and calculates
 Cash-Secured Put (CSP) and Vertical Put Credit Spread (VPC) opportunities.
+Further strategies (call credit spreads, iron condors, covered calls) can be
+enabled through SCANNER_STRATEGIES; see chain_scanner.py.
 
 Criteria:
 - Long Bias: price > SMA200, RSI between 30-48 (oversold in uptrend)
@@ -11,13 +13,21 @@ Criteria:
 
 Usage:
     poetry run python data_collection/generate_options_opportunities.py
+
+    # Sharded across a process pool (0 = all cores), see sharded_generation.py
+    OPPORTUNITY_WORKERS=8 poetry run python data_collection/generate_options_opportunities.py
 """
 
 import os
+import sys
 import logging
 from datetime import date, datetime
+from pathlib import Path
 from dotenv import load_dotenv
 
+# Allow `python data_collection/<script>.py` to import project packages
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
 # Load environment variables
 load_dotenv()
 
@@ -38,6 +48,14 @@ SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "")
 
 from supabase import create_client
 
+from data_collection.opportunity_publisher import OpportunityPublisher
+from data_collection.iv_rank import apply_iv_rank, load_iv_index
+from data_collection.chain_quality import QualityReport, validate_chain
+from data_collection.chain_scanner import get_enabled_strategies, required_sides, scan_chain, simulate_opportunities
+from data_collection.option_chain import rows_to_chain, sort_chain
+from data_collection.sharded_generation import generate_sharded, get_worker_count, load_chain
+from data_collection.ranking import ranks_on_simulation
+
 
 def get_supabase_client():
     """Get Supabase client."""
@@ -116,9 +134,9 @@ def get_long_bias_candidates(supabase):
         return []
 
 
-def get_options_for_ticker(supabase, ticker, min_days=30, max_days=90):
+def get_options_for_ticker(supabase, ticker, min_days=30, max_days=90, option_types=('put',)):
     """
-    Get put options for a ticker within the specified DTE range.
+    Get options (puts by default) for a ticker within the specified DTE range.
     """
     try:
         today = date.today()
@@ -129,10 +147,10 @@ def get_options_for_ticker(supabase, ticker, min_days=30, max_days=90):
             return []
         latest_date = response.data[0]['quote_date']
 
-        # Get put options for this ticker
+        # Get options of the requested types for this ticker
         response = supabase.table('options_quotes').select('*').eq(
             'symbol', ticker
-        ).eq('quote_date', latest_date).eq('type', 'put').execute()
+        ).eq('quote_date', latest_date).in_('type', list(option_types)).execute()
 
         options = []
         for row in response.data:
@@ -163,64 +181,9 @@ def calculate_csp_opportunities(ticker_data, options):
     - Delta < 0.30 (high probability of profit)
     - Reasonable premium (bid > 0)
 
-    Returns list of CSP opportunities.
+    Returns top 5 CSP opportunities (see chain_scanner.scan_csp).
     """
-    opportunities = []
-    price = ticker_data['price']
-
-    for opt in options:
-        try:
-            strike = float(opt.get('strike', 0))
-            bid = float(opt.get('bid', 0)) if opt.get('bid') else 0
-            delta = float(opt.get('delta', 0)) if opt.get('delta') else None
-            days_to_exp = opt.get('days_to_exp', 0)
-
-            # Skip if no bid or strike above current price
-            if bid <= 0 or strike >= price:
-                continue
-
-            # Delta filter: only high probability entries (delta < 0.30)
-            # Note: put delta is negative, so we check abs(delta) < 0.30
-            if delta is not None and abs(delta) >= 0.30:
-                continue
-
-            # Calculate returns
-            collateral = strike * 100  # 100 shares per contract
-            income = bid * 100
-            return_pct = (bid / strike) * 100
-            annualized_return = return_pct * (365 / days_to_exp) if days_to_exp > 0 else 0
-
-            # # Cap extreme values to avoid DB overflow
-            # return_pct = min(return_pct, 9999.99)
-            # annualized_return = min(annualized_return, 9999.99)
-
-            opportunities.append({
-                'ticker': ticker_data['ticker'],
-                'strategy_type': 'CSP',
-                'expiration_date': opt.get('expiration'),
-                'strike_price': strike,
-                'width': None,  # N/A for CSP
-                'net_credit': bid,
-                'collateral': collateral,
-                'return_pct': round(return_pct, 2),
-                'annualized_return': round(annualized_return, 2),
-                'rsi_14': ticker_data.get('rsi'),
-                'iv_percentile': None,  # TODO: calculate IV percentile
-                'price_vs_bb_lower': None,  # TODO: calculate BB distance
-                'above_sma_200': ticker_data.get('above_sma200'),
-                'delta': delta,
-                'theta': float(opt.get('theta', 0)) if opt.get('theta') else None,
-                'days_to_exp': days_to_exp,
-                'implied_volatility': float(opt.get('implied_volatility', 0)) if opt.get('implied_volatility') else None,
-                'contractid': opt.get('contractid')
-            })
-
-        except (ValueError, TypeError) as e:
-            continue
-
-    # Sort by return and take top 5
-    opportunities.sort(key=lambda x: x['return_pct'], reverse=True)
-    return opportunities[:5]
+    return scan_chain(ticker_data, sort_chain(rows_to_chain(options)), ['CSP'])
 
 
 def calculate_vpc_opportunities(ticker_data, options):
@@ -231,106 +194,13 @@ def calculate_vpc_opportunities(ticker_data, options):
     - Short leg: Sell put at higher strike (collect premium)
     - Long leg: Buy put at lower strike (limit risk)
 
-    Returns list of VPC opportunities.
+    Returns top 5 VPC opportunities (see chain_scanner.scan_vpc).
     """
-    opportunities = []
-    price = ticker_data['price']
-
-    # Group options by expiration
-    by_expiration = {}
-    for opt in options:
-        exp = opt.get('expiration')
-        if exp not in by_expiration:
-            by_expiration[exp] = []
-        by_expiration[exp].append(opt)
-
-    # For each expiration, find spread opportunities
-    for exp_date, exp_options in by_expiration.items():
-        # Sort by strike
-        exp_options.sort(key=lambda x: float(x.get('strike', 0)))
-
-        # Try different spread widths (typically $5 or $10)
-        for i, short_leg in enumerate(exp_options):
-            short_strike = float(short_leg.get('strike', 0))
-            short_bid = float(short_leg.get('bid', 0)) if short_leg.get('bid') else 0
-            short_delta = float(short_leg.get('delta', 0)) if short_leg.get('delta') else None
-
-            # Skip if short strike above current price or no bid
-            if short_strike >= price or short_bid <= 0:
-                continue
-
-            # Look for long leg at lower strikes
-            for long_leg in exp_options[:i]:
-                long_strike = float(long_leg.get('strike', 0))
-                long_ask = float(long_leg.get('ask', 0)) if long_leg.get('ask') else 0
-
-                width = short_strike - long_strike
-
-                # Only consider reasonable widths ($2.50 to $20)
-                if width < 2.5 or width > 20:
-                    continue
-
-                # Skip if long ask is too high (no credit)
-                if long_ask >= short_bid:
-                    continue
-
-                try:
-                    net_credit = short_bid - long_ask
-                    max_risk = (width - net_credit) * 100
-                    collateral = max_risk  # Collateral = width - credit for spreads
-
-                    if max_risk <= 0:
-                        continue
-
-                    return_pct = (net_credit / (width - net_credit)) * 100
-                    days_to_exp = short_leg.get('days_to_exp', 30)
-                    annualized_return = return_pct * (365 / days_to_exp) if days_to_exp > 0 else 0
-
-                    # # Cap extreme values to avoid DB overflow
-                    # return_pct = min(return_pct, 9999.99)
-                    # annualized_return = min(annualized_return, 9999.99)
-
-                    opportunities.append({
-                        'ticker': ticker_data['ticker'],
-                        'strategy_type': 'VPC',
-                        'expiration_date': exp_date,
-                        'strike_price': short_strike,  # Short strike
-                        'width': width,
-                        'net_credit': round(net_credit, 2),
-                        'collateral': round(collateral, 2),
-                        'return_pct': round(return_pct, 2),
-                        'annualized_return': round(annualized_return, 2),
-                        'rsi_14': ticker_data.get('rsi'),
-                        'iv_percentile': None,
-                        'price_vs_bb_lower': None,
-                        'above_sma_200': ticker_data.get('above_sma200'),
-                        'delta': short_delta,
-                        'theta': float(short_leg.get('theta', 0)) if short_leg.get('theta') else None,
-                        'days_to_exp': days_to_exp,
-                        'implied_volatility': float(short_leg.get('implied_volatility', 0)) if short_leg.get('implied_volatility') else None,
-                        'contractid': f"{short_leg.get('contractid')}/{long_leg.get('contractid')}"
-                    })
-
-                except (ValueError, TypeError, ZeroDivisionError):
-                    continue
-
-    # Sort by return and take top 5
-    opportunities.sort(key=lambda x: x['return_pct'], reverse=True)
-    return opportunities[:5]
-
-
-def truncate_opportunities_table(supabase):
-    """Clear the options_opportunities table."""
-    try:
-        # Delete all rows (Supabase doesn't have TRUNCATE via REST)
-        supabase.table('options_opportunities').delete().neq('opportunity_id', 0).execute()
-        logger.info("Cleared options_opportunities table")
-    except Exception as e:
-        logger.warning(f"Could not clear table (may not exist): {e}")
+    return scan_chain(ticker_data, sort_chain(rows_to_chain(options)), ['VPC'])
 
 
 def upsert_opportunities(supabase, opportunities):
-    """Insert opportunities into Supabase."""
+    """Publish opportunities to Supabase as a new generation."""
     if not opportunities:
         return 0
 
@@ -349,25 +219,32 @@ def upsert_opportunities(supabase, opportunities):
                 'return_pct': opp['return_pct'],
                 'annualized_return': opp['annualized_return'],
                 'rsi_14': opp.get('rsi_14'),
+                'iv_rank': opp.get('iv_rank'),
                 'iv_percentile': opp.get('iv_percentile'),
                 'price_vs_bb_lower': opp.get('price_vs_bb_lower'),
                 'above_sma_200': opp.get('above_sma_200'),
                 'delta': opp.get('delta'),
-                'theta': opp.get('theta')
+                'theta': opp.get('theta'),
+                'trade_score': opp.get('trade_score'),
+                'trade_score_points': opp.get('trade_score_points'),
+                'score_variants': opp.get('score_variants'),
+                'prob_profit': opp.get('prob_profit'),
+                'prob_touch': opp.get('prob_touch'),
+                'expected_value': opp.get('expected_value'),
+                'short_contractid': opp.get('short_contractid'),
+                'long_contractid': opp.get('long_contractid')
             }
             records.append(record)
 
-        # Insert in batches
-        batch_size = 100
-        for i in range(0, len(records), batch_size):
-            batch = records[i:i + batch_size]
-            supabase.table('options_opportunities').insert(batch).execute()
+        # One bulk insert + pointer flip; readers never see a partial table
+        publisher = OpportunityPublisher(supabase, source='generate_options_opportunities')
+        published = publisher.publish(records)
 
-        logger.info(f"Inserted {len(records)} opportunities")
-        return len(records)
+        logger.info(f"Published {published} opportunities")
+        return published
 
     except Exception as e:
-        logger.error(f"Error inserting opportunities: {e}")
+        logger.error(f"Error publishing opportunities: {e}")
         raise
 
 
@@ -377,10 +254,8 @@ def main():
 
     supabase = get_supabase_client()
 
-    # Step 1: Clear old opportunities
-    truncate_opportunities_table(supabase)
-
-    # Step 2: Get long-bias candidates
+    # Step 1: Get long-bias candidates
+    # (previous opportunities stay visible until the new generation is published)
     candidates = get_long_bias_candidates(supabase)
 
     if not candidates:
@@ -399,29 +274,51 @@ def main():
             for row in response.data if row.get('price')
         ]
 
-    # Step 3: Calculate opportunities for each candidate
-    all_opportunities = []
+    # Step 2: Calculate opportunities for each candidate
+    # One scan per (symbol, expiration) chain emits every enabled strategy
+    strategies = get_enabled_strategies()
+    sides = required_sides(strategies)
+    logger.info(f"Scanning strategies: {', '.join(strategies)}")
 
-    for ticker_data in candidates:
-        ticker = ticker_data['ticker']
-        logger.info(f"Processing {ticker}...")
+    all_opportunities = []
+    workers = get_worker_count()
+
+    if workers > 1:
+        # Sharded mode: bulk-load the chain once, fan tickers out to a process pool
+        chain = load_chain(supabase, [c['ticker'] for c in candidates],
+                           min_days=30, max_days=90, option_types=sides)
+        # Bad contracts are dropped in bulk before any pairing work
+        chain, quality = validate_chain(chain, {c['ticker']: c['price'] for c in candidates})
+        logger.info(quality.summary())
+        all_opportunities = generate_sharded(candidates, chain, workers, strategies)
+    else:
+        quality = QualityReport()
+        for ticker_data in candidates:
+            ticker = ticker_data['ticker']
+            logger.info(f"Processing {ticker}...")
 
-        # Get options for this ticker
-        options = get_options_for_ticker(supabase, ticker, min_days=30, max_days=90)
+            # Get options for this ticker
+            options = get_options_for_ticker(supabase, ticker, min_days=30, max_days=90, option_types=sides)
 
-        if not options:
-            logger.debug(f"No options found for {ticker}")
-            continue
+            if not options:
+                logger.debug(f"No options found for {ticker}")
+                continue
 
-        # Calculate CSP opportunities
-        csp_opps = calculate_csp_opportunities(ticker_data, options)
-        all_opportunities.extend(csp_opps)
+            chain = sort_chain(rows_to_chain(options))
+            # Bad contracts are dropped in bulk before any pairing work
+            chain, _ = validate_chain(chain, ticker_data['price'], report=quality)
+            all_opportunities.extend(scan_chain(ticker_data, chain, strategies, monte_carlo=False))
+        logger.info(quality.summary())
+        # Every ticker's survivors simulated in one batch (already done when ranking needs it)
+        if not ranks_on_simulation():
+            simulate_opportunities(all_opportunities, {c['ticker']: c['price'] for c in candidates})
 
-        # Calculate VPC opportunities
-        vpc_opps = calculate_vpc_opportunities(ticker_data, options)
-        all_opportunities.extend(vpc_opps)
+    # IV rank/percentile from the rolling ATM IV index (one lookup per ticker)
+    if all_opportunities:
+        iv_index = load_iv_index(supabase, sorted({o['ticker'] for o in all_opportunities}))
+        apply_iv_rank(all_opportunities, iv_index)
 
-    # Step 4: Insert into database
+    # Step 3: Publish to database
     if all_opportunities:
         upsert_opportunities(supabase, all_opportunities)
         logger.info(f"Total opportunities generated: {len(all_opportunities)}")
@@ -0,0 +1,197 @@
+"""
+IV Rank / Percentile Index
+
+Keeps a compact rolling history of one at-the-money implied volatility per
+symbol per day (table `iv_history`) instead of rescanning a year of
+options_quotes on every run.
+
+In memory, each symbol's window is held as a sorted list, so:
+- IV rank (position between the window's min and max) is O(1)
+- IV percentile (share of days with lower IV) is one bisect, O(log n)
+- adding a day is one insort plus evicting the oldest day
+
+The daily update (enrich_option_greeks.py) costs one upserted row per symbol.
+"""
+
+import bisect
+import logging
+from collections import deque
+from datetime import date, timedelta
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+IV_HISTORY_TABLE = 'iv_history'
+# One year of trading days
+LOOKBACK_DAYS = 252
+# Expiration used for the ATM IV snapshot (closest to this many days out)
+ATM_TARGET_DAYS = 30
+PAGE_SIZE = 1000
+# Symbols per `in.(...)` filter, keeps request URLs short
+SYMBOL_CHUNK = 100
+
+
+class SymbolIVWindow:
+    """Rolling window of daily ATM IVs for one symbol, kept sorted by value."""
+
+    def __init__(self, lookback: int = LOOKBACK_DAYS):
+        self.lookback = lookback
+        self.by_date: Deque[Tuple[str, float]] = deque()
+        self.sorted_ivs: List[float] = []
+
+    def __len__(self):
+        return len(self.sorted_ivs)
+
+    def add(self, quote_date: str, iv: float):
+        """Append a day; re-recording the latest day replaces it."""
+        if self.by_date and self.by_date[-1][0] == quote_date:
+            self._remove(self.by_date.pop()[1])
+        elif self.by_date and quote_date < self.by_date[-1][0]:
+            # History is loaded in date order; late out-of-order rows are ignored
+            return
+        self.by_date.append((quote_date, iv))
+        bisect.insort(self.sorted_ivs, iv)
+        while len(self.by_date) > self.lookback:
+            self._remove(self.by_date.popleft()[1])
+
+    def _remove(self, iv: float):
+        del self.sorted_ivs[bisect.bisect_left(self.sorted_ivs, iv)]
+
+    @property
+    def latest(self) -> Optional[float]:
+        return self.by_date[-1][1] if self.by_date else None
+
+    def rank(self, iv: float) -> Optional[float]:
+        """(iv - min) / (max - min) over the window, 0-100."""
+        if len(self.sorted_ivs) < 2:
+            return None
+        low, high = self.sorted_ivs[0], self.sorted_ivs[-1]
+        if high <= low:
+            return 50.0
+        return max(0.0, min(100.0, (iv - low) / (high - low) * 100))
+
+    def percentile(self, iv: float) -> Optional[float]:
+        """Share of days in the window with IV below `iv`, 0-100."""
+        if len(self.sorted_ivs) < 2:
+            return None
+        return bisect.bisect_left(self.sorted_ivs, iv) / len(self.sorted_ivs) * 100
+
+
+class IVRankIndex:
+    """Per-symbol IV windows with rank/percentile lookups."""
+
+    def __init__(self, lookback: int = LOOKBACK_DAYS):
+        self.lookback = lookback
+        self.windows: Dict[str, SymbolIVWindow] = {}
+
+    def add(self, symbol: str, quote_date: str, iv: Optional[float]):
+        if iv is None or not np.isfinite(iv) or iv <= 0:
+            return
+        window = self.windows.get(symbol)
+        if window is None:
+            window = self.windows[symbol] = SymbolIVWindow(self.lookback)
+        window.add(str(quote_date), float(iv))
+
+    def rank(self, symbol: str, iv: Optional[float] = None) -> Optional[float]:
+        """IV rank of `iv` (default: the symbol's latest IV)."""
+        window = self.windows.get(symbol)
+        if window is None:
+            return None
+        iv = window.latest if iv is None else iv
+        value = window.rank(iv)
+        return round(value, 2) if value is not None else None
+
+    def percentile(self, symbol: str, iv: Optional[float] = None) -> Optional[float]:
+        """IV percentile of `iv` (default: the symbol's latest IV)."""
+        window = self.windows.get(symbol)
+        if window is None:
+            return None
+        iv = window.latest if iv is None else iv
+        value = window.percentile(iv)
+        return round(value, 2) if value is not None else None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict], lookback: int = LOOKBACK_DAYS) -> 'IVRankIndex':
+        index = cls(lookback)
+        for row in sorted(rows, key=lambda r: (r['symbol'], str(r['quote_date']))):
+            try:
+                index.add(row['symbol'], row['quote_date'], float(row['atm_iv']))
+            except (TypeError, ValueError, KeyError):
+                continue
+        return index
+
+    @classmethod
+    def load(cls, supabase, symbols: Optional[List[str]] = None,
+             lookback: int = LOOKBACK_DAYS) -> 'IVRankIndex':
+        """Load the rolling window from iv_history in paged queries, SYMBOL_CHUNK symbols at a time."""
+        # Calendar days comfortably covering `lookback` trading days
+        since = (date.today() - timedelta(days=int(lookback * 365 / 252) + 7)).isoformat()
+        chunks = [symbols[i:i + SYMBOL_CHUNK] for i in range(0, len(symbols), SYMBOL_CHUNK)] if symbols else [None]
+        rows = []
+        for chunk in chunks:
+            offset = 0
+            while True:
+                query = supabase.table(IV_HISTORY_TABLE).select('symbol, quote_date, atm_iv').gte('quote_date', since)
+                if chunk:
+                    query = query.in_('symbol', chunk)
+                data = (query.order('symbol').order('quote_date')
+                        .range(offset, offset + PAGE_SIZE - 1).execute().data or [])
+                rows.extend(data)
+                if len(data) < PAGE_SIZE:
+                    break
+                offset += PAGE_SIZE
+        index = cls.from_rows(rows, lookback)
+        logger.info(f"Loaded IV history: {len(rows)} rows for {len(index.windows)} symbols")
+        return index
+
+
+def atm_iv(chain: np.ndarray, spot: float, target_days: int = ATM_TARGET_DAYS) -> Optional[float]:
+    """
+    At-the-money IV for one symbol's chain: the expiration closest to
+    `target_days`, averaging the IVs of the strikes nearest to spot.
+    """
+    usable = chain[np.isfinite(chain['implied_volatility']) & (chain['implied_volatility'] > 0)
+                   & (chain['days_to_exp'] > 0)]
+    if len(usable) == 0 or not spot or spot <= 0:
+        return None
+
+    days = usable['days_to_exp']
+    best_days = days[np.argmin(np.abs(days - target_days))]
+    expiry = usable[days == best_days]
+
+    distance = np.abs(expiry['strike'] - spot)
+    nearest = expiry[distance == distance.min()]
+    return float(np.mean(nearest['implied_volatility']))
+
+
+def record_daily_iv(supabase, quote_date: str, ivs: Dict[str, float]) -> int:
+    """Upsert today's ATM IV, one row per symbol."""
+    rows = [
+        {'symbol': symbol, 'quote_date': str(quote_date), 'atm_iv': round(float(iv), 6)}
+        for symbol, iv in ivs.items() if iv is not None and np.isfinite(iv)
+    ]
+    if rows:
+        supabase.table(IV_HISTORY_TABLE).upsert(rows, on_conflict='symbol,quote_date').execute()
+    logger.info(f"Recorded ATM IV for {len(rows)} symbols on {quote_date}")
+    return len(rows)
+
+
+def apply_iv_rank(opportunities: List[Dict], index: IVRankIndex) -> None:
+    """Fill iv_rank / iv_percentile on opportunities, one lookup per ticker."""
+    cache: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
+    for opp in opportunities:
+        ticker = opp['ticker']
+        if ticker not in cache:
+            cache[ticker] = (index.rank(ticker), index.percentile(ticker))
+        opp['iv_rank'], opp['iv_percentile'] = cache[ticker]
+
+
+def load_iv_index(supabase, symbols: Optional[List[str]] = None) -> IVRankIndex:
+    """Load the index; generation continues without IV percentiles on failure."""
+    try:
+        return IVRankIndex.load(supabase, symbols)
+    except Exception as e:
+        logger.warning(f"IV history unavailable, iv_percentile left empty: {e}")
+        return IVRankIndex()
@@ -0,0 +1,196 @@
+"""
+Opportunity Publisher
+
+Generation-versioned publishing for the options_opportunities table.
+
+Instead of deleting every row and re-inserting in batches (which lets readers
+see an empty or half-filled table), each generator run:
+
+1. Allocates a new generation_id in opportunity_generations
+2. Bulk-inserts all of its rows tagged with that generation_id
+3. Advances the single-row opportunity_publish_pointer to the new generation
+   (never backwards: a slower run that finishes after a newer one has been
+   published is superseded and its rows discarded)
+4. Garbage-collects older published generations, and building generations
+   abandoned for over STALE_BUILDING_HOURS, in a background thread
+
+Readers query the current_options_opportunities view, which joins through the
+pointer row, so they always see one complete snapshot.
+
+See database/ddl/004_opportunity_generations.sql for the schema.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+OPPORTUNITIES_TABLE = "options_opportunities"
+GENERATIONS_TABLE = "opportunity_generations"
+POINTER_TABLE = "opportunity_publish_pointer"
+
+# Generations kept besides the current one (for readers mid-query during a flip)
+DEFAULT_KEEP_GENERATIONS = 1
+# A generation still building after this long belongs to a run that died
+STALE_BUILDING_HOURS = 6
+
+
+class OpportunityPublisher:
+    """Publishes a full set of opportunities as one atomically visible generation."""
+
+    def __init__(self, supabase, source: str = "", table: str = OPPORTUNITIES_TABLE,
+                 keep_generations: int = DEFAULT_KEEP_GENERATIONS):
+        self.supabase = supabase
+        self.source = source
+        self.table = table
+        self.keep_generations = keep_generations
+        self._gc_thread: Optional[threading.Thread] = None
+
+    def publish(self, records: List[Dict]) -> int:
+        """
+        Write records under a new generation and make it current.
+
+        Returns the number of rows published. If the bulk insert fails, the
+        pointer is left on the previous generation and the error is re-raised.
+        If a newer generation was published meanwhile, this one is discarded
+        and 0 is returned.
+        """
+        generation_id = self._begin_generation()
+        rows = [{**record, 'generation_id': generation_id} for record in records]
+
+        try:
+            if rows:
+                # Single bulk insert instead of delete + many small batches
+                self.supabase.table(self.table).insert(rows).execute()
+        except Exception:
+            logger.error(f"Bulk insert failed for generation {generation_id}; pointer not flipped")
+            self._discard_generation(generation_id)
+            raise
+
+        if not self._flip_pointer(generation_id, len(rows)):
+            logger.warning(f"Generation {generation_id} superseded by a newer published generation; discarding it")
+            self._discard_generation(generation_id, status='superseded')
+            return 0
+        logger.info(f"Published generation {generation_id}: {len(rows)} opportunities")
+
+        self._start_gc(generation_id)
+        return len(rows)
+
+    def wait_for_gc(self, timeout: Optional[float] = None) -> None:
+        """Block until background garbage collection finishes."""
+        if self._gc_thread:
+            self._gc_thread.join(timeout)
+
+    # ========================
+    # GENERATION LIFECYCLE
+    # ========================
+
+    def _begin_generation(self) -> int:
+        response = self.supabase.table(GENERATIONS_TABLE).insert({
+            'source': self.source,
+            'status': 'building',
+            'created_at': datetime.utcnow().isoformat(),
+        }).execute()
+
+        if not response.data:
+            raise RuntimeError(f"Could not allocate opportunity generation: {response}")
+        return response.data[0]['generation_id']
+
+    def _flip_pointer(self, generation_id: int, row_count: int) -> bool:
+        """Point readers at generation_id unless a newer one is current; True when flipped."""
+        now = datetime.utcnow().isoformat()
+        row = {'id': 1, 'generation_id': generation_id, 'published_at': now}
+
+        # The pointer is a single row, so this conditional update is the atomic
+        # swap; it only ever moves forward
+        response = (
+            self.supabase.table(POINTER_TABLE)
+            .update(row)
+            .eq('id', 1)
+            .or_(f'generation_id.is.null,generation_id.lt.{generation_id}')
+            .execute()
+        )
+        if not response.data:
+            # No pointer row yet (first publish); a concurrent creator wins
+            response = self.supabase.table(POINTER_TABLE).upsert(
+                row, on_conflict='id', ignore_duplicates=True
+            ).execute()
+        if not response.data:
+            return False
+
+        self.supabase.table(GENERATIONS_TABLE).update({
+            'status': 'published',
+            'row_count': row_count,
+            'published_at': now,
+        }).eq('generation_id', generation_id).execute()
+        return True
+
+    def _discard_generation(self, generation_id: int, status: str = 'failed') -> None:
+        try:
+            self.supabase.table(self.table).delete().eq('generation_id', generation_id).execute()
+            self.supabase.table(GENERATIONS_TABLE).update(
+                {'status': status}
+            ).eq('generation_id', generation_id).execute()
+        except Exception as e:
+            logger.warning(f"Could not discard generation {generation_id}: {e}")
+
+    # ========================
+    # GARBAGE COLLECTION
+    # ========================
+
+    def _start_gc(self, current_generation_id: int) -> None:
+        # Non-daemon so short-lived generator scripts finish GC before exiting
+        self._gc_thread = threading.Thread(
+            target=self.collect_garbage,
+            args=(current_generation_id,),
+            name="opportunity-gc",
+        )
+        self._gc_thread.start()
+
+    def collect_garbage(self, current_generation_id: int) -> int:
+        """
+        Delete rows of published generations older than the retention window,
+        and of generations left building for over STALE_BUILDING_HOURS.
+        Readers are already on the current generation, and generations other
+        runs are still building are left alone, so this never affects either.
+        """
+        try:
+            response = (
+                self.supabase.table(GENERATIONS_TABLE)
+                .select('generation_id')
+                .lt('generation_id', current_generation_id)
+                .eq('status', 'published')
+                .order('generation_id', desc=True)
+                .execute()
+            )
+            stale = [row['generation_id'] for row in (response.data or [])][self.keep_generations:]
+
+            cutoff = (datetime.utcnow() - timedelta(hours=STALE_BUILDING_HOURS)).isoformat()
+            response = (
+                self.supabase.table(GENERATIONS_TABLE)
+                .select('generation_id')
+                .eq('status', 'building')
+                .lt('created_at', cutoff)
+                .execute()
+            )
+            abandoned = [row['generation_id'] for row in (response.data or [])]
+
+            for generation_ids, status in ((stale, 'retired'), (abandoned, 'failed')):
+                if generation_ids:
+                    self.supabase.table(self.table).delete().in_('generation_id', generation_ids).execute()
+                    self.supabase.table(GENERATIONS_TABLE).update(
+                        {'status': status}
+                    ).in_('generation_id', generation_ids).execute()
+
+            # Rows written before generation publishing existed
+            self.supabase.table(self.table).delete().is_('generation_id', 'null').execute()
+
+            if stale or abandoned:
+                logger.info(f"Garbage-collected {len(stale)} old and {len(abandoned)} abandoned opportunity generations")
+            return len(stale) + len(abandoned)
+
+        except Exception as e:
+            logger.warning(f"Opportunity generation GC failed (will retry next run): {e}")
+            return 0
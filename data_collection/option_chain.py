@@ -0,0 +1,108 @@
+"""
+Columnar Option Chain
+
+Packs options_quotes rows into a single NumPy structured array so that whole
+chains can be filtered, sorted, sliced per symbol and shared between worker
+processes without per-row Python objects.
+
+Missing numeric values (None from Supabase) are stored as NaN.
+"""
+
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+CHAIN_DTYPE = np.dtype([
+    ('contractid', 'U40'),
+    ('symbol', 'U12'),
+    ('expiration', 'U10'),
+    ('type', 'U4'),
+    ('quote_date', 'U10'),
+    ('strike', 'f8'),
+    ('bid', 'f8'),
+    ('ask', 'f8'),
+    ('mark', 'f8'),
+    ('last', 'f8'),
+    ('volume', 'f8'),
+    ('open_interest', 'f8'),
+    ('implied_volatility', 'f8'),
+    ('delta', 'f8'),
+    ('gamma', 'f8'),
+    ('theta', 'f8'),
+    ('vega', 'f8'),
+    ('days_to_exp', 'i4'),
+])
+
+STRING_FIELDS = ('contractid', 'symbol', 'expiration', 'type', 'quote_date')
+NUMERIC_FIELDS = tuple(name for name in CHAIN_DTYPE.names if name not in STRING_FIELDS + ('days_to_exp',))
+
+# Columns to request from options_quotes when building a chain
+CHAIN_COLUMNS = ', '.join(name for name in CHAIN_DTYPE.names if name != 'days_to_exp')
+
+
+def _to_float(value) -> float:
+    if value is None or value == '':
+        return np.nan
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _days_to_exp(expiration: Optional[str], today: date) -> int:
+    try:
+        return (datetime.strptime(str(expiration)[:10], '%Y-%m-%d').date() - today).days
+    except (ValueError, TypeError):
+        return -1
+
+
+def rows_to_chain(rows: Iterable[Dict], today: Optional[date] = None) -> np.ndarray:
+    """Convert options_quotes rows into a structured array (row order preserved)."""
+    rows = list(rows)
+    today = today or date.today()
+    chain = np.zeros(len(rows), dtype=CHAIN_DTYPE)
+
+    for field in STRING_FIELDS:
+        chain[field] = [str(row.get(field) or '') for row in rows]
+    for field in NUMERIC_FIELDS:
+        chain[field] = [_to_float(row.get(field)) for row in rows]
+    chain['days_to_exp'] = [
+        row['days_to_exp'] if row.get('days_to_exp') is not None else _days_to_exp(row.get('expiration'), today)
+        for row in rows
+    ]
+    return chain
+
+
+def chain_to_rows(chain: np.ndarray) -> List[Dict]:
+    """Convert a structured array back to row dicts (NaN becomes None)."""
+    rows = []
+    for record in chain.tolist():
+        row = {}
+        for name, value in zip(CHAIN_DTYPE.names, record):
+            if isinstance(value, float) and np.isnan(value):
+                value = None
+            row[name] = value
+        rows.append(row)
+    return rows
+
+
+def sort_chain(chain: np.ndarray) -> np.ndarray:
+    """Sort by (symbol, expiration, type, strike) so each chain is contiguous."""
+    order = np.lexsort((chain['strike'], chain['type'], chain['expiration'], chain['symbol']))
+    return chain[order]
+
+
+def group_slices(keys: np.ndarray) -> Dict[str, Tuple[int, int]]:
+    """Map each distinct value of a sorted key column to its [start, stop) range."""
+    if len(keys) == 0:
+        return {}
+    boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    stops = np.concatenate((boundaries, [len(keys)]))
+    return {str(keys[start]): (int(start), int(stop)) for start, stop in zip(starts, stops)}
+
+
+def symbol_slices(chain: np.ndarray) -> Dict[str, Tuple[int, int]]:
+    """[start, stop) range of each symbol in a chain sorted by sort_chain()."""
+    return group_slices(chain['symbol'])
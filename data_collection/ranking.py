@@ -0,0 +1,141 @@
+"""
+Streaming Top-K Ranking
+
+Ranks opportunities as they are produced instead of collecting every
+candidate and sorting the full list afterwards.
+
+- One bounded min-heap per group (ticker, or strategy inside a scan) holds
+  at most K candidates; a new candidate only enters if it beats the
+  group's current worst, so memory is O(groups x K).
+- An optional global top-N is taken over the per-group survivors with a
+  bounded heap as well.
+
+Ties keep the candidate produced first, matching a stable sort.
+
+The ranking key is configurable with OPPORTUNITY_RANK_KEY:
+- return_pct (default)
+- annualized_return
+- score (trade score)
+- expected_value (Monte Carlo expected value, when present)
+Candidates missing the key rank last; return_pct breaks ties.
+"""
+
+import heapq
+import itertools
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_RANK_KEY = 'return_pct'
+
+# Letter grades from calculate_trade_score, worst to best
+GRADE_ORDER = ['F', 'D-', 'D', 'D+', 'C-', 'C', 'C+', 'B-', 'B', 'B+', 'A-', 'A', 'A+']
+_GRADE_RANK = {grade: i for i, grade in enumerate(GRADE_ORDER)}
+
+_MISSING = float('-inf')
+
+
+def _number(value) -> float:
+    try:
+        return float(value) if value is not None else _MISSING
+    except (TypeError, ValueError):
+        return _MISSING
+
+
+def _score(candidate: Dict) -> float:
+    # Numeric points from the scoring engine; fall back to the letter grade
+    points = _number(candidate.get('trade_score_points'))
+    if points != _MISSING:
+        return points
+    return float(_GRADE_RANK.get(candidate.get('trade_score'), _MISSING))
+
+
+RANK_KEYS: Dict[str, Callable[[Dict], float]] = {
+    'return_pct': lambda c: _number(c.get('return_pct')),
+    'annualized_return': lambda c: _number(c.get('annualized_return')),
+    'score': _score,
+    'expected_value': lambda c: _number(c.get('expected_value')),
+}
+
+
+# Keys filled by the Monte Carlo pass: every candidate must be simulated before
+# ranking; otherwise only the ranked survivors are simulated
+SIMULATED_RANK_KEYS = {'expected_value'}
+
+
+def _rank_key_name(name: Optional[str] = None) -> str:
+    name = (name or os.environ.get("OPPORTUNITY_RANK_KEY", DEFAULT_RANK_KEY)).strip().lower()
+    return name if name in RANK_KEYS else DEFAULT_RANK_KEY
+
+
+def ranks_on_simulation(name: Optional[str] = None) -> bool:
+    """True when the configured ranking needs Monte Carlo results."""
+    return _rank_key_name(name) in SIMULATED_RANK_KEYS
+
+
+def get_rank_key(name: Optional[str] = None) -> Callable[[Dict], Tuple[float, float]]:
+    """Sort key for the configured ranking (OPPORTUNITY_RANK_KEY), return_pct as tie-break."""
+    primary = RANK_KEYS[_rank_key_name(name)]
+    return lambda candidate: (primary(candidate), _number(candidate.get('return_pct')))
+
+
+class TopKRanker:
+    """
+    Keep the best `per_group` candidates per group and, optionally, the best
+    `global_limit` overall.
+    """
+
+    def __init__(self, per_group: int, global_limit: Optional[int] = None,
+                 key: Optional[Callable[[Dict], Tuple]] = None, group_by: str = 'ticker'):
+        self.per_group = per_group
+        self.global_limit = global_limit
+        self.key = key or get_rank_key()
+        self.group_by = group_by
+        self.heaps: Dict[str, List[Tuple]] = {}
+        self.seen = 0
+        self._counter = itertools.count()
+
+    def push(self, candidate: Dict) -> bool:
+        """Offer a candidate; returns True if it is (currently) kept."""
+        self.seen += 1
+        if self.per_group <= 0:
+            return False
+        # (key, -seq): among equal keys the newest sits at the heap top and is evicted first
+        entry = (self.key(candidate), -next(self._counter), candidate)
+        heap = self.heaps.setdefault(candidate[self.group_by], [])
+        if len(heap) < self.per_group:
+            heapq.heappush(heap, entry)
+            return True
+        if entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+            return True
+        return False
+
+    def extend(self, candidates: Iterable[Dict]):
+        for candidate in candidates:
+            self.push(candidate)
+
+    def _ordered(self, entries: Iterable[Tuple]) -> List[Dict]:
+        return [entry[2] for entry in sorted(entries, key=lambda e: e[:2], reverse=True)]
+
+    def group(self, name: str) -> List[Dict]:
+        """Survivors of one group, best first."""
+        return self._ordered(self.heaps.get(name, []))
+
+    def results(self) -> List[Dict]:
+        """All survivors (limited to the global top-N if set), best first."""
+        entries = itertools.chain.from_iterable(self.heaps.values())
+        if self.global_limit is not None:
+            entries = heapq.nlargest(self.global_limit, entries, key=lambda e: e[:2])
+        return self._ordered(entries)
+
+    def __len__(self):
+        return sum(len(heap) for heap in self.heaps.values())
+
+
+def get_global_limit() -> Optional[int]:
+    """Overall cap from OPPORTUNITY_GLOBAL_LIMIT (unset or 0 = no cap)."""
+    try:
+        limit = int(os.environ.get("OPPORTUNITY_GLOBAL_LIMIT", "0"))
+    except ValueError:
+        return None
+    return limit if limit > 0 else None
@@ -0,0 +1,207 @@
+"""
+Batched Trade Scoring
+
+Scores every candidate against one or more scoring configs in one
+vectorized pass. Configs are data (config/scoring_configs.json), not code:
+
+- "interp" factors map a field through piecewise-linear breakpoints
+  (np.interp, clamped at both ends)
+- "bins" factors look points up from a table indexed by np.digitize
+- grades map the summed points to letter grades the same way
+
+Missing values (None/NaN, and 0 where "zero_is_missing" is set, mirroring
+the original truthiness checks) score the factor's "missing" points.
+
+The "default" config reproduces calculate_trade_score exactly; extra
+configs are scored alongside it on every run for A/B comparison and
+stored in score_variants.
+
+Usage:
+    engine = ScoringEngine.load()
+    engine.apply(opportunities)  # fills trade_score, trade_score_points, score_variants
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config' / 'scoring_configs.json'
+
+
+def _edge(spec) -> float:
+    """
+    A bin edge is a number (values equal to it fall in the upper bin) or
+    {"at": x, "side": "below"} (values equal to it fall in the lower bin).
+    """
+    if isinstance(spec, Mapping):
+        value = float(spec['at'])
+        return float(np.nextafter(value, np.inf)) if spec.get('side') == 'below' else value
+    return float(spec)
+
+
+@dataclass
+class Factor:
+    name: str
+    field: str
+    kind: str
+    xs: np.ndarray
+    ys: np.ndarray
+    missing: float = 0.0
+    zero_is_missing: bool = False
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> 'Factor':
+        kind = spec['type']
+        if kind == 'interp':
+            xs, ys = spec['breakpoints'], spec['values']
+            if len(xs) != len(ys):
+                raise ValueError(f"Factor {spec['name']}: breakpoints and values differ in length")
+        elif kind == 'bins':
+            xs, ys = [_edge(e) for e in spec['edges']], spec['points']
+            if len(ys) != len(xs) + 1:
+                raise ValueError(f"Factor {spec['name']}: bins need len(edges) + 1 points")
+        else:
+            raise ValueError(f"Factor {spec['name']}: unknown type {kind!r}")
+        return cls(
+            name=spec['name'], field=spec['field'], kind=kind,
+            xs=np.asarray(xs, dtype=float), ys=np.asarray(ys, dtype=float),
+            missing=float(spec.get('missing', 0)),
+            zero_is_missing=bool(spec.get('zero_is_missing', False)),
+        )
+
+    def points(self, values: np.ndarray) -> np.ndarray:
+        missing = np.isnan(values)
+        if self.zero_is_missing:
+            missing |= values == 0
+        safe = np.where(missing, 0.0, values)
+        if self.kind == 'interp':
+            points = np.interp(safe, self.xs, self.ys)
+        else:
+            points = self.ys[np.digitize(safe, self.xs)]
+        return np.where(missing, self.missing, points)
+
+
+@dataclass
+class ScoringConfig:
+    name: str
+    factors: List[Factor]
+    grade_edges: np.ndarray
+    grade_labels: np.ndarray
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> 'ScoringConfig':
+        grades = spec['grades']
+        if len(grades['labels']) != len(grades['edges']) + 1:
+            raise ValueError(f"Config {spec['name']}: grades need len(edges) + 1 labels")
+        return cls(
+            name=spec['name'],
+            factors=[Factor.from_dict(f) for f in spec['factors']],
+            grade_edges=np.asarray([_edge(e) for e in grades['edges']], dtype=float),
+            grade_labels=np.asarray(grades['labels'], dtype=object),
+        )
+
+    @property
+    def fields(self) -> List[str]:
+        return [factor.field for factor in self.factors]
+
+    def evaluate(self, columns: Mapping[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Points and grades for every row of `columns`."""
+        n = len(next(iter(columns.values()))) if columns else 0
+        total = np.zeros(n)
+        # Summed in factor order, so floating point matches the scalar scorer
+        for factor in self.factors:
+            total = total + factor.points(columns[factor.field])
+        return total, self.grade_labels[np.digitize(total, self.grade_edges)]
+
+
+def _column(values: Sequence) -> np.ndarray:
+    out = np.empty(len(values))
+    for i, value in enumerate(values):
+        try:
+            out[i] = float(value) if value is not None else np.nan
+        except (TypeError, ValueError):
+            out[i] = np.nan
+    return out
+
+
+class ScoringEngine:
+    """Evaluates a primary scoring config plus any number of variants."""
+
+    def __init__(self, configs: List[ScoringConfig], primary: Optional[str] = None):
+        if not configs:
+            raise ValueError("At least one scoring config is required")
+        self.configs = {config.name: config for config in configs}
+        self.primary = primary if primary in self.configs else configs[0].name
+
+    @classmethod
+    def from_dict(cls, data: Dict, primary: Optional[str] = None) -> 'ScoringEngine':
+        configs = [ScoringConfig.from_dict(spec) for spec in data['configs']]
+        return cls(configs, primary or os.environ.get("SCORING_CONFIG") or data.get('default'))
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None, primary: Optional[str] = None) -> 'ScoringEngine':
+        """Load configs from SCORING_CONFIG_PATH or config/scoring_configs.json."""
+        path = Path(path or os.environ.get("SCORING_CONFIG_PATH", CONFIG_PATH))
+        with open(path) as f:
+            return cls.from_dict(json.load(f), primary)
+
+    @property
+    def fields(self) -> List[str]:
+        fields = []
+        for config in self.configs.values():
+            fields.extend(f for f in config.fields if f not in fields)
+        return fields
+
+    def score_columns(self, columns: Mapping[str, Sequence]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """{config name: (points, grades)} for column-oriented inputs."""
+        n = len(next(iter(columns.values()))) if columns else 0
+        # Fields a config uses but the caller did not supply count as missing
+        arrays = {
+            field: _column(columns[field]) if field in columns else np.full(n, np.nan)
+            for field in self.fields
+        }
+        return {name: config.evaluate(arrays) for name, config in self.configs.items()}
+
+    def score(self, candidates: Sequence[Dict]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """{config name: (points, grades)} for a list of candidate dicts."""
+        columns = {field: [c.get(field) for c in candidates] for field in self.fields}
+        return self.score_columns(columns)
+
+    def apply(self, candidates: Sequence[Dict], columns: Optional[Mapping[str, Sequence]] = None):
+        """
+        Fill trade_score / trade_score_points from the primary config and
+        score_variants with every config's result. `columns` overrides the
+        inputs read from the candidates (e.g. unrounded returns).
+        """
+        if not candidates:
+            return
+        inputs = {field: [c.get(field) for c in candidates] for field in self.fields}
+        inputs.update(columns or {})
+        results = self.score_columns(inputs)
+        primary_points, primary_grades = results[self.primary]
+        for i, candidate in enumerate(candidates):
+            candidate['trade_score'] = str(primary_grades[i])
+            candidate['trade_score_points'] = round(float(primary_points[i]), 2)
+            candidate['score_variants'] = {
+                name: {'points': round(float(points[i]), 2), 'grade': str(grades[i])}
+                for name, (points, grades) in results.items()
+            }
+
+
+_default_engine: Optional[ScoringEngine] = None
+
+
+def get_scoring_engine() -> ScoringEngine:
+    """Process-wide engine loaded once from the config file."""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = ScoringEngine.load()
+        logger.info(f"Scoring configs: {', '.join(_default_engine.configs)} (primary: {_default_engine.primary})")
+    return _default_engine
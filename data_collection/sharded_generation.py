@@ -0,0 +1,175 @@
+"""
+Sharded Opportunity Generation
+
+Process-pool execution mode for generate_options_opportunities.py, for
+universes too large to scan one ticker at a time on a single core.
+
+Flow:
+1. Load the whole candidate chain in a few paged queries (instead of one
+   Supabase round trip per ticker) and pack it into a columnar array
+2. Copy the array into a shared-memory block once
+3. Partition tickers into shards balanced by contract count
+4. Each worker attaches to the shared block, reads only its slices and
+   returns its ranked candidates
+5. The parent merges the per-shard results
+
+Usage:
+    OPPORTUNITY_WORKERS=8 poetry run python data_collection/generate_options_opportunities.py
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data_collection.chain_scanner import scan_chain, simulate_opportunities
+from data_collection.option_chain import CHAIN_COLUMNS, rows_to_chain, sort_chain, symbol_slices
+from data_collection.ranking import ranks_on_simulation
+
+logger = logging.getLogger(__name__)
+
+# PostgREST caps responses at 1000 rows by default
+PAGE_SIZE = 1000
+# Tickers per `in.(...)` filter, keeps request URLs short
+SYMBOL_CHUNK = 100
+# Shards per worker; smaller shards even out skewed chain sizes
+SHARDS_PER_WORKER = 4
+
+
+def get_worker_count() -> int:
+    """Number of worker processes from OPPORTUNITY_WORKERS (0 = all cores)."""
+    try:
+        workers = int(os.environ.get("OPPORTUNITY_WORKERS", "1"))
+    except ValueError:
+        workers = 1
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def load_chain(supabase, tickers: List[str], min_days: int = 30, max_days: int = 90,
+               option_types: Tuple[str, ...] = ('put',)) -> np.ndarray:
+    """
+    Load the latest options chain for all tickers in paged bulk queries.
+    Returns a chain sorted by (symbol, expiration, type, strike).
+    """
+    response = supabase.table('options_quotes').select('quote_date').order('quote_date', desc=True).limit(1).execute()
+    if not response.data:
+        return rows_to_chain([])
+    latest_date = response.data[0]['quote_date']
+
+    today = date.today()
+    min_exp = (today + timedelta(days=min_days)).isoformat()
+    max_exp = (today + timedelta(days=max_days)).isoformat()
+
+    rows = []
+    for i in range(0, len(tickers), SYMBOL_CHUNK):
+        chunk = tickers[i:i + SYMBOL_CHUNK]
+        offset = 0
+        while True:
+            page = (
+                supabase.table('options_quotes')
+                .select(CHAIN_COLUMNS)
+                .eq('quote_date', latest_date)
+                .in_('symbol', chunk)
+                .in_('type', list(option_types))
+                .gte('expiration', min_exp)
+                .lte('expiration', max_exp)
+                .order('contractid')
+                .range(offset, offset + PAGE_SIZE - 1)
+                .execute()
+            )
+            data = page.data or []
+            rows.extend(data)
+            if len(data) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+
+    logger.info(f"Loaded {len(rows)} contracts for {len(tickers)} tickers in bulk")
+    return sort_chain(rows_to_chain(rows, today=today))
+
+
+def partition_shards(slices: Dict[str, Tuple[int, int]], shard_count: int) -> List[List[str]]:
+    """Greedy largest-first partition of tickers into shards of similar contract count."""
+    shard_count = max(1, min(shard_count, len(slices)))
+    shards: List[List[str]] = [[] for _ in range(shard_count)]
+    loads = [0] * shard_count
+
+    for ticker, (start, stop) in sorted(slices.items(), key=lambda item: item[1][0] - item[1][1]):
+        target = loads.index(min(loads))
+        shards[target].append(ticker)
+        loads[target] += stop - start
+
+    return [shard for shard in shards if shard]
+
+
+def _process_shard(shm_name: str, length: int, dtype: np.dtype,
+                   work: List[Tuple[Dict, int, int]], strategies: List[str]) -> List[Dict]:
+    """Worker: attach to the shared chain and compute opportunities for a shard."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        chain = np.ndarray((length,), dtype=dtype, buffer=shm.buf)
+        results = []
+        for ticker_data, start, stop in work:
+            # Slices are views into shared memory; the scanner reads them in place.
+            # Survivors are simulated by the parent, all shards in one batch
+            results.extend(scan_chain(ticker_data, chain[start:stop], strategies, monte_carlo=False))
+        del chain
+        return results
+    finally:
+        shm.close()
+
+
+def generate_sharded(candidates: List[Dict], chain: np.ndarray, workers: int,
+                     strategies: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Compute opportunities for all candidates across a process pool.
+    `chain` must be sorted with sort_chain().
+    """
+    slices = symbol_slices(chain)
+    by_ticker = {c['ticker']: c for c in candidates if c['ticker'] in slices}
+    if not by_ticker:
+        return []
+
+    shards = partition_shards({t: slices[t] for t in by_ticker}, workers * SHARDS_PER_WORKER)
+    logger.info(f"Sharding {len(by_ticker)} tickers / {len(chain)} contracts "
+                f"into {len(shards)} shards on {workers} workers")
+
+    started = time.time()
+    shm = shared_memory.SharedMemory(create=True, size=max(chain.nbytes, 1))
+    try:
+        shared = np.ndarray(chain.shape, dtype=chain.dtype, buffer=shm.buf)
+        shared[:] = chain
+
+        opportunities: List[Dict] = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    _process_shard, shm.name, len(chain), chain.dtype,
+                    [(by_ticker[t], *slices[t]) for t in shard], strategies
+                )
+                for shard in shards
+            ]
+            for future in as_completed(futures):
+                try:
+                    opportunities.extend(future.result())
+                except Exception as e:
+                    logger.error(f"Shard failed: {e}")
+
+        del shared
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if not ranks_on_simulation():
+        simulate_opportunities(opportunities, {t: float(c['price']) for t, c in by_ticker.items()})
+    # Final merge: deterministic order regardless of shard completion order
+    opportunities.sort(key=lambda o: (o['ticker'], -o['return_pct']))
+    logger.info(f"Sharded generation produced {len(opportunities)} opportunities "
+                f"in {time.time() - started:.2f}s")
+    return opportunities
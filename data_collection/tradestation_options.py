@@ -10,13 +10,19 @@ Usage:
 """
 
 import os
+import sys
 import logging
 import json
 import time
 from datetime import date
+from pathlib import Path
 from dotenv import load_dotenv
 import requests
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tradestation_auth import TokenCache
+
 # Load environment variables
 load_dotenv()
 
@@ -56,10 +62,13 @@ class TradeStationAPI:
         self.client_secret = os.environ.get('TRADESTATION_CLIENT_SECRET')
         self.refresh_token = os.environ.get('TRADESTATION_REFRESH_TOKEN')
         self.access_token = None
+        self.token_expires_at = 0.0
 
         # Fall back to config file
         if not all([self.client_id, self.client_secret, self.refresh_token]):
             self._load_tokens()
+        # Access token shared with other TradeStation processes
+        self.token_cache = TokenCache(self.client_id or '', self.refresh_token or '')
 
     def _load_tokens(self):
         if os.path.exists(self.config_file):
@@ -70,11 +79,18 @@ class TradeStationAPI:
                 self.refresh_token = self.refresh_token or data.get('refresh_token')
 
     def refresh_access_token(self):
-        """Get a fresh access token."""
+        """Get a usable access token (shared cache first, signin if none is valid)."""
         if not self.refresh_token:
             logger.error("No refresh token available")
             return False
 
+        token = self.token_cache.get_or_refresh(self._fetch_token, rejected_token=self.access_token)
+        if not token:
+            return False
+        self.access_token, self.token_expires_at = token
+        return True
+
+    def _fetch_token(self):
         response = requests.post(
             SIGNIN_URL,
             headers={'Content-Type': 'application/x-www-form-urlencoded'},
@@ -88,21 +104,21 @@ class TradeStationAPI:
 
         if response.ok:
             data = response.json()
-            self.access_token = data['access_token']
             scopes = data.get('scope', 'unknown')
             logger.info(f"Access token refreshed successfully. Scopes: {scopes}")
             if 'OptionSpreads' not in scopes:
                 logger.warning("WARNING: OptionSpreads scope not in token!")
-            return True
+            return data['access_token'], time.time() + float(data.get('expires_in') or 1200)
         else:
             logger.error(f"Token refresh failed: {response.text}")
-            return False
+            return None
 
     def _get_headers(self):
         return {'Authorization': f'Bearer {self.access_token}'}
 
     def _ensure_auth(self):
-        if not self.access_token:
+        # Refresh a minute before expiry rather than waiting for a 401
+        if not self.access_token or self.token_expires_at - time.time() < 60:
             return self.refresh_access_token()
         return True
 
@@ -0,0 +1,289 @@
+"""
+Volatility Surface
+
+Fits one SVI smile per (symbol, expiration) in total variance,
+
+    w(k) = a + b * (rho * (k - m) + sqrt((k - m)^2 + sigma^2)),   k = ln(K / F)
+
+so any strike can be given a model IV and mid, including strikes outside
+the collector's +-20% / 100-contract window, without another API call.
+
+The fit is quasi-explicit: for fixed (m, sigma) the smile is linear in
+(a, b*rho*sigma, b*sigma), so a whole grid of (m, sigma) candidates is
+solved at once with batched normal equations and the best admissible one
+(b >= 0, |rho| < 1, w >= 0) is kept; the grid is then refined around it. Quotes far from the fitted smile are
+flagged as outliers and the slice is refit without them; the exit monitor
+values a flagged quote off the smile instead (VolSurfaceCache.is_outlier).
+
+Surfaces are fitted once per collection run (enrich_option_greeks.py) and
+cached in the `vol_surfaces` table; VolSurfaceCache reads them back.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data_collection.black_scholes import bs_price
+from data_collection.option_chain import group_slices, symbol_slices
+
+logger = logging.getLogger(__name__)
+
+VOL_SURFACES_TABLE = 'vol_surfaces'
+# Fewer quotes than this leave a slice unfitted (5 SVI parameters)
+MIN_POINTS = 5
+GRID_M = 21
+GRID_SIGMA = 15
+# Refinement passes around the best coarse grid point
+ZOOM_LEVELS = 2
+# A quote is an outlier when its IV is this far from the smile:
+# max(OUTLIER_MIN_IV, OUTLIER_MADS x robust residual scale)
+OUTLIER_MIN_IV = 0.05
+OUTLIER_MADS = 4.0
+UPSERT_BATCH = 500
+
+
+@dataclass
+class SmileFit:
+    """Fitted SVI smile for one (symbol, expiration)."""
+    symbol: str
+    expiration: str
+    quote_date: str
+    spot: float
+    rate: float
+    t: float
+    a: float
+    b: float
+    rho: float
+    m: float
+    sigma: float
+    rmse: float
+    n_points: int
+    outliers: List[str] = field(default_factory=list)
+
+    @property
+    def forward(self) -> float:
+        return self.spot * np.exp(self.rate * self.t)
+
+    def total_variance(self, strike):
+        k = np.log(np.asarray(strike, dtype=float) / self.forward)
+        return svi_total_variance(k, self.a, self.b, self.rho, self.m, self.sigma)
+
+    def iv(self, strike):
+        """Model implied volatility at `strike` (scalar or array)."""
+        iv = np.sqrt(np.maximum(self.total_variance(strike), 0) / self.t)
+        return float(iv) if np.ndim(iv) == 0 else iv
+
+    def price(self, strike, is_call):
+        """Model mid at `strike` (Black-Scholes at the smile's IV)."""
+        return bs_price(self.spot, strike, self.t, self.rate, self.iv(strike), is_call)
+
+    def to_row(self) -> Dict:
+        return {
+            'symbol': self.symbol,
+            'expiration': self.expiration,
+            'quote_date': self.quote_date,
+            'spot': self.spot,
+            'rate': self.rate,
+            't_years': self.t,
+            'svi_a': self.a,
+            'svi_b': self.b,
+            'svi_rho': self.rho,
+            'svi_m': self.m,
+            'svi_sigma': self.sigma,
+            'rmse_iv': round(self.rmse, 6),
+            'n_points': self.n_points,
+            'outlier_contracts': self.outliers,
+        }
+
+    @classmethod
+    def from_row(cls, row: Dict) -> 'SmileFit':
+        return cls(
+            symbol=row['symbol'], expiration=str(row['expiration']), quote_date=str(row['quote_date']),
+            spot=float(row['spot']), rate=float(row['rate']), t=float(row['t_years']),
+            a=float(row['svi_a']), b=float(row['svi_b']), rho=float(row['svi_rho']),
+            m=float(row['svi_m']), sigma=float(row['svi_sigma']),
+            rmse=float(row.get('rmse_iv') or 0), n_points=int(row.get('n_points') or 0),
+            outliers=list(row.get('outlier_contracts') or []),
+        )
+
+
+def svi_total_variance(k, a, b, rho, m, sigma):
+    d = np.asarray(k, dtype=float) - m
+    return a + b * (rho * d + np.sqrt(d * d + sigma * sigma))
+
+
+def _solve_grid(k: np.ndarray, w: np.ndarray, m_grid: np.ndarray, s_grid: np.ndarray):
+    """Best admissible linear fit over (m, sigma) grid points, or None."""
+    # Basis [1, y, sqrt(y^2 + 1)] for every grid point: (G, n, 3)
+    y = (k[None, :] - m_grid[:, None]) / s_grid[:, None]
+    basis = np.stack([np.ones_like(y), y, np.sqrt(y * y + 1)], axis=-1)
+    normal = np.einsum('gni,gnj->gij', basis, basis) + 1e-12 * np.eye(3)
+    rhs = np.einsum('gni,n->gi', basis, w)
+    a, d, c = np.linalg.solve(normal, rhs[..., None])[..., 0].T
+
+    residual = np.einsum('gni,gi->gn', basis, np.stack([a, d, c], axis=-1)) - w[None, :]
+    sse = np.sum(residual * residual, axis=1)
+    # b >= 0, |rho| < 1 and non-negative minimum variance a + c * sqrt(1 - rho^2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rho = np.where(c > 0, d / c, np.nan)
+    admissible = (c > 0) & (np.abs(rho) < 1) & (a + c * np.sqrt(np.maximum(1 - rho * rho, 0)) >= 0)
+    if not admissible.any():
+        return None
+    best = np.flatnonzero(admissible)[np.argmin(sse[admissible])]
+    return a[best], c[best] / s_grid[best], rho[best], m_grid[best], s_grid[best]
+
+
+def fit_svi(k: np.ndarray, w: np.ndarray) -> Optional[Tuple[float, float, float, float, float]]:
+    """
+    Least-squares SVI fit of total variance `w` at log-moneyness `k`.
+    Returns (a, b, rho, m, sigma), or None if no admissible fit exists.
+    """
+    if len(k) < MIN_POINTS:
+        return None
+    span = max(k.max() - k.min(), 1e-3)
+    ms = np.linspace(k.min() - 0.25 * span, k.max() + 0.25 * span, GRID_M)
+    log_sigmas = np.linspace(np.log(0.01 * span), np.log(2 * span), GRID_SIGMA)
+    best = None
+    # Coarse grid, then zoom in around the best point
+    for _ in range(1 + ZOOM_LEVELS):
+        m_grid, s_grid = (g.ravel() for g in np.meshgrid(ms, np.exp(log_sigmas)))
+        params = _solve_grid(k, w, m_grid, s_grid)
+        if params is None:
+            break
+        best = params
+        m_step, s_step = ms[1] - ms[0], log_sigmas[1] - log_sigmas[0]
+        ms = np.linspace(best[3] - m_step, best[3] + m_step, GRID_M)
+        log_sigmas = np.linspace(np.log(best[4]) - s_step, np.log(best[4]) + s_step, GRID_SIGMA)
+    return tuple(float(p) for p in best) if best is not None else None
+
+
+def _usable(rows: np.ndarray) -> np.ndarray:
+    iv = rows['implied_volatility']
+    return np.isfinite(iv) & (iv > 0) & np.isfinite(rows['strike']) & (rows['strike'] > 0)
+
+
+def fit_slice(rows: np.ndarray, spot: float, rate: float, quote_date: str) -> Optional[SmileFit]:
+    """
+    Fit one (symbol, expiration) slice of a chain. Out-of-the-money quotes
+    are preferred (puts below the forward, calls above) as they are the
+    liquid side of each strike.
+    """
+    if not spot or spot <= 0 or len(rows) == 0:
+        return None
+    t = max(int(rows['days_to_exp'][0]), 1) / 365
+    forward = spot * np.exp(rate * t)
+
+    usable = _usable(rows)
+    is_call = rows['type'] == 'call'
+    otm = usable & np.where(is_call, rows['strike'] >= forward, rows['strike'] < forward)
+    selected = otm if otm.sum() >= MIN_POINTS else usable
+    if selected.sum() < MIN_POINTS:
+        return None
+
+    k = np.log(rows['strike'] / forward)
+    iv = rows['implied_volatility']
+    inliers = selected
+    # Fit, flag outliers against the fit, refit once without them
+    for attempt in range(2):
+        params = fit_svi(k[inliers], iv[inliers] ** 2 * t)
+        if params is None:
+            return None
+        model_iv = np.sqrt(np.maximum(svi_total_variance(k, *params), 0) / t)
+        residual = np.abs(iv - model_iv)
+        scale = 1.4826 * np.median(residual[inliers])
+        flagged = usable & (residual > max(OUTLIER_MIN_IV, OUTLIER_MADS * scale))
+        refit = selected & ~flagged
+        if attempt or np.array_equal(refit, inliers) or refit.sum() < MIN_POINTS:
+            break
+        inliers = refit
+
+    a, b, rho, m, sigma = params
+    rmse = float(np.sqrt(np.mean(residual[inliers] ** 2)))
+    return SmileFit(
+        symbol=str(rows['symbol'][0]), expiration=str(rows['expiration'][0]), quote_date=str(quote_date),
+        spot=float(spot), rate=float(rate), t=t, a=a, b=b, rho=rho, m=m, sigma=sigma,
+        rmse=rmse, n_points=int(inliers.sum()), outliers=[str(c) for c in rows['contractid'][flagged]],
+    )
+
+
+def fit_surfaces(chain: np.ndarray, prices: Dict[str, float], rate: float, quote_date: str) -> List[SmileFit]:
+    """Fit every (symbol, expiration) of a chain sorted with option_chain.sort_chain."""
+    fits = []
+    for symbol, (start, stop) in symbol_slices(chain).items():
+        symbol_chain = chain[start:stop]
+        for _, (lo, hi) in group_slices(symbol_chain['expiration']).items():
+            fit = fit_slice(symbol_chain[lo:hi], prices.get(symbol), rate, quote_date)
+            if fit is not None:
+                fits.append(fit)
+    return fits
+
+
+def store_surfaces(supabase, fits: List[SmileFit]) -> int:
+    """Upsert fitted smiles, one row per (symbol, expiration, quote_date)."""
+    rows = [fit.to_row() for fit in fits]
+    for i in range(0, len(rows), UPSERT_BATCH):
+        supabase.table(VOL_SURFACES_TABLE).upsert(
+            rows[i:i + UPSERT_BATCH], on_conflict='symbol,expiration,quote_date'
+        ).execute()
+    outliers = sum(len(fit.outliers) for fit in fits)
+    logger.info(f"Stored {len(rows)} volatility smiles ({outliers} outlier quotes flagged)")
+    return len(rows)
+
+
+class VolSurfaceCache:
+    """
+    Latest fitted smiles per symbol, loaded from vol_surfaces on first use
+    (one query per symbol) and kept for the life of the cache.
+    """
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self._smiles: Dict[str, Dict[str, SmileFit]] = {}
+
+    def _load(self, symbol: str) -> Dict[str, SmileFit]:
+        if symbol not in self._smiles:
+            smiles = {}
+            try:
+                rows = (
+                    self.supabase.table(VOL_SURFACES_TABLE)
+                    .select('*')
+                    .eq('symbol', symbol)
+                    .order('quote_date', desc=True)
+                    .limit(200)
+                    .execute()
+                ).data or []
+                latest = rows[0]['quote_date'] if rows else None
+                for row in rows:
+                    if row['quote_date'] == latest:
+                        smiles[str(row['expiration'])] = SmileFit.from_row(row)
+            except Exception as e:
+                logger.warning(f"Volatility surface unavailable for {symbol}: {e}")
+            self._smiles[symbol] = smiles
+        return self._smiles[symbol]
+
+    def get(self, symbol: str, expiration: str) -> Optional[SmileFit]:
+        return self._load(symbol).get(str(expiration)[:10])
+
+    def model_iv(self, symbol: str, expiration: str, strike: float) -> Optional[float]:
+        smile = self.get(symbol, expiration)
+        return smile.iv(strike) if smile else None
+
+    def model_mid(self, symbol: str, expiration: str, strike: float, is_call: bool) -> Optional[float]:
+        smile = self.get(symbol, expiration)
+        if smile is None:
+            return None
+        price = float(smile.price(strike, is_call))
+        return price if np.isfinite(price) else None
+
+    def is_outlier(self, symbol: str, expiration: str, contractid: str,
+                   quote_date: Optional[str] = None) -> bool:
+        """
+        Whether the contract's quote was flagged when the smile was fitted;
+        with `quote_date`, only if the flag is for that day's quote.
+        """
+        smile = self.get(symbol, expiration)
+        if not smile or contractid not in smile.outliers:
+            return False
+        return quote_date is None or str(smile.quote_date)[:10] == str(quote_date)[:10]
@@ -0,0 +1,36 @@
+-- Generation-versioned publishing for options_opportunities
+-- Generators bulk-write rows under a new generation_id, then flip a single
+-- pointer row so readers always see one complete snapshot.
+
+-- Generations: one row per generator run
+CREATE TABLE IF NOT EXISTS opportunity_generations (
+    generation_id BIGSERIAL PRIMARY KEY,
+    source VARCHAR(100),               -- Generator script that produced the rows
+    status VARCHAR(20) DEFAULT 'building',  -- building, published, retired
+    row_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    published_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_opportunity_generations_status ON opportunity_generations (status);
+
+-- Pointer: exactly one row, naming the generation readers should see
+CREATE TABLE IF NOT EXISTS opportunity_publish_pointer (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    generation_id BIGINT REFERENCES opportunity_generations (generation_id),
+    published_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Tag every opportunity row with the generation that wrote it
+ALTER TABLE options_opportunities ADD COLUMN IF NOT EXISTS generation_id BIGINT;
+
+-- Readers filter on generation first, then sort by return
+CREATE INDEX IF NOT EXISTS idx_opportunities_generation_return
+ON options_opportunities (generation_id, return_pct DESC);
+
+-- Current snapshot: one indexed lookup through the pointer row
+CREATE OR REPLACE VIEW current_options_opportunities AS
+SELECT o.*
+FROM options_opportunities o
+JOIN opportunity_publish_pointer p ON o.generation_id = p.generation_id
+WHERE p.id = 1;
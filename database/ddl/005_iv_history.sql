@@ -0,0 +1,23 @@
+-- Rolling at-the-money IV history backing IV rank / percentile
+-- One row per symbol per trading day, appended by enrich_option_greeks.py.
+-- Generators load ~1 year per symbol into an in-memory sorted index
+-- (data_collection/iv_rank.py) instead of rescanning options_quotes.
+
+CREATE TABLE IF NOT EXISTS iv_history (
+    symbol VARCHAR(20) NOT NULL,
+    quote_date DATE NOT NULL,
+    atm_iv NUMERIC(10, 6) NOT NULL,     -- ATM implied volatility, ~30 DTE, decimal
+    PRIMARY KEY (symbol, quote_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_iv_history_date ON iv_history (quote_date);
+
+-- IV rank alongside the existing iv_percentile
+ALTER TABLE options_opportunities ADD COLUMN IF NOT EXISTS iv_rank NUMERIC(6, 2);
+
+-- Re-expand o.* so the current-snapshot view exposes the new column
+CREATE OR REPLACE VIEW current_options_opportunities AS
+SELECT o.*
+FROM options_opportunities o
+JOIN opportunity_publish_pointer p ON o.generation_id = p.generation_id
+WHERE p.id = 1;
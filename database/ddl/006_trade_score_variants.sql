@@ -0,0 +1,16 @@
+-- Numeric trade score and per-config scoring variants
+-- trade_score (letter grade) comes from the primary scoring config;
+-- score_variants holds every config's result for A/B comparison, e.g.
+--   {"default": {"points": 87.5, "grade": "A-"}, "theta_window": {...}}
+-- Configs: config/scoring_configs.json (data_collection/scoring.py)
+
+ALTER TABLE options_opportunities ADD COLUMN IF NOT EXISTS trade_score VARCHAR(2);
+ALTER TABLE options_opportunities ADD COLUMN IF NOT EXISTS trade_score_points NUMERIC(6, 2);
+ALTER TABLE options_opportunities ADD COLUMN IF NOT EXISTS score_variants JSONB;
+
+-- Re-expand o.* so the current-snapshot view exposes the new columns
+CREATE OR REPLACE VIEW current_options_opportunities AS
+SELECT o.*
+FROM options_opportunities o
+JOIN opportunity_publish_pointer p ON o.generation_id = p.generation_id
+WHERE p.id = 1;
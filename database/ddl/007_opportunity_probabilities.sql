@@ -0,0 +1,15 @@
+-- Monte Carlo probabilities per opportunity (data_collection/monte_carlo.py)
+-- prob_profit / prob_touch are 0-1; expected_value is mean P&L at
+-- expiration per contract in dollars. NULL for strategies that are not
+-- simulated (IC, CC) or contracts without IV.
+
+ALTER TABLE options_opportunities ADD COLUMN IF NOT EXISTS prob_profit NUMERIC(6, 4);
+ALTER TABLE options_opportunities ADD COLUMN IF NOT EXISTS prob_touch NUMERIC(6, 4);
+ALTER TABLE options_opportunities ADD COLUMN IF NOT EXISTS expected_value NUMERIC(12, 2);
+
+-- Re-expand o.* so the current-snapshot view exposes the new columns
+CREATE OR REPLACE VIEW current_options_opportunities AS
+SELECT o.*
+FROM options_opportunities o
+JOIN opportunity_publish_pointer p ON o.generation_id = p.generation_id
+WHERE p.id = 1;
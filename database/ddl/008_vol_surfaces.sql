@@ -0,0 +1,26 @@
+-- Fitted volatility smiles, one SVI slice per (symbol, expiration) per day
+-- Written once per collection run by enrich_option_greeks.py; read by
+-- data_collection/vol_surface.py (VolSurfaceCache) to give a model IV / mid
+-- for strikes that were not collected.
+--   w(k) = svi_a + svi_b * (svi_rho * (k - svi_m) + sqrt((k - svi_m)^2 + svi_sigma^2))
+--   k = ln(strike / forward), forward = spot * exp(rate * t_years)
+
+CREATE TABLE IF NOT EXISTS vol_surfaces (
+    symbol VARCHAR(20) NOT NULL,
+    expiration DATE NOT NULL,
+    quote_date DATE NOT NULL,
+    spot DOUBLE PRECISION NOT NULL,
+    rate DOUBLE PRECISION NOT NULL,
+    t_years DOUBLE PRECISION NOT NULL,
+    svi_a DOUBLE PRECISION NOT NULL,
+    svi_b DOUBLE PRECISION NOT NULL,
+    svi_rho DOUBLE PRECISION NOT NULL,
+    svi_m DOUBLE PRECISION NOT NULL,
+    svi_sigma DOUBLE PRECISION NOT NULL,
+    rmse_iv NUMERIC(10, 6),             -- fit error in IV (decimal)
+    n_points INTEGER,                   -- quotes used in the final fit
+    outlier_contracts JSONB,            -- contractids far outside the fitted smile
+    PRIMARY KEY (symbol, expiration, quote_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_vol_surfaces_symbol_date ON vol_surfaces (symbol, quote_date DESC);
@@ -0,0 +1,15 @@
+-- Leg contract ids stored by the generators, so trade proposals need no
+-- options_quotes lookup (trade_automation/opportunities.py ContractResolver
+-- resolves legs in one bulk query when these are empty).
+-- short_contractid: the sold option (CSP, VPC/CCS short leg, CC)
+-- long_contractid: the bought protective leg of a spread
+
+ALTER TABLE options_opportunities ADD COLUMN IF NOT EXISTS short_contractid VARCHAR(40);
+ALTER TABLE options_opportunities ADD COLUMN IF NOT EXISTS long_contractid VARCHAR(40);
+
+-- Re-expand o.* so the current-snapshot view exposes the new columns
+CREATE OR REPLACE VIEW current_options_opportunities AS
+SELECT o.*
+FROM options_opportunities o
+JOIN opportunity_publish_pointer p ON o.generation_id = p.generation_id
+WHERE p.id = 1;
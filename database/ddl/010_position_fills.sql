@@ -0,0 +1,19 @@
+-- Actual fills of entry orders (trade_automation/order_tracker.py).
+-- entry_price / quantity are overwritten with the fill once anything is
+-- filled, so P&L is computed from real fills; quoted_price keeps the
+-- credit the trade was proposed and submitted at.
+-- order_status: WORKING, PARTIAL, FILLED, CANCELLED (positions.status is
+-- also set to CANCELLED when an order ends with nothing filled)
+
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS order_ids JSONB;
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS order_status VARCHAR(20);
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS quoted_price NUMERIC(10, 2);
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS fill_price NUMERIC(10, 4);
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS filled_quantity INTEGER;
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS submitted_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS filled_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS fill_latency_ms NUMERIC(12, 1);
+
+-- The tracker reloads working orders on start
+CREATE INDEX IF NOT EXISTS idx_positions_working_orders ON positions (order_status)
+    WHERE order_status IN ('WORKING', 'PARTIAL');
@@ -0,0 +1,29 @@
+-- Change notifications for the in-memory position cache
+-- (trade_automation/position_cache.py). Every insert, update and delete of
+-- a position is sent on the positions_changed channel as
+-- {"op": ..., "row": {...}}; rows over the 8000-byte NOTIFY payload limit
+-- are sent as {"op": ..., "position_id": N} and read back by the listener.
+
+CREATE OR REPLACE FUNCTION notify_positions_changed() RETURNS trigger AS $$
+DECLARE
+    changed positions%ROWTYPE;
+    payload TEXT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSE
+        changed := NEW;
+    END IF;
+    payload := json_build_object('op', TG_OP, 'row', row_to_json(changed))::TEXT;
+    IF octet_length(payload) > 7900 THEN
+        payload := json_build_object('op', TG_OP, 'position_id', changed.position_id)::TEXT;
+    END IF;
+    PERFORM pg_notify('positions_changed', payload);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS positions_changed ON positions;
+CREATE TRIGGER positions_changed
+    AFTER INSERT OR UPDATE OR DELETE ON positions
+    FOR EACH ROW EXECUTE FUNCTION notify_positions_changed();
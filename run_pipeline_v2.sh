@@ -19,6 +19,7 @@ STALE_HOURS=4
 # ---- Timeouts (seconds) ----
 T_FINVIZ=$((6 * 60))           # 6 minutes for stock scraping
 T_TRADESTATION=$((30 * 60))    # 30 minutes for options data (70 tickers)
+T_GREEKS=$((3 * 60))           # 3 minutes to fill missing greeks / IV
 T_OPPORTUNITIES=$((6 * 60))    # 6 minutes for opportunity generation
 T_PROPOSE_TRADES=$((2 * 60))   # 2 minutes to send trade proposals
 T_PIPELINE=$((50 * 60))        # 50 minutes total pipeline timeout
@@ -115,14 +116,20 @@ pipeline_main() {
     "$LOG_DIR/tradestation_options.log" \
     "$HB_DIR/tradestation_heartbeat" || return $?
 
-  # Step 3: Generate options opportunities (for trade automation)
+  # Step 3: Fill greeks/IV TradeStation omitted (Black-Scholes, whole chain at once)
+  step "enrich_option_greeks.py" "$T_GREEKS" \
+    "data_collection/enrich_option_greeks.py" \
+    "$LOG_DIR/enrich_option_greeks.log" \
+    "$HB_DIR/greeks_heartbeat" || return $?
+
+  # Step 4: Generate options opportunities (for trade automation)
   # Using simple script (works for both CSP + VPC)
   step "generate_opportunities_simple.py" "$T_OPPORTUNITIES" \
     "data_collection/generate_opportunities_simple.py" \
     "$LOG_DIR/opportunities.log" \
     "$HB_DIR/opportunities_heartbeat" || return $?
 
-  # Step 4: Send trade proposals for approval (Telegram/Discord)
+  # Step 5: Send trade proposals for approval (Telegram/Discord)
   # Requires approval_worker.py to be running to process responses
   step "propose_trades.py" "$T_PROPOSE_TRADES" \
     "trade_automation/propose_trades.py" \
@@ -35,7 +35,7 @@ echo
 
 # Job 1: Hourly data collection (9 AM - 4 PM ET, Mon-Fri)
 add_cron \
-    "0 9-16 * * 1-5 cd $WORKSPACE && $POETRY run python data_collection/finviz.py >> $LOGDIR/finviz.log 2>&1 && $POETRY run python data_collection/tradestation_options.py >> $LOGDIR/tradestation.log 2>&1 && $POETRY run python data_collection/generate_options_opportunities.py >> $LOGDIR/opportunities.log 2>&1" \
+    "0 9-16 * * 1-5 cd $WORKSPACE && $POETRY run python data_collection/finviz.py >> $LOGDIR/finviz.log 2>&1 && $POETRY run python data_collection/tradestation_options.py >> $LOGDIR/tradestation.log 2>&1 && $POETRY run python data_collection/enrich_option_greeks.py >> $LOGDIR/enrich_option_greeks.log 2>&1 && $POETRY run python data_collection/generate_options_opportunities.py >> $LOGDIR/opportunities.log 2>&1" \
     "OptionsMagic - Hourly data collection (market hours)"
 
 # Job 2: Weekly cleanup (Sunday 2 AM ET)
@@ -0,0 +1,243 @@
+"""Shared test fixtures."""
+
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+
+
+def _split_terms(expression):
+    """Split a PostgREST or=(...) expression on its top-level commas."""
+    terms, depth, start = [], 0, 0
+    for i, char in enumerate(expression):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            terms.append(expression[start:i])
+            start = i + 1
+    terms.append(expression[start:])
+    return terms
+
+
+def _coerce(text, like):
+    if isinstance(like, bool):
+        return text == "true"
+    if isinstance(like, (int, float)):
+        return float(text)
+    return text
+
+
+def _compare(op, value, target):
+    if op == "is":
+        return value is None if target is None else value == target
+    if value is None or target is None:
+        return False  # SQL: comparisons with NULL are never true
+    return {
+        "eq": value == target, "neq": value != target,
+        "lt": value < target, "lte": value <= target,
+        "gt": value > target, "gte": value >= target,
+    }[op]
+
+
+def _term_matches(term, row):
+    for group, combine in (("and(", all), ("or(", any)):
+        if term.startswith(group) and term.endswith(")"):
+            return combine(_term_matches(t, row) for t in _split_terms(term[len(group):-1]))
+    column, op, text = term.split(".", 2)
+    value = row.get(column)
+    if op == "is":
+        target = {"null": None, "true": True, "false": False}[text]
+    else:
+        target = _coerce(text, value)
+    return _compare(op, value, target)
+
+
+class FakeQuery:
+    """One query against a FakeSupabase table; filters are recorded as called."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns = ()
+        self.payload = None
+        self.options = {}
+        self.filters = []
+        self.ordering = []
+        self.offset = 0
+        self.count = None
+        self._tests = []
+
+    # Actions
+
+    def select(self, *columns, **kwargs):
+        self.columns = columns
+        return self
+
+    def insert(self, payload, **kwargs):
+        self.action, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict="", ignore_duplicates=False, **kwargs):
+        self.action, self.payload = "upsert", payload
+        self.options = {"on_conflict": on_conflict or "id", "ignore_duplicates": ignore_duplicates}
+        return self
+
+    def update(self, payload, **kwargs):
+        self.action, self.payload = "update", payload
+        return self
+
+    def delete(self, **kwargs):
+        self.action = "delete"
+        return self
+
+    # Filters
+
+    def _filter(self, method, args, test):
+        self.filters.append((method, args))
+        if method not in self.db.ignore:
+            self._tests.append(test)
+        return self
+
+    def eq(self, column, value):
+        return self._filter("eq", (column, value), lambda r: _compare("eq", r.get(column), value))
+
+    def neq(self, column, value):
+        return self._filter("neq", (column, value), lambda r: _compare("neq", r.get(column), value))
+
+    def lt(self, column, value):
+        return self._filter("lt", (column, value), lambda r: _compare("lt", r.get(column), value))
+
+    def lte(self, column, value):
+        return self._filter("lte", (column, value), lambda r: _compare("lte", r.get(column), value))
+
+    def gt(self, column, value):
+        return self._filter("gt", (column, value), lambda r: _compare("gt", r.get(column), value))
+
+    def gte(self, column, value):
+        return self._filter("gte", (column, value), lambda r: _compare("gte", r.get(column), value))
+
+    def in_(self, column, values):
+        values = list(values)
+        return self._filter("in_", (column, values), lambda r: r.get(column) in values)
+
+    def is_(self, column, value):
+        return self._filter("is_", (column, value), lambda r: _term_matches(f"{column}.is.{value}", r))
+
+    def or_(self, expression):
+        return self._filter("or_", (expression,), lambda r: any(_term_matches(t, r) for t in _split_terms(expression)))
+
+    # Ordering and paging
+
+    def order(self, column, desc=False, nullsfirst=None, **kwargs):
+        self.ordering.append((column, desc, nullsfirst))
+        return self
+
+    def limit(self, count, **kwargs):
+        self.count = count
+        return self
+
+    def range(self, start, stop, **kwargs):
+        self.offset, self.count = start, stop - start + 1
+        return self
+
+    def filtered(self, method, column=None):
+        """Whether a filter `method` (on `column`, when given) was applied."""
+        return any(m == method and (column is None or args[0] == column) for m, args in self.filters)
+
+    def _matching(self):
+        return [row for row in self.db.tables[self.table] if all(test(row) for test in self._tests)]
+
+    def _select(self):
+        rows = [dict(row) for row in self._matching()]
+        # Stable sorts from the last key to the first; Postgres puts NULLs first when descending
+        for column, desc, nullsfirst in reversed(self.ordering):
+            present = sorted((r for r in rows if r.get(column) is not None), key=lambda r: r[column], reverse=desc)
+            missing = [r for r in rows if r.get(column) is None]
+            rows = missing + present if (desc if nullsfirst is None else nullsfirst) else present + missing
+        stop = None if self.count is None else self.offset + self.count
+        return rows[self.offset:stop]
+
+    def _insert(self, payload):
+        rows = []
+        for row in payload if isinstance(payload, list) else [payload]:
+            row = dict(row)
+            if self.table in self.db.serial:
+                column, next_id = self.db.serial[self.table]
+                row.setdefault(column, next_id)
+                self.db.serial[self.table] = (column, next_id + 1)
+            self.db.tables[self.table].append(row)
+            rows.append(dict(row))
+        return rows
+
+    def _upsert(self):
+        keys, rows = self.options["on_conflict"].split(","), []
+        for row in self.payload if isinstance(self.payload, list) else [self.payload]:
+            existing = next((r for r in self.db.tables[self.table]
+                             if all(r.get(key) == row.get(key) for key in keys)), None)
+            if existing is None:
+                rows += self._insert(row)
+            elif not self.options["ignore_duplicates"]:
+                existing.update(row)
+                rows.append(dict(existing))
+        return rows
+
+    def execute(self):
+        self.db.log.append(self)
+        if (self.table, self.action) in self.db.fail:
+            raise RuntimeError(f"{self.action} on {self.table} failed")
+        if self.action == "select":
+            data = self._select()
+        elif self.action == "insert":
+            data = self._insert(self.payload)
+        elif self.action == "upsert":
+            data = self._upsert()
+        elif self.action == "update":
+            data = []
+            for row in self._matching():
+                row.update(self.payload)
+                data.append(dict(row))
+        else:
+            data = [dict(row) for row in self._matching()]
+            self.db.tables[self.table] = [r for r in self.db.tables[self.table] if not all(t(r) for t in self._tests)]
+        return SimpleNamespace(data=data)
+
+
+class FakeSupabase:
+    """
+    In-memory Supabase client: tables are lists of row dicts and queries
+    apply the PostgREST filters, ordering and paging the code uses. Every
+    executed query is kept in `log`.
+
+    serial: {table: (id column, next id)} assigned on insert
+    ignore: filter methods the "server" does not apply (client-side filters)
+    fail:   {(table, action)} that raise on execute
+    """
+
+    def __init__(self, tables=None, serial=None, ignore=(), fail=()):
+        self.tables = defaultdict(list)
+        for name, rows in (tables or {}).items():
+            self.tables[name] = [dict(row) for row in rows]
+        self.serial = dict(serial or {})
+        self.ignore = set(ignore)
+        self.fail = set(fail)
+        self.log = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def executed(self, table=None, action=None):
+        return [q for q in self.log
+                if (table is None or q.table == table) and (action is None or q.action == action)]
+
+    @property
+    def queries(self):
+        return len(self.log)
+
+
+@pytest.fixture
+def fake_supabase():
+    """FakeSupabase factory: fake_supabase({"table": [rows]}, ...)."""
+    return FakeSupabase
@@ -0,0 +1,76 @@
+from trade_automation.allocation import AllocationLimits, Exposure, allocate, load_open_exposure, position_collateral
+
+
+def _opp(ticker, return_pct, collateral, expiration="2026-06-19"):
+    return {"ticker": ticker, "return_pct": return_pct, "collateral": collateral, "expiration_date": expiration}
+
+
+def _position(ticker, legs):
+    return {"ticker": ticker, "quantity": 1, "legs": legs}
+
+
+def _leg(action, strike, expiration="2026-06-19"):
+    return {"action": action, "option_type": "put", "strike": strike, "quantity": 1, "expiration": expiration}
+
+
+def test_no_limits_keeps_top_n_in_rank_order():
+    candidates = [_opp("A", 1.0, 100), _opp("B", 3.0, 100), _opp("C", 2.0, 100)]
+    selected = allocate(candidates, AllocationLimits(max_trades=2), key=lambda o: o["return_pct"])
+    assert [o["ticker"] for o in selected] == ["B", "C"]
+
+
+def test_constraints_include_open_positions():
+    exposure = Exposure.from_positions([
+        _position("SPY", [_leg("Sell", 500)]),                      # CSP: $50,000
+        _position("AAPL", [_leg("Sell", 200), _leg("Buy", 195)]),   # VPC: $500
+    ])
+    assert exposure.total == 50_500
+
+    candidates = [
+        _opp("SPY", 5.0, 10_000),                          # ticker cap: SPY already at $50k
+        _opp("AAPL", 4.0, 30_000, "2026-07-17"),           # fits
+        _opp("MSFT", 3.0, 30_000, "2026-07-17"),           # expiration cap: July would hit $60k
+        _opp("QQQ", 2.0, 19_000, "2026-08-21"),           # fits: total $99,500
+        _opp("IWM", 1.0, 1_000, "2026-09-18"),             # buying power exhausted
+    ]
+    limits = AllocationLimits(buying_power=100_000, max_ticker_collateral=55_000,
+                              max_expiration_collateral=50_000)
+    selected = allocate(candidates, limits, exposure, key=lambda o: o["return_pct"])
+    assert [o["ticker"] for o in selected] == ["AAPL", "QQQ"]
+
+
+def test_per_ticker_trade_count_and_quantity():
+    candidates = [_opp("SPY", 3.0, 1_000), _opp("SPY", 2.0, 1_000), _opp("QQQ", 1.0, 1_000)]
+    limits = AllocationLimits(max_trades_per_ticker=1, buying_power=4_000, quantity=2)
+    selected = allocate(candidates, limits, key=lambda o: o["return_pct"])
+    assert [(o["ticker"], o["return_pct"]) for o in selected] == [("SPY", 3.0), ("QQQ", 1.0)]
+
+
+def test_position_collateral_ignores_calls_and_bad_legs():
+    legs = [_leg("Sell", 100), {"action": "Sell", "option_type": "call", "strike": 110}, {"option_type": "put"}]
+    assert position_collateral(_position("X", legs)) == 10_000
+
+
+def test_unavailable_positions_allocate_without_exposure():
+    assert load_open_exposure(object()).total == 0
+
+
+def test_hundreds_of_candidates_ranked_once_in_one_pass():
+    candidates = [_opp(f"T{i % 50}", (i * 37) % 100 / 10, 500 + i, f"2026-0{1 + i % 9}-15") for i in range(500)]
+    limits = AllocationLimits(max_trades=25, buying_power=200_000, max_ticker_collateral=10_000,
+                              max_expiration_collateral=40_000, max_trades_per_ticker=2)
+    keyed = []
+
+    def key(opp):
+        keyed.append(opp)
+        return opp["return_pct"]
+
+    selected = allocate(candidates, limits, key=key)
+    # One sort (each candidate keyed once), no re-ranking as capacity is used up
+    assert len(keyed) == len(candidates)
+    assert 0 < len(selected) <= 25
+    per_ticker = {}
+    for opp in selected:
+        per_ticker[opp["ticker"]] = per_ticker.get(opp["ticker"], 0) + 1
+    assert max(per_ticker.values()) <= 2
+    assert sum(o["collateral"] for o in selected) <= 200_000
@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from data_collection.black_scholes import bs_greeks, bs_price, implied_volatility
+from data_collection.enrich_option_greeks import compute_greeks, fill_missing
+from data_collection.option_chain import rows_to_chain
+
+
+def test_put_call_parity():
+    s, k, t, r, sigma = 100.0, 95.0, 0.25, 0.045, 0.3
+    call = bs_price(s, k, t, r, sigma, True)
+    put = bs_price(s, k, t, r, sigma, False)
+    assert call - put == pytest.approx(s - k * np.exp(-r * t))
+
+
+def test_implied_volatility_recovers_batch():
+    rng = np.random.default_rng(1)
+    s = rng.uniform(50, 300, 500)
+    k = s * rng.uniform(0.8, 1.2, 500)
+    t = rng.uniform(10, 90, 500) / 365
+    sigma = rng.uniform(0.15, 0.8, 500)
+    is_call = rng.random(500) < 0.5
+    price = bs_price(s, k, t, 0.045, sigma, is_call)
+
+    iv = implied_volatility(price, s, k, t, 0.045, is_call)
+
+    # Deep in-the-money contracts with ~zero vega carry no volatility information
+    informative = bs_greeks(s, k, t, 0.045, sigma, is_call)["vega"] > 1e-3
+    assert np.isfinite(iv).all()
+    assert np.allclose(iv[informative], sigma[informative], atol=1e-4)
+
+
+def test_implied_volatility_nan_outside_arbitrage_bounds():
+    # Put priced below intrinsic value, and a missing price
+    iv = implied_volatility([1.0, np.nan], 100.0, 120.0, 0.1, 0.045, False)
+    assert np.isnan(iv).all()
+
+
+def test_greeks_match_finite_differences():
+    h = 1e-3
+    greeks = bs_greeks(100.0, 95.0, 0.1, 0.045, 0.3, False)
+    delta = (bs_price(100 + h, 95, 0.1, 0.045, 0.3, False) - bs_price(100 - h, 95, 0.1, 0.045, 0.3, False)) / (2 * h)
+    vega = (bs_price(100, 95, 0.1, 0.045, 0.3 + h, False) - bs_price(100, 95, 0.1, 0.045, 0.3 - h, False)) / (2 * h)
+    assert greeks["delta"] == pytest.approx(delta, rel=1e-5)
+    assert greeks["vega"] * 100 == pytest.approx(vega, rel=1e-5)
+
+
+def test_fill_missing_only_touches_empty_fields():
+    expiration = (date.today() + timedelta(days=45)).isoformat()
+    mid = float(bs_price(100.0, 95.0, 45 / 365, 0.045, 0.3, False))
+    rows = [
+        {"contractid": "A", "symbol": "SPY", "expiration": expiration, "type": "put", "strike": 95.0,
+         "bid": mid - 0.01, "ask": mid + 0.01, "implied_volatility": None, "delta": None, "theta": None},
+        {"contractid": "B", "symbol": "SPY", "expiration": expiration, "type": "put", "strike": 95.0,
+         "bid": mid - 0.01, "ask": mid + 0.01, "implied_volatility": 0.3, "delta": -0.2, "theta": -0.04,
+         "gamma": 0.03, "vega": 0.1},
+    ]
+    chain = rows_to_chain(rows)
+    greeks = compute_greeks(chain, np.full(2, 100.0), 0.045)
+
+    updated = fill_missing(rows, chain, greeks)
+
+    assert [row["contractid"] for row in updated] == ["A"]
+    assert updated[0]["implied_volatility"] == pytest.approx(0.3, abs=1e-3)
+    assert updated[0]["delta"] < 0
@@ -0,0 +1,63 @@
+from datetime import date
+
+import numpy as np
+
+from data_collection.chain_quality import QualityReport, QualityThresholds, validate_chain, validate_rows
+from data_collection.option_chain import rows_to_chain
+
+TODAY = date(2026, 3, 6)
+
+
+def _row(contractid, **overrides):
+    row = {
+        'contractid': contractid, 'symbol': 'XYZ', 'type': 'put', 'quote_date': '2026-03-06',
+        'expiration': '2026-04-17', 'strike': 95.0, 'bid': 1.0, 'ask': 1.2,
+        'open_interest': 500, 'volume': 50,
+    }
+    row.update(overrides)
+    return row
+
+
+ROWS = [
+    _row('good'),
+    _row('crossed', bid=1.5, ask=1.2),
+    _row('no_bid', bid=0),
+    _row('thin', open_interest=3),
+    _row('stale', quote_date='2026-02-20'),
+    _row('far_strike', strike=30.0),
+    _row('absurd', strike=5.0, bid=4.0, ask=4.2),
+    _row('unknown_oi', open_interest=None),
+]
+
+
+def test_each_rule_rejects_its_contract():
+    thresholds = QualityThresholds(min_open_interest=10, max_quote_age_days=5)
+    clean, report = validate_chain(rows_to_chain(ROWS, TODAY), {'XYZ': 100.0}, thresholds, TODAY)
+
+    assert list(clean['contractid']) == ['good', 'unknown_oi']
+    assert report.total == 8 and report.kept == 2
+    assert report.rejected['crossed'] == 1
+    assert report.rejected['no_bid'] == 1
+    assert report.rejected['low_open_interest'] == 1
+    assert report.rejected['stale_quote'] == 1
+    # The $5 strike is both far from spot and an 80% premium
+    assert report.rejected['strike_outlier'] == 2
+    assert report.rejected['premium_outlier'] == 1
+
+
+def test_report_accumulates_across_chains_and_rows():
+    report = QualityReport()
+    rows, _ = validate_rows(ROWS[:3], 100.0, QualityThresholds(), TODAY, report=report)
+    validate_rows(ROWS[3:5], 100.0, QualityThresholds(), TODAY, report=report)
+
+    assert [r['contractid'] for r in rows] == ['good']
+    # Defaults keep thin contracts (no OI minimum) but drop stale quotes
+    assert (report.total, report.kept) == (5, 2)
+    assert 'no_bid=1' in report.summary()
+
+
+def test_missing_spot_skips_moneyness_only():
+    chain = rows_to_chain([_row('far_strike', strike=30.0)], TODAY)
+    clean, report = validate_chain(chain, None, QualityThresholds(), TODAY)
+    assert len(clean) == 1 and report.kept == 1
+    assert np.all(clean['strike'] == 30.0)
@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+
+from data_collection.chain_scanner import get_enabled_strategies, required_sides, scan_chain
+from data_collection.option_chain import rows_to_chain, sort_chain
+
+EXPIRATION = (date.today() + timedelta(days=45)).isoformat()
+TICKER = {"ticker": "SPY", "price": 100.0, "rsi": 40.0, "above_sma200": True}
+
+
+def _quote(contract, option_type, strike, bid, ask, delta):
+    return {
+        "contractid": contract, "symbol": "SPY", "expiration": EXPIRATION, "type": option_type,
+        "strike": strike, "bid": bid, "ask": ask, "delta": delta, "theta": -0.05,
+        "implied_volatility": 0.25, "days_to_exp": 45,
+    }
+
+
+def _chain():
+    return sort_chain(rows_to_chain([
+        _quote("P90", "put", 90.0, 0.40, 0.50, -0.10),
+        _quote("P95", "put", 95.0, 1.20, 1.30, -0.25),
+        _quote("P98", "put", 98.0, 2.50, 2.60, -0.45),
+        _quote("C105", "call", 105.0, 1.10, 1.20, 0.25),
+        _quote("C110", "call", 110.0, 0.30, 0.40, 0.10),
+    ]))
+
+
+def test_scan_emits_every_requested_strategy_from_one_chain():
+    results = scan_chain(TICKER, _chain(), ["CSP", "VPC", "CCS", "IC", "CC"])
+    by_strategy = {}
+    for opp in results:
+        by_strategy.setdefault(opp["strategy_type"], []).append(opp)
+
+    # Delta filter drops the 98 put
+    assert {o["strike_price"] for o in by_strategy["CSP"]} == {90.0, 95.0}
+
+    vpc = by_strategy["VPC"][0]
+    assert vpc["contractid"] == "P98/P95"
+    assert vpc["net_credit"] == 1.2
+    assert vpc["return_pct"] == round(1.2 / 1.8 * 100, 2)
+
+    assert by_strategy["CCS"][0]["contractid"] == "C105/C110"
+
+    condor = by_strategy["IC"][0]
+    assert condor["contractid"] == "P98/P95/C105/C110"
+    assert condor["net_credit"] == 1.9
+    assert condor["collateral"] == 310.0
+
+    assert [o["strike_price"] for o in by_strategy["CC"]] == [105.0, 110.0]
+
+
+def test_scan_keeps_top_five_per_strategy():
+    rows = [_quote(f"P{k}", "put", 50.0 + k, 0.10 + k / 100, 0.20, -0.10) for k in range(10)]
+    results = scan_chain(TICKER, sort_chain(rows_to_chain(rows)), ["CSP"])
+    assert len(results) == 5
+    assert [o["strike_price"] for o in results] == [59.0, 58.0, 57.0, 56.0, 55.0]
+
+
+def test_enabled_strategies_from_env(monkeypatch):
+    monkeypatch.setenv("SCANNER_STRATEGIES", "csp, ic, bogus")
+    strategies = get_enabled_strategies()
+    assert strategies == ["CSP", "IC"]
+    assert required_sides(strategies) == ("call", "put")
+
+
+def test_monte_carlo_runs_once_on_survivors_unless_ranking_needs_it(monkeypatch):
+    import data_collection.chain_scanner as chain_scanner
+
+    batches = []
+    real = chain_scanner.apply_monte_carlo
+
+    def recording(candidates, **kwargs):
+        batches.append(len(candidates))
+        real(candidates, **kwargs)
+
+    monkeypatch.setattr(chain_scanner, "apply_monte_carlo", recording)
+    rows = [_quote(f"P{k}", "put", 80.0 + 2.5 * k, 0.10 + k / 10, 0.15 + k / 10, -0.10) for k in range(8)]
+    chain = sort_chain(rows_to_chain(rows))
+
+    results = scan_chain(TICKER, chain, ["CSP", "VPC"])
+    assert batches == [len(results)] and len(results) == 10
+    assert all(o["prob_profit"] is not None for o in results)
+
+    batches.clear()
+    assert all("prob_profit" not in o for o in scan_chain(TICKER, chain, ["CSP", "VPC"], monte_carlo=False))
+    assert batches == []
+
+    # Expected-value ranking simulates every candidate first, in one batch
+    monkeypatch.setenv("OPPORTUNITY_RANK_KEY", "expected_value")
+    results = scan_chain(TICKER, chain, ["CSP", "VPC"], monte_carlo=False)
+    assert len(batches) == 1 and batches[0] > len(results)
+    assert all(o["expected_value"] is not None for o in results)
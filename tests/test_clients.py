@@ -0,0 +1,77 @@
+import time
+from types import SimpleNamespace
+
+from trade_automation.clients import ClientLifecycle
+from trade_automation.config import Settings
+from trade_automation.models import OptionLeg, TradeRequest
+from trade_automation.tradestation import TOKEN_REFRESH_MARGIN_SECONDS, TradeStationTradingClient
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    def post(self, url, **kwargs):
+        self.calls.append(("token", url))
+        return SimpleNamespace(ok=True, json=lambda: {"access_token": f"tok-{len(self.calls)}", "expires_in": 1200})
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.calls.append((method, headers["Authorization"]))
+        return SimpleNamespace(ok=True, status_code=201, json=lambda: {"Orders": []})
+
+
+def _trade():
+    leg = OptionLeg(contractid="SPY 260619P540", action="Sell", quantity=1, option_type="put",
+                    strike=540.0, expiration="2026-06-19")
+    return TradeRequest(request_id="r1", strategy_type="CSP", ticker="SPY", expiration_date="2026-06-19",
+                        strike_price=540.0, width=None, net_credit=1.5, collateral=54000.0,
+                        return_pct=0.3, quantity=1, legs=[leg], source_opportunity_id=1)
+
+
+def test_token_refreshed_ahead_of_expiry_not_per_order(monkeypatch, tmp_path):
+    monkeypatch.setenv("TRADESTATION_TOKEN_CACHE", str(tmp_path / "token.json"))
+    monkeypatch.setenv("TRADESTATION_DRY_RUN", "false")
+    monkeypatch.setenv("TRADESTATION_ACCOUNT_ID", "SIM-1")
+    monkeypatch.setenv("TRADESTATION_REFRESH_TOKEN", "refresh")
+    session = FakeSession()
+    trader = TradeStationTradingClient(Settings(), session=session)
+
+    assert trader.ensure_token()
+    trader.place_order(_trade())
+    trader.place_order(_trade())
+    assert [call[0] for call in session.calls] == ["token", "POST", "POST"]
+
+    # Inside the refresh margin: the next call refreshes first
+    trader.token_expires_at = time.time() + TOKEN_REFRESH_MARGIN_SECONDS / 2
+    assert trader.seconds_until_refresh() == 0
+    trader.place_order(_trade())
+    assert session.calls[-2:] == [("token", session.calls[0][1]), ("POST", "Bearer tok-4")]
+
+
+def test_clients_created_once_and_supabase_retried_after_failure():
+    created = {"supabase": 0, "trader": 0, "positions": 0}
+    attempts = iter([RuntimeError("down"), "db"])
+
+    def supabase_factory(settings):
+        created["supabase"] += 1
+        result = next(attempts)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def trader_factory(settings):
+        created["trader"] += 1
+        return object()
+
+    def position_manager_factory(supabase):
+        created["positions"] += 1
+        return SimpleNamespace(supabase=supabase)
+
+    clients = ClientLifecycle(Settings(), supabase_factory, trader_factory, position_manager_factory)
+
+    assert clients.supabase is None
+    assert clients.position_manager.supabase == "db"
+    for _ in range(3):
+        assert clients.trader is clients.trader
+        assert clients.position_manager.supabase == "db"
+    assert created == {"supabase": 2, "trader": 1, "positions": 1}
@@ -0,0 +1,67 @@
+from trade_automation.config import Settings
+from trade_automation.opportunities import ContractResolver, build_trade_request
+
+
+def _quote(contractid, symbol, strike, quote_date="2026-03-06", expiration="2026-04-17"):
+    return {"contractid": contractid, "symbol": symbol, "expiration": expiration, "strike": strike,
+            "type": "put", "quote_date": quote_date}
+
+
+QUOTES = [
+    _quote("SPY-540-old", "SPY", 540.0, quote_date="2026-03-05"),
+    _quote("SPY-540", "SPY", 540.0),
+    _quote("AAPL-200", "AAPL", 200.0),
+    _quote("AAPL-195", "AAPL", 195.0),
+]
+
+OPPORTUNITIES = [
+    {"opportunity_id": 1, "ticker": "SPY", "strategy_type": "CSP", "expiration_date": "2026-04-17",
+     "strike_price": 540.0},
+    {"opportunity_id": 2, "ticker": "AAPL", "strategy_type": "VPC", "expiration_date": "2026-04-17",
+     "strike_price": 200.0, "width": 5.0},
+]
+
+
+def test_all_legs_resolved_in_one_query_on_the_latest_date(monkeypatch, fake_supabase):
+    monkeypatch.setenv("TRADE_QUANTITY", "1")
+    # A year of history per contract must not be paged through
+    history = [
+        {**quote, "contractid": f"{quote['contractid']}-{day}", "quote_date": f"2025-{1 + day // 28:02d}-{1 + day % 28:02d}"}
+        for quote in QUOTES for day in range(300)
+    ]
+    monkeypatch.setattr(ContractResolver, "PAGE_SIZE", 100)
+    supabase = fake_supabase({"options_quotes": QUOTES + history})
+    resolver = ContractResolver(supabase)
+
+    assert resolver.load(OPPORTUNITIES) == 3
+    trades = [build_trade_request(opp, supabase, Settings(), resolver=resolver) for opp in OPPORTUNITIES]
+
+    # Latest quote date, then the legs quoted that day
+    assert supabase.queries == 2
+    assert supabase.log[1].filtered("eq", "quote_date")
+    assert [leg.contractid for leg in trades[0].legs] == ["SPY-540"]   # latest quote wins
+    assert [(leg.action, leg.contractid) for leg in trades[1].legs] == [("Sell", "AAPL-200"), ("Buy", "AAPL-195")]
+
+
+def test_stored_contract_ids_skip_lookups(fake_supabase):
+    supabase = fake_supabase({"options_quotes": QUOTES})
+    resolver = ContractResolver(supabase)
+    opp = {**OPPORTUNITIES[1], "short_contractid": "S", "long_contractid": "L"}
+
+    assert resolver.load([opp]) == 0
+    trade = build_trade_request(opp, supabase, Settings(), resolver=resolver)
+
+    assert supabase.queries == 0
+    assert [leg.contractid for leg in trade.legs] == ["S", "L"]
+
+
+def test_unloaded_leg_falls_back_to_single_lookup_and_missing_fails(fake_supabase):
+    supabase = fake_supabase({"options_quotes": QUOTES})
+    resolver = ContractResolver(supabase)
+
+    assert resolver.resolve("SPY", "2026-04-17", 540, "put") == "SPY-540"
+    assert resolver.resolve("SPY", "2026-04-17", 540, "put") == "SPY-540"
+    assert supabase.queries == 1
+
+    missing = {**OPPORTUNITIES[0], "strike_price": 530.0}
+    assert build_trade_request(missing, supabase, Settings(), resolver=resolver) is None
@@ -1,9 +1,11 @@
 import asyncio
+import logging
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock
 
 import pytest
 
+from data_collection.black_scholes import bs_price
 from trade_automation.config import Settings
 from trade_automation.exit_automation import ExitAutomation
 from trade_automation.position_manager import PositionManager
@@ -103,6 +105,13 @@ class FakeQueryBuilder:
         self._data = [r for r in self._data if r.get(field) == value]
         return self
 
+    def in_(self, field, values):
+        self._data = [r for r in self._data if r.get(field) in values]
+        return self
+
+    def gte(self, _field, _value):
+        return self
+
     def order(self, _field, desc=False):
         return self
 
@@ -128,10 +137,11 @@ class FakeQueryBuilder:
 class FakeSupabase:
     """Minimal Supabase stub with configurable option quotes."""
 
-    def __init__(self, option_quotes=None, positions=None, trade_history=None):
+    def __init__(self, option_quotes=None, positions=None, trade_history=None, vol_surfaces=None):
         self._option_quotes = option_quotes or []
         self._positions = positions or []
         self._trade_history = trade_history or []
+        self._vol_surfaces = vol_surfaces or []
 
     def table(self, name):
         if name == "options_quotes":
@@ -140,6 +150,8 @@ class FakeSupabase:
             return FakeQueryBuilder(list(self._positions))
         if name == "trade_history":
             return FakeQueryBuilder(list(self._trade_history))
+        if name == "vol_surfaces":
+            return FakeQueryBuilder(list(self._vol_surfaces))
         return FakeQueryBuilder([])
 
 
@@ -203,6 +215,47 @@ class TestGetCostToClose:
         cost = asyncio.run(ea._get_cost_to_close(position))
         assert cost is None
 
+    def test_unquoted_leg_priced_from_vol_surface(self, configured_env):
+        # Flat 20% smile: w(k) = a + b * sqrt(k^2 + sigma^2) with b * sigma = 0
+        smile = {
+            "symbol": "SPY", "expiration": "2026-09-18", "quote_date": "2026-03-06",
+            "spot": 550.0, "rate": 0.045, "t_years": 0.5,
+            "svi_a": 0.02, "svi_b": 0.0, "svi_rho": 0.0, "svi_m": 0.0, "svi_sigma": 0.1,
+        }
+        supabase = FakeSupabase(option_quotes=[], vol_surfaces=[smile])
+        settings = Settings()
+        pm = PositionManager(supabase)
+        ea = ExitAutomation(settings, supabase, pm)
+
+        cost = asyncio.run(ea._get_cost_to_close(_make_position()))
+        expected = float(bs_price(550.0, 540.0, 0.5, 0.045, 0.2, False))
+        assert cost == pytest.approx(expected)
+
+    def test_outlier_quote_replaced_by_model_mid(self, configured_env, caplog):
+        smile = {
+            "symbol": "SPY", "expiration": "2026-09-18", "quote_date": "2026-03-06",
+            "spot": 550.0, "rate": 0.045, "t_years": 0.5,
+            "svi_a": 0.02, "svi_b": 0.0, "svi_rho": 0.0, "svi_m": 0.0, "svi_sigma": 0.1,
+            "outlier_contracts": ["SPY260918P00540000"],
+        }
+        quote = {"contractid": "SPY260918P00540000", "bid": 0.05, "ask": 0.15, "mark": 0.10,
+                 "quote_date": "2026-03-06"}
+        supabase = FakeSupabase(option_quotes=[quote], vol_surfaces=[smile])
+        settings = Settings()
+        pm = PositionManager(supabase)
+        ea = ExitAutomation(settings, supabase, pm)
+
+        caplog.set_level(logging.INFO, logger="trade_automation.exit_automation")
+        cost = asyncio.run(ea._get_cost_to_close(_make_position()))
+        assert cost == pytest.approx(float(bs_price(550.0, 540.0, 0.5, 0.045, 0.2, False)))
+        # The log names the price source: the quote was there but replaced
+        assert "for SPY260918P00540000 (outlier quote mid 0.10)" in caplog.text
+
+        # A newer quote than the fit is not covered by the flag
+        ea = ExitAutomation(settings, FakeSupabase(option_quotes=[{**quote, "quote_date": "2026-03-09"}],
+                                                   vol_surfaces=[smile]), pm)
+        assert asyncio.run(ea._get_cost_to_close(_make_position())) == pytest.approx(0.10)
+
     def test_falls_back_to_bid_ask_when_mark_zero(self, configured_env):
         quotes = [
             {"contractid": "SPY260918P00540000", "bid": 0.60, "ask": 0.80, "mark": 0, "quote_date": "2026-03-06"},
@@ -496,3 +549,48 @@ class TestExecuteExit:
         # Position still closed in DB despite order failure
         assert len(closed_positions) == 1
         assert "order failed" in closed_positions[0]["exit_reason"]
+
+
+# ---------------------------------------------------------------------------
+# Monitor cycle
+# ---------------------------------------------------------------------------
+
+class TestMonitorCycle:
+    def test_quotes_loaded_once_per_cycle(self, configured_env):
+        far = (datetime.utcnow() + timedelta(days=90)).strftime("%Y-%m-%d")
+        positions = [
+            _make_position(position_id=1, expiration=far, entry_price=1.50),
+            _make_position(position_id=3, expiration=far, entry_price=1.00, contractid="QQQ260918P00400000"),
+            _make_vpc_position(position_id=2, expiration=far),
+            # Entry order not filled yet: nothing to close
+            {**_make_position(position_id=4, expiration=far, entry_price=1.50), "order_status": "WORKING"},
+        ]
+        quotes = [
+            {"contractid": "SPY260918P00540000", "bid": 0.30, "ask": 0.40, "mark": 0.35, "quote_date": "2026-03-06"},
+            {"contractid": "QQQ260918P00400000", "bid": 0.90, "ask": 1.10, "mark": 1.00, "quote_date": "2026-03-06"},
+            {"contractid": "AAPL260918P00200000", "bid": 1.00, "ask": 1.20, "mark": 1.10, "quote_date": "2026-03-06"},
+            {"contractid": "AAPL260918P00195000", "bid": 0.40, "ask": 0.60, "mark": 0.50, "quote_date": "2026-03-06"},
+        ]
+        supabase = FakeSupabase(option_quotes=quotes)
+        quote_queries = []
+        table = supabase.table
+        supabase.table = lambda name: (quote_queries.append(name) if name == "options_quotes" else None) or table(name)
+
+        closed = []
+
+        class FakePositionMgr:
+            async def get_open_positions(self, ticker=None):
+                return positions
+
+            async def close_position(self, position_id, exit_price, exit_reason, realized_pnl):
+                closed.append((position_id, exit_price, realized_pnl))
+
+        ea = ExitAutomation(Settings(), supabase, FakePositionMgr())
+        ea.trader = MagicMock(place_order=MagicMock(return_value={"dry_run": True}))
+
+        exits = asyncio.run(ea.monitor_and_exit())
+
+        # SPY: 1.50 credit, 0.35 to close -> 50% target reached; others hold
+        assert exits == 1
+        assert closed == [(1, pytest.approx(0.35), pytest.approx(115.0))]
+        assert len(quote_queries) == 1
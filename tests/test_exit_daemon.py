@@ -0,0 +1,70 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+from trade_automation.clients import ClientLifecycle
+from trade_automation.config import Settings
+from trade_automation.exit_automation import ExitDaemon
+from trade_automation.market_hours import ET, ExitSchedule
+
+
+def _et(*args):
+    return ET.localize(datetime(*args))
+
+
+def test_schedule_idles_when_closed_and_tightens_near_open_close_and_thresholds():
+    schedule = ExitSchedule(base_seconds=300, edge_seconds=60, near_seconds=90, holidays=["2026-11-26"])
+
+    # Friday after the close -> Monday open (across the DST change on Nov 1)
+    friday = _et(2026, 10, 30, 16, 5)
+    assert not schedule.is_open(friday)
+    assert schedule.next_open(friday) == _et(2026, 11, 2, 9, 30)
+    assert schedule.next_interval(friday) == (schedule.next_open(friday) - friday).total_seconds()
+    assert (_et(2026, 11, 2, 9, 30) - friday).total_seconds() == 65 * 3600 + 25 * 60 + 3600
+
+    # Thanksgiving is skipped
+    assert schedule.next_open(_et(2026, 11, 25, 17, 0)) == _et(2026, 11, 27, 9, 30)
+
+    assert schedule.next_interval(_et(2026, 11, 2, 9, 35)) == 60      # just after the open
+    assert schedule.next_interval(_et(2026, 11, 2, 12, 0)) == 300     # midday
+    assert schedule.next_interval(_et(2026, 11, 2, 12, 0), near_positions=2) == 90
+    assert schedule.next_interval(_et(2026, 11, 2, 15, 50)) == 60     # into the close
+    assert schedule.next_interval(_et(2026, 11, 2, 15, 59)) == 30     # last check before the close
+
+
+def test_daemon_reuses_clients_and_reports_near_positions(monkeypatch, fake_supabase):
+    monkeypatch.setenv("TRADE_APPROVAL_BACKENDS", "")
+    expiration = (datetime.utcnow() + timedelta(days=90)).strftime("%Y-%m-%d")
+    position = {
+        "position_id": 1, "ticker": "SPY", "entry_price": 1.50, "profit_target": 0.75, "stop_loss": 3.00,
+        "quantity": 1, "legs": [{"contractid": "SPY 260918P540", "action": "Sell", "option_type": "put",
+                                 "strike": 540.0, "expiration": expiration}],
+    }
+    # 1.50 credit, 0.90 to close: 0.60 profit, 0.15 short of the 0.75 target
+    quote = {"contractid": "SPY 260918P540", "bid": 0.85, "ask": 0.95, "mark": 0.90, "delta": -0.2,
+             "quote_date": date.today().isoformat()}
+    created = []
+
+    class Positions:
+        def __init__(self, supabase):
+            created.append("positions")
+
+        async def get_open_positions(self, ticker=None):
+            return [position]
+
+    def supabase_factory(settings):
+        created.append("supabase")
+        return fake_supabase({"options_quotes": [quote]})
+
+    def trader_factory(settings):
+        created.append("trader")
+        return object()
+
+    settings = Settings()
+    clients = ClientLifecycle(settings, supabase_factory, trader_factory, Positions)
+    daemon = ExitDaemon(settings, clients, ExitSchedule())
+
+    assert asyncio.run(daemon.run_cycle()) == 0
+    assert asyncio.run(daemon.run_cycle()) == 0
+    assert created == ["supabase", "positions", "trader"]
+    assert daemon.exits.near_positions == 1
+    assert len(daemon.latencies_ms) == 2
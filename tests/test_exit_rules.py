@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from trade_automation.exit_rules import RULES, ExitRule, ExitRulesEngine, PositionArrays, parse_rules
+
+
+def _position(position_id, days=90, entry=1.50, option_type="put", strike=100.0):
+    expiration = (datetime.utcnow() + timedelta(days=days)).strftime("%Y-%m-%d")
+    return {
+        "position_id": position_id, "ticker": "SPY", "entry_price": entry,
+        "profit_target": entry * 0.5, "stop_loss": entry * 2,
+        "legs": [{"contractid": f"C{position_id}", "action": "Sell", "option_type": option_type,
+                  "strike": strike, "expiration": expiration}],
+    }
+
+
+def test_default_rules_match_original_reasons_and_priority():
+    positions = [
+        _position(1, days=10),                 # DTE, also at profit target
+        _position(2),                          # profit target
+        _position(3),                          # stop loss
+        _position(4),                          # hold
+        _position(5),                          # no quote: hold
+    ]
+    costs = [0.10, 0.70, 4.60, 1.20, None]
+    engine = ExitRulesEngine()
+
+    reasons = engine.evaluate(PositionArrays.build(positions, costs))
+
+    assert list(reasons) == ["21 DTE reached", "50% profit target reached", "Stop loss triggered", None, None]
+
+    # One pass over many positions gives the same per-position answers
+    many = [_position(i, days=10 if i % 7 == 0 else 90) for i in range(1000)]
+    many_costs = [[0.70, 4.60, 1.20][i % 3] for i in range(1000)]
+    bulk = engine.evaluate(PositionArrays.build(many, many_costs))
+    singles = [engine.evaluate(PositionArrays.build([p], [c]))[0] for p, c in zip(many[:50], many_costs[:50])]
+    assert list(bulk[:50]) == singles
+
+
+def test_configured_rules_delta_strike_distance_trailing_and_custom(monkeypatch):
+    monkeypatch.setitem(RULES, "cost_cap", lambda cap: ExitRule("cost_cap", "Cost cap", lambda a: a.cost >= cap))
+    engine = ExitRulesEngine.from_spec("delta:0.4,strike_distance:0.03,trailing_stop:0.5,cost_cap:3")
+    assert engine.needs == {"delta", "underlying"}
+
+    positions = [_position(1), _position(2, option_type="call", strike=110.0), _position(3), _position(4)]
+    arrays = PositionArrays.build(
+        positions, [1.0, 1.0, 0.6, 3.5],
+        deltas=[-0.45, 0.2, 0.1, 0.1], underlyings=[120.0, 108.0, 120.0, 120.0],
+        peaks=engine.peaks_for(positions),
+    )
+    assert list(engine.evaluate(arrays)) == [
+        "Short delta above 0.40", "Underlying within 3% of short strike", None, "Cost cap",
+    ]
+    assert engine.peaks[3] == pytest.approx(0.9)
+
+    # Profit of position 3 falls from 0.90 to 0.30: more than half given back
+    arrays = PositionArrays.build(positions[2:3], [1.2], deltas=[0.1], underlyings=[120.0],
+                                  peaks=engine.peaks_for(positions[2:3]))
+    assert list(engine.evaluate(arrays)) == ["Trailing stop (50% of peak profit given back)"]
+    assert engine.peaks[3] == pytest.approx(0.9)
+
+    with pytest.raises(ValueError):
+        parse_rules("dte,unknown_rule")
+    assert np.isnan(PositionArrays.build([_position(9)], [None]).profit[0])
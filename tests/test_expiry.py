@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from trade_automation import approval_worker
+from trade_automation.expiry import ExpiryScheduler
+from trade_automation.store import RequestStore
+
+
+def _minutes_ago(minutes):
+    return (datetime.utcnow() - timedelta(minutes=minutes)).isoformat()
+
+
+class Notifier:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, text):
+        self.messages.append(text)
+
+
+class CountingStore(RequestStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.pending_rows_read = 0
+
+    def pending(self, created_before=None, created_since=None):
+        rows = super().pending(created_before, created_since)
+        self.pending_rows_read += len(rows)
+        return rows
+
+
+def test_expired_requests_share_one_notification(tmp_path):
+    store = RequestStore(str(tmp_path / "requests.db"))
+    store.upsert({"request_id": "a", "status": "pending", "created_at": _minutes_ago(9)})
+    store.upsert({"request_id": "b", "status": "pending", "created_at": _minutes_ago(6)})
+    store.upsert({"request_id": "c", "status": "pending", "created_at": _minutes_ago(1)})
+    store.upsert({"request_id": "done", "status": "approved", "created_at": _minutes_ago(30)})
+    notifier = Notifier()
+
+    assert approval_worker.check_and_expire_requests(store, notifier) == ["a", "b"]
+    assert notifier.messages == ["⏱️ 2 requests auto-rejected (5 min timeout): a, b"]
+    assert store.counts() == {"rejected": 2, "pending": 1, "approved": 1}
+
+
+def test_scheduler_only_touches_due_and_new_requests(tmp_path):
+    store = CountingStore(str(tmp_path / "requests.db"))
+    for i in range(20):
+        store.upsert({"request_id": f"old-{i}", "status": "executed", "created_at": _minutes_ago(60 + i)})
+    store.upsert({"request_id": "soon", "status": "pending", "created_at": _minutes_ago(4)})
+    scheduler = ExpiryScheduler()
+
+    assert approval_worker.expire_due(store, scheduler) == []
+    assert store.pending_rows_read == 1
+    assert scheduler.next_deadline() is not None
+
+    # Approved before its deadline: still popped, but the compare-and-set skips it
+    store.set_status("soon", "approved", expected_status="pending")
+    store.upsert({"request_id": "new", "status": "pending", "created_at": _minutes_ago(0)})
+    assert scheduler.refresh(store) == 1
+    assert scheduler.pop_due(datetime.utcnow() + timedelta(minutes=6)) == ["soon", "new"]
+    assert len(scheduler) == 0
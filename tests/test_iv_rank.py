@@ -0,0 +1,83 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from data_collection.iv_rank import IV_HISTORY_TABLE, SYMBOL_CHUNK, IVRankIndex, SymbolIVWindow, apply_iv_rank, atm_iv
+from data_collection.option_chain import rows_to_chain
+
+
+def _day(n):
+    return (date(2026, 1, 1) + timedelta(days=n)).isoformat()
+
+
+def test_rank_and_percentile_against_window():
+    index = IVRankIndex(lookback=10)
+    for n, iv in enumerate([0.20, 0.30, 0.25, 0.40, 0.35]):
+        index.add("SPY", _day(n), iv)
+
+    # Latest IV 0.35: two-thirds of the way from 0.20 to 0.40, above 3 of 5 days
+    assert index.rank("SPY") == 75.0
+    assert index.percentile("SPY") == 60.0
+    assert index.percentile("SPY", 0.50) == 100.0
+    assert index.rank("QQQ") is None
+
+
+def test_window_evicts_oldest_day():
+    window = SymbolIVWindow(lookback=3)
+    for n, iv in enumerate([0.9, 0.1, 0.2, 0.3]):
+        window.add(_day(n), iv)
+
+    assert window.sorted_ivs == [0.1, 0.2, 0.3]
+    assert window.rank(0.3) == 100.0
+
+
+def test_rerecording_a_day_replaces_it():
+    window = SymbolIVWindow()
+    window.add(_day(0), 0.2)
+    window.add(_day(1), 0.5)
+    window.add(_day(1), 0.3)
+
+    assert window.sorted_ivs == [0.2, 0.3]
+    assert window.latest == 0.3
+
+
+def test_atm_iv_uses_expiration_nearest_30_days_and_strike_nearest_spot():
+    today = date.today()
+    rows = [
+        {"symbol": "SPY", "type": "put", "strike": 100.0, "implied_volatility": 0.50,
+         "expiration": (today + timedelta(days=60)).isoformat()},
+        {"symbol": "SPY", "type": "put", "strike": 100.0, "implied_volatility": 0.20,
+         "expiration": (today + timedelta(days=28)).isoformat()},
+        {"symbol": "SPY", "type": "call", "strike": 100.0, "implied_volatility": 0.24,
+         "expiration": (today + timedelta(days=28)).isoformat()},
+        {"symbol": "SPY", "type": "put", "strike": 90.0, "implied_volatility": 0.30,
+         "expiration": (today + timedelta(days=28)).isoformat()},
+    ]
+    assert np.isclose(atm_iv(rows_to_chain(rows, today=today), 101.0), 0.22)
+
+
+def test_apply_iv_rank_fills_each_opportunity():
+    index = IVRankIndex.from_rows([
+        {"symbol": "SPY", "quote_date": _day(1), "atm_iv": "0.30"},
+        {"symbol": "SPY", "quote_date": _day(0), "atm_iv": "0.10"},
+    ])
+    opportunities = [{"ticker": "SPY"}, {"ticker": "SPY"}, {"ticker": "QQQ"}]
+
+    apply_iv_rank(opportunities, index)
+
+    assert opportunities[0]["iv_rank"] == 100.0
+    assert opportunities[1]["iv_percentile"] == 50.0
+    assert opportunities[2]["iv_percentile"] is None
+
+
+def test_load_queries_symbols_in_chunks(fake_supabase):
+    symbols = [f"S{i:03d}" for i in range(250)]
+    recent = (date.today() - timedelta(days=1)).isoformat()
+    history = [{"symbol": symbol, "quote_date": recent, "atm_iv": 0.2} for symbol in symbols]
+    supabase = fake_supabase({IV_HISTORY_TABLE: history})
+
+    index = IVRankIndex.load(supabase, symbols)
+
+    chunks = [len(args[1]) for query in supabase.log for method, args in query.filters if method == "in_"]
+    assert chunks == [SYMBOL_CHUNK, SYMBOL_CHUNK, 50]
+    assert len(index.windows) == 250
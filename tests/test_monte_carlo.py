@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from data_collection.black_scholes import bs_price
+from data_collection.monte_carlo import MonteCarloConfig, apply_monte_carlo, simulate
+
+RATE = 0.045
+
+
+@pytest.fixture
+def config():
+    return MonteCarloConfig(paths=200_000, seed=7, chunk_size=2, rate=RATE)
+
+
+def test_csp_matches_closed_form(config):
+    spot, strike, credit, days, iv = 100.0, 95.0, 2.0, 30, 0.3
+    t = days / 365
+    result = simulate([spot], [strike], [np.nan], [credit], [days], [iv], [False], config)
+
+    breakeven = strike - credit
+    d2 = (np.log(spot / breakeven) + (RATE - iv * iv / 2) * t) / (iv * np.sqrt(t))
+    assert result['prob_profit'][0] == pytest.approx(norm.cdf(d2), abs=0.005)
+
+    # Expected P&L = credit - forward value of the put, per contract
+    expected = (credit - bs_price(spot, strike, t, RATE, iv, False) * np.exp(RATE * t)) * 100
+    assert result['expected_value'][0] == pytest.approx(expected, abs=2.0)
+
+    # Touching the strike is at least as likely as finishing through it
+    d2_strike = (np.log(spot / strike) + (RATE - iv * iv / 2) * t) / (iv * np.sqrt(t))
+    assert result['prob_touch'][0] > norm.cdf(-d2_strike)
+
+
+def test_spread_loss_is_capped_and_chunks_agree(config):
+    args = ([100.0] * 3, [95.0] * 3, [90.0, np.nan, 90.0], [1.0] * 3, [30] * 3, [0.6] * 3, [False] * 3)
+    chunked = simulate(*args, config)
+    whole = simulate(*args, MonteCarloConfig(paths=200_000, seed=7, chunk_size=100, rate=RATE))
+
+    np.testing.assert_allclose(chunked['expected_value'], whole['expected_value'])
+    # Same draws for every candidate: the spread never loses more than width - credit
+    assert chunked['expected_value'][0] > chunked['expected_value'][1]
+    assert chunked['expected_value'][0] == chunked['expected_value'][2]
+
+
+def test_apply_fills_supported_strategies_only():
+    candidates = [
+        {'strategy_type': 'CSP', 'strike_price': 95.0, 'width': None, 'days_to_exp': 30},
+        {'strategy_type': 'CCS', 'strike_price': 105.0, 'width': 5.0, 'days_to_exp': 30},
+        {'strategy_type': 'CC', 'strike_price': 105.0, 'width': None, 'days_to_exp': 30},
+        {'strategy_type': 'VPC', 'strike_price': 95.0, 'width': 5.0, 'days_to_exp': 30},
+    ]
+    apply_monte_carlo(candidates, spot=[100.0] * 4, credit=[1.5, 1.0, 1.2, 1.0],
+                      iv=[0.3, 0.3, 0.3, None], config=MonteCarloConfig(paths=5_000))
+
+    assert 0 < candidates[0]['prob_profit'] < 1
+    assert 0 < candidates[1]['prob_touch'] < 1
+    assert candidates[2]['expected_value'] is None     # covered calls are not simulated
+    assert candidates[3]['prob_profit'] is None        # no IV
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from data_collection.opportunity_publisher import OpportunityPublisher
+
+GENERATIONS = {"opportunity_generations": ("generation_id", 7)}
+
+
+def _statuses(supabase):
+    return {g["generation_id"]: g["status"] for g in supabase.tables["opportunity_generations"]}
+
+
+def test_publish_bulk_inserts_then_flips_pointer(fake_supabase):
+    supabase = fake_supabase(serial=GENERATIONS)
+    publisher = OpportunityPublisher(supabase, source="test")
+
+    count = publisher.publish([{"ticker": "SPY"}, {"ticker": "QQQ"}])
+    publisher.wait_for_gc()
+
+    assert count == 2
+    inserts = supabase.executed("options_opportunities", "insert")
+    assert len(inserts) == 1  # one bulk insert
+    assert all(row["generation_id"] == 7 for row in inserts[0].payload)
+
+    flip = supabase.executed("opportunity_publish_pointer")[0]
+    assert supabase.log.index(flip) > supabase.log.index(inserts[0])
+    assert supabase.tables["opportunity_publish_pointer"] == [{"id": 1, "generation_id": 7,
+                                                               "published_at": flip.payload["published_at"]}]
+    assert _statuses(supabase) == {7: "published"}
+
+
+def test_failed_insert_leaves_pointer_on_previous_generation(fake_supabase):
+    supabase = fake_supabase(serial=GENERATIONS, fail={("options_opportunities", "insert")})
+    publisher = OpportunityPublisher(supabase, source="test")
+
+    with pytest.raises(RuntimeError):
+        publisher.publish([{"ticker": "SPY"}])
+
+    assert not supabase.executed("opportunity_publish_pointer")
+    assert _statuses(supabase) == {7: "failed"}
+
+
+def test_pointer_only_moves_forward(fake_supabase):
+    # A slower run (generation 7) finishing after generation 8 was published
+    supabase = fake_supabase({"opportunity_publish_pointer": [{"id": 1, "generation_id": 8}]}, serial=GENERATIONS)
+    publisher = OpportunityPublisher(supabase, source="test")
+
+    assert publisher.publish([{"ticker": "SPY"}]) == 0
+    publisher.wait_for_gc()
+
+    assert supabase.tables["opportunity_publish_pointer"] == [{"id": 1, "generation_id": 8}]
+    assert supabase.executed("opportunity_publish_pointer", "update")[0].filtered("or_")
+    # Its rows are discarded and no GC runs for it
+    assert supabase.tables["options_opportunities"] == []
+    assert _statuses(supabase) == {7: "superseded"}
+    assert not supabase.executed("opportunity_generations", "select")
+
+
+def _generation(generation_id, status, age=timedelta(days=1)):
+    return {"generation_id": generation_id, "status": status, "created_at": (datetime.utcnow() - age).isoformat()}
+
+
+def test_gc_keeps_recent_generations_and_deletes_older(fake_supabase):
+    generations = [_generation(g, "published") for g in (4, 5, 6)] + [_generation(8, "building", timedelta(0))]
+    rows = [{"ticker": "SPY", "generation_id": g} for g in (4, 5, 6, 8, None)]
+    supabase = fake_supabase({"opportunity_generations": generations, "options_opportunities": rows})
+    publisher = OpportunityPublisher(supabase, source="test", keep_generations=1)
+
+    assert publisher.collect_garbage(current_generation_id=7) == 2
+
+    # Generation 8 is another run still building: its rows are kept
+    assert [row["generation_id"] for row in supabase.tables["options_opportunities"]] == [6, 8]
+    assert _statuses(supabase) == {4: "retired", 5: "retired", 6: "published", 8: "building"}
+
+
+def test_gc_fails_generations_abandoned_while_building(fake_supabase):
+    generations = [_generation(3, "building"), _generation(8, "building", timedelta(minutes=5))]
+    rows = [{"ticker": "SPY", "generation_id": g} for g in (3, 8)]
+    supabase = fake_supabase({"opportunity_generations": generations, "options_opportunities": rows})
+    publisher = OpportunityPublisher(supabase, source="test")
+
+    assert publisher.collect_garbage(current_generation_id=7) == 1
+
+    assert [row["generation_id"] for row in supabase.tables["options_opportunities"]] == [8]
+    assert _statuses(supabase) == {3: "failed", 8: "building"}
@@ -0,0 +1,53 @@
+from trade_automation.opportunities import query_opportunities
+
+
+def _opp(oid, ticker, strategy, return_pct, collateral=1000.0):
+    return {"opportunity_id": oid, "ticker": ticker, "strategy_type": strategy,
+            "return_pct": return_pct, "collateral": collateral}
+
+
+ROWS = [
+    _opp(1, "SPY", "CSP", 3.0),
+    _opp(2, "QQQ", "CCS", 2.5),
+    _opp(3, "IWM", "VPC", 2.0, collateral=90000.0),
+    _opp(4, "AAPL", "CSP", 2.0),
+    _opp(5, "MSFT", "VPC", 2.0),
+    _opp(6, "TSLA", "CSP", 1.5),
+    _opp(7, "AMD", "CSP", 0.5),
+]
+
+
+def test_filters_are_pushed_into_one_query(fake_supabase):
+    supabase = fake_supabase({"options_opportunities": ROWS})
+    result = query_opportunities(supabase, "options_opportunities", limit=3, min_return_pct=1.0,
+                                 max_collateral=50000, strategy_types=["csp", "vpc"])
+
+    assert [opp["opportunity_id"] for opp in result] == [1, 5, 4]
+    assert supabase.queries == 1
+    query = supabase.log[0]
+    assert all(query.filtered(method) for method in ("gte", "in_", "lte"))
+    assert query.columns != ("*",)
+
+
+def test_keyset_pages_continue_through_ties_without_duplicates(fake_supabase):
+    # A filter the server does not apply forces a second page
+    supabase = fake_supabase({"options_opportunities": ROWS}, ignore={"in_"})
+    result = query_opportunities(supabase, "options_opportunities", limit=4, strategy_types=["CSP", "VPC"])
+
+    assert [opp["opportunity_id"] for opp in result] == [1, 5, 4, 3]
+    assert supabase.queries == 2
+    assert supabase.log[1].filtered("or_", "return_pct.lt.2.0,and(return_pct.eq.2.0,opportunity_id.lt.4),return_pct.is.null")
+
+
+def test_without_min_return_negative_and_null_returns_are_kept_last(fake_supabase):
+    rows = ROWS + [_opp(8, "XLF", "CSP", -1.0), _opp(9, "XLE", "CSP", None), _opp(10, "XLU", "CSP", None),
+                   _opp(11, "XLB", "VPC", None)]
+    supabase = fake_supabase({"options_opportunities": rows}, ignore={"in_"})
+    result = query_opportunities(supabase, "options_opportunities", limit=7, strategy_types=["CSP"])
+
+    # Pages: returns 3.0..0.5; on past 0.5 into the NULLs; the rest of the NULLs
+    assert [opp["opportunity_id"] for opp in result] == [1, 4, 6, 7, 8, 10, 9]
+    assert supabase.queries == 3
+    assert not any(query.filtered("gte") for query in supabase.log)
+    # The last page continues inside the NULLs
+    assert supabase.log[2].filtered("is_", "return_pct") and supabase.log[2].filtered("lt", "opportunity_id")
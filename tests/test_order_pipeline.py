@@ -0,0 +1,82 @@
+import threading
+import time
+
+from trade_automation.models import OptionLeg, TradeRequest
+from trade_automation.order_pipeline import OrderPipeline, idempotency_key
+from trade_automation.store import RequestStore
+
+
+def _approved(store, request_id, ticker="SPY"):
+    request = {"request_id": request_id, "status": "pending", "ticker": ticker, "net_credit": 1.2, "quantity": 1}
+    store.upsert(request)
+    store.set_status(request_id, "approved", expected_status="pending")
+    leg = OptionLeg(contractid=f"{ticker} P", action="Sell", quantity=1, option_type="put",
+                    strike=100.0, expiration="2026-06-19")
+    trade = TradeRequest(request_id=request_id, strategy_type="CSP", ticker=ticker, expiration_date="2026-06-19",
+                         strike_price=100.0, width=None, net_credit=1.2, collateral=10000.0, return_pct=1.2,
+                         quantity=1, legs=[leg], source_opportunity_id=None)
+    return store.get(request_id), trade
+
+
+class SlowTrader:
+    def __init__(self, delay=0.2, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.submitted = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def place_order(self, trade):
+        with self._lock:
+            self.submitted.append(trade.request_id)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        if trade.request_id in self.fail:
+            raise RuntimeError("rejected by broker")
+        return {"ok": True, "execution_price": 1.25}
+
+
+class BatchPositions:
+    def __init__(self):
+        self.batches = []
+
+    async def create_positions(self, entries):
+        self.batches.append(entries)
+        return [{"position_id": i + 1, "ticker": trade.ticker} for i, (trade, *_) in enumerate(entries)]
+
+
+def test_orders_submitted_concurrently_and_positions_batched(tmp_path):
+    store = RequestStore(str(tmp_path / "requests.db"))
+    approved = [_approved(store, f"r{i}") for i in range(6)]
+    trader, positions = SlowTrader(fail={"r5"}), BatchPositions()
+
+    started = time.perf_counter()
+    results = OrderPipeline(trader, positions, store, max_concurrency=3).execute(approved)
+    elapsed = time.perf_counter() - started
+
+    assert trader.max_in_flight == 3
+    assert elapsed < 0.2 * 6 * 0.6
+    assert len(positions.batches) == 1 and len(positions.batches[0]) == 5
+    assert positions.batches[0][0][3]["order_key"] == idempotency_key("r0")
+    assert [r.position["position_id"] for r in results if r.ok] == [1, 2, 3, 4, 5]
+    assert all(r.submit_ms >= 150 for r in results)
+    assert store.counts() == {"executed": 5, "failed": 1}
+    assert "rejected by broker" in store.get("r5")["notes"]
+    assert store.get("r0")["order_key"] == idempotency_key("r0")
+
+
+def test_request_is_never_submitted_twice(tmp_path):
+    store = RequestStore(str(tmp_path / "requests.db"))
+    approved = [_approved(store, "r1")]
+    trader = SlowTrader(delay=0)
+    pipeline = OrderPipeline(trader, BatchPositions(), store)
+
+    assert len(pipeline.execute(approved)) == 1
+    assert pipeline.execute(approved) == []
+    assert pipeline.execute(approved + approved) == []
+    assert trader.submitted == ["r1"]
+    assert idempotency_key("r1") == idempotency_key("r1") != idempotency_key("r2")
@@ -0,0 +1,87 @@
+import asyncio
+
+from trade_automation.order_tracker import OrderTracker, TrackedPosition, parse_order
+from trade_automation.tradestation import order_ids
+
+
+def _spread_order(order_id, status, exec_qty, short_px="2.10", long_px="0.60"):
+    return {
+        "OrderID": order_id,
+        "Status": status,
+        "FilledPrice": "1.50",
+        "ClosedDateTime": "2026-03-02T15:00:01Z" if status == "FLL" else None,
+        "Legs": [
+            {"BuyOrSell": "Sell", "QuantityOrdered": "2", "ExecQuantity": str(exec_qty), "ExecutionPrice": short_px},
+            {"BuyOrSell": "Buy", "QuantityOrdered": "2", "ExecQuantity": str(exec_qty), "ExecutionPrice": long_px},
+        ],
+    }
+
+
+class FakeTrader:
+    def __init__(self, states):
+        self.states = states
+        self.calls = []
+
+    def get_orders(self, ids):
+        self.calls.append(list(ids))
+        return [self.states.pop(0)] if len(self.states) > 1 else list(self.states)
+
+
+def test_parse_order_net_credit_and_partial_fills():
+    assert order_ids({"ok": True, "body": {"Orders": [{"OrderID": "123", "Message": "Sent"}]}}) == ["123"]
+    assert order_ids({"dry_run": True}) == []
+
+    partial = parse_order(_spread_order("123", "FPR", 1))
+    assert (partial.ordered, partial.filled, partial.price, partial.terminal) == (2, 1, 1.5, False)
+
+    single = parse_order({"OrderID": "9", "Status": "FLL", "FilledPrice": "1.23",
+                          "Legs": [{"BuyOrSell": "SellToOpen", "QuantityOrdered": "1", "ExecQuantity": "1"}]})
+    assert (single.filled, single.price, single.terminal) == (1, 1.23, True)
+
+    cancelled = parse_order(_spread_order("7", "CAN", 0))
+    assert (cancelled.filled, cancelled.price, cancelled.terminal) == (0, None, True)
+
+
+def test_tracker_writes_partial_then_full_fill_and_stops(fake_supabase):
+    trader = FakeTrader([
+        _spread_order("123", "OPN", 0),
+        _spread_order("123", "FPR", 1, short_px="2.00"),
+        _spread_order("123", "FLL", 2, short_px="2.05"),
+    ])
+    supabase = fake_supabase({"positions": [{"position_id": 1}]})
+    tracker = OrderTracker(trader, supabase, min_interval=0.01, max_interval=0.02)
+
+    async def run():
+        task = asyncio.create_task(tracker.run())
+        await asyncio.sleep(0.01)
+        tracker.track(1, ["123"], strategy_type="VPC")
+        for _ in range(100):
+            if not len(tracker) and supabase.executed("positions", "update"):
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(run())
+
+    partial, filled = [query.payload for query in supabase.executed("positions", "update")]
+    assert partial["order_status"] == "PARTIAL" and partial["quantity"] == 1 and partial["entry_price"] == 1.4
+    assert filled["order_status"] == "FILLED" and filled["quantity"] == 2
+    assert filled["fill_price"] == 1.45 and filled["entry_price"] == 1.45
+    # Profit target follows the fill; a spread's stop is its width and stays put
+    assert filled["profit_target"] == 0.725 and "stop_loss" not in filled
+    assert filled["filled_at"] == "2026-03-02T15:00:01Z"
+    assert filled["fill_latency_ms"] >= 0 and tracker.latencies_ms == [filled["fill_latency_ms"]]
+    assert len(tracker) == 0
+    assert all(ids == ["123"] for ids in trader.calls)
+
+
+def test_fill_price_rebases_credit_based_thresholds(fake_supabase):
+    tracker = OrderTracker(None, fake_supabase())
+    summary = {"state": "FILLED", "filled": 1, "price": 1.2, "filled_at": None, "status": "FLL"}
+
+    update = tracker._position_update(TrackedPosition(1, ["9"], 0.0, strategy_type="CSP"), summary, 1.0)
+    assert (update["entry_price"], update["profit_target"], update["stop_loss"]) == (1.2, 0.6, 2.4)
+
+    working = tracker._position_update(TrackedPosition(2, ["10"], 0.0, strategy_type="CSP"),
+                                       {**summary, "state": "WORKING", "filled": 0, "price": None}, 1.0)
+    assert "profit_target" not in working and "stop_loss" not in working
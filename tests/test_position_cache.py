@@ -0,0 +1,103 @@
+import asyncio
+import json
+import threading
+
+from trade_automation.order_tracker import OrderTracker, TrackedPosition
+from trade_automation.position_cache import PositionCache
+from trade_automation.position_manager import PositionManager
+
+
+def _positions(fake_supabase, rows):
+    return fake_supabase({"positions": rows}, serial={"positions": ("position_id", 100)})
+
+
+def _calls(db):
+    return [(q.table, q.action) for q in db.log]
+
+
+def _row(position_id, ticker="SPY", status="OPEN", entry_date="2026-10-01"):
+    return {"position_id": position_id, "request_id": f"r{position_id}", "ticker": ticker, "status": status,
+            "entry_date": entry_date, "entry_price": 1.50, "quantity": 1, "stop_loss": 3.0,
+            "strategy_type": "CSP", "legs": []}
+
+
+def test_reads_served_from_memory_and_writes_applied_through(fake_supabase):
+    db = _positions(fake_supabase, [_row(1), _row(2, "QQQ", entry_date="2026-10-05"), _row(3, status="CLOSED")])
+    cache = PositionCache(db)
+    manager = PositionManager(db, cache)
+
+    async def scenario():
+        assert [p["position_id"] for p in await manager.get_open_positions()] == [2, 1]
+        assert [p["position_id"] for p in await manager.get_open_positions("SPY")] == [1]
+        assert (await manager.get_position_by_request_id("r2"))["ticker"] == "QQQ"
+        assert (await manager.get_position_by_id(1))["entry_price"] == 1.50
+        assert _calls(db) == [("positions", "select")]
+
+        # Closing reads the cached row and drops it from the open set
+        await manager.close_position(1, exit_price=0.75, exit_reason="profit target")
+        assert _calls(db)[1:] == [("positions", "update"), ("trade_history", "insert")]
+        assert [p["position_id"] for p in await manager.get_open_positions()] == [2]
+        # Closed positions are not cached: lookups fall back to the database
+        assert (await manager.get_position_by_id(1))["status"] == "CLOSED"
+
+    asyncio.run(scenario())
+
+    # Fill updates from the tracker are applied to the cached row
+    tracker = OrderTracker(None, db, cache=cache)
+    tracker._fetch = lambda order_ids: {}
+    tracker._tracked[2] = TrackedPosition(2, ["o1"], 0.0)
+    tracker._tracked[2].summary = lambda: {"state": "FILLED", "filled": 2, "price": 1.42,
+                                           "filled_at": "2026-10-19T14:00:00Z", "status": "FLL"}
+    assert tracker.poll_once() == 1
+    assert cache.get(2)["quantity"] == 2 and cache.get(2)["entry_price"] == 1.42
+    assert cache.loads == 1
+
+
+def test_due_loads_run_off_the_event_loop(fake_supabase):
+    db = _positions(fake_supabase, [_row(1)])
+    cache = PositionCache(db, refresh_seconds=0)
+    manager = PositionManager(db, cache)
+    load, load_threads = cache.load, []
+    cache.load = lambda: load_threads.append(threading.current_thread()) or load()
+
+    async def scenario():
+        assert cache.load_due()
+        assert [p["position_id"] for p in await manager.get_open_positions()] == [1]
+        assert (await manager.get_position_by_id(1))["ticker"] == "SPY"
+
+    asyncio.run(scenario())
+    # First use and each stale read (refresh_seconds=0) loaded, never on the loop's thread
+    assert len(load_threads) == 2
+    assert threading.main_thread() not in load_threads
+
+
+def test_notifications_keep_cache_coherent_and_stale_cache_reloads(fake_supabase):
+    db = _positions(fake_supabase, [_row(1)])
+    cache = PositionCache(db, refresh_seconds=3600)
+    cache.load()
+
+    cache.apply_notification(json.dumps({"op": "INSERT", "row": _row(5, "IWM", entry_date="2026-10-09")}))
+    cache.apply_notification({"op": "UPDATE", "row": {**_row(1), "quantity": 3}})
+    assert [p["position_id"] for p in cache.open_positions()] == [5, 1]
+    assert cache.get(1)["quantity"] == 3
+    assert cache.get_by_request_id("r5")["ticker"] == "IWM"
+
+    cache.apply_notification({"op": "UPDATE", "row": _row(5, "IWM", status="CLOSED")})
+    assert cache.get(5) is None and cache.get_by_request_id("r5") is None
+
+    # Oversized rows are announced by id and read back
+    db.tables["positions"].append(_row(7, "DIA"))
+    cache.apply_notification({"op": "INSERT", "position_id": 7})
+    assert cache.get(7)["ticker"] == "DIA"
+    db.tables["positions"].pop()
+    cache.apply_notification({"op": "DELETE", "row": _row(7, "DIA")})
+    assert cache.get(7) is None
+    assert cache.loads == 1
+
+    # Without a listener a stale cache reloads on the next read
+    cache.refresh_seconds = 0
+    db.tables["positions"].append(_row(8, "XLF"))
+    assert [p["position_id"] for p in cache.open_positions()] == [1, 8]
+    assert cache.loads == 2
+    # No listener without a connection string
+    assert cache.listen() is False
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+from trade_automation.config import Settings
+from trade_automation.exit_automation import ExitAutomation
+from trade_automation.quote_stream import QuoteBook, QuoteStream, StreamingExitMonitor
+
+
+def _position(position_id, contractid, entry_price=1.50, stop_loss=3.00, profit_target=0.75):
+    expiration = (datetime.utcnow() + timedelta(days=90)).strftime("%Y-%m-%d")
+    return {
+        "position_id": position_id, "ticker": contractid.split()[0], "strategy_type": "CSP",
+        "entry_price": entry_price, "quantity": 1, "stop_loss": stop_loss, "profit_target": profit_target,
+        "legs": [{"contractid": contractid, "action": "Sell", "quantity": 1, "option_type": "put",
+                  "strike": 540.0, "expiration": expiration}],
+    }
+
+
+class FakeStream:
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self.running = False
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+
+class FakePositionMgr:
+    def __init__(self, positions):
+        self.positions = positions
+        self.closed = []
+
+    async def get_open_positions(self, ticker=None):
+        return list(self.positions)
+
+    async def close_position(self, position_id, exit_price, exit_reason, realized_pnl):
+        self.closed.append((position_id, exit_reason, round(exit_price, 2), round(realized_pnl, 2)))
+        self.positions = [p for p in self.positions if p["position_id"] != position_id]
+
+
+class FakeTrader:
+    def __init__(self):
+        self.orders = []
+
+    def place_order(self, trade):
+        self.orders.append(trade)
+        return {"dry_run": True}
+
+
+def test_stop_loss_exit_on_tick_and_subscriptions_follow_positions(monkeypatch):
+    monkeypatch.setenv("TRADE_APPROVAL_BACKENDS", "")
+    positions = FakePositionMgr([_position(1, "SPY 260918P540")])
+    exits = ExitAutomation(Settings(), supabase=None, position_mgr=positions)
+    exits.trader = FakeTrader()
+    streams = []
+    monitor = StreamingExitMonitor(
+        exits, stream_factory=lambda symbols, loop, queue: streams.append(FakeStream(symbols)) or streams[-1]
+    )
+
+    async def scenario():
+        await monitor.refresh_positions()
+        assert [s.symbols for s in streams if s.running] == [["SPY 260918P540"]]
+
+        # Loss 4.00 - 1.50 = 2.50 is inside the 3.00 stop
+        monitor.book.apply({"Symbol": "SPY 260918P540", "Bid": "3.90", "Ask": "4.10", "Last": "4.00"})
+        assert await monitor.on_quote("SPY 260918P540") == 0
+        # Partial update (ask only): mid 4.90 -> loss 3.40 breaches
+        monitor.book.apply({"Symbol": "SPY 260918P540", "Ask": "5.90"})
+        assert await monitor.on_quote("SPY 260918P540") == 1
+        assert await monitor.on_quote("SPY 260918P540") == 0
+
+        assert positions.closed == [(1, "Stop loss triggered", 4.9, -340.0)]
+        assert exits.trader.orders[0].legs[0].action == "Buy"
+        assert not any(s.running for s in streams)
+
+        positions.positions.append(_position(2, "QQQ 260918P400"))
+        await monitor.refresh_positions()
+        assert [s.symbols for s in streams if s.running] == [["QQQ 260918P400"]]
+
+    asyncio.run(scenario())
+
+
+def test_breached_positions_close_concurrently_off_the_event_loop(monkeypatch):
+    monkeypatch.setenv("TRADE_APPROVAL_BACKENDS", "")
+    positions = FakePositionMgr([_position(1, "SPY 260918P540"), _position(2, "SPY 260918P540")])
+    exits = ExitAutomation(Settings(), supabase=None, position_mgr=positions)
+    # Each order waits for the other: only completes when both are in flight at once
+    barrier = threading.Barrier(2, timeout=5)
+
+    class BlockingTrader(FakeTrader):
+        def place_order(self, trade):
+            barrier.wait()
+            return super().place_order(trade)
+
+    exits.trader = BlockingTrader()
+    monitor = StreamingExitMonitor(exits, stream_factory=lambda symbols, loop, queue: FakeStream(symbols))
+
+    async def scenario():
+        await monitor.refresh_positions()
+        monitor.book.apply({"Symbol": "SPY 260918P540", "Bid": "5.90", "Ask": "6.10"})
+        ticks = []
+
+        async def ticker():
+            while len(exits.trader.orders) < 2 and len(ticks) < 5000:
+                ticks.append(None)
+                await asyncio.sleep(0.001)
+
+        exited, _ = await asyncio.gather(monitor.on_quote("SPY 260918P540"), ticker())
+        return exited, ticks
+
+    exited, ticks = asyncio.run(scenario())
+    assert exited == 2 and len(exits.trader.orders) == 2
+    assert sorted(closed[0] for closed in positions.closed) == [1, 2]
+    # The loop kept running while the orders were placed
+    assert ticks
+
+
+def test_positions_with_unfilled_entry_orders_are_not_exited(monkeypatch):
+    monkeypatch.setenv("TRADE_APPROVAL_BACKENDS", "")
+    positions = FakePositionMgr([{**_position(1, "SPY 260918P540"), "order_status": "WORKING"}])
+    exits = ExitAutomation(Settings(), supabase=None, position_mgr=positions)
+    exits.trader = FakeTrader()
+    monitor = StreamingExitMonitor(exits, stream_factory=lambda symbols, loop, queue: FakeStream(symbols))
+
+    async def scenario():
+        await monitor.refresh_positions()
+        monitor.book.apply({"Symbol": "SPY 260918P540", "Bid": "5.90", "Ask": "6.10"})
+        assert await monitor.on_quote("SPY 260918P540") == 0
+
+        positions.positions[0]["order_status"] = "FILLED"
+        await monitor.refresh_positions()
+        assert positions.closed == [(1, "Stop loss triggered", 6.0, -450.0)]
+
+    asyncio.run(scenario())
+
+
+def test_quote_stream_reconnects_after_error_and_skips_heartbeats(monkeypatch):
+    monkeypatch.setattr("trade_automation.quote_stream.RECONNECT_MIN_SECONDS", 0.01)
+
+    class StreamingTrader:
+        def __init__(self):
+            self.connects = 0
+
+        def stream_quotes(self, symbols):
+            self.connects += 1
+            yield {"Heartbeat": 1}
+            yield {"Symbol": symbols[0], "Bid": str(self.connects)}
+            if self.connects == 1:
+                yield {"Error": "GoAway", "Message": "reconnect"}
+            else:
+                time.sleep(0.05)
+
+    async def scenario():
+        queue = asyncio.Queue()
+        trader = StreamingTrader()
+        stream = QuoteStream(trader, ["SPY 260918P540"], asyncio.get_running_loop(), queue)
+        stream.start()
+        messages = [await asyncio.wait_for(queue.get(), 2) for _ in range(2)]
+        stream.stop()
+        return trader, messages
+
+    trader, messages = asyncio.run(scenario())
+    assert trader.connects >= 2
+    book = QuoteBook()
+    assert [book.apply(m) for m in messages] == ["SPY 260918P540"] * 2
+    assert book.mid("SPY 260918P540") is None  # bid only
+    book.apply({"Symbol": "SPY 260918P540", "Ask": "2.4"})
+    assert book.mid("SPY 260918P540") == 2.2
@@ -0,0 +1,59 @@
+import random
+
+from data_collection.ranking import TopKRanker, get_rank_key
+
+
+def _reference_top_k(candidates, k):
+    """The old approach: sort everything, then keep k per ticker."""
+    kept = {}
+    for candidate in sorted(candidates, key=lambda c: c["return_pct"], reverse=True):
+        kept.setdefault(candidate["ticker"], [])
+        if len(kept[candidate["ticker"]]) < k:
+            kept[candidate["ticker"]].append(candidate)
+    return kept
+
+
+def test_matches_sort_then_truncate_including_ties():
+    rng = random.Random(7)
+    candidates = [
+        {"id": i, "ticker": rng.choice("ABCDE"), "return_pct": rng.choice([0.5, 1.0, 1.5, 2.0, 2.5])}
+        for i in range(500)
+    ]
+    ranker = TopKRanker(per_group=3, key=get_rank_key("return_pct"))
+    ranker.extend(candidates)
+
+    expected = _reference_top_k(candidates, 3)
+    for ticker, best in expected.items():
+        assert [c["id"] for c in ranker.group(ticker)] == [c["id"] for c in best]
+    assert len(ranker) == sum(len(best) for best in expected.values())
+    assert ranker.seen == 500
+
+
+def test_global_limit_takes_best_survivors():
+    ranker = TopKRanker(per_group=2, global_limit=3, key=get_rank_key("return_pct"))
+    ranker.extend([
+        {"ticker": "A", "return_pct": 5.0},
+        {"ticker": "A", "return_pct": 4.0},
+        {"ticker": "A", "return_pct": 3.9},
+        {"ticker": "B", "return_pct": 1.0},
+        {"ticker": "C", "return_pct": 4.5},
+    ])
+
+    assert [c["return_pct"] for c in ranker.results()] == [5.0, 4.5, 4.0]
+
+
+def test_rank_key_from_env(monkeypatch):
+    monkeypatch.setenv("OPPORTUNITY_RANK_KEY", "score")
+    ranker = TopKRanker(per_group=1)
+    ranker.push({"ticker": "A", "return_pct": 9.0, "trade_score": "C"})
+    ranker.push({"ticker": "A", "return_pct": 2.0, "trade_score": "A-"})
+
+    assert ranker.group("A")[0]["trade_score"] == "A-"
+
+
+def test_missing_key_ranks_last():
+    ranker = TopKRanker(per_group=1, key=get_rank_key("expected_value"))
+    ranker.push({"ticker": "A", "return_pct": 9.0})
+    ranker.push({"ticker": "A", "return_pct": 1.0, "expected_value": -5.0})
+
+    assert ranker.group("A")[0]["expected_value"] == -5.0
@@ -0,0 +1,52 @@
+import json
+from datetime import datetime, timedelta
+
+from trade_automation.store import RequestStore
+
+
+def _days_ago(days):
+    return (datetime.utcnow() - timedelta(days=days)).isoformat()
+
+
+def test_legacy_state_json_is_imported_once(tmp_path):
+    state_path = tmp_path / "state.json"
+    state_path.write_text(json.dumps({
+        "requests": {
+            "a": {"request_id": "a", "status": "pending", "created_at": _days_ago(0), "ticker": "SPY"},
+            "b": {"request_id": "b", "status": "executed", "created_at": _days_ago(1)},
+        },
+        "telegram": {"last_update_id": 987},
+        "discord": {"last_message_id": "123"},
+    }))
+
+    store = RequestStore(str(tmp_path / "requests.db"), legacy_state_path=str(state_path))
+
+    assert store.get("a")["ticker"] == "SPY"
+    assert [r["request_id"] for r in store.pending()] == ["a"]
+    assert store.get_cursor("telegram_last_update_id") == 987
+    assert store.get_cursor("discord_last_message_id") == "123"
+    assert not state_path.exists() and (tmp_path / "state.json.imported").exists()
+
+
+def test_status_changes_are_compare_and_set_across_connections(tmp_path):
+    path = str(tmp_path / "requests.db")
+    proposer, worker = RequestStore(path), RequestStore(path)
+    proposer.upsert({"request_id": "r1", "status": "pending", "ticker": "SPY"})
+    proposer.update("r1", telegram_message_id=55)
+
+    assert worker.set_status("r1", "approved", expected_status="pending")
+    assert not proposer.set_status("r1", "rejected", notes="late", expected_status="pending")
+
+    req = proposer.get("r1")
+    assert (req["status"], req["telegram_message_id"], req.get("notes")) == ("approved", 55, None)
+
+
+def test_purge_keeps_pending_and_recent_requests(tmp_path):
+    store = RequestStore(str(tmp_path / "requests.db"))
+    store.upsert({"request_id": "old-done", "status": "executed", "created_at": _days_ago(40)})
+    store.upsert({"request_id": "old-pending", "status": "pending", "created_at": _days_ago(40)})
+    store.upsert({"request_id": "recent-done", "status": "rejected", "created_at": _days_ago(1)})
+
+    assert store.purge(retention_days=30) == 1
+    assert store.get("old-done") is None
+    assert store.counts() == {"pending": 1, "rejected": 1}
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+from data_collection.generate_opportunities_simple import calculate_trade_score
+from data_collection.scoring import CONFIG_PATH, ScoringEngine
+
+
+@pytest.fixture
+def engine():
+    return ScoringEngine.load(CONFIG_PATH, primary="default")
+
+
+@pytest.mark.parametrize("return_pct, rsi, days_to_exp, annualized, grade", [
+    (10.0, 45, 30, 120, "A+"),    # 50 + 25 + 15 + 10
+    (5.0, 70, 45, 100, "A-"),     # 35 + 25 (70 inclusive) + 15 (45 inclusive) + 10
+    (5.0, 70.5, 46, 99, "C+"),    # 35 + 15 + 10 + 7
+    (2.0, None, None, None, "F"), # 20 + 10 + 7 + 0
+    (3.5, 0, 0, 0, "D-"),         # 27.5 + 10 + 7 + 0: zero counts as missing
+    (1.0, 85, 90, 10, "F"),       # 10 + 5 + 5 + 2
+])
+def test_default_config_matches_original_buckets(engine, return_pct, rsi, days_to_exp, annualized, grade):
+    assert calculate_trade_score(return_pct, rsi, days_to_exp, annualized) == grade
+    _, grades = engine.score([{
+        "return_pct": return_pct, "rsi_14": rsi, "days_to_exp": days_to_exp, "annualized_return": annualized,
+    }])["default"]
+    assert grades[0] == grade
+
+
+def test_every_config_scored_in_one_call(engine):
+    candidates = [
+        {"return_pct": 4.0, "rsi_14": 40, "days_to_exp": 35, "annualized_return": 42},
+        {"return_pct": 8.0, "rsi_14": 25, "days_to_exp": 10, "annualized_return": 290},
+    ]
+    engine.apply(candidates)
+
+    assert set(candidates[0]["score_variants"]) == {"default", "theta_window"}
+    assert candidates[0]["trade_score_points"] == candidates[0]["score_variants"]["default"]["points"]
+    # theta_window rewards the 30-45 DTE candidate over the short-dated one
+    variants = [c["score_variants"]["theta_window"]["points"] for c in candidates]
+    assert variants[0] > variants[1]
+
+
+def test_primary_config_selects_trade_score(tmp_path):
+    data = json.loads(CONFIG_PATH.read_text())
+    path = tmp_path / "scoring.json"
+    path.write_text(json.dumps(data))
+    engine = ScoringEngine.load(path, primary="theta_window")
+
+    candidate = {"return_pct": 4.0, "rsi_14": 40, "days_to_exp": 35, "annualized_return": 42}
+    engine.apply([candidate])
+
+    assert candidate["trade_score_points"] == candidate["score_variants"]["theta_window"]["points"]
+
+
+def test_bins_need_one_more_point_than_edges():
+    with pytest.raises(ValueError):
+        ScoringEngine.from_dict({"configs": [{
+            "name": "bad",
+            "factors": [{"name": "rsi", "field": "rsi_14", "type": "bins", "edges": [30, 70], "points": [1, 2]}],
+            "grades": {"edges": [], "labels": ["F"]},
+        }]})
+
+
+def test_missing_field_scores_missing_points(engine):
+    results = engine.score_columns({"return_pct": np.array([10.0])})
+    points, _ = results["default"]
+    assert points[0] == 50 + 10 + 7 + 0
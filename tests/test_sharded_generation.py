@@ -0,0 +1,83 @@
+from datetime import date, timedelta
+from multiprocessing import shared_memory
+
+import pytest
+
+from data_collection import sharded_generation
+from data_collection.chain_scanner import scan_chain
+from data_collection.option_chain import rows_to_chain, sort_chain, symbol_slices
+from data_collection.sharded_generation import generate_sharded, load_chain, partition_shards
+
+EXPIRATION = (date.today() + timedelta(days=45)).isoformat()
+LATEST = "2026-10-16"
+
+
+def _quotes(symbol, strikes, price=100.0):
+    rows = []
+    for k, strike in enumerate(strikes):
+        for option_type, sign in (("put", -1), ("call", 1)):
+            otm = (price - strike) if option_type == "put" else (strike - price)
+            bid = round(max(0.05, 3.0 - otm * 0.2), 2)
+            rows.append({
+                "contractid": f"{symbol} {option_type[0].upper()}{strike}", "symbol": symbol,
+                "expiration": EXPIRATION, "type": option_type, "quote_date": LATEST,
+                "strike": strike, "bid": bid, "ask": bid + 0.10, "delta": sign * max(0.05, 0.5 - otm * 0.03),
+                "theta": -0.05, "implied_volatility": 0.25,
+            })
+    return rows
+
+
+def test_load_chain_pages_chunks_and_partitions_by_contract_count(monkeypatch, fake_supabase):
+    monkeypatch.setattr(sharded_generation, "PAGE_SIZE", 4)
+    monkeypatch.setattr(sharded_generation, "SYMBOL_CHUNK", 2)
+    rows = (_quotes("AAA", [90.0, 95.0, 100.0]) + _quotes("BBB", [95.0]) + _quotes("CCC", [85.0, 90.0])
+            + [{**row, "quote_date": "2026-10-15"} for row in _quotes("AAA", [80.0])])
+    db = fake_supabase({"options_quotes": rows})
+
+    chain = load_chain(db, ["AAA", "BBB", "CCC"], option_types=("put", "call"))
+
+    # Latest date only, both sides, sorted per symbol
+    assert len(chain) == 12
+    assert set(chain["quote_date"]) == {LATEST}
+    assert list(symbol_slices(chain)) == ["AAA", "BBB", "CCC"]
+    # 1 latest-date query; chunk [AAA, BBB]: 8 rows over 3 pages; chunk [CCC]: 4 rows over 2 pages
+    assert db.queries == 1 + 3 + 2
+
+    slices = {"A": (0, 10), "B": (10, 14), "C": (14, 18), "D": (18, 20), "E": (20, 21)}
+    shards = partition_shards(slices, 2)
+    assert sorted(sorted(shard) for shard in shards) == [["A", "E"], ["B", "C", "D"]]
+    assert len(partition_shards(slices, 10)) == 5
+
+
+def test_two_worker_run_matches_serial_scan_and_releases_shared_memory(monkeypatch):
+    prices = {"AAA": 100.0, "BBB": 50.0, "CCC": 200.0, "DDD": 75.0}
+    rows = []
+    for symbol, price in prices.items():
+        rows += _quotes(symbol, [price * (0.80 + 0.025 * k) for k in range(10)], price)
+    chain = sort_chain(rows_to_chain(rows))
+    candidates = [{"ticker": t, "price": p, "rsi": 40.0, "above_sma200": True} for t, p in prices.items()]
+    strategies = ["CSP", "VPC", "CCS"]
+
+    created = []
+
+    class RecordingSharedMemory(shared_memory.SharedMemory):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            if kwargs.get("create"):
+                created.append(self.name)
+
+    monkeypatch.setattr(sharded_generation.shared_memory, "SharedMemory", RecordingSharedMemory)
+
+    sharded = generate_sharded(candidates + [{"ticker": "NONE", "price": 1.0}], chain, 2, strategies)
+
+    slices = symbol_slices(chain)
+    serial = []
+    for candidate in candidates:
+        start, stop = slices[candidate["ticker"]]
+        serial.extend(scan_chain(candidate, chain[start:stop], strategies))
+    serial.sort(key=lambda o: (o["ticker"], -o["return_pct"]))
+
+    assert sharded and sharded == serial
+    assert len(created) == 1
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=created[0])
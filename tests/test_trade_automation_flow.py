@@ -1,4 +1,5 @@
 import asyncio
+import time
 from datetime import datetime, timedelta
 
 import pytest
@@ -25,9 +26,10 @@ def configured_env(monkeypatch, tmp_path):
     for key, value in env.items():
         monkeypatch.setenv(key, value)
 
-    state_path = tmp_path / "state.json"
-    monkeypatch.setattr(store, "STATE_PATH", str(state_path))
-    return state_path
+    db_path = tmp_path / "requests.db"
+    monkeypatch.setattr(store, "DB_PATH", str(db_path))
+    monkeypatch.setattr(store, "STATE_PATH", str(tmp_path / "state.json"))
+    return db_path
 
 
 def _sample_trade(request_id: str = "req-123") -> TradeRequest:
@@ -76,8 +78,10 @@ class FakeWorkerTelegram:
         self.sent_messages = []
         self.callback_answers = []
         self.edited_messages = []
+        self.update_calls = 0
 
-    def get_callback_queries(self, offset):
+    def get_updates(self, offset):
+        self.update_calls += 1
         return [
             {
                 "update_id": 100,
@@ -101,9 +105,6 @@ class FakeWorkerTelegram:
             }
         ]
 
-    def get_updates(self, offset):
-        return []
-
     def parse_commands(self, updates):
         return []
 
@@ -148,14 +149,14 @@ def test_end_to_end_propose_then_approve_executes_trade(monkeypatch, configured_
         ],
     )
     monkeypatch.setattr(propose_trades, "filter_opportunities", lambda opps, settings: opps)
-    monkeypatch.setattr(propose_trades, "build_trade_request", lambda opp, supabase, settings: trade)
+    monkeypatch.setattr(propose_trades, "build_trade_request", lambda opp, supabase, settings, **_: trade)
     monkeypatch.setattr(propose_trades, "TelegramNotifier", FakeProposalTelegram)
     monkeypatch.setattr(propose_trades, "DiscordNotifier", lambda settings: FakeDiscord())
 
     propose_trades.main()
-    state = store.load_state()
-    assert state["requests"][trade.request_id]["status"] == "pending"
-    assert state["requests"][trade.request_id]["telegram_message_id"] == 9001
+    requests_store = store.open_store()
+    assert requests_store.get(trade.request_id)["status"] == "pending"
+    assert requests_store.get(trade.request_id)["telegram_message_id"] == 9001
 
     class FakeTrader:
         def __init__(self, settings):
@@ -168,19 +169,20 @@ def test_end_to_end_propose_then_approve_executes_trade(monkeypatch, configured_
         def __init__(self, supabase_client):
             self.supabase_client = supabase_client
 
-        async def create_position(self, request, entry_price, quantity, execution_data):
-            return {"position_id": 77}
+        async def create_positions(self, entries):
+            return [{"position_id": 77} for _ in entries]
 
     monkeypatch.setattr(approval_worker, "get_supabase_client", lambda settings: object())
     monkeypatch.setattr(approval_worker, "TradeStationTradingClient", FakeTrader)
     monkeypatch.setattr(approval_worker, "PositionManager", FakePositionManager)
 
-    worker_state = store.load_state()
     worker_telegram = FakeWorkerTelegram(trade.request_id, 9001)
     settings = Settings()
-    approval_worker.run_once(settings, worker_state, worker_telegram, FakeDiscord())
+    approval_worker.run_once(settings, requests_store, worker_telegram, FakeDiscord())
 
-    assert worker_state["requests"][trade.request_id]["status"] == "executed"
+    assert requests_store.get(trade.request_id)["status"] == "executed"
+    assert worker_telegram.update_calls == 1
+    assert requests_store.get_cursor("telegram_last_update_id") == 100
     assert worker_telegram.callback_answers
     assert any("Executed" in msg for msg in worker_telegram.sent_messages)
     assert any("Position ID: 77" in msg for msg in worker_telegram.sent_messages)
@@ -189,15 +191,9 @@ def test_end_to_end_propose_then_approve_executes_trade(monkeypatch, configured_
 
 def test_auto_reject_marks_expired_requests(monkeypatch, configured_env):
     old_time = (datetime.utcnow() - timedelta(minutes=10)).isoformat()
-    state = {
-        "requests": {
-            "req-old": {
-                "request_id": "req-old",
-                "status": "pending",
-                "created_at": old_time,
-            }
-        }
-    }
+    requests_store = store.open_store()
+    requests_store.upsert({"request_id": "req-old", "status": "pending", "created_at": old_time})
+    requests_store.upsert({"request_id": "req-new", "status": "pending"})
 
     class Notifier:
         def __init__(self):
@@ -207,12 +203,13 @@ def test_auto_reject_marks_expired_requests(monkeypatch, configured_env):
             self.messages.append(text)
 
     notifier = Notifier()
-    approval_worker.check_and_expire_requests(state, notifier)
+    approval_worker.check_and_expire_requests(requests_store, notifier)
 
-    req = state["requests"]["req-old"]
+    req = requests_store.get("req-old")
     assert req["status"] == "rejected"
     assert "timeout" in req["notes"].lower()
     assert any("auto-rejected" in msg for msg in notifier.messages)
+    assert requests_store.get("req-new")["status"] == "pending"
 
 
 def test_opportunities_fetcher_applies_filters(monkeypatch, configured_env):
@@ -224,7 +221,19 @@ def test_opportunities_fetcher_applies_filters(monkeypatch, configured_env):
         def select(self, _fields):
             return self
 
-        def order(self, _field, desc=False):
+        def gte(self, field, value):
+            self._data = [r for r in self._data if r[field] >= value]
+            return self
+
+        def lte(self, field, value):
+            self._data = [r for r in self._data if r[field] <= value]
+            return self
+
+        def in_(self, field, values):
+            self._data = [r for r in self._data if r[field] in values]
+            return self
+
+        def order(self, _field, desc=False, nullsfirst=None):
             return self
 
         def limit(self, value):
@@ -263,3 +272,154 @@ def test_opportunities_fetcher_applies_filters(monkeypatch, configured_env):
     )
 
     assert [item["ticker"] for item in result] == ["SPY"]
+
+
+def test_one_update_batch_dispatches_callbacks_and_text_commands(monkeypatch, configured_env):
+    from trade_automation.notifier_telegram import TelegramNotifier
+
+    settings = Settings()
+    telegram = TelegramNotifier(settings)
+    applied = []
+    monkeypatch.setattr(
+        approval_worker, "_apply_commands",
+        lambda commands, requests_store, settings, notifier, clients, is_callback=False:
+            applied.extend((cmd["action"], cmd["request_id"], is_callback) for cmd in commands),
+    )
+    updates = [
+        {"update_id": 7, "callback_query": {"id": "cb", "from": {"id": 42}, "data": "approve:req-1"}},
+        {"update_id": 8, "message": {"from": {"id": 42}, "text": "reject req-2"}},
+        {"update_id": 5, "message": {"from": {"id": 42}, "text": "approve req-old"}},
+    ]
+    requests_store = store.open_store()
+    requests_store.set_cursor("telegram_last_update_id", 6)
+
+    approval_worker.handle_telegram_updates(updates, requests_store, settings, telegram, clients=None)
+
+    assert applied == [("approve", "req-1", True), ("reject", "req-2", False)]
+    assert requests_store.get_cursor("telegram_last_update_id") == 8
+
+
+def test_webhook_receiver_queues_updates_and_checks_secret():
+    import http.client
+    import json
+    import urllib.error
+    import urllib.request
+
+    def post(port, body, secret=None):
+        headers = {approval_worker.SECRET_HEADER: secret} if secret is not None else {}
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{port}/", data=json.dumps(body).encode(), headers=headers, method="POST",
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=5).status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def post_oversized(port):
+        # Headers only: the receiver must refuse before reading the body
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        try:
+            conn.putrequest("POST", "/")
+            conn.putheader(approval_worker.SECRET_HEADER, "s3cret")
+            conn.putheader("Content-Length", str(approval_worker.MAX_UPDATE_BYTES + 1))
+            conn.endheaders()
+            return conn.getresponse().status
+        finally:
+            conn.close()
+
+    async def scenario():
+        queue = asyncio.Queue()
+        receiver = approval_worker.WebhookReceiver("127.0.0.1", 0, "s3cret", asyncio.get_running_loop(), queue)
+        receiver.start()
+        try:
+            rejected = [
+                await asyncio.to_thread(post, receiver.port, {"update_id": 1}, "wrong"),
+                await asyncio.to_thread(post, receiver.port, {"update_id": 1}),
+                await asyncio.to_thread(post_oversized, receiver.port),
+            ]
+            accepted = await asyncio.to_thread(post, receiver.port, {"update_id": 2}, "s3cret")
+            update = await asyncio.wait_for(queue.get(), timeout=5)
+        finally:
+            receiver.stop()
+        return rejected, accepted, update, queue.empty()
+
+    assert asyncio.run(scenario()) == ([403, 403, 413], 200, {"update_id": 2}, True)
+
+    # No receiver without a secret
+    with pytest.raises(ValueError):
+        approval_worker.WebhookReceiver("127.0.0.1", 0, "", None, None)
+
+
+def test_webhook_mode_without_configured_secret_registers_a_generated_one(monkeypatch, configured_env):
+    monkeypatch.delenv("TELEGRAM_WEBHOOK_SECRET", raising=False)
+    monkeypatch.setenv("TELEGRAM_WEBHOOK_PORT", "0")
+    receivers = []
+
+    class RecordingReceiver(approval_worker.WebhookReceiver):
+        def __init__(self, *args):
+            super().__init__(*args)
+            receivers.append(self)
+
+    class Telegram:
+        def __init__(self):
+            self.registered = asyncio.Event()
+
+        def set_webhook(self, url, secret_token=""):
+            self.secret_token = secret_token
+            self.loop.call_soon_threadsafe(self.registered.set)
+            return True
+
+    monkeypatch.setattr(approval_worker, "WebhookReceiver", RecordingReceiver)
+    telegram = Telegram()
+    worker = approval_worker.ApprovalWorker(Settings(), telegram, None, store=object(), clients=object())
+
+    async def scenario():
+        telegram.loop = asyncio.get_running_loop()
+        task = asyncio.create_task(worker.run_webhook())
+        await asyncio.wait_for(telegram.registered.wait(), timeout=5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert len(telegram.secret_token) >= 32
+    assert receivers[0].secret == telegram.secret_token
+
+
+def test_failed_update_batch_is_logged_and_polling_continues(monkeypatch, configured_env):
+    batches = [[{"update_id": 1}], [{"update_id": 2}]]
+    handled = []
+
+    def handle(updates, *args):
+        handled.append([u["update_id"] for u in updates])
+        if len(handled) == 1:
+            raise RuntimeError("notifier down")
+
+    class Telegram:
+        def delete_webhook(self):
+            return True
+
+        def get_updates(self, offset, timeout):
+            if batches:
+                return batches.pop(0)
+            time.sleep(0.01)
+            return []
+
+    class Store:
+        def get_cursor(self, name, default):
+            return default
+
+    monkeypatch.setattr(approval_worker, "handle_telegram_updates", handle)
+    worker = approval_worker.ApprovalWorker(Settings(), Telegram(), None, store=Store(), clients=object())
+
+    async def scenario():
+        task = asyncio.create_task(worker.run_long_poll())
+        for _ in range(200):
+            if len(handled) == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert not task.done()
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert handled == [[1], [2]]
@@ -0,0 +1,58 @@
+import os
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tradestation_auth import TokenCache
+
+
+def test_valid_token_reused_and_rejected_token_refreshed(tmp_path):
+    path = str(tmp_path / "token.json")
+    refreshes = []
+
+    def refresh():
+        refreshes.append(1)
+        return f"tok-{len(refreshes)}", time.time() + 1200
+
+    collector = TokenCache("client", "refresh", path)
+    worker = TokenCache("client", "refresh", path)
+    other_app = TokenCache("other-client", "refresh", path)
+
+    assert collector.get_or_refresh(refresh)[0] == "tok-1"
+    assert worker.get_or_refresh(refresh)[0] == "tok-1"
+    assert worker.get_or_refresh(refresh, rejected_token="tok-1")[0] == "tok-2"
+    assert collector.get_or_refresh(refresh)[0] == "tok-2"
+    assert other_app.get_or_refresh(refresh)[0] == "tok-3"
+    assert len(refreshes) == 3
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_expiring_token_is_not_handed_out(tmp_path):
+    cache = TokenCache("client", "refresh", str(tmp_path / "token.json"))
+    cache.get_or_refresh(lambda: ("short", time.time() + 30))
+
+    assert cache.valid_token() is None
+    assert cache.get_or_refresh(lambda: ("long", time.time() + 1200))[0] == "long"
+
+
+def test_concurrent_callers_share_a_single_refresh(tmp_path):
+    path = str(tmp_path / "token.json")
+    calls = []
+    start = threading.Barrier(8)
+
+    def refresh():
+        calls.append(1)
+        time.sleep(0.2)
+        return "shared", time.time() + 1200
+
+    def acquire(_):
+        start.wait()
+        # A separate cache object per caller, like separate processes
+        return TokenCache("client", "refresh", path).get_or_refresh(refresh)[0]
+
+    with ThreadPoolExecutor(8) as pool:
+        tokens = list(pool.map(acquire, range(8)))
+
+    assert tokens == ["shared"] * 8
+    assert len(calls) == 1
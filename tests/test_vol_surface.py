@@ -0,0 +1,59 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from data_collection.black_scholes import bs_price
+from data_collection.option_chain import rows_to_chain, sort_chain
+from data_collection.vol_surface import VOL_SURFACES_TABLE, SmileFit, VolSurfaceCache, fit_surfaces, fit_svi, svi_total_variance
+
+SPOT, RATE, DAYS = 100.0, 0.045, 30
+TRUE_SVI = (0.002, 0.05, -0.5, 0.02, 0.1)
+
+
+def _smile_chain(bumped=None):
+    t = DAYS / 365
+    forward = SPOT * np.exp(RATE * t)
+    expiration = (date.today() + timedelta(days=DAYS)).isoformat()
+    rows = []
+    for strike in np.arange(80, 121, 2.5):
+        for option_type in ('put', 'call'):
+            contractid = f"XYZ {option_type[0].upper()}{strike:g}"
+            iv = np.sqrt(svi_total_variance(np.log(strike / forward), *TRUE_SVI) / t)
+            if contractid == bumped:
+                iv += 0.2
+            rows.append({
+                'contractid': contractid, 'symbol': 'XYZ', 'expiration': expiration, 'type': option_type,
+                'quote_date': '2026-03-06', 'strike': float(strike), 'implied_volatility': iv,
+            })
+    return sort_chain(rows_to_chain(rows))
+
+
+def test_fit_recovers_smile_and_extrapolates():
+    k = np.linspace(-0.25, 0.2, 40)
+    a, b, rho, m, sigma = fit_svi(k, svi_total_variance(k, *TRUE_SVI))
+    wider = np.linspace(-0.5, 0.4, 10)
+    np.testing.assert_allclose(svi_total_variance(wider, a, b, rho, m, sigma),
+                               svi_total_variance(wider, *TRUE_SVI), rtol=0.05)
+
+
+def test_outlier_flagged_and_excluded():
+    fits = fit_surfaces(_smile_chain(bumped='XYZ P100'), {'XYZ': SPOT}, RATE, '2026-03-06')
+
+    assert len(fits) == 1
+    fit = fits[0]
+    assert fit.outliers == ['XYZ P100']
+    assert fit.rmse < 0.005
+    true_iv = np.sqrt(svi_total_variance(np.log(100 / fit.forward), *TRUE_SVI) / fit.t)
+    assert fit.iv(100.0) == pytest.approx(true_iv, abs=0.005)
+
+
+def test_cache_prices_uncollected_strike(fake_supabase):
+    fit = fit_surfaces(_smile_chain(), {'XYZ': SPOT}, RATE, '2026-03-06')[0]
+
+    cache = VolSurfaceCache(fake_supabase({VOL_SURFACES_TABLE: [fit.to_row()]}))
+    # 70 is outside the collected 80-120 window
+    mid = cache.model_mid('XYZ', fit.expiration, 70.0, is_call=False)
+    assert mid == pytest.approx(float(bs_price(SPOT, 70.0, fit.t, RATE, fit.iv(70.0), False)))
+    assert cache.model_mid('ABC', fit.expiration, 70.0, is_call=False) is None
+    assert SmileFit.from_row(fit.to_row()).iv(95.0) == fit.iv(95.0)
@@ -0,0 +1,158 @@
+"""
+Portfolio-aware allocation for trade proposals.
+
+Picks which opportunities to propose under portfolio constraints instead
+of sending the top N by return:
+
+- buying power: total collateral of open positions plus new proposals
+- per-ticker collateral and per-expiration collateral caps
+- per-ticker trade count
+- at most OPPORTUNITIES_LIMIT proposals
+
+Open positions are read once and seed the exposure. The solver is a
+greedy pass in rank order (OPPORTUNITY_RANK_KEY, see
+data_collection/ranking.py): a candidate is taken if it still fits every
+constraint. That is the standard ratio-greedy heuristic for this
+multi-constraint knapsack, and it is O(n log n), i.e. milliseconds for
+hundreds of candidates.
+
+A limit of 0 disables that constraint; with every limit at 0 the result is
+the first OPPORTUNITIES_LIMIT candidates, as before.
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from data_collection.ranking import get_rank_key
+from trade_automation.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AllocationLimits:
+    max_trades: int = 0
+    buying_power: float = 0.0
+    max_ticker_collateral: float = 0.0
+    max_expiration_collateral: float = 0.0
+    max_trades_per_ticker: int = 0
+    quantity: int = 1
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> 'AllocationLimits':
+        return cls(
+            max_trades=settings.opportunities_limit,
+            buying_power=settings.allocation_buying_power,
+            max_ticker_collateral=settings.allocation_max_per_ticker,
+            max_expiration_collateral=settings.allocation_max_per_expiration,
+            max_trades_per_ticker=settings.allocation_max_trades_per_ticker,
+            quantity=settings.default_quantity,
+        )
+
+
+@dataclass
+class Exposure:
+    """Collateral committed per ticker / expiration (and trade counts per ticker)."""
+    total: float = 0.0
+    by_ticker: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    by_expiration: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    trades_by_ticker: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def add(self, ticker: str, expiration: str, collateral: float):
+        self.total += collateral
+        self.by_ticker[ticker] += collateral
+        self.by_expiration[expiration] += collateral
+        self.trades_by_ticker[ticker] += 1
+
+    @classmethod
+    def from_positions(cls, positions: List[Dict[str, Any]]) -> 'Exposure':
+        exposure = cls()
+        for position in positions:
+            legs = position.get("legs") or []
+            expiration = str(legs[0].get("expiration") or "")[:10] if legs else ""
+            exposure.add(position.get("ticker") or "", expiration, position_collateral(position))
+        return exposure
+
+
+def position_collateral(position: Dict[str, Any]) -> float:
+    """
+    Collateral held by an open position, from its legs: short puts secure
+    strike x 100, long puts below them release it (a put spread holds its
+    width x 100).
+    """
+    total = 0.0
+    default_qty = position.get("quantity") or 1
+    for leg in position.get("legs") or []:
+        if not isinstance(leg, dict) or str(leg.get("option_type") or "").lower() != "put":
+            continue
+        try:
+            amount = float(leg.get("strike") or 0) * 100 * int(leg.get("quantity") or default_qty)
+        except (TypeError, ValueError):
+            continue
+        action = str(leg.get("action") or "").lower()
+        total += amount if action == "sell" else -amount if action == "buy" else 0
+    return max(total, 0.0)
+
+
+def load_open_exposure(supabase, cache=None) -> Exposure:
+    """
+    Exposure of all open positions (one query, or none when a PositionCache
+    is given); empty if positions are unavailable.
+    """
+    try:
+        if cache is not None:
+            positions = cache.open_positions()
+        else:
+            response = supabase.table("positions").select("ticker, quantity, legs").eq("status", "OPEN").execute()
+            positions = response.data or []
+    except Exception as e:
+        logger.warning(f"Could not load open positions, allocating without them: {e}")
+        return Exposure()
+    exposure = Exposure.from_positions(positions)
+    logger.info(f"Open positions: {len(positions)}, collateral committed ${exposure.total:,.0f}")
+    return exposure
+
+
+def _fits(limit: float, current: float, amount: float) -> bool:
+    return not limit or current + amount <= limit
+
+
+def allocate(candidates: List[Dict[str, Any]], limits: AllocationLimits,
+             exposure: Optional[Exposure] = None,
+             key: Optional[Callable[[Dict], Tuple]] = None) -> List[Dict[str, Any]]:
+    """Best feasible set of candidates, in rank order."""
+    exposure = exposure or Exposure()
+    key = key or get_rank_key()
+    selected = []
+    skipped: Dict[str, int] = defaultdict(int)
+
+    for opp in sorted(candidates, key=key, reverse=True):
+        if limits.max_trades and len(selected) >= limits.max_trades:
+            break
+        ticker = opp.get("ticker") or ""
+        expiration = str(opp.get("expiration_date") or "")[:10]
+        try:
+            collateral = float(opp.get("collateral") or 0) * limits.quantity
+        except (TypeError, ValueError):
+            skipped["invalid"] += 1
+            continue
+
+        if not _fits(limits.buying_power, exposure.total, collateral):
+            skipped["buying_power"] += 1
+        elif not _fits(limits.max_ticker_collateral, exposure.by_ticker[ticker], collateral):
+            skipped["ticker"] += 1
+        elif not _fits(limits.max_expiration_collateral, exposure.by_expiration[expiration], collateral):
+            skipped["expiration"] += 1
+        elif limits.max_trades_per_ticker and exposure.trades_by_ticker[ticker] >= limits.max_trades_per_ticker:
+            skipped["ticker_trades"] += 1
+        else:
+            exposure.add(ticker, expiration, collateral)
+            selected.append(opp)
+
+    if skipped:
+        logger.info("Allocation skipped: " + ", ".join(f"{name}={count}" for name, count in skipped.items()))
+    logger.info(f"Allocated {len(selected)} of {len(candidates)} candidates "
+                f"(collateral committed ${exposure.total:,.0f})")
+    return selected
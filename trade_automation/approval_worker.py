@@ -1,17 +1,23 @@
 import json
 import logging
-import time
 import asyncio
+import hmac
+import secrets
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
 
 from trade_automation.config import Settings
-from trade_automation.store import load_state, save_state, update_request_status
+from trade_automation.store import RequestStore, open_store
+from trade_automation.expiry import APPROVAL_TIMEOUT_MINUTES, ExpiryScheduler
 from trade_automation.notifier_telegram import TelegramNotifier
 from trade_automation.notifier_discord import DiscordNotifier
 from trade_automation.tradestation import TradeStationTradingClient
 from trade_automation.position_manager import PositionManager
 from trade_automation.supabase_client import get_supabase_client
+from trade_automation.clients import ClientLifecycle
+from trade_automation.order_pipeline import OrderPipeline, OrderResult
 from trade_automation.models import TradeRequest, OptionLeg
 
 
@@ -25,8 +31,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Timeout for trade approval (5 minutes)
-APPROVAL_TIMEOUT_MINUTES = 5
+# Header carrying TELEGRAM_WEBHOOK_SECRET on webhook pushes
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# Largest webhook body accepted; Telegram updates are a few KB
+MAX_UPDATE_BYTES = 1024 * 1024
 
 
 def request_from_dict(data: Dict[str, Any]) -> TradeRequest:
@@ -61,57 +69,78 @@ def is_expired(created_at: str, timeout_minutes: int = APPROVAL_TIMEOUT_MINUTES)
         return False
 
 
-def check_and_expire_requests(state: Dict[str, Any], notifier) -> None:
-    """Check for expired requests and auto-reject them."""
-    requests = state.get("requests", {})
-    expired_count = 0
+def expire_due(store: RequestStore, scheduler: Optional[ExpiryScheduler] = None) -> List[str]:
+    """
+    Auto-reject pending requests whose deadline has passed and return their
+    ids. Without a long-lived scheduler one is built from the store.
+    """
+    if scheduler is None:
+        scheduler = ExpiryScheduler()
+    scheduler.refresh(store)
+    expired = [
+        request_id for request_id in scheduler.pop_due()
+        if store.set_status(request_id, "rejected", notes="Auto-rejected: timeout", expected_status="pending")
+    ]
+    if expired:
+        logger.info(f"Auto-rejected {len(expired)} expired requests")
+    return expired
+
 
-    for request_id, req in requests.items():
-        if req.get("status") == "pending":
-            created_at = req.get("created_at", "")
-            if is_expired(created_at):
-                update_request_status(state, request_id, "rejected", notes="Auto-rejected: timeout")
-                notifier.send_message(f"⏱️ Request {request_id} auto-rejected (5 min timeout)")
-                expired_count += 1
+def expiry_message(request_ids: List[str]) -> str:
+    """One notification for every request that expired in the same tick."""
+    timeout = f"{APPROVAL_TIMEOUT_MINUTES} min timeout"
+    if len(request_ids) == 1:
+        return f"⏱️ Request {request_ids[0]} auto-rejected ({timeout})"
+    return f"⏱️ {len(request_ids)} requests auto-rejected ({timeout}): {', '.join(request_ids)}"
 
-    if expired_count > 0:
-        logger.info(f"Auto-rejected {expired_count} expired requests")
+
+def check_and_expire_requests(store: RequestStore, notifier,
+                              scheduler: Optional[ExpiryScheduler] = None) -> List[str]:
+    """Check for expired requests and auto-reject them."""
+    expired = expire_due(store, scheduler)
+    if expired:
+        notifier.send_message(expiry_message(expired))
+    return expired
 
 
 def _apply_commands(
     commands: List[Dict[str, str]],
-    state: Dict[str, Any],
+    store: RequestStore,
     settings: Settings,
     notifier,
-    supabase_client,
+    clients: ClientLifecycle,
     is_callback: bool = False
 ) -> None:
     """Process approve/reject commands (from text or callback)."""
-    trader = TradeStationTradingClient(settings)
-    position_mgr = PositionManager(supabase_client)
+    approved = []
 
     for cmd in commands:
         request_id = cmd["request_id"]
         action = cmd["action"]
         message_id = cmd.get("message_id")
 
-        req = state.get("requests", {}).get(request_id)
+        req = store.get(request_id)
         if not req:
             if is_callback:
                 notifier.answer_callback_query(cmd.get("callback_query_id"), "❌ Request not found")
             notifier.send_message(f"❌ Unknown request id: {request_id}")
             continue
 
-        if req.get("status") != "pending":
-            msg = f"Request {request_id} is already {req.get('status')}"
+        # Leaving pending is a compare-and-set, so a request acted on
+        # concurrently (another click, the expiry check) is only handled once
+        expired = is_expired(req.get("created_at", ""))
+        new_status = "rejected" if expired or action == "reject" else "approved"
+        notes = "Auto-rejected: timeout" if expired else ""
+        if not store.set_status(request_id, new_status, notes=notes, expected_status="pending"):
+            current = store.get(request_id) or req
+            msg = f"Request {request_id} is already {current.get('status')}"
             if is_callback:
                 notifier.answer_callback_query(cmd.get("callback_query_id"), msg)
             notifier.send_message(msg)
             continue
 
         # Check if expired
-        if is_expired(req.get("created_at", "")):
-            update_request_status(state, request_id, "rejected", notes="Auto-rejected: timeout")
+        if expired:
             msg = f"⏱️ Request {request_id} expired and was auto-rejected"
             if is_callback:
                 notifier.answer_callback_query(cmd.get("callback_query_id"), "⏱️ Request expired")
@@ -125,7 +154,6 @@ def _apply_commands(
             continue
 
         if action == "reject":
-            update_request_status(state, request_id, "rejected")
             if is_callback:
                 notifier.answer_callback_query(cmd.get("callback_query_id"), "❌ Trade rejected")
             notifier.send_message(f"❌ Rejected {request_id}")
@@ -138,111 +166,312 @@ def _apply_commands(
             continue
 
         if action == "approve":
-            update_request_status(state, request_id, "approved")
             if is_callback:
                 notifier.answer_callback_query(cmd.get("callback_query_id"), "✅ Trade approved! Executing...")
             notifier.send_message(f"✅ Approved {request_id} - Executing...")
+            approved.append((req, request_from_dict(req), message_id))
+
+    if not approved:
+        return
+
+    # Every approval of the batch is submitted concurrently
+    pipeline = OrderPipeline(clients.trader, clients.position_manager, store, settings.order_concurrency,
+                             tracker=clients.order_tracker)
+    message_ids = {req["request_id"]: message_id for req, _, message_id in approved}
+    for order in pipeline.execute([(req, trade) for req, trade, _ in approved]):
+        _report_order(order, notifier, message_ids.get(order.request_id))
+
+
+def _report_order(order: OrderResult, notifier, message_id) -> None:
+    request_id, req = order.request_id, order.request
+    if order.ok:
+        if order.position is not None:
+            notifier.send_message(
+                f"✅ Executed {request_id}\n"
+                f"Position ID: {order.position.get('position_id')}"
+            )
+        else:
+            notifier.send_message(
+                f"⚠️ Trade executed but position tracking failed: {order.position_error}"
+            )
+        if message_id:
+            notifier.edit_message_text(
+                message_id,
+                f"✅ <b>APPROVED & EXECUTED</b>\n\nID: <code>{request_id}</code>\n"
+                f"Ticker: {req.get('ticker')}\nStrategy: {req.get('strategy_type')}\n"
+                f"<i>Trade has been submitted</i>"
+            )
+    elif order.error is None:
+        notifier.send_message(f"❌ Failed {request_id}: {order.response}")
+        if message_id:
+            notifier.edit_message_text(
+                message_id,
+                f"⚠️ <b>APPROVED BUT FAILED</b>\n\nID: <code>{request_id}</code>\n"
+                f"Error: {order.response}"
+            )
+    else:
+        notifier.send_message(f"❌ Failed {request_id}: {order.error}")
+        if message_id:
+            notifier.edit_message_text(
+                message_id,
+                f"⚠️ <b>APPROVED BUT ERROR</b>\n\nID: <code>{request_id}</code>\n"
+                f"Error: {order.error}"
+            )
+
+
+def default_clients(settings: Settings) -> ClientLifecycle:
+    return ClientLifecycle(
+        settings,
+        supabase_factory=get_supabase_client,
+        trader_factory=TradeStationTradingClient,
+        position_manager_factory=PositionManager,
+    )
 
-            trade = request_from_dict(req)
-            try:
-                result = trader.place_order(trade)
-                if result.get("ok") or result.get("dry_run"):
-                    update_request_status(state, request_id, "executed")
-                    
-                    # Create position record in database
-                    try:
-                        entry_price = result.get("execution_price", req.get("net_credit", 0))
-                        quantity = int(req.get("quantity", 1))
-                        position = asyncio.run(position_mgr.create_position(
-                            trade,
-                            entry_price=entry_price,
-                            quantity=quantity,
-                            execution_data=result
-                        ))
-                        notifier.send_message(
-                            f"✅ Executed {request_id}\n"
-                            f"Position ID: {position.get('position_id')}"
-                        )
-                    except Exception as pos_exc:
-                        logger.error(f"Failed to create position for {request_id}: {pos_exc}")
-                        notifier.send_message(
-                            f"⚠️ Trade executed but position tracking failed: {pos_exc}"
-                        )
-                    
-                    if message_id:
-                        notifier.edit_message_text(
-                            message_id,
-                            f"✅ <b>APPROVED & EXECUTED</b>\n\nID: <code>{request_id}</code>\n"
-                            f"Ticker: {req.get('ticker')}\nStrategy: {req.get('strategy_type')}\n"
-                            f"<i>Trade has been submitted</i>"
-                        )
-                else:
-                    update_request_status(state, request_id, "failed", notes=str(result))
-                    notifier.send_message(f"❌ Failed {request_id}: {result}")
-                    if message_id:
-                        notifier.edit_message_text(
-                            message_id,
-                            f"⚠️ <b>APPROVED BUT FAILED</b>\n\nID: <code>{request_id}</code>\n"
-                            f"Error: {result}"
-                        )
-            except Exception as exc:
-                update_request_status(state, request_id, "failed", notes=str(exc))
-                notifier.send_message(f"❌ Failed {request_id}: {exc}")
-                if message_id:
-                    notifier.edit_message_text(
-                        message_id,
-                        f"⚠️ <b>APPROVED BUT ERROR</b>\n\nID: <code>{request_id}</code>\n"
-                        f"Error: {exc}"
-                    )
-
-
-def run_once(settings: Settings, state: Dict[str, Any],
-             telegram: TelegramNotifier, discord: DiscordNotifier) -> None:
-    # Initialize Supabase client
-    try:
-        supabase = get_supabase_client(settings)
-    except Exception as e:
-        logger.error(f"Failed to initialize Supabase client: {e}")
-        supabase = None
-    
-    # First, check for expired requests
+
+def handle_telegram_updates(updates: List[Dict[str, Any]], store: RequestStore, settings: Settings,
+                            telegram: TelegramNotifier, clients: ClientLifecycle) -> None:
+    """
+    Dispatch one batch of Telegram updates: button clicks (callback
+    queries) and text commands come from the same stream. Updates at or
+    below the stored last_update_id were handled already and are skipped.
+    """
+    last_update_id = store.get_cursor("telegram_last_update_id", 0)
+    updates = [u for u in updates if u.get("update_id", 0) > last_update_id]
+    if not updates:
+        return
+    store.set_cursor("telegram_last_update_id", max(u["update_id"] for u in updates))
+
+    callbacks = telegram.parse_callback_queries([u for u in updates if "callback_query" in u])
+    if callbacks:
+        logger.info(f"Processing {len(callbacks)} Telegram callbacks")
+        _apply_commands(callbacks, store, settings, telegram, clients, is_callback=True)
+
+    commands = telegram.parse_commands([u for u in updates if "message" in u])
+    if commands:
+        logger.info(f"Processing {len(commands)} Telegram text commands")
+        _apply_commands(commands, store, settings, telegram, clients, is_callback=False)
+
+
+def poll_discord(store: RequestStore, settings: Settings, discord: DiscordNotifier,
+                 clients: ClientLifecycle) -> None:
+    last_message_id = store.get_cursor("discord_last_message_id", "")
+    messages = discord.get_messages()
+    if messages:
+        newest_id = max(int(msg["id"]) for msg in messages if msg.get("id"))
+        store.set_cursor("discord_last_message_id", str(newest_id))
+    commands = discord.parse_commands(messages, last_message_id)
+    if commands:
+        logger.info(f"Processing {len(commands)} Discord commands")
+        _apply_commands(commands, store, settings, discord, clients, is_callback=False)
+
+
+def expire_requests(store: RequestStore, settings: Settings, telegram: TelegramNotifier,
+                    discord: DiscordNotifier, scheduler: Optional[ExpiryScheduler] = None) -> None:
+    expired = expire_due(store, scheduler)
+    if not expired:
+        return
+    message = expiry_message(expired)
     if "telegram" in settings.approval_backends:
-        check_and_expire_requests(state, telegram)
+        telegram.send_message(message)
     if "discord" in settings.approval_backends:
-        check_and_expire_requests(state, discord)
+        discord.send_message(message)
+
+
+def run_once(settings: Settings, store: RequestStore,
+             telegram: TelegramNotifier, discord: DiscordNotifier,
+             clients: Optional[ClientLifecycle] = None) -> None:
+    """One synchronous pass (single getUpdates call); the service runs ApprovalWorker."""
+    clients = clients or default_clients(settings)
+
+    # First, check for expired requests
+    expire_requests(store, settings, telegram, discord)
 
-    # Process callback queries (button clicks) first
     if "telegram" in settings.approval_backends:
-        last_update_id = state.get("telegram", {}).get("last_update_id", 0)
-
-        # Get callback queries
-        callback_updates = telegram.get_callback_queries(offset=last_update_id + 1)
-        if callback_updates:
-            state.setdefault("telegram", {})["last_update_id"] = callback_updates[-1]["update_id"]
-            callbacks = telegram.parse_callback_queries(callback_updates)
-            if callbacks:
-                logger.info(f"Processing {len(callbacks)} Telegram callbacks")
-                _apply_commands(callbacks, state, settings, telegram, supabase, is_callback=True)
-
-        # Also check for text commands (backward compatibility)
+        last_update_id = store.get_cursor("telegram_last_update_id", 0)
         updates = telegram.get_updates(offset=last_update_id + 1)
-        if updates:
-            state.setdefault("telegram", {})["last_update_id"] = updates[-1]["update_id"]
-            commands = telegram.parse_commands(updates)
-            if commands:
-                logger.info(f"Processing {len(commands)} Telegram text commands")
-                _apply_commands(commands, state, settings, telegram, supabase, is_callback=False)
+        handle_telegram_updates(updates, store, settings, telegram, clients)
 
     if "discord" in settings.approval_backends:
-        last_message_id = state.get("discord", {}).get("last_message_id", "")
-        messages = discord.get_messages()
-        if messages:
-            newest_id = max(int(msg["id"]) for msg in messages if msg.get("id"))
-            state.setdefault("discord", {})["last_message_id"] = str(newest_id)
-        commands = discord.parse_commands(messages, last_message_id)
-        if commands:
-            logger.info(f"Processing {len(commands)} Discord commands")
-            _apply_commands(commands, state, settings, discord, supabase, is_callback=False)
+        poll_discord(store, settings, discord, clients)
+
+
+class WebhookReceiver:
+    """
+    Small local HTTP endpoint Telegram posts updates to (put it behind the
+    TLS reverse proxy TELEGRAM_WEBHOOK_URL points at). Each update is handed
+    to the event loop's queue and acknowledged immediately.
+
+    Updates carry approvals that place orders, so a secret is required:
+    requests without it are rejected, as are bodies over MAX_UPDATE_BYTES.
+    """
+
+    def __init__(self, host: str, port: int, secret: str,
+                 loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        if not secret:
+            raise ValueError("WebhookReceiver requires a secret token")
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, code: int) -> None:
+                self.send_response(code)
+                self.end_headers()
+
+            def do_POST(self):
+                token = self.headers.get(SECRET_HEADER) or ""
+                if not hmac.compare_digest(token.encode(), receiver.secret.encode()):
+                    return self._reply(403)
+                try:
+                    length = int(self.headers["Content-Length"])
+                except (KeyError, TypeError):
+                    return self._reply(411)
+                except ValueError:
+                    return self._reply(400)
+                if length < 0:
+                    return self._reply(400)
+                if length > MAX_UPDATE_BYTES:
+                    self.close_connection = True
+                    return self._reply(413)
+                try:
+                    update = json.loads(self.rfile.read(length) or b"{}")
+                except (ValueError, json.JSONDecodeError):
+                    return self._reply(400)
+                loop.call_soon_threadsafe(queue.put_nowait, update)
+                self._reply(200)
+
+            def log_message(self, format, *args):
+                logger.debug("webhook: " + format % args)
+
+        self.secret = secret
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self) -> None:
+        self._thread.start()
+        logger.info(f"Webhook receiver listening on port {self.port}")
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ApprovalWorker:
+    """
+    Event-driven approval service.
+
+    Telegram updates arrive on one stream, either a getUpdates long-poll
+    that returns as soon as an update exists (APPROVAL_MODE=poll) or
+    webhook pushes (APPROVAL_MODE=webhook), and each batch is dispatched
+    immediately. Expiry (a deadline heap, see expiry.py) and Discord
+    polling run on their own APPROVAL_POLL_SECONDS tick, woken early for a
+    due deadline, which also purges old finished requests.
+    Handlers run one at a time against the shared RequestStore, which
+    propose_trades writes to concurrently, and reuse the process-lifetime
+    clients (clients.py); fills of submitted orders are tracked alongside
+    (order_tracker.py).
+    """
+
+    def __init__(self, settings: Settings, telegram: TelegramNotifier, discord: DiscordNotifier,
+                 store: Optional[RequestStore] = None, clients: Optional[ClientLifecycle] = None):
+        self.settings = settings
+        self.telegram = telegram
+        self.discord = discord
+        self.store = store or open_store()
+        self.expiry = ExpiryScheduler()
+        self.clients = clients or default_clients(settings)
+        self._lock = asyncio.Lock()
+
+    async def _handle(self, fn, *args) -> None:
+        # Handlers block (HTTP, order placement), so they run off the event loop
+        async with self._lock:
+            await asyncio.to_thread(fn, *args)
+
+    def _dispatch(self, updates) -> None:
+        handle_telegram_updates(updates, self.store, self.settings, self.telegram, self.clients)
+
+    async def _dispatch_batch(self, updates) -> None:
+        # A failing batch is logged and skipped; the update streams (and the
+        # fill tracking and token refresh running beside them) carry on
+        try:
+            await self._handle(self._dispatch, updates)
+        except Exception as e:
+            update_ids = sorted(u.get("update_id", 0) for u in updates)
+            logger.error(f"Telegram updates {update_ids[0]}..{update_ids[-1]} failed: {e}")
+
+    def _housekeeping(self) -> None:
+        expire_requests(self.store, self.settings, self.telegram, self.discord, self.expiry)
+        if "discord" in self.settings.approval_backends:
+            poll_discord(self.store, self.settings, self.discord, self.clients)
+        self.store.purge()
+
+    async def run_housekeeping(self) -> None:
+        while True:
+            try:
+                await self._handle(self._housekeeping)
+            except Exception as e:
+                logger.error(f"Approval housekeeping failed: {e}")
+            await asyncio.sleep(self._seconds_to_next_tick())
+
+    def _seconds_to_next_tick(self) -> float:
+        # Wake early when a deadline falls inside the poll interval
+        interval = self.settings.poll_interval_seconds
+        deadline = self.expiry.next_deadline()
+        if deadline is None:
+            return interval
+        return min(interval, max((deadline - datetime.utcnow()).total_seconds(), 0) + 0.1)
+
+    async def run_long_poll(self) -> None:
+        await asyncio.to_thread(self.telegram.delete_webhook)
+        offset = self.store.get_cursor("telegram_last_update_id", 0) + 1
+        while True:
+            try:
+                updates = await asyncio.to_thread(
+                    self.telegram.get_updates, offset, self.settings.telegram_long_poll_seconds
+                )
+            except Exception as e:
+                logger.warning(f"Telegram getUpdates failed: {e}")
+                await asyncio.sleep(self.settings.poll_interval_seconds)
+                continue
+            if updates:
+                offset = max(u["update_id"] for u in updates) + 1
+                await self._dispatch_batch(updates)
+
+    async def run_webhook(self) -> None:
+        secret = self.settings.telegram_webhook_secret
+        if not secret:
+            # Never accept unauthenticated pushes: register a per-run secret with Telegram instead
+            secret = secrets.token_urlsafe(32)
+            logger.warning("TELEGRAM_WEBHOOK_SECRET not set; using a generated secret for this run")
+        queue: asyncio.Queue = asyncio.Queue()
+        receiver = WebhookReceiver(
+            self.settings.telegram_webhook_host, self.settings.telegram_webhook_port,
+            secret, asyncio.get_running_loop(), queue,
+        )
+        receiver.start()
+        if not await asyncio.to_thread(self.telegram.set_webhook, self.settings.telegram_webhook_url, secret):
+            logger.error("Telegram setWebhook failed; check TELEGRAM_WEBHOOK_URL")
+        try:
+            while True:
+                updates = [await queue.get()]
+                while not queue.empty():
+                    updates.append(queue.get_nowait())
+                await self._dispatch_batch(updates)
+        finally:
+            receiver.stop()
+
+    async def run(self) -> None:
+        # Clients and the first access token are ready before any approval arrives
+        await asyncio.to_thread(self.clients.warm_up)
+        tasks = [self.run_housekeeping(), self.clients.keep_token_fresh(), self.clients.track_fills()]
+        if "telegram" in self.settings.approval_backends and self.telegram.is_configured():
+            if self.settings.approval_mode == "webhook":
+                tasks.append(self.run_webhook())
+            else:
+                tasks.append(self.run_long_poll())
+        await asyncio.gather(*tasks)
 
 
 def main():
@@ -250,14 +479,10 @@ def main():
     telegram = TelegramNotifier(settings)
     discord = DiscordNotifier(settings)
 
-    logger.info("Starting approval worker")
+    logger.info(f"Starting approval worker ({settings.approval_mode} mode)")
     logger.info(f"Approval timeout: {APPROVAL_TIMEOUT_MINUTES} minutes")
 
-    while True:
-        state = load_state()
-        run_once(settings, state, telegram, discord)
-        save_state(state)
-        time.sleep(settings.poll_interval_seconds)
+    asyncio.run(ApprovalWorker(settings, telegram, discord).run())
 
 
 if __name__ == "__main__":
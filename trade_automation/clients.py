@@ -0,0 +1,147 @@
+"""
+Process-lifetime clients for the approval loop.
+
+The Supabase client, the TradeStation order client and the PositionManager
+are created once, on first use, and reused for every command batch, so an
+approval does not pay client construction, an OAuth refresh or a fresh TLS
+handshake. The TradeStation token is refreshed in the background shortly
+before it expires (see TradeStationTradingClient.ensure_token), and live
+orders are followed to their fills by one OrderTracker (order_tracker.py).
+Open positions are held in one PositionCache (position_cache.py) shared by
+the PositionManager and the tracker, so reads skip the database and writes
+keep it current.
+
+Factories are injectable so callers (and tests) can substitute clients.
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+from trade_automation.config import Settings
+from trade_automation.order_tracker import OrderTracker
+from trade_automation.position_cache import PositionCache
+from trade_automation.position_manager import PositionManager
+from trade_automation.supabase_client import get_supabase_client
+from trade_automation.tradestation import TradeStationTradingClient
+
+logger = logging.getLogger(__name__)
+
+# Retry delay when a background token refresh fails
+TOKEN_RETRY_SECONDS = 30
+
+
+class ClientLifecycle:
+    def __init__(
+        self,
+        settings: Settings,
+        supabase_factory: Callable[[Settings], Any] = get_supabase_client,
+        trader_factory: Callable[[Settings], Any] = TradeStationTradingClient,
+        position_manager_factory: Callable[[Any], Any] = PositionManager,
+    ):
+        self.settings = settings
+        self._supabase_factory = supabase_factory
+        self._trader_factory = trader_factory
+        self._position_manager_factory = position_manager_factory
+        self._supabase = None
+        self._trader = None
+        self._position_manager = None
+        self._position_cache = None
+        self._order_tracker = None
+
+    @property
+    def supabase(self):
+        """Supabase client; None (and retried on next use) if it cannot be created."""
+        if self._supabase is None:
+            try:
+                self._supabase = self._supabase_factory(self.settings)
+            except Exception as e:
+                logger.error(f"Failed to initialize Supabase client: {e}")
+        return self._supabase
+
+    @property
+    def trader(self):
+        if self._trader is None:
+            self._trader = self._trader_factory(self.settings)
+        return self._trader
+
+    @property
+    def position_cache(self) -> Optional[PositionCache]:
+        """Open positions cache; None without Supabase."""
+        if self._position_cache is None:
+            supabase = self.supabase
+            if supabase is not None:
+                self._position_cache = PositionCache(
+                    supabase, self.settings.positions_database_url, self.settings.position_cache_refresh_seconds,
+                )
+        return self._position_cache
+
+    @property
+    def position_manager(self):
+        if self._position_manager is None:
+            supabase = self.supabase
+            if supabase is None:
+                # Not cached: a later batch retries once Supabase is reachable
+                return self._position_manager_factory(None)
+            manager = self._position_manager_factory(supabase)
+            if isinstance(manager, PositionManager) and manager.cache is None:
+                manager.cache = self.position_cache
+            self._position_manager = manager
+        return self._position_manager
+
+    @property
+    def order_tracker(self) -> Optional[OrderTracker]:
+        """Fill tracker for live orders; None in dry run or without Supabase."""
+        if self._order_tracker is None and self._live_trader() is not None:
+            supabase = self.supabase
+            if supabase is not None:
+                self._order_tracker = OrderTracker(
+                    self.trader, supabase,
+                    self.settings.fill_poll_min_seconds, self.settings.fill_poll_max_seconds,
+                    cache=self.position_cache,
+                )
+        return self._order_tracker
+
+    def _live_trader(self) -> Optional[Any]:
+        if self.settings.ts_dry_run or not hasattr(self.trader, "ensure_token"):
+            return None
+        return self.trader
+
+    def warm_up(self) -> None:
+        """Create clients, load open positions and fetch the first access token before any approval arrives."""
+        _ = self.supabase, self.position_manager
+        cache = self.position_cache
+        if cache is not None:
+            try:
+                cache.load()
+                cache.listen()
+            except Exception as e:
+                # Loaded again on first read
+                logger.warning(f"Could not load open positions: {e}")
+        trader = self._live_trader()
+        if trader is not None and not trader.ensure_token():
+            logger.warning("TradeStation token refresh failed at startup")
+
+    async def keep_token_fresh(self) -> None:
+        """Refresh the TradeStation token ahead of expiry, forever (no-op in dry run)."""
+        trader = self._live_trader()
+        if trader is None:
+            return
+        while True:
+            await asyncio.sleep(trader.seconds_until_refresh())
+            try:
+                ok = await asyncio.to_thread(trader.ensure_token)
+            except Exception as e:
+                logger.warning(f"TradeStation token refresh failed: {e}")
+                ok = False
+            if not ok:
+                await asyncio.sleep(TOKEN_RETRY_SECONDS)
+
+    async def track_fills(self) -> None:
+        """Follow submitted orders to their fills, forever (no-op in dry run)."""
+        tracker = self.order_tracker
+        if tracker is None:
+            if self._live_trader() is not None:
+                logger.error("Fill tracking disabled: Supabase unavailable at startup")
+            return
+        await tracker.run()
@@ -37,7 +37,9 @@ class Settings:
         self.supabase_url = os.environ.get("SUPABASE_URL", "")
         self.supabase_key = os.environ.get("SUPABASE_KEY", "")
         self.supabase_service_role_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
-        self.opportunities_table = os.environ.get("OPPORTUNITIES_TABLE", "options_opportunities")
+        # Readers use the view over the currently published generation
+        # (see database/ddl/004_opportunity_generations.sql)
+        self.opportunities_table = os.environ.get("OPPORTUNITIES_TABLE", "current_options_opportunities")
 
         # TradeStation auth - prefer env vars, fall back to tokens.json
         tokens = _load_tokens_file()
@@ -75,9 +77,45 @@ class Settings:
         self.max_collateral = float(os.environ.get("OPPORTUNITIES_MAX_COLLATERAL", "0"))
         self.strategy_types = _split_csv(os.environ.get("OPPORTUNITIES_STRATEGIES", ""))
 
+        # Portfolio allocation (see allocation.py); 0 disables a limit
+        self.allocation_candidates = int(os.environ.get("ALLOCATION_CANDIDATES", "200"))
+        self.allocation_buying_power = float(os.environ.get("ALLOCATION_BUYING_POWER", "0"))
+        self.allocation_max_per_ticker = float(os.environ.get("ALLOCATION_MAX_PER_TICKER", "0"))
+        self.allocation_max_per_expiration = float(os.environ.get("ALLOCATION_MAX_PER_EXPIRATION", "0"))
+        self.allocation_max_trades_per_ticker = int(os.environ.get("ALLOCATION_MAX_TRADES_PER_TICKER", "0"))
+
         # Execution
         self.default_quantity = int(os.environ.get("TRADE_QUANTITY", "1"))
+        # Orders from one approval batch submitted at once (order_pipeline.py)
+        self.order_concurrency = int(os.environ.get("ORDER_CONCURRENCY", "4"))
+        # Order-status polling backoff for fill tracking (order_tracker.py)
+        self.fill_poll_min_seconds = float(os.environ.get("FILL_POLL_MIN_SECONDS", "1"))
+        self.fill_poll_max_seconds = float(os.environ.get("FILL_POLL_MAX_SECONDS", "30"))
+        # Open positions cache (position_cache.py): direct Postgres connection for
+        # change notifications; without one the cache reloads on this interval
+        self.positions_database_url = os.environ.get("POSITIONS_DATABASE_URL", "")
+        self.position_cache_refresh_seconds = float(os.environ.get("POSITION_CACHE_REFRESH_SECONDS", "60"))
+
+        # Exit monitor: "poll" (options_quotes every 5 minutes) or "stream" (live quotes, quote_stream.py)
+        self.exit_monitor_mode = os.environ.get("EXIT_MONITOR_MODE", "poll").strip().lower()
+        self.exit_position_refresh_seconds = float(os.environ.get("EXIT_POSITION_REFRESH_SECONDS", "15"))
+        # Exit rule set in priority order, `name` or `name:param` (exit_rules.py)
+        self.exit_rules = os.environ.get("EXIT_RULES", "dte:21,profit_target,stop_loss")
+        # Exit daemon check interval, tighter near the open/close and exit thresholds (market_hours.py)
+        self.exit_interval_seconds = float(os.environ.get("EXIT_INTERVAL_SECONDS", "300"))
+        self.exit_edge_interval_seconds = float(os.environ.get("EXIT_EDGE_INTERVAL_SECONDS", "60"))
+        self.exit_near_interval_seconds = float(os.environ.get("EXIT_NEAR_INTERVAL_SECONDS", "60"))
+        self.market_holidays = _split_csv(os.environ.get("MARKET_HOLIDAYS", ""))
         self.poll_interval_seconds = int(os.environ.get("APPROVAL_POLL_SECONDS", "10"))
+
+        # Approval worker update stream: "poll" (getUpdates long-poll) or "webhook"
+        self.approval_mode = os.environ.get("APPROVAL_MODE", "poll").strip().lower()
+        self.telegram_long_poll_seconds = int(os.environ.get("TELEGRAM_LONG_POLL_SECONDS", "30"))
+        self.telegram_webhook_url = os.environ.get("TELEGRAM_WEBHOOK_URL", "")
+        # Required on every push; when unset the worker generates one per run
+        self.telegram_webhook_secret = os.environ.get("TELEGRAM_WEBHOOK_SECRET", "")
+        self.telegram_webhook_host = os.environ.get("TELEGRAM_WEBHOOK_HOST", "127.0.0.1")
+        self.telegram_webhook_port = int(os.environ.get("TELEGRAM_WEBHOOK_PORT", "8081"))
         
         # Trade Mode (backward compatibility)
         self.trade_mode = os.environ.get("TRADE_MODE", "DRY_RUN").upper()
@@ -100,9 +138,16 @@ class Settings:
     def supabase_auth_key(self) -> str:
         return self.supabase_service_role_key or self.supabase_key
 
+    def ts_api_root(self) -> str:
+        if self.ts_env == "SIM":
+            return "https://sim-api.tradestation.com/v3"
+        return self.ts_api_base
+
     def ts_order_endpoint(self) -> str:
         if self.ts_order_url:
             return self.ts_order_url
-        if self.ts_env == "SIM":
-            return "https://sim-api.tradestation.com/v3/orderexecution/orders"
-        return f"{self.ts_api_base}/orderexecution/orders"
+        return f"{self.ts_api_root()}/orderexecution/orders"
+
+    def ts_orders_status_endpoint(self, order_ids) -> str:
+        return (f"{self.ts_api_root()}/brokerage/accounts/{self.ts_account_id}"
+                f"/orders/{','.join(order_ids)}")
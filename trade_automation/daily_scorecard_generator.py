@@ -30,9 +30,11 @@ logger = logging.getLogger(__name__)
 class DailyScorecardGenerator:
     """Generate daily trading scorecard with P&L and performance metrics"""
 
-    def __init__(self, settings: Settings, supabase):
+    def __init__(self, settings: Settings, supabase, position_cache=None):
         self.settings = settings
         self.supabase = supabase
+        # Open positions are read from the cache when one is given (position_cache.py)
+        self.position_cache = position_cache
         self.output_dir = Path("/tmp")
 
     async def generate_scorecard(self, date: Optional[datetime] = None) -> Dict:
@@ -123,6 +125,9 @@ class DailyScorecardGenerator:
         """Fetch all currently open positions"""
 
         try:
+            if self.position_cache is not None:
+                return self.position_cache.open_positions()
+
             response = self.supabase.table("positions").select("*").eq(
                 "status", "OPEN"
             ).execute()
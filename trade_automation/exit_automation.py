@@ -1,18 +1,28 @@
 """
 Exit Automation - Monitor positions and execute exits based on rules
-Runs every 5 minutes during market hours to check exit conditions
+Runs as a long-lived daemon (ExitDaemon): checks during market hours on an
+adaptive interval (market_hours.py), idle while the market is closed
 """
 import asyncio
 import logging
 import time
-from datetime import datetime, timedelta
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
+import numpy as np
+
+from data_collection.vol_surface import VolSurfaceCache
+from trade_automation.clients import ClientLifecycle
 from trade_automation.config import Settings
+from trade_automation.exit_rules import ExitRulesEngine, PositionArrays, short_leg
+from trade_automation.market_hours import ExitSchedule
 from trade_automation.models import TradeRequest, OptionLeg
+from trade_automation.position_cache import PositionCache
 from trade_automation.position_manager import PositionManager
 from trade_automation.supabase_client import get_supabase_client
 from trade_automation.notifier_telegram import TelegramNotifier
+from trade_automation.order_tracker import awaiting_fill
+from trade_automation.quote_cache import QuoteCache
+from trade_automation.quote_stream import StreamingExitMonitor
 from trade_automation.tradestation import TradeStationTradingClient
 
 logging.basicConfig(
@@ -29,12 +39,17 @@ logger = logging.getLogger(__name__)
 class ExitAutomation:
     """Monitors positions and executes exits"""
 
-    def __init__(self, settings: Settings, supabase, position_mgr: PositionManager):
+    def __init__(self, settings: Settings, supabase, position_mgr: PositionManager, trader=None):
         self.settings = settings
         self.supabase = supabase
         self.position_mgr = position_mgr
         self.notifier = TelegramNotifier(settings) if "telegram" in settings.approval_backends else None
-        self.trader = TradeStationTradingClient(settings)
+        self.trader = trader or TradeStationTradingClient(settings)
+        self.vol_surfaces = VolSurfaceCache(supabase)
+        self.quotes = QuoteCache(supabase)
+        self.rules = ExitRulesEngine.from_spec(settings.exit_rules)
+        # Open positions close to an exit threshold after the last cycle
+        self.near_positions = 0
 
     async def monitor_and_exit(self) -> int:
         """
@@ -44,101 +59,143 @@ class ExitAutomation:
 
         logger.info("Checking open positions for exit conditions...")
 
-        # Get all open positions
-        open_positions = await self.position_mgr.get_open_positions()
+        # Fresh smiles each cycle (one query per symbol, on first use)
+        self.vol_surfaces = VolSurfaceCache(self.supabase)
+
+        # Get all open positions (an entry order still working has nothing to close)
+        open_positions = [p for p in await self.position_mgr.get_open_positions() if not awaiting_fill(p)]
 
         if not open_positions:
             logger.info("No open positions to monitor")
+            self.near_positions = 0
             return 0
 
         logger.info(f"Found {len(open_positions)} open positions")
 
-        exits_executed = 0
+        # Latest quotes for every leg of every position, loaded once per cycle
+        self._load_market_data(open_positions)
 
+        # Each position is valued once, then all are checked in one rules pass
+        costs = []
         for position in open_positions:
             try:
-                should_exit, reason = await self._evaluate_position(position)
-
-                if should_exit:
-                    logger.info(f"Exiting position {position['position_id']}: {reason}")
-                    await self._execute_exit(position, reason)
-                    exits_executed += 1
-
-                    if self.notifier:
-                        entry = position.get("entry_price", 0)
-                        cost = await self._get_cost_to_close(position)
-                        pnl = (entry - cost) if cost is not None else 0
-                        self.notifier.send_message(
-                            f"📊 Position {position['position_id']} exited\n"
-                            f"Ticker: {position['ticker']}\n"
-                            f"Reason: {reason}\n"
-                            f"P&L per contract: ${pnl:.2f}\n"
-                            f"Status: CLOSED"
-                        )
-                else:
-                    # Log position status for monitoring
-                    cost = await self._get_cost_to_close(position)
-                    if cost is not None:
-                        entry = position.get("entry_price", 0)
-                        unrealized = entry - cost
-                        logger.debug(f"Position {position['position_id']}: {position['ticker']} "
-                                    f"- Unrealized P&L/contract: ${unrealized:.2f}")
-
+                costs.append(await self._get_cost_to_close(position))
             except Exception as e:
-                logger.error(f"Error evaluating position {position['position_id']}: {e}")
-                continue
+                logger.error(f"Error valuing position {position['position_id']}: {e}")
+                costs.append(None)
+        arrays = self._position_arrays(open_positions, costs)
+        reasons = self.evaluate_exits(open_positions, costs, arrays)
+        self.near_positions = int(np.count_nonzero(self.rules.near(arrays)))
+
+        for position, cost, reason in zip(open_positions, costs, reasons):
+            if not reason and cost is not None:
+                # Log position status for monitoring
+                entry = position.get("entry_price", 0)
+                unrealized = entry - cost
+                logger.debug(f"Position {position['position_id']}: {position['ticker']} "
+                            f"- Unrealized P&L/contract: ${unrealized:.2f}")
+
+        # Breached positions are closed concurrently
+        exited = await asyncio.gather(*(
+            self._exit_position(position, reason, cost)
+            for position, cost, reason in zip(open_positions, costs, reasons) if reason
+        ))
+        exits_executed = sum(exited)
 
         if exits_executed > 0:
             logger.info(f"Exited {exits_executed} positions")
+        logger.info(f"Valued {len(open_positions)} positions with {self.quotes.queries} quote queries")
 
         return exits_executed
 
-    async def _evaluate_position(self, position: Dict) -> Tuple[bool, str]:
+    async def _exit_position(self, position: Dict, reason: str, cost: Optional[float]) -> bool:
+        try:
+            logger.info(f"Exiting position {position['position_id']}: {reason}")
+            await self._execute_exit(position, reason, cost)
+        except Exception as e:
+            logger.error(f"Error exiting position {position['position_id']}: {e}")
+            return False
+        try:
+            await asyncio.to_thread(self._notify_exit, position, reason, cost)
+        except Exception as e:
+            logger.error(f"Error notifying exit of position {position['position_id']}: {e}")
+        return True
+
+    def _load_market_data(self, positions: List[Dict], option_quotes: bool = True) -> None:
         """
-        Evaluate a single position for exit conditions.
-        Returns: (should_exit, reason)
+        Fresh quote cache: leg quotes (always for polling; for the delta rule
+        in stream mode) and underlying prices when a rule needs them.
         """
+        self.quotes = QuoteCache(self.supabase)
+        needs = self.rules.needs
+        if option_quotes or "delta" in needs:
+            self.quotes.load(cid for position in positions for cid in self._leg_contract_ids(position))
+        if "underlying" in needs:
+            self.quotes.load_underlyings({position.get("ticker") for position in positions})
+
+    def _position_arrays(self, positions: List[Dict], costs: List[Optional[float]]) -> PositionArrays:
+        needs = self.rules.needs
+        deltas = underlyings = None
+        if "delta" in needs:
+            deltas = []
+            for position in positions:
+                leg = short_leg(position)
+                contractid = (leg.get("contractid") if isinstance(leg, dict) else leg.contractid) if leg else None
+                deltas.append(self.quotes.delta(contractid) if contractid else None)
+        if "underlying" in needs:
+            underlyings = [self.quotes.underlying(position.get("ticker")) for position in positions]
+        return PositionArrays.build(positions, costs, deltas, underlyings, self.rules.peaks_for(positions))
+
+    def evaluate_exits(self, positions: List[Dict], costs: List[Optional[float]],
+                       arrays: Optional[PositionArrays] = None) -> List[Optional[str]]:
+        """Exit reason per position (None to hold), all positions in one pass of the rule set."""
+        if arrays is None:
+            arrays = self._position_arrays(positions, costs)
+        reasons = list(self.rules.evaluate(arrays))
+        for position, reason in zip(positions, reasons):
+            if reason:
+                logger.info(f"Position {position['position_id']} ({position.get('ticker')}) triggers exit: {reason}")
+        return reasons
+
+    def _notify_exit(self, position: Dict, reason: str, cost_to_close: Optional[float]) -> None:
+        if not self.notifier:
+            return
+        entry = position.get("entry_price", 0)
+        pnl = (entry - cost_to_close) if cost_to_close is not None else 0
+        self.notifier.send_message(
+            f"📊 Position {position['position_id']} exited\n"
+            f"Ticker: {position['ticker']}\n"
+            f"Reason: {reason}\n"
+            f"P&L per contract: ${pnl:.2f}\n"
+            f"Status: CLOSED"
+        )
 
-        # Rule 1: Days to Expiry (21 DTE)
-        if self._check_days_to_expiry(position):
-            return True, "21 DTE reached"
-
-        # Rule 2 & 3 need current option pricing
-        cost_to_close = await self._get_cost_to_close(position)
-
-        if cost_to_close is not None:
-            # Rule 2: Profit Target (50% of credit received)
-            if self._check_profit_target(position, cost_to_close):
-                return True, "50% profit target reached"
-
-            # Rule 3: Stop Loss
-            if self._check_stop_loss(position, cost_to_close):
-                return True, "Stop loss triggered"
+    async def _evaluate_position(self, position: Dict,
+                                 cost_to_close: Optional[float] = None) -> Tuple[bool, str]:
+        """
+        Evaluate a single position for exit conditions, using the cycle's
+        cost_to_close when given (valued from the quote cache otherwise).
+        Returns: (should_exit, reason)
+        """
+        if cost_to_close is None:
+            cost_to_close = await self._get_cost_to_close(position)
+        reason = self.evaluate_exits([position], [cost_to_close])[0]
+        return reason is not None, reason
 
-        return False, None
+    def _check_rule(self, name: str, position: Dict, cost_to_close: Optional[float]) -> bool:
+        arrays = PositionArrays.build([position], [cost_to_close], peaks=self.rules.peaks_for([position]))
+        return bool(self.rules.rule(name).mask(arrays)[0])
 
     def _check_days_to_expiry(self, position: Dict) -> bool:
-        """Check if position is within 21 days of expiration"""
-
-        legs = position.get("legs", [])
-        if not legs:
-            return False
-
-        try:
-            leg = legs[0]
-            exp_str = leg.get("expiration") if isinstance(leg, dict) else leg.expiration
-
-            if exp_str:
-                expiration = datetime.fromisoformat(exp_str.replace("Z", "+00:00"))
-                days_to_exp = (expiration - datetime.utcnow()).days
-
-                if days_to_exp <= 21:
-                    logger.info(f"Position {position['position_id']}: {days_to_exp} DTE - TRIGGER EXIT")
-                    return True
-        except (ValueError, TypeError, AttributeError) as e:
-            logger.warning(f"Could not parse expiration for position {position['position_id']}: {e}")
+        """Check if position is within the DTE exit window (21 days by default)"""
+        return self._check_rule("dte", position, None)
 
-        return False
+    @staticmethod
+    def _leg_contract_ids(position: Dict):
+        for leg in position.get("legs") or []:
+            contractid = leg.get("contractid") if isinstance(leg, dict) else leg.contractid
+            if contractid:
+                yield contractid
 
     async def _get_cost_to_close(self, position: Dict) -> Optional[float]:
         """
@@ -151,6 +208,9 @@ class ExitAutomation:
         if not legs:
             return None
 
+        # One query for the position's legs unless the cycle already loaded them
+        self.quotes.load(self._leg_contract_ids(position))
+
         total_cost = 0.0
         for leg in legs:
             contractid = leg.get("contractid") if isinstance(leg, dict) else leg.contractid
@@ -158,6 +218,18 @@ class ExitAutomation:
                 return None
 
             mid_price = self._get_option_mid_price(contractid)
+            if mid_price is None:
+                reason = "no quote"
+            elif self._is_outlier_quote(position.get("ticker"), leg, contractid):
+                reason = f"outlier quote mid {mid_price:.2f}"
+            else:
+                reason = None
+            if reason:
+                # Contract not in the collected chain, or its quote is far off
+                # the fitted smile: price it off the smile instead
+                model_mid = self._get_model_mid_price(position.get("ticker"), leg, reason)
+                if model_mid is not None:
+                    mid_price = model_mid
             if mid_price is None:
                 return None
 
@@ -173,76 +245,57 @@ class ExitAutomation:
         return total_cost
 
     def _get_option_mid_price(self, contractid: str) -> Optional[float]:
-        """Get the latest mid-price for an option contract from options_quotes."""
+        """Get the latest mid-price for an option contract (from the cycle's quote cache)."""
         try:
-            response = (
-                self.supabase.table("options_quotes")
-                .select("bid, ask, mark")
-                .eq("contractid", contractid)
-                .order("quote_date", desc=True)
-                .limit(1)
-                .execute()
-            )
-
-            if not response.data:
-                logger.warning(f"No quote found for contract {contractid}")
-                return None
+            return self.quotes.mid(contractid)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Failed to get quote for {contractid}: {e}")
+            return None
 
-            quote = response.data[0]
-            # Prefer mark (mid) price, fall back to (bid+ask)/2
-            mark = quote.get("mark")
-            if mark is not None and float(mark) > 0:
-                return float(mark)
+    def _is_outlier_quote(self, ticker: Optional[str], leg, contractid: str) -> bool:
+        """Whether the leg's cached quote was flagged as an outlier by the smile fit."""
+        expiration = leg.get("expiration") if isinstance(leg, dict) else getattr(leg, "expiration", None)
+        quote = self.quotes.quote(contractid)
+        if not ticker or not expiration or not quote:
+            return False
+        if not self.vol_surfaces.is_outlier(ticker, expiration, contractid, quote.get("quote_date")):
+            return False
+        logger.info(f"Quote for {contractid} on {quote.get('quote_date')} is a smile outlier")
+        return True
 
-            bid = float(quote.get("bid") or 0)
-            ask = float(quote.get("ask") or 0)
-            if bid > 0 and ask > 0:
-                return (bid + ask) / 2.0
+    def _get_model_mid_price(self, ticker: Optional[str], leg, reason: str = "no quote") -> Optional[float]:
+        """
+        Model mid for a leg from the cached volatility surface (see vol_surface.py).
+        `reason` says why the quote is not used and is logged with the price.
+        """
+        def field(name):
+            return leg.get(name) if isinstance(leg, dict) else getattr(leg, name, None)
 
+        expiration, strike, option_type = field("expiration"), field("strike"), field("option_type")
+        if not ticker or not expiration or not strike or not option_type:
             return None
-        except Exception as e:
-            logger.error(f"Failed to get quote for {contractid}: {e}")
+        try:
+            mid = self.vol_surfaces.model_mid(ticker, expiration, float(strike), str(option_type).lower() == "call")
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Could not model price for {field('contractid')}: {e}")
             return None
+        if mid is not None:
+            logger.info(f"Using model mid {mid:.2f} for {field('contractid')} ({reason})")
+        return mid
 
     def _check_profit_target(self, position: Dict, cost_to_close: float) -> bool:
         """
-        Check if position has reached 50% profit target.
+        Check if position has reached its profit target.
         For credit positions: profit = entry_credit - cost_to_close
         """
-        entry_price = position.get("entry_price", 0)
-        profit_target = position.get("profit_target", 0)
-
-        if not entry_price or not profit_target:
-            return False
-
-        unrealized_profit = entry_price - cost_to_close
-
-        if unrealized_profit >= profit_target:
-            logger.info(f"Position {position['position_id']}: "
-                       f"Profit ${unrealized_profit:.2f} >= target ${profit_target:.2f}")
-            return True
-
-        return False
+        return self._check_rule("profit_target", position, cost_to_close)
 
     def _check_stop_loss(self, position: Dict, cost_to_close: float) -> bool:
         """
         Check if position has hit stop loss.
         For credit positions: loss = cost_to_close - entry_credit
         """
-        entry_price = position.get("entry_price", 0)
-        stop_loss = position.get("stop_loss", 0)
-
-        if not entry_price or not stop_loss:
-            return False
-
-        unrealized_loss = cost_to_close - entry_price
-
-        if unrealized_loss >= stop_loss:
-            logger.info(f"Position {position['position_id']}: "
-                       f"Loss ${unrealized_loss:.2f} >= stop loss ${stop_loss:.2f}")
-            return True
-
-        return False
+        return self._check_rule("stop_loss", position, cost_to_close)
 
     def _build_closing_order(self, position: Dict) -> TradeRequest:
         """Build a TradeRequest that closes the position by reversing all legs."""
@@ -287,14 +340,20 @@ class ExitAutomation:
             legs=closing_legs,
         )
 
-    async def _execute_exit(self, position: Dict, exit_reason: str) -> None:
-        """Execute exit: place closing order via TradeStation, then update DB."""
+    async def _execute_exit(self, position: Dict, exit_reason: str,
+                            cost_to_close: Optional[float] = None) -> None:
+        """
+        Execute exit: place closing order via TradeStation, then update DB.
+        cost_to_close is the cycle's valuation (looked up when not given).
+        The order and the database writes run off the event loop, so several
+        exits can proceed at once.
+        """
 
         # Place closing order
         close_request = self._build_closing_order(position)
         order_note = ""
         try:
-            result = self.trader.place_order(close_request)
+            result = await asyncio.to_thread(self.trader.place_order, close_request)
             if not result.get("ok") and not result.get("dry_run"):
                 order_note = f" (order failed: {result})"
                 logger.error(f"Closing order failed for position {position['position_id']}: {result}")
@@ -305,7 +364,8 @@ class ExitAutomation:
             logger.error(f"Error placing closing order for position {position['position_id']}: {e}")
 
         # Calculate realized P&L from option premiums
-        cost_to_close = await self._get_cost_to_close(position)
+        if cost_to_close is None:
+            cost_to_close = await self._get_cost_to_close(position)
         entry_price = position.get("entry_price", 0)
         quantity = position.get("quantity", 1)
 
@@ -329,6 +389,66 @@ class ExitAutomation:
                    f"Realized P&L ${realized_pnl:.2f}")
 
 
+class ExitDaemon:
+    """
+    Long-lived exit service: the Supabase client, PositionManager, notifier
+    and TradeStation client (token refreshed in the background) are created
+    once and reused by every check. Checks run on ExitSchedule's interval
+    during market hours; each cycle's latency is logged with a rolling p50/max.
+    """
+
+    LATENCY_WINDOW = 100
+
+    def __init__(self, settings: Settings, clients: Optional[ClientLifecycle] = None,
+                 schedule: Optional[ExitSchedule] = None):
+        self.settings = settings
+        self.clients = clients or ClientLifecycle(settings)
+        self.schedule = schedule or ExitSchedule.from_settings(settings)
+        self.exits: Optional[ExitAutomation] = None
+        self.latencies_ms: List[float] = []
+
+    def _exit_automation(self) -> Optional[ExitAutomation]:
+        if self.exits is None:
+            supabase = self.clients.supabase
+            if supabase is None:
+                return None
+            self.exits = ExitAutomation(self.settings, supabase, self.clients.position_manager, self.clients.trader)
+        return self.exits
+
+    async def run_cycle(self) -> Optional[int]:
+        """One exit check; returns exits placed (None if Supabase is unavailable)."""
+        exits = self._exit_automation()
+        if exits is None:
+            return None
+        started = time.perf_counter()
+        exited = await exits.monitor_and_exit()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.latencies_ms = (self.latencies_ms + [elapsed_ms])[-self.LATENCY_WINDOW:]
+        recent = sorted(self.latencies_ms)
+        logger.info(
+            f"Exit cycle: {exited} exits, {exits.near_positions} near a threshold, {elapsed_ms:.0f} ms "
+            f"(last {len(recent)}: p50 {recent[len(recent) // 2]:.0f} ms, max {recent[-1]:.0f} ms)"
+        )
+        return exited
+
+    async def run(self) -> None:
+        await asyncio.to_thread(self.clients.warm_up)
+        token_refresh = asyncio.create_task(self.clients.keep_token_fresh())
+        try:
+            while True:
+                if self.schedule.is_open():
+                    try:
+                        await self.run_cycle()
+                    except Exception as e:
+                        logger.error(f"Error in exit automation: {e}")
+                else:
+                    logger.info(f"Market closed; next check at {self.schedule.next_open():%Y-%m-%d %H:%M %Z}")
+                near = self.exits.near_positions if self.exits is not None else 0
+                await asyncio.sleep(self.schedule.next_interval(near_positions=near))
+        finally:
+            token_refresh.cancel()
+
+
 async def run_exit_check():
     """Run the exit check once"""
     
@@ -350,23 +470,40 @@ async def run_exit_check():
         logger.error(f"Error in exit automation: {e}")
 
 
+async def run_streaming_exits(settings: Settings):
+    """Evaluate exits on live quotes until stopped (EXIT_MONITOR_MODE=stream)"""
+
+    try:
+        supabase = get_supabase_client(settings)
+    except Exception as e:
+        logger.error(f"Failed to initialize Supabase: {e}")
+        return
+
+    # Position refreshes read memory while notifications keep the cache current
+    cache = PositionCache(supabase, settings.positions_database_url, settings.exit_position_refresh_seconds)
+    cache.listen()
+    exit_automation = ExitAutomation(settings, supabase, PositionManager(supabase, cache))
+    monitor = StreamingExitMonitor(exit_automation, settings.exit_position_refresh_seconds)
+    await monitor.run()
+
+
 def main():
     """Run exit automation loop"""
-    
-    logger.info("Starting exit automation")
-    
-    # Run continuously, checking every 5 minutes
-    while True:
+
+    settings = Settings()
+    if settings.exit_monitor_mode == "stream":
+        logger.info("Starting exit automation (streaming quotes)")
         try:
-            asyncio.run(run_exit_check())
+            asyncio.run(run_streaming_exits(settings))
         except KeyboardInterrupt:
             logger.info("Shutting down")
-            break
-        except Exception as e:
-            logger.error(f"Unexpected error in main loop: {e}")
-        
-        # Sleep for 5 minutes (300 seconds)
-        time.sleep(300)
+        return
+
+    logger.info("Starting exit automation daemon")
+    try:
+        asyncio.run(ExitDaemon(settings).run())
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,271 @@
+"""
+Exit rules engine.
+
+Open positions are loaded into arrays once (PositionArrays) and every
+configured rule is evaluated over all of them in one vectorized pass; the
+first rule that fires for a position (in configured order) is its exit
+reason. Rules only see arrays, so the cost of a pass does not depend on
+per-position Python branching, and a new rule is one registered function.
+
+Rule set: EXIT_RULES, comma-separated `name` or `name:param`, in priority
+order (default "dte:21,profit_target,stop_loss", the original rules):
+
+- dte:N              N or fewer days to expiration ("21 DTE reached")
+- profit_target[:F]  profit >= the position's profit_target, or >= F x the
+                     entry credit when F is given ("50% profit target reached")
+- stop_loss[:F]      loss >= the position's stop_loss, or >= F x the entry
+                     credit when F is given ("Stop loss triggered")
+- delta:D            short leg |delta| >= D (default 0.50)
+- trailing_stop:F    profit fell more than F (default 0.50) below its peak;
+                     peaks are tracked per engine, i.e. per process
+- strike_distance:P  underlying within P (default 0.02) of the short strike
+
+Profit and loss are per share of the position: entry credit minus the cost
+to close. Missing inputs are NaN and never trigger a rule.
+"""
+
+import logging
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXIT_RULES = "dte:21,profit_target,stop_loss"
+# near(): a position is near a threshold when a cost-to-close move of this
+# fraction of the entry credit (either way), or one more day, would fire a rule
+NEAR_BAND = 0.20
+
+
+def _leg_field(leg, name):
+    return leg.get(name) if isinstance(leg, dict) else getattr(leg, name, None)
+
+
+def _number(value) -> float:
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def short_leg(position: Dict):
+    """The position's sold leg (first leg if none is sold)."""
+    legs = position.get("legs") or []
+    for leg in legs:
+        if str(_leg_field(leg, "action") or "").lower() == "sell":
+            return leg
+    return legs[0] if legs else None
+
+
+def _days_to_expiry(leg, now: datetime) -> float:
+    expiration = _leg_field(leg, "expiration") if leg is not None else None
+    if not expiration:
+        return np.nan
+    try:
+        parsed = datetime.fromisoformat(str(expiration).replace("Z", "+00:00"))
+    except ValueError:
+        return np.nan
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return float((parsed - now).days)
+
+
+@dataclass
+class PositionArrays:
+    """Rule inputs for n positions, one array entry per position."""
+    position_ids: np.ndarray
+    entry: np.ndarray
+    cost: np.ndarray
+    profit_target: np.ndarray
+    stop_loss: np.ndarray
+    dte: np.ndarray
+    short_strike: np.ndarray
+    short_is_call: np.ndarray
+    short_delta: np.ndarray
+    underlying: np.ndarray
+    peak_profit: np.ndarray
+
+    @property
+    def profit(self) -> np.ndarray:
+        return self.entry - self.cost
+
+    def __len__(self):
+        return len(self.position_ids)
+
+    @classmethod
+    def build(cls, positions: Sequence[Dict], costs: Sequence[Optional[float]],
+              deltas: Optional[Sequence[Optional[float]]] = None,
+              underlyings: Optional[Sequence[Optional[float]]] = None,
+              peaks: Optional[Sequence[Optional[float]]] = None,
+              now: Optional[datetime] = None) -> "PositionArrays":
+        now = now or datetime.utcnow()
+        n = len(positions)
+        shorts = [short_leg(position) for position in positions]
+
+        def column(values):
+            return np.array([_number(v) for v in values], dtype=float) if values is not None else np.full(n, np.nan)
+
+        return cls(
+            position_ids=np.array([p.get("position_id") for p in positions], dtype=object),
+            entry=column([p.get("entry_price") for p in positions]),
+            cost=column(costs),
+            profit_target=column([p.get("profit_target") for p in positions]),
+            stop_loss=column([p.get("stop_loss") for p in positions]),
+            dte=np.array([_days_to_expiry(leg, now) for leg in shorts], dtype=float),
+            short_strike=column([_leg_field(leg, "strike") if leg is not None else None for leg in shorts]),
+            short_is_call=np.array(
+                [str(_leg_field(leg, "option_type") or "").lower() == "call" if leg is not None else False
+                 for leg in shorts], dtype=bool,
+            ),
+            short_delta=np.abs(column(deltas)),
+            underlying=column(underlyings),
+            peak_profit=column(peaks),
+        )
+
+
+@dataclass
+class ExitRule:
+    name: str
+    reason: str
+    mask: Callable[[PositionArrays], np.ndarray]
+    # Optional inputs the rule reads ("delta", "underlying"); loaded only when configured
+    needs: frozenset = frozenset()
+
+
+RULES: Dict[str, Callable[[Optional[float]], ExitRule]] = {}
+
+
+def register_rule(name: str):
+    """Register a rule factory: factory(param or None) -> ExitRule."""
+    def decorator(factory):
+        RULES[name] = factory
+        return factory
+    return decorator
+
+
+@register_rule("dte")
+def _dte_rule(days: Optional[float]) -> ExitRule:
+    days = 21 if days is None else int(days)
+    return ExitRule("dte", f"{days} DTE reached", lambda a: a.dte <= days)
+
+
+@register_rule("profit_target")
+def _profit_target_rule(fraction: Optional[float]) -> ExitRule:
+    if fraction is None:
+        # profit_target column: 50% of the credit (PositionManager.PROFIT_TARGET_PERCENT)
+        return ExitRule("profit_target", "50% profit target reached",
+                        lambda a: (a.entry > 0) & (a.profit_target > 0) & (a.profit >= a.profit_target))
+    return ExitRule("profit_target", f"{fraction:.0%} profit target reached",
+                    lambda a: (a.entry > 0) & (a.profit >= fraction * a.entry))
+
+
+@register_rule("stop_loss")
+def _stop_loss_rule(fraction: Optional[float]) -> ExitRule:
+    if fraction is None:
+        return ExitRule("stop_loss", "Stop loss triggered",
+                        lambda a: (a.entry > 0) & (a.stop_loss > 0) & (-a.profit >= a.stop_loss))
+    return ExitRule("stop_loss", "Stop loss triggered",
+                    lambda a: (a.entry > 0) & (-a.profit >= fraction * a.entry))
+
+
+@register_rule("delta")
+def _delta_rule(limit: Optional[float]) -> ExitRule:
+    limit = 0.50 if limit is None else limit
+    return ExitRule("delta", f"Short delta above {limit:.2f}", lambda a: a.short_delta >= limit,
+                    frozenset({"delta"}))
+
+
+@register_rule("trailing_stop")
+def _trailing_stop_rule(giveback: Optional[float]) -> ExitRule:
+    giveback = 0.50 if giveback is None else giveback
+    return ExitRule("trailing_stop", f"Trailing stop ({giveback:.0%} of peak profit given back)",
+                    lambda a: (a.peak_profit > 0) & (a.profit < a.peak_profit * (1 - giveback)))
+
+
+@register_rule("strike_distance")
+def _strike_distance_rule(distance: Optional[float]) -> ExitRule:
+    distance = 0.02 if distance is None else distance
+
+    def mask(a: PositionArrays) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cushion = np.where(a.short_is_call, a.short_strike - a.underlying,
+                               a.underlying - a.short_strike) / a.underlying
+        return cushion <= distance
+
+    return ExitRule("strike_distance", f"Underlying within {distance:.0%} of short strike", mask,
+                    frozenset({"underlying"}))
+
+
+def parse_rules(spec: str) -> List[ExitRule]:
+    rules = []
+    for item in (part.strip() for part in (spec or "").split(",")):
+        if not item:
+            continue
+        name, _, param = item.partition(":")
+        if name not in RULES:
+            raise ValueError(f"Unknown exit rule '{name}' (known: {', '.join(sorted(RULES))})")
+        rules.append(RULES[name](float(param) if param else None))
+    return rules
+
+
+class ExitRulesEngine:
+    def __init__(self, rules: Optional[List[ExitRule]] = None):
+        self.rules = parse_rules(DEFAULT_EXIT_RULES) if rules is None else rules
+        self.peaks: Dict[int, float] = {}
+        self._reasons = np.array([rule.reason for rule in self.rules] + [None], dtype=object)
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "ExitRulesEngine":
+        return cls(parse_rules(spec))
+
+    @property
+    def needs(self) -> frozenset:
+        return frozenset().union(*(rule.needs for rule in self.rules))
+
+    def rule(self, name: str) -> ExitRule:
+        """The configured rule `name`, or the registry default when not configured."""
+        for rule in self.rules:
+            if rule.name == name:
+                return rule
+        return RULES[name](None)
+
+    def peaks_for(self, positions: Sequence[Dict]) -> List[Optional[float]]:
+        return [self.peaks.get(p.get("position_id")) for p in positions]
+
+    def _fired(self, arrays: PositionArrays) -> np.ndarray:
+        """(rules x positions) boolean matrix."""
+        return np.vstack([np.asarray(rule.mask(arrays), dtype=bool) for rule in self.rules])
+
+    def evaluate(self, arrays: PositionArrays) -> np.ndarray:
+        """Exit reason per position (None to hold), first firing rule wins."""
+        n = len(arrays)
+        if not n or not self.rules:
+            return np.full(n, None, dtype=object)
+        fired = self._fired(arrays)
+        # Rows past the last rule mean "no rule fired"
+        first = np.where(fired.any(axis=0), fired.argmax(axis=0), len(self.rules))
+        self._update_peaks(arrays)
+        return self._reasons[first]
+
+    def near(self, arrays: PositionArrays, band: float = NEAR_BAND) -> np.ndarray:
+        """Positions not exiting now that a small price move or one more day would exit."""
+        n = len(arrays)
+        if not n or not self.rules:
+            return np.zeros(n, dtype=bool)
+        now = self._fired(arrays).any(axis=0)
+        shift = band * np.abs(arrays.entry)
+        moved = [
+            replace(arrays, cost=arrays.cost + shift),
+            replace(arrays, cost=arrays.cost - shift),
+            replace(arrays, dte=arrays.dte - 1),
+        ]
+        return ~now & np.any([self._fired(m).any(axis=0) for m in moved], axis=0)
+
+    def _update_peaks(self, arrays: PositionArrays) -> None:
+        profit = arrays.profit
+        known = ~np.isnan(profit)
+        peaks = np.fmax(arrays.peak_profit, np.where(known, profit, np.nan))
+        for position_id, peak in zip(arrays.position_ids[known], peaks[known]):
+            self.peaks[position_id] = float(peak)
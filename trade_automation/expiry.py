@@ -0,0 +1,98 @@
+"""
+Approval expiry scheduling.
+
+Pending requests are kept in a min-heap keyed by their approval deadline
+(created_at + APPROVAL_TIMEOUT_MINUTES), so a tick only pops requests that
+are actually due instead of re-reading and re-parsing every request.
+
+- rebuild() loads every pending request once (at startup)
+- refresh() adds requests created since the last refresh (propose_trades
+  writes them from another process); the created_at watermark query only
+  returns recent rows, already scheduled ones are skipped
+- pop_due() returns the ids whose deadline has passed
+
+Requests approved or rejected before their deadline stay in the heap and
+are dropped when popped: the caller's compare-and-set to "rejected" only
+succeeds for requests that are still pending.
+"""
+
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Timeout for trade approval (5 minutes)
+APPROVAL_TIMEOUT_MINUTES = 5
+# refresh() re-reads this far behind the watermark, so a request committed
+# late by another process (created_at slightly older than the newest seen) is not missed
+REFRESH_SLACK = timedelta(seconds=60)
+
+
+def parse_created_at(created_at: str) -> Optional[datetime]:
+    """created_at as a naive UTC datetime (None if unparseable)."""
+    try:
+        created = datetime.fromisoformat((created_at or "").replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if created.tzinfo is not None:
+        created = (created - created.utcoffset()).replace(tzinfo=None)
+    return created
+
+
+class ExpiryScheduler:
+    def __init__(self, timeout_minutes: int = APPROVAL_TIMEOUT_MINUTES):
+        self.timeout = timedelta(minutes=timeout_minutes)
+        self._heap: List[Tuple[datetime, str]] = []
+        self._scheduled: Set[str] = set()
+        self._watermark: Optional[str] = None
+        self._loaded = False
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, request_id: str, created_at: str) -> bool:
+        if request_id in self._scheduled:
+            return False
+        created = parse_created_at(created_at)
+        if created is None:
+            logger.warning(f"Could not parse created_at '{created_at}' for {request_id}; it will not expire")
+            return False
+        heapq.heappush(self._heap, (created + self.timeout, request_id))
+        self._scheduled.add(request_id)
+        return True
+
+    def _load(self, requests) -> int:
+        added = sum(self.schedule(req["request_id"], req.get("created_at", "")) for req in requests)
+        if requests:
+            self._watermark = max(self._watermark or "", *(req.get("created_at") or "" for req in requests))
+        return added
+
+    def rebuild(self, store) -> int:
+        """Schedule every pending request in the store."""
+        self._heap, self._scheduled, self._watermark = [], set(), None
+        self._loaded = True
+        added = self._load(store.pending())
+        logger.info(f"Expiry scheduler tracking {added} pending requests")
+        return added
+
+    def refresh(self, store) -> int:
+        """Schedule pending requests created since the last load (rebuilds on first use)."""
+        if not self._loaded:
+            return self.rebuild(store)
+        watermark = parse_created_at(self._watermark) if self._watermark else None
+        since = (watermark - REFRESH_SLACK).isoformat() if watermark else None
+        return self._load(store.pending(created_since=since))
+
+    def next_deadline(self) -> Optional[datetime]:
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[datetime] = None) -> List[str]:
+        now = now or datetime.utcnow()
+        due = []
+        while self._heap and self._heap[0][0] < now:
+            _, request_id = heapq.heappop(self._heap)
+            self._scheduled.discard(request_id)
+            due.append(request_id)
+        return due
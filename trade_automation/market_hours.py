@@ -0,0 +1,88 @@
+"""
+Market-hours-aware check scheduling for the exit daemon.
+
+Regular US equity options session: 9:30-16:00 America/New_York, Monday to
+Friday, excluding MARKET_HOLIDAYS (ISO dates). Outside the session the
+daemon sleeps until the next open instead of checking every 5 minutes
+around the clock.
+
+Interval during the session (ExitSchedule.next_interval):
+- EXIT_EDGE_INTERVAL_SECONDS within EDGE_MINUTES of the open or the close
+- EXIT_NEAR_INTERVAL_SECONDS while any position is near an exit threshold
+  (see ExitRulesEngine.near)
+- EXIT_INTERVAL_SECONDS otherwise
+The sleep never runs past the close, so the last check of the day happens
+just before it.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional
+
+import pytz
+
+ET = pytz.timezone("America/New_York")
+SESSION_OPEN = time(9, 30)
+SESSION_CLOSE = time(16, 0)
+EDGE_MINUTES = 15
+# Last check this long before the close
+CLOSE_GUARD_SECONDS = 30
+
+
+class ExitSchedule:
+    def __init__(self, base_seconds: float = 300, edge_seconds: float = 60, near_seconds: float = 60,
+                 holidays: Iterable[str] = ()):
+        self.base_seconds = base_seconds
+        self.edge_seconds = edge_seconds
+        self.near_seconds = near_seconds
+        self.holidays = {date.fromisoformat(day) for day in holidays}
+
+    @classmethod
+    def from_settings(cls, settings) -> "ExitSchedule":
+        return cls(settings.exit_interval_seconds, settings.exit_edge_interval_seconds,
+                   settings.exit_near_interval_seconds, settings.market_holidays)
+
+    @staticmethod
+    def now() -> datetime:
+        return datetime.now(ET)
+
+    def _session(self, day: date):
+        return ET.localize(datetime.combine(day, SESSION_OPEN)), ET.localize(datetime.combine(day, SESSION_CLOSE))
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self.holidays
+
+    def is_open(self, now: Optional[datetime] = None) -> bool:
+        now = (now or self.now()).astimezone(ET)
+        if not self.is_trading_day(now.date()):
+            return False
+        session_open, session_close = self._session(now.date())
+        return session_open <= now < session_close
+
+    def next_open(self, now: Optional[datetime] = None) -> datetime:
+        now = (now or self.now()).astimezone(ET)
+        day = now.date()
+        while True:
+            if self.is_trading_day(day):
+                session_open, _ = self._session(day)
+                if session_open > now:
+                    return session_open
+            day += timedelta(days=1)
+
+    def next_interval(self, now: Optional[datetime] = None, near_positions: int = 0) -> float:
+        """Seconds until the next check."""
+        now = (now or self.now()).astimezone(ET)
+        if not self.is_open(now):
+            return max((self.next_open(now) - now).total_seconds(), 0.0)
+
+        session_open, session_close = self._session(now.date())
+        edge = timedelta(minutes=EDGE_MINUTES)
+        interval = self.base_seconds
+        if near_positions:
+            interval = min(interval, self.near_seconds)
+        if now - session_open < edge or session_close - now < edge:
+            interval = min(interval, self.edge_seconds)
+
+        until_close = (session_close - now).total_seconds() - CLOSE_GUARD_SECONDS
+        if until_close > 0:
+            interval = min(interval, until_close)
+        return max(interval, 1.0)
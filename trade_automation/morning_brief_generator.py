@@ -144,7 +144,7 @@ class MorningBriefGenerator:
         """Fetch top 3 trading opportunities from database"""
 
         try:
-            response = self.supabase.table("options_opportunities").select(
+            response = self.supabase.table(self.settings.opportunities_table).select(
                 "ticker,strategy_type,strike_price,delta,net_credit,expiry_date,collateral_required"
             ).order("net_credit", desc=True).limit(3).execute()
 
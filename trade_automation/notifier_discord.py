@@ -8,6 +8,8 @@ class DiscordNotifier:
     def __init__(self, settings: Settings):
         self.settings = settings
         self.base_url = "https://discord.com/api/v10"
+        # One pooled session for the notifier's lifetime (keep-alive connections)
+        self.http = requests.Session()
 
     def is_configured(self) -> bool:
         return bool(self.settings.discord_bot_token and self.settings.discord_channel_id)
@@ -18,7 +20,7 @@ class DiscordNotifier:
     def send_message(self, text: str) -> None:
         if not self.is_configured():
             return
-        requests.post(
+        self.http.post(
             f"{self.base_url}/channels/{self.settings.discord_channel_id}/messages",
             json={"content": text},
             headers=self._headers(),
@@ -28,7 +30,7 @@ class DiscordNotifier:
     def get_messages(self, limit: int = 50) -> List[Dict[str, Any]]:
         if not self.is_configured():
             return []
-        response = requests.get(
+        response = self.http.get(
             f"{self.base_url}/channels/{self.settings.discord_channel_id}/messages",
             params={"limit": limit},
             headers=self._headers(),
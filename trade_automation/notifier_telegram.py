@@ -8,6 +8,8 @@ class TelegramNotifier:
     def __init__(self, settings: Settings):
         self.settings = settings
         self.base_url = f"https://api.telegram.org/bot{settings.telegram_bot_token}"
+        # One pooled session for the notifier's lifetime (keep-alive connections)
+        self.http = requests.Session()
 
     def is_configured(self) -> bool:
         return bool(self.settings.telegram_bot_token and self.settings.telegram_chat_id)
@@ -15,7 +17,7 @@ class TelegramNotifier:
     def send_message(self, text: str) -> Optional[Dict[str, Any]]:
         if not self.is_configured():
             return None
-        response = requests.post(
+        response = self.http.post(
             f"{self.base_url}/sendMessage",
             json={"chat_id": self.settings.telegram_chat_id, "text": text},
             timeout=15,
@@ -73,7 +75,7 @@ class TelegramNotifier:
             ]
         }
 
-        response = requests.post(
+        response = self.http.post(
             f"{self.base_url}/sendMessage",
             json={
                 "chat_id": self.settings.telegram_chat_id,
@@ -110,7 +112,7 @@ class TelegramNotifier:
         if reply_markup:
             payload["reply_markup"] = reply_markup
 
-        response = requests.post(
+        response = self.http.post(
             f"{self.base_url}/editMessageText",
             json=payload,
             timeout=15,
@@ -126,26 +128,44 @@ class TelegramNotifier:
         if text:
             payload["text"] = text
 
-        response = requests.post(
+        response = self.http.post(
             f"{self.base_url}/answerCallbackQuery",
             json=payload,
             timeout=15,
         )
         return response.ok
 
-    def get_updates(self, offset: int) -> List[Dict[str, Any]]:
+    def get_updates(self, offset: int, timeout: int = 10) -> List[Dict[str, Any]]:
+        """Long-poll: returns as soon as an update arrives, or empty after `timeout` seconds."""
         if not self.is_configured():
             return []
-        response = requests.get(
+        response = self.http.get(
             f"{self.base_url}/getUpdates",
-            params={"timeout": 10, "offset": offset},
-            timeout=20,
+            params={"timeout": timeout, "offset": offset},
+            timeout=timeout + 10,
         )
         if not response.ok:
             return []
         data = response.json()
         return data.get("result", [])
 
+    def set_webhook(self, url: str, secret_token: str = "") -> bool:
+        """Have Telegram push updates to `url` (getUpdates stops working while set)."""
+        if not self.is_configured():
+            return False
+        payload = {"url": url, "allowed_updates": ["message", "callback_query"]}
+        if secret_token:
+            payload["secret_token"] = secret_token
+        response = self.http.post(f"{self.base_url}/setWebhook", json=payload, timeout=15)
+        return response.ok
+
+    def delete_webhook(self) -> bool:
+        """Switch back to getUpdates polling."""
+        if not self.is_configured():
+            return False
+        response = self.http.post(f"{self.base_url}/deleteWebhook", timeout=15)
+        return response.ok
+
     def get_callback_queries(self, offset: int) -> List[Dict[str, Any]]:
         """Get updates and filter for callback queries (button clicks)."""
         updates = self.get_updates(offset)
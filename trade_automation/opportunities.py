@@ -1,10 +1,13 @@
 import hashlib
-from typing import List, Optional, Dict, Any
+import logging
+from typing import List, Optional, Dict, Any, Tuple
 
 from trade_automation.models import TradeRequest, OptionLeg
 from trade_automation.supabase_client import get_supabase_client
 from trade_automation.config import Settings
 
+logger = logging.getLogger(__name__)
+
 
 def _hash_id(parts: List[str]) -> str:
     joined = "|".join(parts)
@@ -35,7 +38,119 @@ def get_latest_option_contract(supabase, symbol: str, expiration: str, strike: f
     return None
 
 
-def build_trade_request(opportunity: Dict[str, Any], supabase, settings: Settings) -> Optional[TradeRequest]:
+# Legs per strategy: (action, strike, option_type, contract id stored by the generator)
+LegSpec = Tuple[str, float, str, Optional[str]]
+
+
+def _leg_specs(opportunity: Dict[str, Any]) -> Optional[List[LegSpec]]:
+    strategy_type = (opportunity.get("strategy_type") or "").upper()
+    strike_price = _format_strike(opportunity.get("strike_price"))
+    width = opportunity.get("width")
+    if strategy_type == "CSP":
+        return [("Sell", strike_price, "put", opportunity.get("short_contractid"))]
+    if strategy_type == "VPC":
+        if not width:
+            return None
+        return [
+            ("Sell", strike_price, "put", opportunity.get("short_contractid")),
+            ("Buy", strike_price - float(width), "put", opportunity.get("long_contractid")),
+        ]
+    return None
+
+
+class ContractResolver:
+    """
+    Resolves option legs to contract ids from one bulk options_quotes query
+    (plus one for the latest quote date) instead of one `order by quote_date
+    desc limit 1` lookup per leg.
+
+    load() collects every (symbol, expiration, strike, type) key the
+    opportunities need (skipping legs that already carry a contract id) and
+    indexes their contracts from the latest quote date only, so the lookup
+    does not page through every historical day. Keys not quoted that day
+    fall back to a single lookup each.
+    """
+
+    PAGE_SIZE = 1000
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self._index: Dict[Tuple, Optional[str]] = {}
+
+    @staticmethod
+    def key(symbol: str, expiration: str, strike: float, option_type: str) -> Tuple:
+        return (symbol, str(expiration)[:10], round(float(strike), 2), option_type.lower())
+
+    def load(self, opportunities: List[Dict[str, Any]]) -> int:
+        """Index every needed leg; returns the number of keys resolved."""
+        keys = set()
+        for opp in opportunities:
+            if not opp.get("ticker") or not opp.get("expiration_date"):
+                continue
+            for _, strike, option_type, stored in _leg_specs(opp) or []:
+                if not stored and strike:
+                    keys.add(self.key(opp["ticker"], opp["expiration_date"], strike, option_type))
+        keys -= set(self._index)
+        if not keys:
+            return 0
+
+        try:
+            rows = self._fetch(keys)
+        except Exception as e:
+            logger.warning(f"Bulk contract lookup failed, resolving legs one by one: {e}")
+            return 0
+        for row in rows:
+            try:
+                key = self.key(row["symbol"], row["expiration"], row["strike"], row["type"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if key in keys and key not in self._index:
+                self._index[key] = row["contractid"]
+        # Unresolved keys are left out of the index: resolve() looks them up one by one
+        resolved = sum(1 for key in keys if key in self._index)
+        logger.info(f"Resolved {resolved}/{len(keys)} option legs in one lookup")
+        return resolved
+
+    def _fetch(self, keys) -> List[Dict[str, Any]]:
+        latest = (
+            self.supabase.table("options_quotes")
+            .select("quote_date")
+            .order("quote_date", desc=True)
+            .limit(1)
+            .execute()
+        ).data
+        if not latest:
+            return []
+        symbols, expirations, strikes, types = (sorted({key[i] for key in keys}) for i in range(4))
+        rows = []
+        offset = 0
+        while True:
+            data = (
+                self.supabase.table("options_quotes")
+                .select("contractid, symbol, expiration, strike, type, quote_date")
+                .eq("quote_date", latest[0]["quote_date"])
+                .in_("symbol", symbols)
+                .in_("expiration", expirations)
+                .in_("strike", strikes)
+                .in_("type", types)
+                .order("contractid")
+                .range(offset, offset + self.PAGE_SIZE - 1)
+                .execute()
+            ).data or []
+            rows.extend(data)
+            if len(data) < self.PAGE_SIZE:
+                return rows
+            offset += self.PAGE_SIZE
+
+    def resolve(self, symbol: str, expiration: str, strike: float, option_type: str) -> Optional[str]:
+        key = self.key(symbol, expiration, strike, option_type)
+        if key not in self._index:
+            self._index[key] = get_latest_option_contract(self.supabase, symbol, expiration, strike, option_type)
+        return self._index[key]
+
+
+def build_trade_request(opportunity: Dict[str, Any], supabase, settings: Settings,
+                        resolver: Optional[ContractResolver] = None) -> Optional[TradeRequest]:
     ticker = opportunity.get("ticker")
     strategy_type = (opportunity.get("strategy_type") or "").upper()
     expiration = opportunity.get("expiration_date")
@@ -54,52 +169,28 @@ def build_trade_request(opportunity: Dict[str, Any], supabase, settings: Setting
         str(width or "")
     ])
 
+    specs = _leg_specs(opportunity)
+    if not specs:
+        return None
+
     legs: List[OptionLeg] = []
-    if strategy_type == "CSP":
-        contractid = get_latest_option_contract(
-            supabase, ticker, expiration, strike_price, "put"
-        )
+    for action, strike, option_type, contractid in specs:
+        # Contract ids stored by the generator need no lookup at all
+        if not contractid:
+            if resolver is not None:
+                contractid = resolver.resolve(ticker, expiration, strike, option_type)
+            else:
+                contractid = get_latest_option_contract(supabase, ticker, expiration, strike, option_type)
         if not contractid:
             return None
         legs.append(OptionLeg(
             contractid=contractid,
-            action="Sell",
+            action=action,
             quantity=settings.default_quantity,
-            option_type="put",
-            strike=strike_price,
+            option_type=option_type,
+            strike=strike,
             expiration=str(expiration),
         ))
-    elif strategy_type == "VPC":
-        if not width:
-            return None
-        short_strike = strike_price
-        long_strike = strike_price - float(width)
-        short_contract = get_latest_option_contract(
-            supabase, ticker, expiration, short_strike, "put"
-        )
-        long_contract = get_latest_option_contract(
-            supabase, ticker, expiration, long_strike, "put"
-        )
-        if not short_contract or not long_contract:
-            return None
-        legs.append(OptionLeg(
-            contractid=short_contract,
-            action="Sell",
-            quantity=settings.default_quantity,
-            option_type="put",
-            strike=short_strike,
-            expiration=str(expiration),
-        ))
-        legs.append(OptionLeg(
-            contractid=long_contract,
-            action="Buy",
-            quantity=settings.default_quantity,
-            option_type="put",
-            strike=long_strike,
-            expiration=str(expiration),
-        ))
-    else:
-        return None
 
     return TradeRequest(
         request_id=request_id,
@@ -117,33 +208,108 @@ def build_trade_request(opportunity: Dict[str, Any], supabase, settings: Setting
     )
 
 
+# Columns proposals, allocation and ranking read (instead of select("*"))
+OPPORTUNITY_COLUMNS = ", ".join([
+    "opportunity_id", "ticker", "strategy_type", "expiration_date", "strike_price", "width",
+    "net_credit", "collateral", "return_pct", "annualized_return",
+    "trade_score", "trade_score_points", "expected_value", "prob_profit",
+    "short_contractid", "long_contractid",
+])
+
+
+def _passes(opp: Dict[str, Any], min_return_pct: float, max_collateral: float, strategy_set) -> bool:
+    return_pct = float(opp.get("return_pct") or 0)
+    collateral = float(opp.get("collateral") or 0)
+    strategy = (opp.get("strategy_type") or "").upper()
+
+    if strategy_set and strategy not in strategy_set:
+        return False
+    if min_return_pct and return_pct < min_return_pct:
+        return False
+    if max_collateral and collateral > max_collateral:
+        return False
+    return True
+
+
+def query_opportunities(
+    supabase,
+    table: str,
+    limit: int,
+    min_return_pct: float = 0,
+    max_collateral: float = 0,
+    strategy_types: Optional[List[str]] = None,
+    columns: str = OPPORTUNITY_COLUMNS,
+) -> List[Dict[str, Any]]:
+    """
+    Top `limit` opportunities by return_pct that pass the filters.
+
+    Filters run in the query and only `columns` are transferred. Pages
+    continue from a (return_pct, opportunity_id) keyset cursor until
+    `limit` rows pass, which is normally a single round trip. Without a
+    min_return_pct every row is eligible, as before the filters moved into
+    the query; rows with a NULL return_pct sort last instead of first.
+    """
+    strategy_set = {s.upper() for s in (strategy_types or [])}
+    results: List[Dict[str, Any]] = []
+    cursor = None
+
+    while len(results) < limit:
+        wanted = limit - len(results)
+        query = supabase.table(table).select(columns)
+        if min_return_pct:
+            query = query.gte("return_pct", min_return_pct)
+        if strategy_set:
+            query = query.in_("strategy_type", sorted(strategy_set))
+        if max_collateral:
+            query = query.lte("collateral", max_collateral)
+        if cursor is not None:
+            last_return, last_id = cursor
+            if last_return is None:
+                # Already into the NULL returns at the end of the order
+                query = query.is_("return_pct", "null")
+                if last_id is not None:
+                    query = query.lt("opportunity_id", last_id)
+            elif last_id is None:
+                query = query.lt("return_pct", last_return)
+            else:
+                after = f"return_pct.lt.{last_return},and(return_pct.eq.{last_return},opportunity_id.lt.{last_id})"
+                if not min_return_pct:
+                    after += ",return_pct.is.null"
+                query = query.or_(after)
+        rows = (
+            query.order("return_pct", desc=True, nullsfirst=False)
+            .order("opportunity_id", desc=True)
+            .limit(wanted)
+            .execute()
+        ).data or []
+
+        results.extend(opp for opp in rows if _passes(opp, min_return_pct, max_collateral, strategy_set))
+        if len(rows) < wanted:
+            break
+        cursor = (rows[-1].get("return_pct"), rows[-1].get("opportunity_id"))
+
+    return results[:limit]
+
+
 def fetch_opportunities(settings: Settings) -> List[Dict[str, Any]]:
+    """Candidate pool for allocation (allocate() trims it to opportunities_limit)."""
     supabase = get_supabase_client(settings)
-    response = (
-        supabase.table(settings.opportunities_table)
-        .select("*")
-        .order("return_pct", desc=True)
-        .limit(settings.opportunities_limit)
-        .execute()
+    return query_opportunities(
+        supabase,
+        settings.opportunities_table,
+        limit=max(settings.opportunities_limit, settings.allocation_candidates),
+        min_return_pct=settings.min_return_pct,
+        max_collateral=settings.max_collateral,
+        strategy_types=settings.strategy_types,
     )
-    return response.data or []
 
 
 def filter_opportunities(opportunities: List[Dict[str, Any]], settings: Settings) -> List[Dict[str, Any]]:
-    filtered = []
-    for opp in opportunities:
-        return_pct = float(opp.get("return_pct") or 0)
-        collateral = float(opp.get("collateral") or 0)
-        strategy = (opp.get("strategy_type") or "").upper()
-
-        if settings.strategy_types and strategy not in {s.upper() for s in settings.strategy_types}:
-            continue
-        if settings.min_return_pct and return_pct < settings.min_return_pct:
-            continue
-        if settings.max_collateral and collateral > settings.max_collateral:
-            continue
-        filtered.append(opp)
-    return filtered
+    strategy_set = {s.upper() for s in settings.strategy_types}
+    return [
+        opp for opp in opportunities
+        if _passes(opp, settings.min_return_pct, settings.max_collateral, strategy_set)
+    ]
 
 
 class OpportunitiesFetcher:
@@ -163,30 +329,14 @@ class OpportunitiesFetcher:
         min_return_pct: float = 0,
         max_collateral: float = 0,
         strategy_types: Optional[List[str]] = None,
+        columns: str = OPPORTUNITY_COLUMNS,
     ) -> List[Dict[str, Any]]:
-        response = (
-            self.supabase.table(self.settings.opportunities_table)
-            .select("*")
-            .order("return_pct", desc=True)
-            .limit(limit)
-            .execute()
+        return query_opportunities(
+            self.supabase,
+            self.settings.opportunities_table,
+            limit=limit,
+            min_return_pct=min_return_pct,
+            max_collateral=max_collateral,
+            strategy_types=strategy_types,
+            columns=columns,
         )
-        opportunities = response.data or []
-
-        filtered: List[Dict[str, Any]] = []
-        strategy_set = {s.upper() for s in (strategy_types or [])}
-
-        for opp in opportunities:
-            return_pct = float(opp.get("return_pct") or 0)
-            collateral = float(opp.get("collateral") or 0)
-            strategy = (opp.get("strategy_type") or "").upper()
-
-            if strategy_set and strategy not in strategy_set:
-                continue
-            if min_return_pct and return_pct < min_return_pct:
-                continue
-            if max_collateral and collateral > max_collateral:
-                continue
-            filtered.append(opp)
-
-        return filtered
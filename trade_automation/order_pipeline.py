@@ -0,0 +1,155 @@
+"""
+Order execution pipeline for approved trade requests.
+
+Approvals from one command batch are submitted concurrently (at most
+ORDER_CONCURRENCY orders in flight), so one slow order no longer delays the
+approvals behind it. Positions for the filled orders are then written with a
+single insert.
+
+Idempotency: every request gets a key derived from its request_id. Before
+submission the request is claimed with a compare-and-set from "approved"
+to "submitting" that also records the key, so a retried batch, a duplicate
+approval or a restarted worker can never submit the same request twice. A
+request left in "submitting" (e.g. the process died mid-order) is not
+resubmitted automatically and needs checking against the broker.
+TradeStation's order API has no documented idempotency header, so the key
+is enforced here and stored with the request and the position's
+execution data rather than sent to the broker.
+
+Submit latency is measured per order and logged per batch. With a tracker
+(order_tracker.py) the broker order ids of every recorded position are
+handed over, so the quoted entry price is replaced by the actual fill.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from trade_automation.models import TradeRequest
+from trade_automation.store import RequestStore
+from trade_automation.tradestation import order_ids
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 4
+
+
+def idempotency_key(request_id: str) -> str:
+    """Stable key for a request's order: the same request always maps to the same key."""
+    return "om-" + hashlib.sha256(request_id.encode()).hexdigest()[:24]
+
+
+@dataclass
+class OrderResult:
+    request: Dict[str, Any]
+    trade: TradeRequest
+    order_key: str
+    response: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    submit_ms: float = 0.0
+    submitted_at: float = 0.0
+    position: Optional[Dict[str, Any]] = None
+    position_error: Optional[str] = None
+
+    @property
+    def request_id(self) -> str:
+        return self.request["request_id"]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and bool(self.response.get("ok") or self.response.get("dry_run"))
+
+
+class OrderPipeline:
+    def __init__(self, trader, position_manager, store: RequestStore,
+                 max_concurrency: int = DEFAULT_CONCURRENCY, tracker=None):
+        self.trader = trader
+        self.position_manager = position_manager
+        self.store = store
+        self.max_concurrency = max(1, max_concurrency)
+        self.tracker = tracker
+
+    def _claim(self, request: Dict[str, Any], trade: TradeRequest) -> Optional[OrderResult]:
+        request_id = request["request_id"]
+        if not self.store.set_status(request_id, "submitting", expected_status="approved"):
+            logger.warning(f"Order for {request_id} already claimed, not resubmitting")
+            return None
+        key = idempotency_key(request_id)
+        self.store.update(request_id, order_key=key)
+        return OrderResult(request=request, trade=trade, order_key=key)
+
+    async def _submit(self, order: OrderResult, slots: asyncio.Semaphore) -> None:
+        async with slots:
+            started = time.perf_counter()
+            order.submitted_at = time.time()
+            try:
+                order.response = await asyncio.to_thread(self.trader.place_order, order.trade) or {}
+            except Exception as exc:
+                order.error = str(exc)
+            order.submit_ms = (time.perf_counter() - started) * 1000
+
+    async def _record_positions(self, filled: List[OrderResult]) -> None:
+        if not filled:
+            return
+        entries = [
+            (
+                order.trade,
+                order.response.get("execution_price", order.request.get("net_credit", 0)),
+                int(order.request.get("quantity", 1)),
+                {
+                    **order.response,
+                    "order_key": order.order_key,
+                    "order_ids": order_ids(order.response),
+                    "submitted_at": datetime.fromtimestamp(order.submitted_at, timezone.utc).isoformat(),
+                    "submit_ms": round(order.submit_ms, 1),
+                },
+            )
+            for order in filled
+        ]
+        try:
+            positions = await self.position_manager.create_positions(entries)
+        except Exception as exc:
+            logger.error(f"Failed to create positions for {len(filled)} orders: {exc}")
+            for order in filled:
+                order.position_error = str(exc)
+            return
+        for order, position in zip(filled, positions):
+            order.position = position
+            if self.tracker is not None:
+                self.tracker.track(position["position_id"], order_ids(order.response), order.submitted_at,
+                                   position.get("strategy_type"))
+
+    def _finish(self, order: OrderResult) -> None:
+        self.store.update(order.request_id, submit_ms=round(order.submit_ms, 1))
+        if order.ok:
+            self.store.set_status(order.request_id, "executed")
+        else:
+            self.store.set_status(order.request_id, "failed", notes=order.error or str(order.response))
+
+    async def run(self, approved: List[Tuple[Dict[str, Any], TradeRequest]]) -> List[OrderResult]:
+        orders = [order for order in (self._claim(req, trade) for req, trade in approved) if order]
+        if not orders:
+            return []
+
+        slots = asyncio.Semaphore(self.max_concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*(self._submit(order, slots) for order in orders))
+        for order in orders:
+            self._finish(order)
+        await self._record_positions([order for order in orders if order.ok])
+
+        latencies = sorted(order.submit_ms for order in orders)
+        logger.info(
+            f"Submitted {len(orders)} orders in {(time.perf_counter() - started) * 1000:.0f} ms "
+            f"(per order p50 {latencies[len(latencies) // 2]:.0f} ms, max {latencies[-1]:.0f} ms; "
+            f"{sum(order.ok for order in orders)} ok)"
+        )
+        return orders
+
+    def execute(self, approved: List[Tuple[Dict[str, Any], TradeRequest]]) -> List[OrderResult]:
+        """Synchronous entry point (called from the worker's handler thread)."""
+        return asyncio.run(self.run(approved))
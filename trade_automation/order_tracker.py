@@ -0,0 +1,278 @@
+"""
+Order fill tracking for executed trades.
+
+A position is written as soon as its order is accepted, with the quoted
+credit as entry price. The tracker then follows the broker's order status
+and writes what actually happened to the position:
+
+- fill_price / filled_quantity / filled_at as fills arrive (partial fills
+  included); once anything is filled, entry_price and quantity are replaced
+  by the fill, so P&L (exit_automation, close_position) is computed from the
+  real fill, and the credit-based profit_target / stop_loss are recomputed
+  from it. The quoted credit stays in quoted_price.
+- order_status: WORKING (exit checks skip the position, see awaiting_fill),
+  PARTIAL, FILLED (terminal, possibly partially filled) or CANCELLED
+  (terminal with nothing filled; the position status becomes CANCELLED so
+  exits never try to close it)
+- fill_latency_ms: submission to observed fill confirmation
+
+All tracked orders are fetched with one order-status request per poll.
+Polling backs off from FILL_POLL_MIN_SECONDS to FILL_POLL_MAX_SECONDS while
+nothing changes and resets on a new order or fill; with nothing to track
+the tracker sleeps until an order is registered. Orders still working when
+the process stopped are reloaded from `positions` on start. Updates are
+also applied to the position cache when one is given (position_cache.py).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from trade_automation.position_manager import fill_thresholds
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_INTERVAL = 1.0
+DEFAULT_MAX_INTERVAL = 30.0
+# TradeStation accepts up to 50 order ids per status request
+MAX_ORDERS_PER_REQUEST = 50
+
+FILLED_CODES = {"FLL", "FLP"}
+DEAD_CODES = {"CAN", "EXP", "OUT", "REJ", "RJC", "UCN", "BRO", "TSC", "SCN"}
+OPEN_STATES = ("WORKING", "PARTIAL")
+
+
+def awaiting_fill(position: Dict[str, Any]) -> bool:
+    """True while nothing of the position's entry order has filled yet."""
+    return position.get("order_status") == "WORKING"
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _epoch(timestamp: Optional[str]) -> Optional[float]:
+    try:
+        parsed = datetime.fromisoformat((timestamp or "").replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+@dataclass
+class OrderFill:
+    """Fill state of one broker order, per unit of the order (spread or contract)."""
+    order_id: str
+    status: str
+    ordered: int = 0
+    filled: int = 0
+    price: Optional[float] = None
+    filled_at: Optional[str] = None
+
+    @property
+    def terminal(self) -> bool:
+        return self.status in FILLED_CODES or self.status in DEAD_CODES
+
+
+def parse_order(order: Dict[str, Any]) -> OrderFill:
+    """
+    Fill state of a TradeStation order. Multi-leg orders count filled spreads
+    (the least-filled leg by ratio); the price is the net credit per unit from
+    the leg execution prices (sells positive), falling back to FilledPrice.
+    """
+    legs = order.get("Legs") or []
+    ordered = [_float(leg.get("QuantityOrdered")) for leg in legs]
+    base = min((q for q in ordered if q > 0), default=0)
+    filled, price = 0, None
+    if base:
+        ratios = [q / base for q in ordered]
+        filled = int(min(_float(leg.get("ExecQuantity")) / ratio for leg, ratio in zip(legs, ratios) if ratio))
+        if filled and all(leg.get("ExecutionPrice") not in (None, "") for leg in legs):
+            price = sum(
+                _float(leg["ExecutionPrice"]) * ratio * (1 if str(leg.get("BuyOrSell", "")).lower().startswith("sell") else -1)
+                for leg, ratio in zip(legs, ratios)
+            )
+    if filled and price is None and order.get("FilledPrice") not in (None, ""):
+        price = abs(_float(order["FilledPrice"]))
+    return OrderFill(
+        order_id=str(order.get("OrderID", "")),
+        status=str(order.get("Status", "")).upper(),
+        ordered=int(base),
+        filled=filled,
+        price=round(price, 4) if price is not None else None,
+        filled_at=order.get("ClosedDateTime") or None,
+    )
+
+
+@dataclass
+class TrackedPosition:
+    position_id: int
+    order_ids: List[str]
+    submitted_at: float
+    state: str = "WORKING"
+    filled: int = 0
+    fills: Dict[str, OrderFill] = field(default_factory=dict)
+    strategy_type: Optional[str] = None
+
+    def summary(self) -> Dict[str, Any]:
+        """Aggregate state over the position's orders."""
+        fills = [self.fills[oid] for oid in self.order_ids if oid in self.fills]
+        filled = sum(f.filled for f in fills)
+        priced = [f for f in fills if f.filled and f.price is not None]
+        price = (sum(f.price * f.filled for f in priced) / sum(f.filled for f in priced)) if priced else None
+        done = len(fills) == len(self.order_ids) and all(f.terminal for f in fills)
+        if done:
+            state = "FILLED" if filled else "CANCELLED"
+        else:
+            state = "PARTIAL" if filled else "WORKING"
+        filled_at = max((f.filled_at for f in fills if f.filled and f.filled_at), default=None)
+        return {"state": state, "filled": filled, "price": price, "filled_at": filled_at,
+                "status": ",".join(f.status for f in fills)}
+
+
+class OrderTracker:
+    def __init__(self, trader, supabase, min_interval: float = DEFAULT_MIN_INTERVAL,
+                 max_interval: float = DEFAULT_MAX_INTERVAL, cache=None):
+        self.trader = trader
+        self.supabase = supabase
+        self.cache = cache
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.latencies_ms: List[float] = []
+        self._tracked: Dict[int, TrackedPosition] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def __len__(self):
+        return len(self._tracked)
+
+    def track(self, position_id: int, order_ids: List[str], submitted_at: Optional[float] = None,
+              strategy_type: Optional[str] = None) -> None:
+        """Follow a position's orders; safe to call from any thread."""
+        if not order_ids:
+            return
+        with self._lock:
+            self._tracked[position_id] = TrackedPosition(
+                position_id, [str(oid) for oid in order_ids], submitted_at or time.time(),
+                strategy_type=strategy_type,
+            )
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def load_open(self) -> int:
+        """Resume positions whose orders were still working when the process stopped."""
+        response = (
+            self.supabase.table("positions")
+            .select("position_id,order_ids,submitted_at,strategy_type")
+            .in_("order_status", list(OPEN_STATES))
+            .execute()
+        )
+        rows = response.data or []
+        for row in rows:
+            self.track(row["position_id"], row.get("order_ids") or [], _epoch(row.get("submitted_at")),
+                       row.get("strategy_type"))
+        if rows:
+            logger.info(f"Resumed fill tracking for {len(rows)} positions")
+        return len(rows)
+
+    def _fetch(self, order_ids: List[str]) -> Dict[str, OrderFill]:
+        fills = {}
+        for start in range(0, len(order_ids), MAX_ORDERS_PER_REQUEST):
+            for order in self.trader.get_orders(order_ids[start:start + MAX_ORDERS_PER_REQUEST]):
+                fill = parse_order(order)
+                fills[fill.order_id] = fill
+        return fills
+
+    def _position_update(self, tracked: TrackedPosition, summary: Dict[str, Any], observed_at: float) -> Dict:
+        update = {
+            "order_status": summary["state"],
+            "filled_quantity": summary["filled"],
+            "last_updated": datetime.utcnow().isoformat(),
+        }
+        if summary["filled"]:
+            update.update({
+                "fill_price": summary["price"],
+                "filled_at": summary["filled_at"] or datetime.fromtimestamp(observed_at, timezone.utc).isoformat(),
+                "quantity": summary["filled"],
+            })
+            if summary["price"] is not None:
+                update["entry_price"] = round(summary["price"], 2)
+                update.update(fill_thresholds(tracked.strategy_type, update["entry_price"]))
+        if summary["state"] == "FILLED":
+            latency_ms = round((observed_at - tracked.submitted_at) * 1000, 1)
+            update["fill_latency_ms"] = latency_ms
+            self.latencies_ms.append(latency_ms)
+        elif summary["state"] == "CANCELLED":
+            update["status"] = "CANCELLED"
+            update["notes"] = f"Order {','.join(tracked.order_ids)} ended unfilled ({summary['status']})"
+        return update
+
+    def poll_once(self) -> int:
+        """Fetch every tracked order once and write changed fills; returns positions updated."""
+        with self._lock:
+            tracked = list(self._tracked.values())
+        if not tracked:
+            return 0
+
+        fills = self._fetch([oid for position in tracked for oid in position.order_ids])
+        observed_at = time.time()
+        changed = 0
+        for position in tracked:
+            position.fills.update({oid: fills[oid] for oid in position.order_ids if oid in fills})
+            summary = position.summary()
+            if summary["state"] == position.state and summary["filled"] == position.filled:
+                continue
+            update = self._position_update(position, summary, observed_at)
+            self.supabase.table("positions").update(update).eq("position_id", position.position_id).execute()
+            if self.cache is not None:
+                self.cache.update(position.position_id, update)
+            position.state, position.filled = summary["state"], summary["filled"]
+            changed += 1
+            logger.info(
+                f"Position {position.position_id}: {summary['state']} {summary['filled']} @ {summary['price']}"
+                + (f" ({update['fill_latency_ms']:.0f} ms after submit)" if "fill_latency_ms" in update else "")
+            )
+            if summary["state"] not in OPEN_STATES:
+                with self._lock:
+                    if self._tracked.get(position.position_id) is position:
+                        del self._tracked[position.position_id]
+        return changed
+
+    async def run(self) -> None:
+        """Track fills forever: poll with backoff while orders are working, idle otherwise."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        try:
+            await asyncio.to_thread(self.load_open)
+        except Exception as e:
+            logger.error(f"Could not load working orders: {e}")
+
+        interval = self.min_interval
+        while True:
+            if not self._tracked:
+                await self._wake.wait()
+                interval = self.min_interval
+            self._wake.clear()
+            try:
+                changed = await asyncio.to_thread(self.poll_once)
+            except Exception as e:
+                logger.warning(f"Order status poll failed: {e}")
+                changed = 0
+            if changed:
+                interval = self.min_interval
+            try:
+                # A newly tracked order cuts the backoff short
+                await asyncio.wait_for(self._wake.wait(), timeout=interval)
+                interval = self.min_interval
+            except asyncio.TimeoutError:
+                interval = min(interval * 2, self.max_interval)
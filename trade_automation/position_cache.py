@@ -0,0 +1,238 @@
+"""
+Write-through cache of open positions.
+
+Exit checks, the approval worker, scorecards and proposal sizing all read
+open positions, each with its own `positions` query, and close_position
+re-read a row its caller already held. PositionCache loads the open
+positions once and serves reads from memory:
+
+- writes made through PositionManager / OrderTracker go to the database and
+  are applied to the cache with the row (or fields) written
+- changes made by other processes arrive as Postgres notifications on
+  NOTIFY_CHANNEL (trigger in database/ddl/011_positions_notify.sql); a
+  listener thread applies them when POSITIONS_DATABASE_URL is set and
+  psycopg2 is installed. After a reconnect the cache reloads, since
+  notifications sent while disconnected are lost
+- without a listener the cache reloads when older than
+  POSITION_CACHE_REFRESH_SECONDS, which bounds how stale another process's
+  change can be
+
+Only OPEN positions are cached; a row written with any other status is
+dropped, and lookups that miss fall back to the database.
+"""
+
+import json
+import logging
+import select
+import threading
+import time
+from typing import Dict, List, Optional, Union
+
+try:
+    import psycopg2
+except ImportError:  # Listener is optional; the cache falls back to periodic reloads
+    psycopg2 = None
+
+logger = logging.getLogger(__name__)
+
+POSITIONS_TABLE = "positions"
+NOTIFY_CHANNEL = "positions_changed"
+LISTEN_TIMEOUT_SECONDS = 5.0
+RECONNECT_MIN_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 60.0
+
+
+class PositionCache:
+    def __init__(self, supabase, dsn: str = "", refresh_seconds: float = 60):
+        self.supabase = supabase
+        self.dsn = dsn
+        self.refresh_seconds = refresh_seconds
+        self.loads = 0
+        self._positions: Dict[int, Dict] = {}
+        self._by_request: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.RLock()
+        self._listening = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self):
+        return len(self._positions)
+
+    @property
+    def listening(self) -> bool:
+        return self._listening.is_set()
+
+    # ========================
+    # LOAD
+    # ========================
+
+    def load(self) -> int:
+        """Replace the cache with the open positions in the database."""
+        response = (
+            self.supabase.table(POSITIONS_TABLE)
+            .select("*")
+            .eq("status", "OPEN")
+            .order("entry_date", desc=True)
+            .execute()
+        )
+        rows = response.data or []
+        with self._lock:
+            self._positions = {}
+            self._by_request = {}
+            for row in rows:
+                self._store(row)
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+        logger.info(f"Position cache loaded {len(rows)} open positions")
+        return len(rows)
+
+    def load_due(self) -> bool:
+        """Whether the next read loads from the database (async callers run it in a thread)."""
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            return True
+        return not self.listening and time.monotonic() - loaded_at >= self.refresh_seconds
+
+    def ensure_loaded(self) -> None:
+        """Load on first use, and again when stale and no listener keeps the cache current."""
+        if self.load_due():
+            self.load()
+
+    # ========================
+    # READS
+    # ========================
+
+    def open_positions(self, ticker: Optional[str] = None) -> List[Dict]:
+        """Open positions, newest entry first (copies; callers may modify them)."""
+        self.ensure_loaded()
+        with self._lock:
+            rows = [dict(row) for row in self._positions.values()
+                    if ticker is None or row.get("ticker") == ticker]
+        return sorted(rows, key=lambda row: str(row.get("entry_date") or ""), reverse=True)
+
+    def get(self, position_id: int) -> Optional[Dict]:
+        self.ensure_loaded()
+        with self._lock:
+            row = self._positions.get(position_id)
+            return dict(row) if row is not None else None
+
+    def get_by_request_id(self, request_id: str) -> Optional[Dict]:
+        self.ensure_loaded()
+        with self._lock:
+            row = self._positions.get(self._by_request.get(request_id))
+            return dict(row) if row is not None else None
+
+    # ========================
+    # WRITES
+    # ========================
+
+    def _store(self, row: Dict) -> None:
+        position_id = row["position_id"]
+        if row.get("status") == "OPEN":
+            self._positions[position_id] = dict(row)
+            if row.get("request_id"):
+                self._by_request[row["request_id"]] = position_id
+        else:
+            self._drop(position_id)
+
+    def _drop(self, position_id: int) -> None:
+        row = self._positions.pop(position_id, None)
+        if row is not None and self._by_request.get(row.get("request_id")) == position_id:
+            del self._by_request[row["request_id"]]
+
+    def apply(self, row: Dict) -> None:
+        """Apply a full position row as written to the database."""
+        with self._lock:
+            self._store(row)
+
+    def update(self, position_id: int, fields: Dict) -> None:
+        """Apply a partial update of a cached position."""
+        with self._lock:
+            row = self._positions.get(position_id)
+            if row is not None:
+                self._store({**row, **fields})
+            elif fields.get("status") not in (None, "OPEN"):
+                self._drop(position_id)
+
+    def remove(self, position_id: int) -> None:
+        with self._lock:
+            self._drop(position_id)
+
+    def apply_notification(self, payload: Union[str, Dict]) -> None:
+        """
+        Apply a NOTIFY payload: {"op": "INSERT"|"UPDATE"|"DELETE", "row": {...}}.
+        Rows too large for a notification arrive as {"op", "position_id"} and
+        are read back from the database.
+        """
+        message = json.loads(payload) if isinstance(payload, str) else payload
+        row = message.get("row")
+        position_id = row["position_id"] if row else message.get("position_id")
+        if position_id is None:
+            return
+        if message.get("op") == "DELETE":
+            self.remove(position_id)
+        elif row:
+            self.apply(row)
+        else:
+            response = self.supabase.table(POSITIONS_TABLE).select("*").eq("position_id", position_id).execute()
+            if response.data:
+                self.apply(response.data[0])
+            else:
+                self.remove(position_id)
+
+    # ========================
+    # CHANGE NOTIFICATIONS
+    # ========================
+
+    def listen(self) -> bool:
+        """Start the notification listener thread; False when it cannot run here."""
+        if not self.dsn:
+            return False
+        if psycopg2 is None:
+            logger.warning("psycopg2 not installed: position cache reloads every "
+                           f"{self.refresh_seconds:.0f}s instead of listening for changes")
+            return False
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._listen, name="position-cache", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _listen(self) -> None:
+        delay = RECONNECT_MIN_SECONDS
+        while not self._stopped.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                # Changes made before LISTEN took effect were not notified
+                self.load()
+                self._listening.set()
+                delay = RECONNECT_MIN_SECONDS
+                logger.info(f"Position cache listening on {NOTIFY_CHANNEL}")
+                while not self._stopped.is_set():
+                    select.select([conn], [], [], LISTEN_TIMEOUT_SECONDS)
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            self.apply_notification(notify.payload)
+                        except Exception as e:
+                            logger.warning(f"Ignoring position notification {notify.payload[:200]}: {e}")
+            except Exception as e:
+                logger.warning(f"Position cache listener dropped: {e}")
+            finally:
+                self._listening.clear()
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            if self._stopped.wait(delay):
+                return
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
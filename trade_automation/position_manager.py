@@ -1,6 +1,7 @@
 """
 Position Manager - Tracks open positions and exit conditions
 """
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
@@ -9,10 +10,39 @@ from decimal import Decimal
 from supabase import Client
 
 from trade_automation.models import TradeRequest
+from trade_automation.position_cache import PositionCache
 
 logger = logging.getLogger(__name__)
 
 
+def stop_loss_for(strategy_type: Optional[str], credit: Optional[float], width: Optional[float] = None) -> float:
+    """Stop loss level for a strategy entered at `credit`"""
+    if strategy_type == "CSP":
+        # Cash-secured put: stop loss at 200% of credit received
+        return (credit or 0) * 2
+    elif strategy_type == "VPC":
+        # Vertical put spread: stop loss at width of spread
+        return width or 0
+    return 0
+
+
+def profit_target_for(credit: Optional[float]) -> float:
+    """Profit target: 50% of the credit received"""
+    return credit * 0.5 if credit else 0
+
+
+def fill_thresholds(strategy_type: Optional[str], fill_price: float) -> Dict[str, float]:
+    """
+    Exit thresholds derived from the credit, recomputed from the fill price
+    once it replaces the quoted credit (a VPC stop is the spread width and
+    does not move).
+    """
+    thresholds = {"profit_target": profit_target_for(fill_price)}
+    if strategy_type == "CSP":
+        thresholds["stop_loss"] = stop_loss_for(strategy_type, fill_price)
+    return thresholds
+
+
 class PositionManager:
     """Manages open positions and applies exit rules"""
     
@@ -21,22 +51,17 @@ class PositionManager:
     STOP_LOSS_PERCENT = 200     # Close at 200% of credit (spreads)
     DAYS_TO_EXPIRY_EXIT = 21    # Close 21 DTE
     
-    def __init__(self, supabase: Client):
+    def __init__(self, supabase: Client, cache: Optional[PositionCache] = None):
         self.supabase = supabase
+        # Open positions are read from the cache and writes applied to it (position_cache.py)
+        self.cache = cache
     
     # ========================
     # CREATE & ENTRY
     # ========================
     
-    async def create_position(
-        self,
-        request: TradeRequest,
-        entry_price: float,
-        quantity: int,
-        execution_data: Dict
-    ) -> Dict:
-        """Create a new position record"""
-
+    def _position_row(self, request: TradeRequest, entry_price: float, quantity: int,
+                      execution_data: Optional[Dict] = None) -> Dict:
         legs_payload = []
         for leg in request.legs:
             if hasattr(leg, "__dict__"):
@@ -44,7 +69,7 @@ class PositionManager:
             elif isinstance(leg, dict):
                 legs_payload.append(leg)
 
-        position_data = {
+        row = {
             "request_id": request.request_id,
             "ticker": request.ticker,
             "strategy_type": request.strategy_type,
@@ -57,54 +82,99 @@ class PositionManager:
             "profit_target": self._calculate_profit_target(request),
             "notes": f"Executed from request {request.request_id}"
         }
-        
+
+        # Broker orders are followed until filled (order_tracker.py); dry runs have none
+        order_ids = (execution_data or {}).get("order_ids")
+        if order_ids:
+            row.update({
+                "order_ids": order_ids,
+                "order_status": "WORKING",
+                "quoted_price": entry_price,
+                "submitted_at": execution_data.get("submitted_at"),
+            })
+        return row
+
+    async def create_position(
+        self,
+        request: TradeRequest,
+        entry_price: float,
+        quantity: int,
+        execution_data: Dict
+    ) -> Dict:
+        """Create a new position record"""
+        positions = await self.create_positions([(request, entry_price, quantity, execution_data)])
+        return positions[0]
+
+    async def create_positions(self, entries: List[Tuple[TradeRequest, float, int, Dict]]) -> List[Dict]:
+        """
+        Create position records for (request, entry_price, quantity,
+        execution_data) entries with one insert; rows come back in order.
+        """
+        rows = [self._position_row(request, entry_price, quantity, execution_data)
+                for request, entry_price, quantity, execution_data in entries]
+
         # Insert into positions table
-        response = self.supabase.table("positions").insert(position_data).execute()
-        
-        if response.data:
-            position = response.data[0]
-            logger.info(f"Created position {position['position_id']} for {request.ticker}")
-            return position
+        response = self.supabase.table("positions").insert(rows).execute()
+
+        if response.data and len(response.data) == len(rows):
+            for position in response.data:
+                if self.cache is not None:
+                    self.cache.apply(position)
+                logger.info(f"Created position {position['position_id']} for {position.get('ticker')}")
+            return response.data
         else:
-            logger.error(f"Failed to create position for {request.request_id}")
-            raise Exception(f"Failed to create position: {response}")
-    
+            request_ids = ", ".join(request.request_id for request, *_ in entries)
+            logger.error(f"Failed to create positions for {request_ids}")
+            raise Exception(f"Failed to create positions: {response}")
+
     # ========================
     # POSITION QUERIES
     # ========================
     
+    async def _from_cache(self, read, *args):
+        # Reads are served from memory; a due (re)load queries the database,
+        # so it runs off the event loop like the other database calls
+        if self.cache.load_due():
+            return await asyncio.to_thread(read, *args)
+        return read(*args)
+
     async def get_open_positions(self, ticker: Optional[str] = None) -> List[Dict]:
         """Get all open positions, optionally filtered by ticker"""
         
+        if self.cache is not None:
+            return await self._from_cache(self.cache.open_positions, ticker)
+
         query = self.supabase.table("positions").select("*").eq("status", "OPEN")
         
         if ticker:
             query = query.eq("ticker", ticker)
         
-        response = query.order("entry_date", desc=True).execute()
+        response = await asyncio.to_thread(query.order("entry_date", desc=True).execute)
         return response.data or []
     
     async def get_position_by_request_id(self, request_id: str) -> Optional[Dict]:
         """Get position by original trade request ID"""
         
-        response = (
-            self.supabase.table("positions")
-            .select("*")
-            .eq("request_id", request_id)
-            .execute()
-        )
+        if self.cache is not None:
+            position = await self._from_cache(self.cache.get_by_request_id, request_id)
+            if position is not None:
+                return position
+
+        query = self.supabase.table("positions").select("*").eq("request_id", request_id)
+        response = await asyncio.to_thread(query.execute)
         
         return response.data[0] if response.data else None
     
     async def get_position_by_id(self, position_id: int) -> Optional[Dict]:
         """Get position by position ID"""
         
-        response = (
-            self.supabase.table("positions")
-            .select("*")
-            .eq("position_id", position_id)
-            .execute()
-        )
+        if self.cache is not None:
+            position = await self._from_cache(self.cache.get, position_id)
+            if position is not None:
+                return position
+
+        query = self.supabase.table("positions").select("*").eq("position_id", position_id)
+        response = await asyncio.to_thread(query.execute)
         
         return response.data[0] if response.data else None
     
@@ -207,14 +277,13 @@ class PositionManager:
             "last_updated": datetime.utcnow().isoformat()
         }
         
-        response = (
-            self.supabase.table("positions")
-            .update(close_data)
-            .eq("position_id", position_id)
-            .execute()
-        )
+        # Database writes run off the event loop (exits close several positions at once)
+        query = self.supabase.table("positions").update(close_data).eq("position_id", position_id)
+        response = await asyncio.to_thread(query.execute)
         
         if response.data:
+            if self.cache is not None:
+                self.cache.apply(response.data[0])
             logger.info(f"Closed position {position_id}: {exit_reason}, P&L: ${realized_pnl}")
             
             # Log to trade_history
@@ -251,7 +320,7 @@ class PositionManager:
             "closed_at": close_data["exit_date"]
         }
         
-        response = self.supabase.table("trade_history").insert(history_entry).execute()
+        response = await asyncio.to_thread(self.supabase.table("trade_history").insert(history_entry).execute)
         
         if response.data:
             logger.info(f"Logged trade to history: {win_loss}")
@@ -264,23 +333,11 @@ class PositionManager:
     
     def _calculate_stop_loss(self, request: TradeRequest) -> float:
         """Calculate stop loss level based on strategy"""
-        
-        if request.strategy_type == "CSP":
-            # Cash-secured put: stop loss at 200% of credit received
-            return (request.net_credit or 0) * 2
-        elif request.strategy_type == "VPC":
-            # Vertical put spread: stop loss at width of spread
-            return request.width or 0
-        else:
-            return 0
+        return stop_loss_for(request.strategy_type, request.net_credit, request.width)
     
     def _calculate_profit_target(self, request: TradeRequest) -> float:
         """Calculate profit target (50% of max profit)"""
-        
-        if request.net_credit:
-            # 50% of credit received
-            return request.net_credit * 0.5
-        return 0
+        return profit_target_for(request.net_credit)
     
     def _calculate_days_held(self, position: Dict) -> int:
         """Calculate days position was held"""
@@ -2,9 +2,10 @@ import logging
 import json
 from datetime import datetime
 
+from trade_automation.allocation import AllocationLimits, allocate, load_open_exposure
 from trade_automation.config import Settings
-from trade_automation.opportunities import fetch_opportunities, filter_opportunities, build_trade_request
-from trade_automation.store import load_state, save_state, upsert_request
+from trade_automation.opportunities import ContractResolver, fetch_opportunities, filter_opportunities, build_trade_request
+from trade_automation.store import open_store
 from trade_automation.notifier_telegram import TelegramNotifier
 from trade_automation.notifier_discord import DiscordNotifier
 from trade_automation.supabase_client import get_supabase_client
@@ -35,11 +36,14 @@ def format_trade_details(trade) -> str:
 
 def main():
     settings = Settings()
-    state = load_state()
+    store = open_store()
 
     supabase = get_supabase_client(settings)
     opportunities = fetch_opportunities(settings)
     opportunities = filter_opportunities(opportunities, settings)
+    # Best feasible set given buying power and what open positions already hold
+    opportunities = allocate(opportunities, AllocationLimits.from_settings(settings),
+                             load_open_exposure(supabase))
 
     if not opportunities:
         logger.info("No opportunities found")
@@ -48,12 +52,16 @@ def main():
     telegram = TelegramNotifier(settings)
     discord = DiscordNotifier(settings)
 
+    # Every leg contract id in one lookup instead of one query per leg
+    resolver = ContractResolver(supabase)
+    resolver.load(opportunities)
+
     created = 0
     for opp in opportunities:
-        trade = build_trade_request(opp, supabase, settings)
+        trade = build_trade_request(opp, supabase, settings, resolver=resolver)
         if not trade:
             continue
-        if trade.request_id in state.get("requests", {}):
+        if store.exists(trade.request_id):
             continue
 
         trade_dict = json.loads(json.dumps(trade, default=lambda o: o.__dict__))
@@ -61,7 +69,8 @@ def main():
         # Store created_at for timeout tracking
         trade_dict["created_at"] = datetime.utcnow().isoformat()
 
-        upsert_request(state, trade_dict)
+        # Stored before sending, so an immediate approval finds it
+        store.upsert(trade_dict)
         created += 1
 
         # Send with inline buttons via Telegram
@@ -79,7 +88,7 @@ def main():
             )
             if result:
                 # Store message_id for later editing
-                trade_dict["telegram_message_id"] = result.get("message_id")
+                store.update(trade.request_id, telegram_message_id=result.get("message_id"))
                 logger.info(f"Sent Telegram proposal for {trade.request_id}")
             else:
                 logger.warning(f"Failed to send Telegram proposal for {trade.request_id}")
@@ -92,7 +101,6 @@ def main():
 
         logger.info("Queued trade request %s for %s", trade.request_id, trade.ticker)
 
-    save_state(state)
     logger.info("Created %s trade requests", created)
 
 
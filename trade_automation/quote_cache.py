@@ -0,0 +1,112 @@
+"""
+Option quote cache for exit monitoring.
+
+The exit monitor values every open position each cycle. Instead of one
+options_quotes query per leg (repeated for every valuation of a position),
+the contract ids of all open positions are collected and their latest quotes
+loaded with one query per LOAD_CHUNK contracts at the start of the cycle.
+The cache lives for one cycle, so every cycle sees fresh quotes.
+
+Only quotes from the last QUOTE_LOOKBACK_DAYS are read (the table keeps one
+row per contract and quote date); contracts without a recent quote count as
+unquoted and are priced off the fitted smile by the caller. Misses are
+cached too, so an unquoted contract is queried once per cycle at most.
+Underlying prices (stock_quotes) are loaded the same way when an exit rule
+needs them.
+"""
+
+import logging
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OPTIONS_QUOTES_TABLE = "options_quotes"
+STOCK_QUOTES_TABLE = "stock_quotes"
+# Contracts per query: keeps the URL short and LOAD_CHUNK x lookback days
+# under PostgREST's default 1000-row response limit
+LOAD_CHUNK = 100
+# stock_quotes has several intraday rows per ticker and day
+UNDERLYING_CHUNK = 10
+QUOTE_LOOKBACK_DAYS = 7
+
+
+def quote_mid(quote: Dict) -> Optional[float]:
+    """Mark when positive, else the bid/ask midpoint, else None."""
+    mark = quote.get("mark")
+    if mark is not None and float(mark) > 0:
+        return float(mark)
+    bid = float(quote.get("bid") or 0)
+    ask = float(quote.get("ask") or 0)
+    if bid > 0 and ask > 0:
+        return (bid + ask) / 2.0
+    return None
+
+
+class QuoteCache:
+    def __init__(self, supabase, lookback_days: int = QUOTE_LOOKBACK_DAYS):
+        self.supabase = supabase
+        self.lookback_days = lookback_days
+        self._quotes: Dict[str, Optional[Dict]] = {}
+        self._underlyings: Dict[str, Optional[Dict]] = {}
+        self.queries = 0
+
+    def __contains__(self, contractid: str) -> bool:
+        return contractid in self._quotes
+
+    def _load_latest(self, table: str, key: str, columns: str, keys: Iterable[str],
+                     cache: Dict[str, Optional[Dict]], chunk_size: int = LOAD_CHUNK,
+                     order_by: Tuple[str, ...] = ("quote_date",)) -> int:
+        missing = sorted({k for k in keys if k and k not in cache})
+        since = (date.today() - timedelta(days=self.lookback_days)).isoformat()
+        for start in range(0, len(missing), chunk_size):
+            chunk = missing[start:start + chunk_size]
+            for k in chunk:
+                cache[k] = None
+            try:
+                query = self.supabase.table(table).select(columns).in_(key, chunk).gte("quote_date", since)
+                for column in order_by:
+                    query = query.order(column, desc=True)
+                rows = query.execute().data or []
+            except Exception as e:
+                logger.error(f"Failed to load {table} for {len(chunk)} keys: {e}")
+                continue
+            finally:
+                self.queries += 1
+            for row in rows:
+                # Newest first: keep the first row per key
+                if cache.get(row[key]) is None:
+                    cache[row[key]] = row
+        return len(missing)
+
+    def load(self, contract_ids: Iterable[str]) -> int:
+        """Fetch the latest quote of every contract not loaded yet; returns contracts fetched."""
+        return self._load_latest(OPTIONS_QUOTES_TABLE, "contractid", "contractid, bid, ask, mark, delta, quote_date",
+                                 contract_ids, self._quotes)
+
+    def load_underlyings(self, tickers: Iterable[str]) -> int:
+        """Fetch the latest stock price of every ticker not loaded yet."""
+        return self._load_latest(STOCK_QUOTES_TABLE, "ticker", "ticker, price, quote_date, quote_time",
+                                 tickers, self._underlyings, UNDERLYING_CHUNK, ("quote_date", "quote_time"))
+
+    def underlying(self, ticker: str) -> Optional[float]:
+        if ticker not in self._underlyings:
+            self.load_underlyings([ticker])
+        row = self._underlyings.get(ticker)
+        return float(row["price"]) if row and row.get("price") is not None else None
+
+    def delta(self, contractid: str) -> Optional[float]:
+        quote = self.quote(contractid)
+        return float(quote["delta"]) if quote and quote.get("delta") is not None else None
+
+    def quote(self, contractid: str) -> Optional[Dict]:
+        if contractid not in self._quotes:
+            self.load([contractid])
+        return self._quotes.get(contractid)
+
+    def mid(self, contractid: str) -> Optional[float]:
+        quote = self.quote(contractid)
+        if quote is None:
+            logger.warning(f"No quote found for contract {contractid}")
+            return None
+        return quote_mid(quote)
@@ -0,0 +1,252 @@
+"""
+Streaming exit monitor (EXIT_MONITOR_MODE=stream).
+
+The polling monitor checks positions every 5 minutes against whatever the
+collector last wrote to options_quotes, so a stop loss can trigger an hour
+late. In stream mode the contracts of all open positions are subscribed to
+TradeStation's quote stream and every tick is evaluated in memory:
+
+- QuoteBook keeps the latest bid/ask per contract (stream messages only
+  carry the fields that changed)
+- each tick re-values only the positions holding that contract and runs
+  the exit rule set (exit_rules.py) over them; a breach places the closing
+  order right away, with the streamed cost to close
+- open positions are reloaded every EXIT_POSITION_REFRESH_SECONDS and all
+  of them are checked (this is where the DTE rule fires); when the contract
+  set changes the streams are resubscribed, so new positions are watched
+  and closed ones dropped
+
+A stream carries up to MAX_STREAM_SYMBOLS contracts and runs in its own
+thread, handing messages to the event loop; it reconnects with backoff
+when the connection drops or the server sends an error (e.g. GoAway).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, FrozenSet, List, Optional, Set
+
+from trade_automation.order_tracker import awaiting_fill
+from trade_automation.quote_cache import quote_mid
+from trade_automation.tradestation import MAX_STREAM_SYMBOLS
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_MIN_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 30.0
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _leg_field(leg, name):
+    return leg.get(name) if isinstance(leg, dict) else getattr(leg, name, None)
+
+
+class QuoteBook:
+    """Latest bid/ask/last per contract, merged from partial stream updates."""
+
+    def __init__(self):
+        self._quotes: Dict[str, Dict[str, Optional[float]]] = {}
+
+    def apply(self, message: Dict) -> Optional[str]:
+        """Merge a quote message; returns its symbol (None for heartbeats and errors)."""
+        symbol = message.get("Symbol")
+        if not symbol:
+            return None
+        quote = self._quotes.setdefault(symbol, {})
+        for field in ("Bid", "Ask", "Last"):
+            if field in message:
+                quote[field.lower()] = _float(message[field])
+        return symbol
+
+    def mid(self, symbol: str) -> Optional[float]:
+        quote = self._quotes.get(symbol)
+        return quote_mid(quote) if quote else None
+
+    def retain(self, symbols: Set[str]) -> None:
+        for symbol in set(self._quotes) - symbols:
+            del self._quotes[symbol]
+
+
+class QuoteStream:
+    """One quote stream (thread) feeding messages to an asyncio queue until stopped."""
+
+    def __init__(self, trader, symbols: List[str], loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self.trader = trader
+        self.symbols = symbols
+        self.loop = loop
+        self.queue = queue
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="quote-stream", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        # The thread notices on its next message (TradeStation heartbeats every few seconds)
+        self._stopped.set()
+
+    def _run(self) -> None:
+        delay = RECONNECT_MIN_SECONDS
+        while not self._stopped.is_set():
+            try:
+                for message in self.trader.stream_quotes(self.symbols):
+                    if self._stopped.is_set():
+                        return
+                    if "Error" in message:
+                        logger.warning(f"Quote stream error: {message.get('Error')} {message.get('Message', '')}")
+                        break
+                    delay = RECONNECT_MIN_SECONDS
+                    if "Heartbeat" not in message:
+                        self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+            except Exception as e:
+                logger.warning(f"Quote stream for {len(self.symbols)} contracts dropped: {e}")
+            if self._stopped.wait(delay):
+                return
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+
+class StreamingExitMonitor:
+    """
+    Evaluates exit rules on live quotes. `exits` is an ExitAutomation
+    (rules, closing orders, notifications); `stream_factory(symbols, loop,
+    queue)` creates a started-on-demand stream (QuoteStream by default).
+    """
+
+    def __init__(self, exits, refresh_seconds: float = 15,
+                 stream_factory: Optional[Callable] = None):
+        self.exits = exits
+        self.refresh_seconds = refresh_seconds
+        self.book = QuoteBook()
+        self.positions: Dict[int, Dict] = {}
+        self._by_contract: Dict[str, Set[int]] = defaultdict(set)
+        self._exiting: Set[int] = set()
+        self._symbols: FrozenSet[str] = frozenset()
+        self._streams: List = []
+        self._stream_factory = stream_factory or (
+            lambda symbols, loop, queue: QuoteStream(exits.trader, symbols, loop, queue)
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+
+    @staticmethod
+    def _contracts(position: Dict) -> List[str]:
+        return [cid for cid in (_leg_field(leg, "contractid") for leg in position.get("legs") or []) if cid]
+
+    def _index(self) -> None:
+        self._by_contract = defaultdict(set)
+        for position_id, position in self.positions.items():
+            for contractid in self._contracts(position):
+                self._by_contract[contractid].add(position_id)
+
+    def _resubscribe(self) -> None:
+        symbols = frozenset(self._by_contract)
+        if symbols == self._symbols:
+            return
+        for stream in self._streams:
+            stream.stop()
+        ordered = sorted(symbols)
+        self._streams = [
+            self._stream_factory(ordered[i:i + MAX_STREAM_SYMBOLS], self._loop, self._queue)
+            for i in range(0, len(ordered), MAX_STREAM_SYMBOLS)
+        ]
+        for stream in self._streams:
+            stream.start()
+        self._symbols = symbols
+        self.book.retain(set(symbols))
+        logger.info(f"Streaming quotes for {len(symbols)} contracts ({len(self.positions)} positions)")
+
+    async def refresh_positions(self) -> None:
+        """Reload open positions, check all of them and update the subscriptions."""
+        open_positions = [p for p in await self.exits.position_mgr.get_open_positions() if not awaiting_fill(p)]
+        # Positions being closed stay excluded until they leave the open set
+        self._exiting &= {p["position_id"] for p in open_positions}
+        self.positions = {p["position_id"]: p for p in open_positions if p["position_id"] not in self._exiting}
+        self._index()
+        # Prices come from the stream; only rules reading deltas/underlyings need a query
+        self.exits._load_market_data(list(self.positions.values()), option_quotes=False)
+        await self._check(list(self.positions.values()))
+        self._resubscribe()
+
+    def cost_to_close(self, position: Dict) -> Optional[float]:
+        """Net cost to close from streamed mids; None until every leg has a quote."""
+        total = 0.0
+        for leg in position.get("legs") or []:
+            mid = self.book.mid(_leg_field(leg, "contractid"))
+            if mid is None:
+                return None
+            action = str(_leg_field(leg, "action") or "").lower()
+            total += mid if action == "sell" else -mid
+        return total
+
+    async def _check(self, positions: List[Dict]) -> int:
+        if not positions:
+            return 0
+        costs = [self.cost_to_close(position) for position in positions]
+        breached = [(position, reason, cost) for position, cost, reason
+                    in zip(positions, costs, self.exits.evaluate_exits(positions, costs)) if reason]
+        # One slow order or database write does not hold up the other exits
+        await asyncio.gather(*(self._exit(position, reason, cost) for position, reason, cost in breached))
+        return len(breached)
+
+    async def on_quote(self, symbol: str) -> int:
+        """Check the positions holding `symbol`; returns exits placed."""
+        positions = [self.positions[pid] for pid in self._by_contract.get(symbol, ()) if pid in self.positions]
+        exits = await self._check(positions)
+        if exits:
+            self._resubscribe()
+        return exits
+
+    async def _exit(self, position: Dict, reason: str, cost: Optional[float]) -> None:
+        position_id = position["position_id"]
+        self._exiting.add(position_id)
+        self.positions.pop(position_id, None)
+        for contractid in self._contracts(position):
+            self._by_contract.get(contractid, set()).discard(position_id)
+            if not self._by_contract.get(contractid):
+                self._by_contract.pop(contractid, None)
+
+        started = time.perf_counter()
+        try:
+            logger.info(f"Exiting position {position_id}: {reason}")
+            await self.exits._execute_exit(position, reason, cost)
+            await asyncio.to_thread(self.exits._notify_exit, position, reason, cost)
+        except Exception as e:
+            # Not closed: the next refresh picks it up again
+            logger.error(f"Exit of position {position_id} failed: {e}")
+            self._exiting.discard(position_id)
+            return
+        logger.info(f"Position {position_id} exit placed {(time.perf_counter() - started) * 1000:.0f} ms after the tick")
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh_positions()
+            except Exception as e:
+                logger.error(f"Position refresh failed: {e}")
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        await self.refresh_positions()
+        refresher = asyncio.create_task(self._refresh_loop())
+        try:
+            while True:
+                symbol = self.book.apply(await self._queue.get())
+                if symbol:
+                    try:
+                        await self.on_quote(symbol)
+                    except Exception as e:
+                        logger.error(f"Exit check on {symbol} tick failed: {e}")
+        finally:
+            refresher.cancel()
+            for stream in self._streams:
+                stream.stop()
@@ -1,31 +1,223 @@
+"""
+Trade request store.
+
+Requests live in a SQLite database in WAL mode (TRADE_AUTOMATION_DB,
+default trade_automation/requests.db) instead of a state.json that was
+read and rewritten whole on every worker tick:
+
+- one row per request (JSON document plus indexed status / created_at),
+  so the worker only reads pending requests and updates the one it acts on
+- status changes are single-row compare-and-set updates, so a request can
+  only be approved once even with several writers (propose_trades and the
+  approval worker run as separate processes)
+- update cursors (Telegram last_update_id, Discord last_message_id) in a
+  small key/value table
+- terminal requests older than TRADE_REQUEST_RETENTION_DAYS are purged
+
+A legacy state.json (TRADE_AUTOMATION_STATE) is imported once, the first
+time an empty database is opened.
+"""
+
 import json
+import logging
 import os
-from typing import Dict, Any
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
 
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.environ.get("TRADE_AUTOMATION_DB", "trade_automation/requests.db")
 STATE_PATH = os.environ.get("TRADE_AUTOMATION_STATE", "trade_automation/state.json")
 
+TERMINAL_STATUSES = ("rejected", "executed", "failed")
+DEFAULT_RETENTION_DAYS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trade_requests (
+    request_id TEXT PRIMARY KEY,
+    status     TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    data       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trade_requests_status_created ON trade_requests (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_trade_requests_created ON trade_requests (created_at);
+CREATE TABLE IF NOT EXISTS cursors (
+    name  TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def get_retention_days() -> int:
+    try:
+        return int(os.environ.get("TRADE_REQUEST_RETENTION_DAYS", DEFAULT_RETENTION_DAYS))
+    except ValueError:
+        return DEFAULT_RETENTION_DAYS
+
+
+class RequestStore:
+    """SQLite-backed trade requests; safe to share between threads and processes."""
+
+    def __init__(self, path: Optional[str] = None, legacy_state_path: Optional[str] = None):
+        self.path = path or DB_PATH
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Autocommit; every write is one statement or an explicit transaction
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        if legacy_state_path:
+            self.import_legacy_state(legacy_state_path)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    # Requests
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        row = self._execute("SELECT data FROM trade_requests WHERE request_id = ?", (request_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def exists(self, request_id: str) -> bool:
+        return self._execute("SELECT 1 FROM trade_requests WHERE request_id = ?", (request_id,)).fetchone() is not None
+
+    def upsert(self, request_dict: Dict[str, Any]) -> None:
+        data = dict(request_dict)
+        data.setdefault("status", "pending")
+        data.setdefault("created_at", _now())
+        self._execute(
+            "INSERT INTO trade_requests (request_id, status, created_at, updated_at, data) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (request_id) DO UPDATE SET status = excluded.status, "
+            "created_at = excluded.created_at, updated_at = excluded.updated_at, data = excluded.data",
+            (data["request_id"], data["status"], data["created_at"], _now(), json.dumps(data)),
+        )
+
+    def update(self, request_id: str, **fields) -> bool:
+        """Merge fields into a request's document (status goes through set_status)."""
+        fields.pop("status", None)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data FROM trade_requests WHERE request_id = ?", (request_id,)
+                ).fetchone()
+                if row:
+                    data = {**json.loads(row["data"]), **fields}
+                    self._conn.execute(
+                        "UPDATE trade_requests SET data = ?, updated_at = ? WHERE request_id = ?",
+                        (json.dumps(data), _now(), request_id),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row is not None
+
+    def set_status(self, request_id: str, status: str, notes: str = "",
+                   expected_status: Optional[str] = None) -> bool:
+        """
+        Atomically move a request to `status`. With `expected_status` the
+        change only happens if the request is still in that status; returns
+        whether a row changed.
+        """
+        patch = {"status": status, **({"notes": notes} if notes else {})}
+        sql = ("UPDATE trade_requests SET status = ?, updated_at = ?, data = json_patch(data, ?) "
+               "WHERE request_id = ?")
+        params = [status, _now(), json.dumps(patch), request_id]
+        if expected_status is not None:
+            sql += " AND status = ?"
+            params.append(expected_status)
+        return self._execute(sql, params).rowcount > 0
+
+    def by_status(self, status: str, created_before: Optional[str] = None,
+                  created_since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Requests in `status`, oldest first, optionally limited to
+        created_at < created_before and/or created_at >= created_since (ISO).
+        """
+        sql = "SELECT data FROM trade_requests WHERE status = ?"
+        params: List[Any] = [status]
+        if created_before is not None:
+            sql += " AND created_at < ?"
+            params.append(created_before)
+        if created_since is not None:
+            sql += " AND created_at >= ?"
+            params.append(created_since)
+        rows = self._execute(sql + " ORDER BY created_at", params).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def pending(self, created_before: Optional[str] = None,
+                created_since: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self.by_status("pending", created_before, created_since)
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._execute("SELECT status, COUNT(*) AS n FROM trade_requests GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def purge(self, retention_days: Optional[int] = None) -> int:
+        """Delete terminal requests created more than `retention_days` ago."""
+        days = get_retention_days() if retention_days is None else retention_days
+        cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
+        placeholders = ", ".join("?" for _ in TERMINAL_STATUSES)
+        deleted = self._execute(
+            f"DELETE FROM trade_requests WHERE status IN ({placeholders}) AND created_at < ?",
+            (*TERMINAL_STATUSES, cutoff),
+        ).rowcount
+        if deleted:
+            logger.info(f"Purged {deleted} finished trade requests older than {days} days")
+        return deleted
 
-def load_state() -> Dict[str, Any]:
-    if not os.path.exists(STATE_PATH):
-        return {"requests": {}, "telegram": {"last_update_id": 0}, "discord": {"last_message_id": ""}}
-    with open(STATE_PATH, "r") as f:
-        return json.load(f)
+    # Cursors
 
+    def get_cursor(self, name: str, default: Any = None) -> Any:
+        row = self._execute("SELECT value FROM cursors WHERE name = ?", (name,)).fetchone()
+        return json.loads(row["value"]) if row else default
 
-def save_state(state: Dict[str, Any]) -> None:
-    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
-    with open(STATE_PATH, "w") as f:
-        json.dump(state, f, indent=2)
+    def set_cursor(self, name: str, value: Any) -> None:
+        self._execute(
+            "INSERT INTO cursors (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+            (name, json.dumps(value)),
+        )
 
+    # Migration
 
-def upsert_request(state: Dict[str, Any], request_dict: Dict[str, Any]) -> None:
-    state.setdefault("requests", {})[request_dict["request_id"]] = request_dict
+    def import_legacy_state(self, state_path: str) -> int:
+        """Import a state.json into an empty store; the file is renamed to *.imported."""
+        if not os.path.exists(state_path):
+            return 0
+        if self._execute("SELECT 1 FROM trade_requests LIMIT 1").fetchone():
+            return 0
+        with open(state_path) as f:
+            state = json.load(f)
+        requests = list((state.get("requests") or {}).values())
+        for request in requests:
+            self.upsert(request)
+        if state.get("telegram", {}).get("last_update_id"):
+            self.set_cursor("telegram_last_update_id", state["telegram"]["last_update_id"])
+        if state.get("discord", {}).get("last_message_id"):
+            self.set_cursor("discord_last_message_id", state["discord"]["last_message_id"])
+        os.replace(state_path, state_path + ".imported")
+        logger.info(f"Imported {len(requests)} trade requests from {state_path}")
+        return len(requests)
 
 
-def update_request_status(state: Dict[str, Any], request_id: str, status: str, notes: str = "") -> None:
-    req = state.setdefault("requests", {}).get(request_id)
-    if not req:
-        return
-    req["status"] = status
-    if notes:
-        req["notes"] = notes
+def open_store() -> RequestStore:
+    """The configured store (importing a legacy state.json if present)."""
+    return RequestStore(DB_PATH, legacy_state_path=STATE_PATH)
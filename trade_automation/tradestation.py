@@ -1,28 +1,67 @@
 import json
 import logging
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from urllib.parse import quote
 
 import requests
 
+from tradestation_auth import TokenCache
 from trade_automation.config import Settings
 from trade_automation.models import TradeRequest, OptionLeg
 
 logger = logging.getLogger(__name__)
 
 SIGNIN_URL = "https://signin.tradestation.com/oauth/token"
+# Symbols per market data stream request
+MAX_STREAM_SYMBOLS = 100
+# Access tokens live 20 minutes; refresh this long before they expire
+TOKEN_REFRESH_MARGIN_SECONDS = 120
+DEFAULT_TOKEN_TTL_SECONDS = 1200
+
+
+def order_ids(result: Dict[str, Any]) -> List[str]:
+    """Broker order ids from a place_order result (none for dry runs or failures)."""
+    body = result.get("body") if isinstance(result, dict) else None
+    if not isinstance(body, dict):
+        return []
+    return [str(order["OrderID"]) for order in body.get("Orders") or [] if order.get("OrderID")]
 
 
 class TradeStationTradingClient:
-    def __init__(self, settings: Settings):
+    """
+    Order client meant to live for the whole process: one pooled HTTP
+    session (keep-alive, no TLS handshake per order) and an access token
+    that is refreshed ahead of expiry rather than on the order path.
+    Tokens come from the cross-process cache (tradestation_auth.py),
+    so a token another process already obtained is reused.
+    """
+
+    def __init__(self, settings: Settings, session: Optional[requests.Session] = None,
+                 token_cache: Optional[TokenCache] = None):
         self.settings = settings
         self.access_token = None
+        self.token_expires_at = 0.0
+        self.session = session or requests.Session()
+        self.token_cache = token_cache or TokenCache(settings.ts_client_id, settings.ts_refresh_token)
 
     def refresh_access_token(self) -> bool:
+        """Replace the current access token (from the shared cache, or signin if none is usable)."""
         if not self.settings.ts_refresh_token:
             logger.error("No TRADESTATION_REFRESH_TOKEN set")
             return False
 
-        response = requests.post(
+        token = self.token_cache.get_or_refresh(
+            self._fetch_token, rejected_token=self.access_token,
+            min_ttl=TOKEN_REFRESH_MARGIN_SECONDS + 60,
+        )
+        if not token:
+            return False
+        self.access_token, self.token_expires_at = token
+        return True
+
+    def _fetch_token(self) -> Optional[Tuple[str, float]]:
+        response = self.session.post(
             SIGNIN_URL,
             headers={"Content-Type": "application/x-www-form-urlencoded"},
             data={
@@ -36,26 +75,34 @@ class TradeStationTradingClient:
 
         if response.ok:
             data = response.json()
-            self.access_token = data["access_token"]
-            return True
+            return data["access_token"], time.time() + float(data.get("expires_in") or DEFAULT_TOKEN_TTL_SECONDS)
 
         logger.error("Token refresh failed: %s", response.text[:500])
-        return False
+        return None
 
     def _headers(self) -> Dict[str, str]:
         return {"Authorization": f"Bearer {self.access_token}"}
 
+    def seconds_until_refresh(self) -> float:
+        """Time until the token should be refreshed (0 when missing or due)."""
+        return max(self.token_expires_at - TOKEN_REFRESH_MARGIN_SECONDS - time.time(), 0.0)
+
+    def ensure_token(self) -> bool:
+        """Refresh the access token if it is missing or close to expiry."""
+        if self.access_token and self.seconds_until_refresh() > 0:
+            return True
+        return self.refresh_access_token()
+
     def _request(self, method: str, url: str, **kwargs):
-        if not self.access_token:
-            if not self.refresh_access_token():
-                raise RuntimeError("TradeStation auth failed")
+        if not self.ensure_token():
+            raise RuntimeError("TradeStation auth failed")
 
-        response = requests.request(method, url, headers=self._headers(), **kwargs)
+        response = self.session.request(method, url, headers=self._headers(), **kwargs)
         if response.status_code == 401:
             logger.warning("Access token expired, refreshing...")
             if not self.refresh_access_token():
                 raise RuntimeError("TradeStation auth failed: refresh token rejected")
-            response = requests.request(method, url, headers=self._headers(), **kwargs)
+            response = self.session.request(method, url, headers=self._headers(), **kwargs)
         return response
 
     def _build_leg(self, leg: OptionLeg) -> Dict[str, Any]:
@@ -110,3 +157,35 @@ class TradeStationTradingClient:
             return {"ok": False, "status": response.status_code, "body": response.text}
 
         return {"ok": True, "status": response.status_code, "body": response.json()}
+
+    def get_orders(self, order_ids: List[str]) -> List[Dict[str, Any]]:
+        """Current status of the given orders (one request)."""
+        if not order_ids:
+            return []
+        url = self.settings.ts_orders_status_endpoint(order_ids)
+        response = self._request("GET", url, timeout=20)
+        if not response.ok:
+            raise RuntimeError(f"Order status request failed ({response.status_code}): {response.text[:500]}")
+        return response.json().get("Orders") or []
+
+    def stream_quotes(self, symbols: List[str], read_timeout: float = 30) -> Iterator[Dict[str, Any]]:
+        """
+        Messages from the quote stream for up to MAX_STREAM_SYMBOLS symbols:
+        quote updates (only changed fields besides Symbol), Heartbeat and
+        Error messages. Ends when the server closes the stream.
+        """
+        url = (f"{self.settings.ts_api_root()}/marketdata/stream/quotes/"
+               f"{','.join(quote(symbol, safe='') for symbol in symbols[:MAX_STREAM_SYMBOLS])}")
+        response = self._request("GET", url, stream=True, timeout=(10, read_timeout))
+        if not response.ok:
+            raise RuntimeError(f"Quote stream failed ({response.status_code}): {response.text[:500]}")
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+        finally:
+            response.close()
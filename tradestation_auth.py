@@ -0,0 +1,122 @@
+"""
+Shared TradeStation Access Token Cache
+
+Every process that talks to TradeStation (options collector, approval
+worker, exit automation) used to exchange the refresh token for a new
+access token on startup. The cache keeps the current access token and its
+expiry in one file so any process can reuse a token that is still valid.
+It lives at the top level so the collector (data_collection) and the
+trading client (trade_automation) share it without depending on each other.
+
+Single-refresher protocol:
+1. Read the file without locking; use the token if it is valid for at
+   least MIN_TTL_SECONDS (and is not the token the caller just had rejected).
+2. Otherwise take an exclusive flock on <cache>.lock and read again:
+   another process may have refreshed while this one waited.
+3. Only if the token is still unusable, call the refresh function, write the
+   new token atomically (temp file + rename, mode 0600) and release the lock.
+
+Entries are keyed by a hash of client id and refresh token, so rotating
+credentials or switching apps never serves a foreign token.
+
+Config:
+- TRADESTATION_TOKEN_CACHE  cache file (default .tradestation_token.json in
+                            the project root; keep it out of version control)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX: no cross-process lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / '.tradestation_token.json'
+# A cached token must stay valid at least this long to be handed out
+MIN_TTL_SECONDS = 120
+
+# (access_token, expires_at epoch seconds)
+Token = Tuple[str, float]
+
+
+def get_token_cache_path() -> str:
+    return os.environ.get('TRADESTATION_TOKEN_CACHE') or str(DEFAULT_CACHE_PATH)
+
+
+class TokenCache:
+    def __init__(self, client_id: str, refresh_token: str, path: Optional[str] = None):
+        self.path = path or get_token_cache_path()
+        self.key = hashlib.sha256(f"{client_id}:{refresh_token}".encode()).hexdigest()[:16]
+
+    def _read_all(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write_all(self, entries: Dict[str, Dict]):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.token-')
+        try:
+            os.fchmod(fd, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def valid_token(self, min_ttl: float = MIN_TTL_SECONDS, rejected_token: Optional[str] = None) -> Optional[Token]:
+        entry = self._read_all().get(self.key) or {}
+        token, expires_at = entry.get('access_token'), float(entry.get('expires_at') or 0)
+        if token and token != rejected_token and expires_at - time.time() >= min_ttl:
+            return token, expires_at
+        return None
+
+    @contextmanager
+    def _exclusive(self):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_or_refresh(self, refresh: Callable[[], Optional[Token]], rejected_token: Optional[str] = None,
+                       min_ttl: float = MIN_TTL_SECONDS) -> Optional[Token]:
+        """
+        A valid cached token, or a new one from `refresh()` (called by at
+        most one process at a time). `rejected_token` is never returned,
+        e.g. the token that just got a 401. None if the refresh fails.
+        """
+        cached = self.valid_token(min_ttl, rejected_token)
+        if cached:
+            return cached
+        with self._exclusive():
+            cached = self.valid_token(min_ttl, rejected_token)
+            if cached:
+                logger.debug("Using access token refreshed by another process")
+                return cached
+            token = refresh()
+            if token:
+                entries = self._read_all()
+                entries[self.key] = {'access_token': token[0], 'expires_at': token[1]}
+                self._write_all(entries)
+            return token